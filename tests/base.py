@@ -3,6 +3,7 @@ import unittest
 import json
 import os
 import ntpath
+import tempfile
 
 from mixer.backend.flask import mixer
 
@@ -45,6 +46,9 @@ from zou.app.models.working_file import WorkingFile
 
 TEST_FOLDER = os.path.join("tests", "tmp")
 
+# Search indexes written by the tests don't end up in the working directory.
+app.config["INDEXES_FOLDER"] = tempfile.mkdtemp(prefix="zou-indexes-")
+
 
 class ApiTestCase(unittest.TestCase):
     """
@@ -1,3 +1,5 @@
+import json
+
 from tests.base import ApiDBTestCase
 
 from zou.app.services import (
@@ -6,6 +8,7 @@ from zou.app.services import (
     projects_service,
     tasks_service,
 )
+from zou.app.stores import versions_store
 
 
 class BreakdownServiceTestCase(ApiDBTestCase):
@@ -29,6 +32,13 @@ class BreakdownServiceTestCase(ApiDBTestCase):
         self.asset_character_id = str(self.asset_character.id)
         self.generate_fixture_shot("SH02")
         self.asset = self.generate_fixture_asset_character("Dog")
+        # Conditional requests are disabled without a shared store.
+        self.is_versions_store_shared = versions_store.is_shared
+        versions_store.is_shared = True
+
+    def tearDown(self):
+        versions_store.is_shared = self.is_versions_store_shared
+        super(BreakdownServiceTestCase, self).tearDown()
 
     def test_get_episode_casting(self):
         casting = breakdown_service.get_casting(self.shot.id)
@@ -128,3 +138,115 @@ class BreakdownServiceTestCase(ApiDBTestCase):
         self.asset.update({"source_id": self.episode_id})
         assets = self.get("/data/assets?episode_id=%s" % self.episode_id)
         self.assertEquals(len(assets), 3)
+
+    def test_update_project_casting(self):
+        shot_2_id = str(self.shot.id)
+        dog_id = str(self.asset.id)
+        self.put(
+            "/data/projects/%s/entities/%s/casting"
+            % (self.project_id, self.shot_id),
+            [
+                {"asset_id": self.asset_id, "nb_occurences": 1},
+                {"asset_id": self.asset_character_id, "nb_occurences": 3},
+            ],
+        )
+        self.put(
+            "/data/projects/%s/casting" % self.project_id,
+            {
+                self.shot_id: [
+                    {"asset_id": self.asset_id, "nb_occurences": 2},
+                    {"asset_id": dog_id, "nb_occurences": 1},
+                ],
+                shot_2_id: [{"asset_id": dog_id, "nb_occurences": 4}],
+            },
+        )
+        casting = self.get(
+            "/data/projects/%s/entities/%s/casting"
+            % (self.project_id, self.shot_id)
+        )
+        self.assertEqual(
+            [(cast["asset_name"], cast["nb_occurences"]) for cast in casting],
+            [("Dog", 1), ("Tree", 2)],
+        )
+        casting = self.get(
+            "/data/projects/%s/entities/%s/casting"
+            % (self.project_id, shot_2_id)
+        )
+        self.assertEqual(len(casting), 1)
+        self.assertEqual(casting[0]["nb_occurences"], 4)
+        casting = self.get(
+            "/data/projects/%s/entities/%s/casting"
+            % (self.project_id, self.episode_id)
+        )
+        self.assertEqual(len(casting), 3)
+        shot = self.get("data/shots/%s" % self.shot_id)
+        self.assertEqual(shot["nb_entities_out"], 2)
+
+        self.put(
+            "/data/projects/%s/casting" % self.project_id,
+            {"d7a0bdb5-5ec9-4b63-a09e-ec4b0ea43c3c": []},
+            404,
+        )
+
+    def test_get_casting_graph(self):
+        shot_2_id = str(self.shot.id)
+        dog_id = str(self.asset.id)
+        self.put(
+            "/data/projects/%s/casting" % self.project_id,
+            {
+                self.shot_id: [
+                    {"asset_id": self.asset_id, "nb_occurences": 1},
+                    {"asset_id": dog_id, "nb_occurences": 2, "label": "bg"},
+                ],
+                shot_2_id: [{"asset_id": dog_id, "nb_occurences": 4}],
+            },
+        )
+        path = "/data/projects/%s/casting/graph" % self.project_id
+        response = self.app.get(path, headers=self.base_headers)
+        self.assertEqual(response.status_code, 200)
+        graph = json.loads(response.data.decode("utf-8"))
+        self.assertEqual(
+            sorted(graph["shot_ids"]), sorted([self.shot_id, shot_2_id])
+        )
+        self.assertEqual(
+            sorted(graph["asset_ids"]), sorted([self.asset_id, dog_id])
+        )
+        links = sorted(
+            (
+                graph["shot_ids"][shot_index],
+                graph["asset_ids"][asset_index],
+                nb_occurences,
+                graph["labels"][label_index],
+            )
+            for shot_index, asset_index, nb_occurences, label_index in zip(
+                graph["links"]["shots"],
+                graph["links"]["assets"],
+                graph["links"]["occurences"],
+                graph["links"]["labels"],
+            )
+        )
+        self.assertEqual(
+            links,
+            sorted(
+                [
+                    (self.shot_id, self.asset_id, 1, ""),
+                    (self.shot_id, dog_id, 2, "bg"),
+                    (shot_2_id, dog_id, 4, ""),
+                ]
+            ),
+        )
+
+        etag = response.headers["ETag"]
+        headers = dict(self.base_headers, **{"If-None-Match": etag})
+        response = self.app.get(path, headers=headers)
+        self.assertEqual(response.status_code, 304)
+
+        self.put(
+            "/data/projects/%s/casting" % self.project_id,
+            {shot_2_id: []},
+        )
+        response = self.app.get(path, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        graph = json.loads(response.data.decode("utf-8"))
+        self.assertEqual(graph["shot_ids"], [self.shot_id])
@@ -1,3 +1,4 @@
+import datetime
 import time
 from tests.base import ApiDBTestCase
 from zou.app.models.event import ApiEvent
@@ -49,3 +50,28 @@ class EventsRoutesTestCase(ApiDBTestCase):
         self.assertEqual(len(events), 6)
         events = self.get("/data/events/last?only_files=true")
         self.assertEqual(len(events), 2)
+
+    def test_get_next_events(self):
+        created_at = datetime.datetime(2024, 1, 10, 12, 0, 0, 123456)
+        for index in range(5):
+            ApiEvent.create(name="asset:update", created_at=created_at)
+        ApiEvent.create(
+            name="asset:new", created_at=created_at + datetime.timedelta(1)
+        )
+
+        event_ids = []
+        path = "/data/events/next?page_size=2"
+        events = self.get(path)
+        while len(events) > 0:
+            event_ids += [event["id"] for event in events]
+            events = self.get(
+                path
+                + "&after=%s&after_id=%s"
+                % (events[-1]["created_at"], events[-1]["id"])
+            )
+        self.assertEqual(len(event_ids), 6)
+        self.assertEqual(len(set(event_ids)), 6)
+        events = self.get(path + "&after=%s" % created_at.isoformat())
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["name"], "asset:new")
+        self.get(path + "&after_id=wrong-id", 400)
@@ -65,3 +65,53 @@ class NewsRoutesTestCase(ApiDBTestCase):
             % (self.task_dict["project_id"], news["id"])
         )
         self.assertIsNotNone(news["created_at"])
+
+    def test_get_last_news_for_project_with_cursor(self):
+        self.generate_fixture_comment()
+        for i in range(1, 81):
+            comment = comments_service.new_comment(
+                self.task.id,
+                self.task_status.id,
+                self.user["id"],
+                "comment %s" % i,
+            )
+            news_service.create_news_for_task_and_comment(
+                self.task_dict, comment
+            )
+        path = "/data/projects/%s/news?page_size=30" % (
+            self.task_dict["project_id"]
+        )
+        news_list = self.get(path)
+        first_page_ids = [news["id"] for news in news_list["data"]]
+        self.assertEqual(news_list["total"], 80)
+        self.assertEqual(len(first_page_ids), 30)
+
+        news_list = self.get(
+            "%s&cursor=%s&with_total=false" % (path, news_list["next_cursor"])
+        )
+        self.assertIsNone(news_list["total"])
+        self.assertNotIn("stats", news_list)
+        self.assertEqual(len(news_list["data"]), 30)
+        self.assertEqual(
+            news_list["data"][0]["full_entity_name"], "E01 / S01 / P01"
+        )
+        second_page_ids = [news["id"] for news in news_list["data"]]
+        self.assertEqual(len(set(first_page_ids) & set(second_page_ids)), 0)
+
+        news_list = self.get(
+            "%s&cursor=%s&with_total=false" % (path, news_list["next_cursor"])
+        )
+        self.assertEqual(len(news_list["data"]), 20)
+        self.assertIsNone(news_list["next_cursor"])
+        page_two = self.get("%s&page=2" % path)
+        self.assertEqual(
+            [news["id"] for news in page_two["data"]], second_page_ids
+        )
+
+    def test_get_last_news_for_project_with_wrong_cursor(self):
+        self.generate_fixture_comment()
+        path = "/data/projects/%s/news?page_size=30" % (
+            self.task_dict["project_id"]
+        )
+        self.get("%s&cursor=wrong-id" % path, 400)
+        self.get("%s&cursor=%s" % (path, self.comment["id"]), 400)
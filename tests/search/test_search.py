@@ -111,3 +111,22 @@ class AssetSearchTestCase(ApiDBTestCase):
         self.delete("data/persons/%s" % person["id"])
         persons = self.post("data/search", {"query": "girafe"}, 200)["persons"]
         self.assertEqual(len(persons), 0)
+
+    def test_search_shots(self):
+        shot_id = str(self.shot.id)
+        result = self.post("data/search", {"query": "p01"}, 200)
+        self.assertEqual(len(result["shots"]), 1)
+        self.assertEqual(result["shots"][0]["id"], shot_id)
+        self.assertEqual(result["shots"][0]["title"], "S01 / P01")
+        self.assertEqual(result["sequences"], [])
+        self.assertEqual(result["comments"], [])
+
+    def test_search_without_projects(self):
+        self.generate_fixture_user_cg_artist()
+        self.log_in_cg_artist()
+        result = self.post("data/search", {"query": "p01"}, 200)
+        self.assertEqual(result["shots"], [])
+        self.assertEqual(result["tasks"], [])
+        self.assertEqual(result["comments"], [])
+        result = self.post("data/search", {"query": "rabbit"}, 200)
+        self.assertEqual(result["assets"], [])
@@ -0,0 +1,113 @@
+import copy
+import gzip
+import shutil
+import unittest
+
+from contextlib import contextmanager
+from sqlalchemy import create_engine, inspect
+
+from tests.base import ApiDBTestCase
+
+from zou.app import app, db
+from zou.app.services import backup_service
+from zou.app.services.exception import DatabaseBackupException
+from zou.app.stores import file_store
+
+
+class BackupServiceTestCase(ApiDBTestCase):
+    def setUp(self):
+        super(BackupServiceTestCase, self).setUp()
+        self.generate_fixture_project_status()
+        self.generate_fixture_project()
+        self.messages = []
+        config = app.config["DATABASE"]
+        self.db_parameters = [
+            config["host"],
+            config["port"],
+            config["username"],
+            config["password"],
+            config["database"],
+        ]
+
+    def tearDown(self):
+        file_store.clear()
+        super(BackupServiceTestCase, self).tearDown()
+
+    @contextmanager
+    def use_restore_database(self):
+        database = "%s_restore" % self.db_parameters[-1]
+        connection = db.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        )
+        connection.execute('DROP DATABASE IF EXISTS "%s"' % database)
+        connection.execute('CREATE DATABASE "%s"' % database)
+        url = copy.copy(db.engine.url)
+        url.database = database
+        engine = create_engine(url)
+        try:
+            yield (database, engine)
+        finally:
+            engine.dispose()
+            connection.execute('DROP DATABASE IF EXISTS "%s"' % database)
+            connection.close()
+
+    def test_stream_db_backup(self):
+        project_name = self.project.name
+        filename = backup_service.stream_db_backup(
+            *self.db_parameters, output=self.messages.append
+        )
+        key = backup_service.get_db_backup_key(filename)
+        dump = gzip.decompress(b"".join(file_store.read_stream("files", key)))
+        self.assertIn(b"CREATE TABLE public.project", dump)
+        self.assertIn(project_name.encode(), dump)
+        self.assertIn("uploaded", self.messages[-1])
+
+    def test_stream_db_backup_failure(self):
+        self.db_parameters[-1] = "wrong-database"
+        with self.assertRaises(DatabaseBackupException):
+            backup_service.stream_db_backup(
+                *self.db_parameters, output=self.messages.append
+            )
+        self.assertEqual(list(file_store.list_keys("files")), [])
+
+    @unittest.skipIf(
+        shutil.which("pg_dump") is None or shutil.which("psql") is None,
+        "PostgreSQL client tools are not installed",
+    )
+    def test_restore_db_backup(self):
+        project_name = self.project.name
+        filename = backup_service.stream_db_backup(
+            *self.db_parameters, output=self.messages.append
+        )
+        with self.use_restore_database() as (database, engine):
+            backup_service.restore_db_backup(
+                filename,
+                *self.db_parameters[:-1],
+                database,
+                output=self.messages.append,
+            )
+            project_names = [
+                row[0] for row in engine.execute("SELECT name FROM project")
+            ]
+        self.assertEqual(project_names, [project_name])
+        self.assertIn("restored", self.messages[-1])
+
+    @unittest.skipIf(
+        shutil.which("pg_dump") is None or shutil.which("psql") is None,
+        "PostgreSQL client tools are not installed",
+    )
+    def test_restore_db_backup_failure(self):
+        filename = backup_service.stream_db_backup(
+            *self.db_parameters, output=self.messages.append
+        )
+        with self.use_restore_database() as (database, engine):
+            engine.execute("CREATE TABLE working_file (id integer)")
+            with self.assertRaises(DatabaseBackupException):
+                backup_service.restore_db_backup(
+                    filename,
+                    *self.db_parameters[:-1],
+                    database,
+                    output=self.messages.append,
+                )
+            table_names = inspect(engine).get_table_names()
+        self.assertEqual(table_names, ["working_file"])
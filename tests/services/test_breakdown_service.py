@@ -1,11 +1,15 @@
 from tests.base import ApiDBTestCase
 
+from zou.app.models.project import ProjectTaskTypeLink
+from zou.app.models.task import Task
+from zou.app.models.task_type import TaskType
 from zou.app.services import (
     assets_service,
     breakdown_service,
     projects_service,
     tasks_service,
 )
+from zou.app.utils import events
 
 
 class BreakdownServiceTestCase(ApiDBTestCase):
@@ -248,7 +252,7 @@ class BreakdownServiceTestCase(ApiDBTestCase):
         )
         self.assertEqual(len(instances[self.scene_id]), 2)
 
-    def test_is_asset_ready(self):
+    def test_refresh_casting_stats(self):
         self.generate_fixture_department()
         self.generate_fixture_task_type()
         self.generate_fixture_task_status()
@@ -282,29 +286,6 @@ class BreakdownServiceTestCase(ApiDBTestCase):
         self.task_compositing = self.generate_fixture_shot_task(
             task_type_id=self.task_type_compositing_id
         )
-        priority_map = breakdown_service._get_task_type_priority_map(
-            self.project_id
-        )
-        self.assertEqual(priority_map[self.task_type_layout_id], 1)
-        self.assertEqual(priority_map[self.task_type_animation_id], 2)
-        self.assertEqual(priority_map[self.task_type_compositing_id], 3)
-        asset = {"ready_for": str(self.task_type_animation.id)}
-        self.assertTrue(
-            breakdown_service._is_asset_ready(
-                asset, self.task_layout, priority_map
-            )
-        )
-        self.assertTrue(
-            breakdown_service._is_asset_ready(
-                asset, self.task_animation, priority_map
-            )
-        )
-        self.assertFalse(
-            breakdown_service._is_asset_ready(
-                asset, self.task_compositing, priority_map
-            )
-        )
-
         self.shot_id = str(self.shot.id)
         self.sequence_id = str(self.sequence.id)
         self.asset_id = str(self.asset.id)
@@ -328,3 +309,189 @@ class BreakdownServiceTestCase(ApiDBTestCase):
         self.assertEqual(self.task_layout["nb_assets_ready"], 2)
         self.assertEqual(self.task_animation["nb_assets_ready"], 2)
         self.assertEqual(self.task_compositing["nb_assets_ready"], 1)
+
+    def test_update_castings(self):
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        self.generate_fixture_task_status()
+        self.generate_fixture_person()
+        self.generate_fixture_assigner()
+        task_type_layout_id = str(self.task_type_layout.id)
+        task_type_animation_id = str(self.task_type_animation.id)
+        projects_service.create_project_task_type_link(
+            self.project_id, task_type_layout_id, 1
+        )
+        projects_service.create_project_task_type_link(
+            self.project_id, task_type_animation_id, 2
+        )
+        task_layout = self.generate_fixture_shot_task(
+            task_type_id=task_type_layout_id
+        )
+        task_animation = self.generate_fixture_shot_task(
+            task_type_id=task_type_animation_id
+        )
+        task_layout_id = str(task_layout.id)
+        task_animation_id = str(task_animation.id)
+        self.asset.update({"ready_for": task_type_layout_id})
+        self.asset_character.update({"ready_for": task_type_animation_id})
+        self.generate_fixture_shot("SH02")
+        shot_2_id = str(self.shot.id)
+
+        breakdown_service.update_castings(
+            self.project_id,
+            {
+                self.shot_id: [
+                    {"asset_id": self.asset_id, "nb_occurences": 1},
+                    {"asset_id": self.asset_character_id, "nb_occurences": 3},
+                ],
+                shot_2_id: [{"asset_id": self.asset_id, "nb_occurences": 2}],
+            },
+        )
+        casting = breakdown_service.get_sequence_casting(self.sequence.id)
+        self.assertEqual(len(casting[self.shot_id]), 2)
+        self.assertEqual(len(casting[shot_2_id]), 1)
+        self.assertEqual(casting[shot_2_id][0]["nb_occurences"], 2)
+        self.assertEqual(
+            tasks_service.get_task(task_layout_id)["nb_assets_ready"], 2
+        )
+        self.assertEqual(
+            tasks_service.get_task(task_animation_id)["nb_assets_ready"], 1
+        )
+        episode_casting = breakdown_service.get_casting(self.episode.id)
+        self.assertEqual(len(episode_casting), 2)
+
+        breakdown_service.update_castings(
+            self.project_id,
+            {
+                self.shot_id: [
+                    {
+                        "asset_id": self.asset_character_id,
+                        "nb_occurences": 1,
+                        "label": "fixed",
+                    },
+                ],
+            },
+        )
+        casting = breakdown_service.get_casting(self.shot_id)
+        self.assertEqual(len(casting), 1)
+        self.assertEqual(casting[0]["nb_occurences"], 1)
+        self.assertEqual(casting[0]["label"], "fixed")
+        self.assertEqual(
+            tasks_service.get_task(task_layout_id)["nb_assets_ready"], 1
+        )
+        self.assertEqual(
+            tasks_service.get_task(task_animation_id)["nb_assets_ready"], 1
+        )
+        shot = breakdown_service.shots_service.get_shot(self.shot_id)
+        self.assertEqual(shot["nb_entities_out"], 1)
+
+    def handle_event(self, data):
+        self.casting_stats_events.append(data)
+
+    def get_task_type_priority_map(self, project_id):
+        """
+        Previous per task computation, kept to check that the SQL
+        recomputation gives the same results.
+        """
+        task_types = (
+            ProjectTaskTypeLink.query.join(TaskType)
+            .filter(ProjectTaskTypeLink.project_id == project_id)
+            .filter(TaskType.for_entity == "Shot")
+            .all()
+        )
+        return {
+            str(task_type_link.task_type_id): task_type_link.priority
+            for task_type_link in task_types
+        }
+
+    def is_asset_ready(self, asset, task, priority_map):
+        is_ready = False
+        if "ready_for" in asset and asset["ready_for"] is not None:
+            priority_ready = priority_map.get(asset["ready_for"], -1) or -1
+            priority_task = priority_map.get(str(task.task_type_id), 0) or 0
+            is_ready = priority_task <= priority_ready
+        return is_ready
+
+    def test_refresh_casting_stats_matches_per_task_computation(self):
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        self.generate_fixture_task_status()
+        self.generate_fixture_person()
+        self.generate_fixture_assigner()
+        task_type_ids = [
+            str(self.task_type_layout.id),
+            str(self.task_type_animation.id),
+            tasks_service.get_or_create_task_type(
+                self.department_animation.serialize(),
+                "compositing",
+                color="#FFFFFF",
+                short_name="compo",
+                for_entity="Shot",
+            )["id"],
+            tasks_service.get_or_create_task_type(
+                self.department_animation.serialize(),
+                "lighting",
+                color="#FFFFFF",
+                short_name="light",
+                for_entity="Shot",
+            )["id"],
+        ]
+        for priority, task_type_id in enumerate(task_type_ids[:3]):
+            projects_service.create_project_task_type_link(
+                self.project_id, task_type_id, priority
+            )
+
+        assets = [self.asset, self.asset_character]
+        for name in ["Chair", "Table", "Lamp"]:
+            assets.append(self.generate_fixture_asset(name))
+        ready_fors = [None] + task_type_ids
+        for asset, ready_for in zip(assets, ready_fors):
+            asset.update({"ready_for": ready_for})
+
+        shot_ids = []
+        for index in range(4):
+            self.generate_fixture_shot("SH%02d" % (index + 2))
+            shot_ids.append(str(self.shot.id))
+            for task_type_id in task_type_ids:
+                self.generate_fixture_shot_task(task_type_id=task_type_id)
+            breakdown_service.update_casting(
+                self.shot.id,
+                [
+                    {"asset_id": str(asset.id), "nb_occurences": 1}
+                    for asset in assets[index:]
+                ],
+            )
+
+        events.register(
+            "task:update-casting-stats-batch", "handle_event", self
+        )
+        try:
+            for asset in assets:
+                asset.update({"ready_for": task_type_ids[1]})
+                self.casting_stats_events = []
+                breakdown_service.refresh_casting_stats(asset.serialize())
+                self.assertLessEqual(len(self.casting_stats_events), 1)
+                for event in self.casting_stats_events:
+                    for task_id, nb_ready in event["casting_stats"].items():
+                        self.assertEqual(
+                            Task.get(task_id).nb_assets_ready, nb_ready
+                        )
+
+                priority_map = self.get_task_type_priority_map(self.project_id)
+                for shot_id in shot_ids:
+                    casting = breakdown_service.get_entity_casting(shot_id)
+                    for task in Task.get_all_by(entity_id=shot_id):
+                        expected = len(
+                            [
+                                cast
+                                for cast in casting
+                                if self.is_asset_ready(
+                                    cast, task, priority_map
+                                )
+                            ]
+                        )
+                        self.assertEqual(task.nb_assets_ready, expected)
+        finally:
+            events.unregister(
+                "task:update-casting-stats-batch", "handle_event"
+            )
@@ -1,6 +1,104 @@
+import email
+import json
+import threading
+import time
+import unittest
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 from tests.base import ApiDBTestCase
 
-from zou.app.services import emails_service
+from zou.app import app, config
+from zou.app.models.organisation import Organisation
+from zou.app.services import emails_service, persons_service
+from zou.app.stores import notifications_store
+
+try:
+    import asyncore
+    import smtpd
+except ImportError:
+    smtpd = None
+
+
+if smtpd is not None:
+
+    class SMTPStandIn(smtpd.SMTPServer):
+        """
+        Local SMTP server recording the connections it accepts and the
+        messages it receives. Messages sent to rejected recipients are
+        refused.
+        """
+
+        def __init__(self, rejected_recipients=[]):
+            self.socket_map = {}
+            super(SMTPStandIn, self).__init__(
+                ("127.0.0.1", 0), None, map=self.socket_map
+            )
+            self.port = self.socket.getsockname()[1]
+            self.rejected_recipients = rejected_recipients
+            self.connections = 0
+            self.messages = []
+            self.is_running = True
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+        def run(self):
+            while self.is_running:
+                asyncore.loop(timeout=0.01, map=self.socket_map, count=1)
+
+        def stop(self):
+            self.is_running = False
+            self.thread.join()
+            asyncore.close_all(map=self.socket_map)
+
+        def handle_accepted(self, conn, addr):
+            self.connections += 1
+            super(SMTPStandIn, self).handle_accepted(conn, addr)
+
+        def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+            if any(
+                recipient in self.rejected_recipients for recipient in rcpttos
+            ):
+                return "550 Mailbox unavailable"
+            self.messages.append(
+                (rcpttos, email.message_from_bytes(data), time.monotonic())
+            )
+
+
+class WebhookStandIn(ThreadingHTTPServer):
+    """
+    Local HTTP server recording the payloads posted to it. Payloads sent to
+    failing channels get an error response.
+    """
+
+    def __init__(self, failing_channels=[]):
+        super(WebhookStandIn, self).__init__(("127.0.0.1", 0), WebhookHandler)
+        self.port = self.server_address[1]
+        self.failing_channels = failing_channels
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        self.server.requests.append((self.path, payload, time.monotonic()))
+        if payload.get("channel") in self.server.failing_channels:
+            self.send_response(500)
+        else:
+            self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
 
 
 class EmailsServiceTestCase(ApiDBTestCase):
@@ -44,3 +142,207 @@ class EmailsServiceTestCase(ApiDBTestCase):
             "https://localhost:8080/productions/%s/shots/tasks/%s"
             % (self.project.id, self.shot_task.id),
         )
+
+    @contextmanager
+    def use_smtp_server(self, smtp_server):
+        mail = app.extensions["mail"]
+        settings = (mail.server, mail.port, mail.suppress)
+        (mail.server, mail.port, mail.suppress) = (
+            "127.0.0.1",
+            smtp_server.port,
+            False,
+        )
+        try:
+            yield smtp_server
+        finally:
+            (mail.server, mail.port, mail.suppress) = settings
+            smtp_server.stop()
+
+    @contextmanager
+    def use_digests(self, is_shared=True):
+        store_is_shared = notifications_store.is_shared
+        notifications_store.is_shared = is_shared
+        config.NOTIFICATION_DIGEST_WINDOW = 60
+        notifications_store.clear()
+        try:
+            yield
+        finally:
+            config.NOTIFICATION_DIGEST_WINDOW = 0
+            notifications_store.is_shared = store_is_shared
+            notifications_store.clear()
+
+    def get_messages(self):
+        return {
+            "email_message": "<p>Message</p>",
+            "slack_message": "Message",
+            "mattermost_message": {"message": "Message", "project_name": "P"},
+            "discord_message": "Message",
+        }
+
+    @unittest.skipIf(smtpd is None, "smtpd is not available")
+    def test_send_person_notification_without_shared_store(self):
+        self.person.update({"notifications_enabled": True})
+        person = self.person.serialize()
+        with self.use_smtp_server(SMTPStandIn()) as smtp_server:
+            with self.use_digests(is_shared=False):
+                emails_service.send_person_notification(
+                    person, "A", self.get_messages()
+                )
+                self.assertEqual(
+                    notifications_store.get_pending_digests_count(), 0
+                )
+        self.assertEqual(len(smtp_server.messages), 1)
+        (recipients, message, _) = smtp_server.messages[0]
+        self.assertEqual(recipients, [person["email"]])
+        self.assertEqual(message["Subject"], "A")
+
+    @unittest.skipIf(smtpd is None, "smtpd is not available")
+    def test_deliver_digests(self):
+        self.person.update({"notifications_enabled": True})
+        person = self.person.serialize()
+        with self.use_smtp_server(SMTPStandIn()) as smtp_server:
+            with self.use_digests():
+                emails_service.send_person_notification(
+                    person, "A", self.get_messages()
+                )
+                emails_service.send_person_notification(
+                    person, "B", self.get_messages()
+                )
+                self.assertEqual(emails_service.deliver_digests(), {})
+                self.assertEqual(smtp_server.connections, 0)
+                results = emails_service.deliver_digests(now=time.time() + 61)
+                metrics = emails_service.get_delivery_metrics()
+
+        self.assertEqual(results, {"email": {"sent": 1, "failed": 0}})
+        self.assertEqual(smtp_server.connections, 1)
+        self.assertEqual(len(smtp_server.messages), 1)
+        (recipients, message, _) = smtp_server.messages[0]
+        self.assertEqual(recipients, [person["email"]])
+        self.assertEqual(
+            message["Subject"], "[Kitsu] You have 2 new notifications"
+        )
+        html = [
+            part.get_payload(decode=True).decode()
+            for part in message.walk()
+            if part.get_content_type() == "text/html"
+        ][0]
+        self.assertEqual(html.count("<p>Message</p>"), 2)
+        self.assertEqual(metrics["email"]["sent"], 1)
+        self.assertEqual(metrics["pending_digests"], 0)
+
+    @unittest.skipIf(smtpd is None, "smtpd is not available")
+    def test_deliver_digests_retries_failed_deliveries(self):
+        self.person.update({"notifications_enabled": True})
+        person = self.person.serialize()
+        smtp_server = SMTPStandIn(rejected_recipients=[person["email"]])
+        with self.use_smtp_server(smtp_server):
+            with self.use_digests():
+                emails_service.send_person_notification(
+                    person, "A", self.get_messages()
+                )
+                results = emails_service.deliver_digests(now=time.time() + 61)
+                self.assertEqual(results, {"email": {"sent": 0, "failed": 1}})
+                for attempt in range(emails_service.DELIVERY_MAX_ATTEMPTS - 1):
+                    results = emails_service.deliver_digests()
+                    self.assertEqual(
+                        results, {"email": {"sent": 0, "failed": 1}}
+                    )
+                self.assertEqual(emails_service.deliver_digests(), {})
+
+        self.assertEqual(
+            smtp_server.connections, emails_service.DELIVERY_MAX_ATTEMPTS
+        )
+        self.assertEqual(len(smtp_server.messages), 0)
+
+    @unittest.skipIf(smtpd is None, "smtpd is not available")
+    def test_deliver_messages(self):
+        webhook_server = WebhookStandIn(failing_channels=["@jane"])
+        Organisation.query.delete()
+        Organisation.create(
+            name="Kitsu",
+            chat_webhook_mattermost="http://127.0.0.1:%s/hooks/key"
+            % webhook_server.port,
+        )
+        organisation = persons_service.get_organisation()
+        rate_limits = dict(config.NOTIFICATION_RATE_LIMITS)
+        config.NOTIFICATION_RATE_LIMITS.update({"email": 10, "mattermost": 10})
+        deliveries = {
+            "email": [
+                ("A", "<p>A</p>", "john@example.com"),
+                ("B", "<p>B</p>", "jane@example.com"),
+                ("C", "<p>C</p>", "jim@example.com"),
+            ],
+            "mattermost": [
+                ("john", {"message": "A", "project_name": "P"}),
+                ("jane", {"message": "B", "project_name": "P"}),
+                ("jim", {"message": "C", "project_name": "P"}),
+            ],
+        }
+        failed_deliveries = {}
+        try:
+            with self.use_smtp_server(SMTPStandIn()) as smtp_server:
+                results = emails_service.deliver_messages(
+                    deliveries, organisation, failed_deliveries
+                )
+        finally:
+            config.NOTIFICATION_RATE_LIMITS.update(rate_limits)
+            webhook_server.stop()
+            notifications_store.clear()
+
+        self.assertEqual(
+            results,
+            {
+                "email": {"sent": 3, "failed": 0},
+                "mattermost": {"sent": 2, "failed": 1},
+            },
+        )
+        self.assertEqual(
+            failed_deliveries,
+            {"email": [], "mattermost": [deliveries["mattermost"][1]]},
+        )
+
+        self.assertEqual(smtp_server.connections, 1)
+        self.assertEqual(
+            [message["Subject"] for (_, message, _) in smtp_server.messages],
+            ["A", "B", "C"],
+        )
+        received_at = [at for (_, _, at) in smtp_server.messages]
+        self.assertGreaterEqual(received_at[-1] - received_at[0], 0.15)
+
+        self.assertEqual(
+            [
+                (path, payload["channel"], payload["text"])
+                for (path, payload, _) in webhook_server.requests
+            ],
+            [
+                ("/hooks/key", "@john", "A"),
+                ("/hooks/key", "@jane", "B"),
+                ("/hooks/key", "@jim", "C"),
+            ],
+        )
+        received_at = [at for (_, _, at) in webhook_server.requests]
+        self.assertGreaterEqual(received_at[-1] - received_at[0], 0.15)
+
+    def test_deliver_digests_restores_digests_on_error(self):
+        person = self.person.serialize()
+
+        def get_persons_by_ids(person_ids):
+            raise Exception("Database unavailable")
+
+        get_persons_by_ids_function = persons_service.get_persons_by_ids
+        persons_service.get_persons_by_ids = get_persons_by_ids
+        try:
+            with self.use_digests():
+                emails_service.send_person_notification(
+                    person, "A", self.get_messages()
+                )
+                with self.assertRaises(Exception):
+                    emails_service.deliver_digests(now=time.time() + 61)
+                self.assertEqual(
+                    notifications_store.get_pending_digests_count(), 1
+                )
+                digests = notifications_store.pop_due_digests()
+        finally:
+            persons_service.get_persons_by_ids = get_persons_by_ids_function
+
+        self.assertEqual(digests[person["id"]][0]["subject"], "A")
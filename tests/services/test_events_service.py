@@ -1,8 +1,15 @@
+import datetime
 import time
 from tests.base import ApiDBTestCase
 
-from zou.app.utils import fields
-from zou.app.services import events_service, assets_service
+from zou.app import db
+from zou.app.models.event import ApiEvent
+from zou.app.utils import fields, partitions
+from zou.app.services import (
+    assets_service,
+    deletion_service,
+    events_service,
+)
 
 
 class EventsServiceTestCase(ApiDBTestCase):
@@ -46,3 +53,63 @@ class EventsServiceTestCase(ApiDBTestCase):
         self.assertEqual(len(login_logs), 4)
         login_logs = events_service.get_last_login_logs(page_size=2)
         self.assertEqual(len(login_logs), 2)
+
+    def generate_events(self, dates):
+        for date in dates:
+            ApiEvent.create(name="asset:new", created_at=date)
+
+    def test_remove_old_events(self):
+        now = datetime.datetime.utcnow()
+        self.generate_events(
+            [now - datetime.timedelta(days=days) for days in [10, 20, 40]]
+        )
+        deletion_service.remove_old_events(days_old=30)
+        self.assertEqual(ApiEvent.query.count(), 2)
+        deletion_service.remove_old_events(days_old=15)
+        self.assertEqual(ApiEvent.query.count(), 1)
+
+    def test_partitioned_events(self):
+        now = datetime.datetime(2026, 10, 15)
+        dates = [
+            datetime.datetime(2026, 6, 2),
+            datetime.datetime(2026, 7, 20),
+            datetime.datetime(2026, 8, 1),
+            datetime.datetime(2026, 9, 30),
+        ]
+        self.generate_events(dates)
+        connection = db.session.connection()
+        partitions.partition_table(connection, "api_event", now=now)
+        self.assertEqual(
+            partitions.ensure_partitions(connection, "api_event", 4, now),
+            ["api_event_2027_02"],
+        )
+        self.assertTrue(partitions.is_partitioned(connection, "api_event"))
+        db.session.commit()
+        self.generate_events(
+            [datetime.datetime(2026, 10, 2), datetime.datetime(2026, 11, 3)]
+        )
+        dates += [
+            datetime.datetime(2026, 10, 2),
+            datetime.datetime(2026, 11, 3),
+        ]
+
+        events = events_service.get_last_events(page_size=3)
+        self.assertEqual(
+            [event["created_at"] for event in events],
+            [fields.serialize_value(date) for date in dates[::-1][:3]],
+        )
+        events = events_service.get_last_events()
+        self.assertEqual(len(events), 6)
+        events = events_service.get_last_events(
+            before=datetime.datetime(2026, 10, 5)
+        )
+        self.assertEqual(len(events), 5)
+
+        connection = db.session.connection()
+        dropped = partitions.drop_partitions_before(
+            connection, "api_event", datetime.datetime(2026, 10, 20)
+        )
+        self.assertEqual(dropped, ["api_event_legacy"])
+        db.session.commit()
+        events = events_service.get_last_events()
+        self.assertEqual(len(events), 2)
@@ -1,6 +1,15 @@
 from tests.base import ApiDBTestCase
 
-from zou.app.services import assets_service, index_service
+from zou.app import app, config
+from zou.app.stores import queue_store
+from zou.app.utils import indexing
+from zou.app.services import (
+    assets_service,
+    comments_service,
+    deletion_service,
+    index_service,
+    shots_service,
+)
 
 
 class IndexServiceTestCase(ApiDBTestCase):
@@ -21,8 +30,15 @@ class IndexServiceTestCase(ApiDBTestCase):
         self.generate_fixture_asset_character("Fox")
         self.generate_fixture_asset_character("Lémo")
         self.generate_fixture_asset_character("L'ustensile")
+        self.generate_fixture_person()
+        self.generate_fixture_assigner()
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        self.generate_fixture_task_status()
+        self.generate_fixture_shot_task()
         self.project_ids = [str(self.project.id)]
         self.asset_type_id = str(self.asset_type.id)
+        index_service.register_event_handlers()
         index_service.reset_index()
 
     def test_search_assets_exact(self):
@@ -65,3 +81,141 @@ class IndexServiceTestCase(ApiDBTestCase):
         assets_service.remove_asset(asset["id"])
         assets = index_service.search_assets("girafe")
         self.assertEqual(len(assets), 0)
+
+    def test_reset_index_with_several_processes(self):
+        index_service.reset_index(procs=2, multisegment=True)
+        assets = index_service.search_assets("rabbit", self.project_ids)
+        self.assertEqual(len(assets), 1)
+        assets = index_service.search_assets("usten", self.project_ids)
+        self.assertEqual(len(assets), 1)
+
+    def test_queued_changes(self):
+        flush_interval = app.config["INDEXES_FLUSH_INTERVAL"]
+        app.config["INDEXES_FLUSH_INTERVAL"] = 60
+        try:
+            asset = assets_service.create_asset(
+                self.project_id, self.asset_type_id, "Girafe", "", {}
+            )
+            assets_service.update_asset(asset["id"], {"name": "Elephant"})
+            self.assertEqual(
+                list(index_service.index_queues["assets"].keys()),
+                [asset["id"]],
+            )
+            assets = index_service.search_assets("elephant")
+            self.assertEqual(len(assets), 1)
+            self.assertNotIn("assets", index_service.index_queues)
+            assets = index_service.search_assets("girafe")
+            self.assertEqual(len(assets), 0)
+        finally:
+            app.config["INDEXES_FLUSH_INTERVAL"] = flush_interval
+
+    def test_search_entries(self):
+        entries = index_service.search_entries("p01", self.project_ids)
+        self.assertEqual(
+            [(entry["type"], entry["title"]) for entry in entries],
+            [("Shot", "S01 / P01"), ("Task", "S01 / P01 / Animation")],
+        )
+        self.assertEqual(entries[0]["project_name"], self.project.name)
+        self.assertEqual(entries[1]["entity_id"], str(self.shot.id))
+        entries = index_service.search_entries("s01", types=["Sequence"])
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["id"], str(self.sequence.id))
+        entries = index_service.search_entries("p01", ["wrong-project"])
+        self.assertEqual(len(entries), 0)
+
+    def test_search_entries_after_events(self):
+        comment = comments_service.new_comment(
+            str(self.shot_task.id),
+            str(self.task_status.id),
+            str(self.person.id),
+            "The bouncing ball is too slow",
+        )
+        entries = index_service.search_entries("bouncing")
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["id"], comment["id"])
+        self.assertEqual(entries[0]["title"], "S01 / P01 / Animation")
+        self.assertEqual(entries[0]["person_name"], "John Doe")
+        self.assertEqual(entries[0]["text"], "The bouncing ball is too slow")
+
+        shots_service.update_shot(str(self.shot.id), {"name": "P02"})
+        self.assertEqual(
+            len(index_service.search_entries("p01", types=["Shot", "Task"])),
+            0,
+        )
+        entries = index_service.search_entries("bouncing")
+        self.assertEqual(entries[0]["title"], "S01 / P02 / Animation")
+
+        deletion_service.remove_task(str(self.shot_task.id), force=True)
+        self.assertEqual(len(index_service.search_entries("bouncing")), 0)
+        entries = index_service.search_entries("p02")
+        self.assertEqual([entry["type"] for entry in entries], ["Shot"])
+        shots_service.remove_shot(str(self.shot.id))
+        self.assertEqual(len(index_service.search_entries("p02")), 0)
+
+    def test_entry_events_with_job_queue(self):
+        class FakeJobQueue(object):
+            def enqueue(self, func, *args):
+                return func(*args)
+
+        flush_interval = app.config["INDEXES_FLUSH_INTERVAL"]
+        enable_job_queue = config.ENABLE_JOB_QUEUE
+        app.config["INDEXES_FLUSH_INTERVAL"] = 60
+        config.ENABLE_JOB_QUEUE = True
+        queue_store.job_queue = FakeJobQueue()
+        try:
+            shots_service.update_shot(str(self.shot.id), {"name": "P02"})
+            self.assertNotIn("entries", index_service.index_queues)
+            documents = indexing.search_documents(
+                index_service.get_entry_index(), "p02"
+            )
+            self.assertEqual(
+                sorted(document["type"] for document in documents),
+                ["Shot", "Task"],
+            )
+        finally:
+            app.config["INDEXES_FLUSH_INTERVAL"] = flush_interval
+            config.ENABLE_JOB_QUEUE = enable_job_queue
+            del queue_store.job_queue
+
+    def test_entity_update_without_rename(self):
+        flush_interval = app.config["INDEXES_FLUSH_INTERVAL"]
+        app.config["INDEXES_FLUSH_INTERVAL"] = 60
+        try:
+            shot_id = str(self.shot.id)
+            shots_service.update_shot(shot_id, {"description": "Updated"})
+            self.assertEqual(
+                list(index_service.index_queues["entries"].keys()), [shot_id]
+            )
+            shots_service.update_shot(shot_id, {"name": "P02"})
+            self.assertEqual(
+                sorted(index_service.index_queues["entries"].keys()),
+                sorted([shot_id, str(self.shot_task.id)]),
+            )
+        finally:
+            index_service.flush_index_queues()
+            app.config["INDEXES_FLUSH_INTERVAL"] = flush_interval
+
+    def test_failed_changes_are_queued_again(self):
+        flush_interval = app.config["INDEXES_FLUSH_INTERVAL"]
+        apply_changes = indexing.apply_changes
+        app.config["INDEXES_FLUSH_INTERVAL"] = 60
+
+        def fail(*args, **kwargs):
+            raise Exception("Index is locked")
+
+        try:
+            asset = assets_service.create_asset(
+                self.project_id, self.asset_type_id, "Girafe", "", {}
+            )
+            indexing.apply_changes = fail
+            self.assertEqual(index_service.flush_index_queues(["assets"]), {})
+            self.assertEqual(
+                list(index_service.index_queues["assets"].keys()),
+                [asset["id"]],
+            )
+            indexing.apply_changes = apply_changes
+            assets = index_service.search_assets("girafe")
+            self.assertEqual(len(assets), 1)
+        finally:
+            indexing.apply_changes = apply_changes
+            app.config["INDEXES_FLUSH_INTERVAL"] = flush_interval
@@ -35,6 +35,19 @@ class NamesServiceTestCase(ApiDBTestCase):
         self.assertEqual(asset_name, "Props / Tree")
         self.assertEqual(shot_name, "E01 / S01 / P01")
 
+    def test_get_full_entity_names(self):
+        names = names_service.get_full_entity_names(
+            [self.asset.id, self.shot.id, self.sequence.id, self.episode.id]
+        )
+        self.assertEqual(len(names), 4)
+        for entity_id, name in names.items():
+            self.assertEqual(
+                name, names_service.get_full_entity_name(entity_id)
+            )
+        self.assertEqual(names[str(self.shot.id)][0], "E01 / S01 / P01")
+        self.assertEqual(names[str(self.sequence.id)][0], "E01 / S01")
+        self.assertEqual(names_service.get_full_entity_names([]), {})
+
     def test_get_preview_file_name(self):
         preview_file = files_service.create_preview_file(
             "main", 3, self.shot_task["id"], self.user["id"], source="webgui"
@@ -58,3 +71,34 @@ class NamesServiceTestCase(ApiDBTestCase):
         )
         name = names_service.get_preview_file_name(preview_file["id"])
         self.assertEqual(name, "cosmos_landromat_props_tree_shaders_v4-5.mp4")
+
+    def test_get_preview_file_names(self):
+        preview_file = files_service.create_preview_file(
+            "main", 3, self.shot_task["id"], self.user["id"], source="webgui"
+        )
+        preview_file_2 = files_service.create_preview_file(
+            "main",
+            4,
+            self.asset_task["id"],
+            self.user["id"],
+            source="webgui",
+            position=5,
+        )
+        names = names_service.get_preview_file_names(
+            [preview_file["id"], preview_file_2["id"]]
+        )
+        self.assertEqual(
+            names,
+            {
+                preview_file["id"]: names_service.get_preview_file_name(
+                    preview_file["id"]
+                ),
+                preview_file_2["id"]: names_service.get_preview_file_name(
+                    preview_file_2["id"]
+                ),
+            },
+        )
+        self.assertEqual(
+            names[preview_file_2["id"]],
+            "cosmos_landromat_props_tree_shaders_v4-5.mp4",
+        )
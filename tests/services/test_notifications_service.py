@@ -1,7 +1,11 @@
 from tests.base import ApiDBTestCase
 
 from zou.app.models.notification import Notification
-from zou.app.services import comments_service, notifications_service
+from zou.app.services import (
+    comments_service,
+    emails_service,
+    notifications_service,
+)
 
 
 class NotificationsServiceTestCase(ApiDBTestCase):
@@ -61,6 +65,16 @@ class NotificationsServiceTestCase(ApiDBTestCase):
         self.assertEqual(len(notifications), 1)
         self.assertEqual(str(notifications[0].author_id), self.user["id"])
 
+    def test_create_notifications_for_task_and_comment_twice(self):
+        self.generate_fixture_comment()
+        self.comment["mentions"] = [self.person.id]
+        for _ in range(2):
+            notifications_service.create_notifications_for_task_and_comment(
+                self.task_dict, self.comment
+            )
+        notifications = Notification.get_all()
+        self.assertEqual(len(notifications), 2)
+
     def test_create_notifications_for_task_and_comment_with_mentions(self):
         self.generate_fixture_comment()
         self.comment["mentions"] = [self.person.id]
@@ -70,6 +84,54 @@ class NotificationsServiceTestCase(ApiDBTestCase):
         notifications = Notification.get_all()
         self.assertEqual(len(notifications), 2)
 
+    def test_create_notifications_for_task_and_comment_batch(self):
+        self.generate_fixture_comment()
+        notifications_service.subscribe_to_sequence(
+            self.person_dict["id"],
+            self.sequence_dict["id"],
+            self.task_type_dict["id"],
+        )
+        self.comment["mentions"] = [self.person_dict["id"], self.user["id"]]
+        calls = []
+
+        def send_comment_notifications_mock(*args):
+            calls.append(args)
+
+        send_comment_notifications = emails_service.send_comment_notifications
+        emails_service.send_comment_notifications = (
+            send_comment_notifications_mock
+        )
+        try:
+            recipient_ids = notifications_service.create_notifications_for_task_and_comment(
+                self.task_dict, self.comment
+            )
+        finally:
+            emails_service.send_comment_notifications = (
+                send_comment_notifications
+            )
+        self.assertEqual(
+            recipient_ids,
+            {self.task_dict["assignees"][0], self.person_dict["id"]},
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][4], [self.person_dict["id"]])
+        notifications = Notification.get_all()
+        self.assertEqual(len(notifications), 3)
+        types = sorted(
+            (str(notification.person_id), notification.type.code)
+            for notification in notifications
+        )
+        self.assertEqual(
+            types,
+            sorted(
+                [
+                    (self.task_dict["assignees"][0], "comment"),
+                    (self.person_dict["id"], "comment"),
+                    (self.person_dict["id"], "mention"),
+                ]
+            ),
+        )
+
     def test_create_assignation_notification(self):
         self.generate_fixture_comment()
         notifications_service.create_assignation_notification(
@@ -1,7 +1,7 @@
 from tests.base import ApiDBTestCase
 
 from zou.app.models.playlist import Playlist
-from zou.app.services import files_service, playlists_service
+from zou.app.services import files_service, playlists_service, tasks_service
 
 
 class PlaylistsServiceTestCase(ApiDBTestCase):
@@ -125,6 +125,25 @@ class PlaylistsServiceTestCase(ApiDBTestCase):
         self.assertEqual(asset["parent_name"], "Props")
         self.assertEqual(asset["preview_files"], {})
 
+    def test_generate_playlisted_entity_from_task_with_same_task_type(self):
+        self.generate_fixture_preview_files()
+        task_id = str(self.task.id)
+        preview_file_id = str(self.preview_file.id)
+        self.task = self.generate_fixture_shot_task(name="Secondary")
+        other_task_id = str(self.task.id)
+        self.generate_fixture_preview_file(revision=3)
+        other_preview_file_id = str(self.preview_file.id)
+        tasks_service.refresh_last_comments_and_preview_files(
+            [task_id, other_task_id]
+        )
+
+        shot = playlists_service.generate_playlisted_entity_from_task(task_id)
+        self.assertEqual(shot["preview_file_id"], preview_file_id)
+        shot = playlists_service.generate_playlisted_entity_from_task(
+            other_task_id
+        )
+        self.assertEqual(shot["preview_file_id"], other_preview_file_id)
+
     def test_get_preview_files_for_task(self):
         self.generate_fixture_preview_files()
         task_id = self.task.id
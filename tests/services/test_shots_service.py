@@ -1,8 +1,10 @@
+import datetime
 import pytest
 
 from tests.base import ApiDBTestCase
 
 from zou.app.models.entity import Entity
+from zou.app.models.time_spent import TimeSpent
 from zou.app.services import breakdown_service, shots_service
 from zou.app.services.exception import (
     SceneNotFoundException,
@@ -254,3 +256,115 @@ class ShotUtilsTestCase(ApiDBTestCase):
         )
         scenes = shots_service.get_scenes_for_sequence(self.sequence.id)
         self.assertEqual(len(scenes), 1)
+
+    def generate_quota_fixtures(self):
+        self.generate_fixture_person()
+        self.generate_fixture_assigner()
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        self.generate_fixture_task_status()
+        self.shot.update({"nb_frames": 100})
+        self.generate_fixture_shot_task()
+        self.shot_task.update(
+            {
+                "duration": 50,
+                "real_start_date": datetime.datetime(2017, 2, 20, 10),
+                "end_date": datetime.datetime(2017, 2, 21, 18),
+            }
+        )
+        TimeSpent.create(
+            person_id=self.person.id,
+            task_id=self.shot_task.id,
+            date=datetime.date(2017, 2, 20),
+            duration=30,
+        )
+        TimeSpent.create(
+            person_id=self.person.id,
+            task_id=self.shot_task.id,
+            date=datetime.date(2017, 2, 21),
+            duration=20,
+        )
+        self.generate_fixture_shot("P02", nb_frames=50)
+        self.generate_fixture_shot_task()
+        self.shot_task.update(
+            {
+                "real_start_date": datetime.datetime(2017, 2, 23, 10),
+                "end_date": datetime.datetime(2017, 2, 27, 10),
+            }
+        )
+
+    def test_get_weighted_quotas(self):
+        self.generate_quota_fixtures()
+        person_id = str(self.person.id)
+        quotas = shots_service.get_weighted_quotas(
+            self.project.id, self.task_type_animation.id, None
+        )
+        self.assertEqual(list(quotas.keys()), [person_id])
+        quotas = quotas[person_id]
+        self.assertEqual(
+            quotas["day"]["frames"],
+            {
+                "2017-02-20": 60,
+                "2017-02-21": 40,
+                "2017-02-23": 17,
+                "2017-02-24": 17,
+                "2017-02-27": 17,
+            },
+        )
+        self.assertEqual(quotas["day"]["count"]["2017-02-20"], 1)
+        self.assertEqual(quotas["day"]["entries"], {"2017-02": 5})
+        self.assertEqual(
+            quotas["week"]["frames"], {"2017-8": 134, "2017-9": 17}
+        )
+        self.assertEqual(quotas["week"]["count"], {"2017-8": 4, "2017-9": 1})
+        self.assertEqual(quotas["month"]["frames"], {"2017-02": 151})
+        self.assertEqual(quotas["month"]["count"], {"2017-02": 5})
+        self.assertEqual(quotas["year"]["frames"], {"2017": 151})
+        self.assertAlmostEqual(quotas["year"]["seconds"]["2017"], 151 / 24)
+
+    def test_get_weighted_quotas_for_a_year(self):
+        self.generate_quota_fixtures()
+        person_id = str(self.person.id)
+        self.generate_fixture_shot("P03", nb_frames=2600)
+        self.generate_fixture_shot_task()
+        self.shot_task.update(
+            {
+                "duration": 260,
+                "real_start_date": datetime.datetime(2018, 1, 1, 10),
+                "end_date": datetime.datetime(2018, 12, 31, 18),
+            }
+        )
+        date = datetime.date(2018, 1, 1)
+        nb_time_spents = 0
+        while nb_time_spents < 260:
+            if date.weekday() < 5:
+                TimeSpent.create(
+                    person_id=self.person.id,
+                    task_id=self.shot_task.id,
+                    date=date,
+                    duration=1,
+                )
+                nb_time_spents += 1
+            date += datetime.timedelta(days=1)
+
+        quotas = shots_service.get_weighted_quotas(
+            self.project.id, self.task_type_animation.id, None
+        )[person_id]
+        self.assertEqual(quotas["year"]["frames"]["2018"], 2600)
+        self.assertEqual(quotas["year"]["count"]["2018"], 260)
+        self.assertEqual(quotas["day"]["frames"]["2018-06-15"], 10)
+        self.assertEqual(len(quotas["month"]["frames"]), 13)
+        self.assertEqual(quotas["month"]["entries"], {"2017": 1, "2018": 12})
+
+    def test_get_raw_quotas(self):
+        self.generate_quota_fixtures()
+        person_id = str(self.person.id)
+        quotas = shots_service.get_raw_quotas(
+            self.project.id, self.task_type_animation.id, None
+        )[person_id]
+        self.assertEqual(
+            quotas["day"]["frames"], {"2017-02-21": 100, "2017-02-27": 50}
+        )
+        self.assertEqual(quotas["week"]["count"], {"2017-8": 1, "2017-9": 1})
+        self.assertEqual(quotas["month"]["frames"], {"2017-02": 150})
+        self.assertAlmostEqual(quotas["month"]["seconds"]["2017-02"], 150 / 24)
@@ -0,0 +1,151 @@
+import datetime
+import os
+
+from tests.base import ApiDBTestCase
+
+from zou.app import db
+from zou.app.models.storage_tombstone import StorageTombstone
+from zou.app.services import deletion_service, storage_gc_service
+from zou.app.stores import file_store
+from zou.app.utils import commands
+
+
+class StorageGCServiceTestCase(ApiDBTestCase):
+    def setUp(self):
+        super(StorageGCServiceTestCase, self).setUp()
+        self.generate_base_context()
+        self.generate_fixture_asset()
+        self.generate_fixture_person()
+        self.generate_fixture_assigner()
+        self.generate_fixture_task()
+        self.generate_fixture_preview_file()
+        self.preview_file_id = str(self.preview_file.id)
+        self.fixture_path = self.get_fixture_file_path(
+            os.path.join("thumbnails", "th01.png")
+        )
+        file_store.clear()
+
+    def tearDown(self):
+        file_store.clear()
+        super(StorageGCServiceTestCase, self).tearDown()
+
+    def test_collect_garbage(self):
+        for prefix in ["thumbnails", "thumbnails-square", "previews"]:
+            file_store.add_picture(
+                prefix, self.preview_file_id, self.fixture_path
+            )
+        deletion_service.remove_preview_file(self.preview_file)
+        self.assertEqual(StorageTombstone.query.count(), 5)
+        self.assertTrue(
+            file_store.exists_picture("thumbnails", self.preview_file_id)
+        )
+
+        result = storage_gc_service.collect_garbage()
+        self.assertEqual(result, {"removed": 5, "failed": 0})
+        self.assertEqual(StorageTombstone.query.count(), 0)
+        self.assertEqual(list(file_store.list_keys("pictures")), [])
+
+    def test_collect_garbage_retry(self):
+        storage_gc_service.add_tombstones(
+            [("files", "previews-%s" % self.preview_file_id)]
+        )
+        remove_keys = file_store.remove_keys
+        file_store.remove_keys = lambda bucket, keys: {
+            key: "Storage unavailable" for key in keys
+        }
+        try:
+            result = storage_gc_service.collect_garbage(
+                max_attempts=2, retry_delay=0
+            )
+            self.assertEqual(result, {"removed": 0, "failed": 1})
+            tombstone = StorageTombstone.query.first()
+            self.assertEqual(tombstone.attempts, 1)
+            self.assertEqual(tombstone.last_error, "Storage unavailable")
+            storage_gc_service.collect_garbage(max_attempts=2, retry_delay=0)
+            result = storage_gc_service.collect_garbage(
+                max_attempts=2, retry_delay=0
+            )
+            self.assertEqual(result, {"removed": 0, "failed": 0})
+            self.assertEqual(
+                storage_gc_service.get_tombstones_stats(max_attempts=2),
+                {"pending": 0, "failed": 1},
+            )
+        finally:
+            file_store.remove_keys = remove_keys
+        result = storage_gc_service.collect_garbage(retry_delay=0)
+        self.assertEqual(result, {"removed": 1, "failed": 0})
+
+    def test_collect_garbage_retry_delay(self):
+        storage_gc_service.add_tombstones(
+            [("files", "previews-%s" % self.preview_file_id)]
+        )
+
+        def set_last_attempt(seconds_ago):
+            StorageTombstone.query.update(
+                {
+                    StorageTombstone.updated_at: datetime.datetime.utcnow()
+                    - datetime.timedelta(seconds=seconds_ago)
+                }
+            )
+            db.session.commit()
+
+        remove_keys = file_store.remove_keys
+        file_store.remove_keys = lambda bucket, keys: {
+            key: "Storage unavailable" for key in keys
+        }
+        try:
+            result = storage_gc_service.collect_garbage(retry_delay=60)
+            self.assertEqual(result, {"removed": 0, "failed": 1})
+            result = storage_gc_service.collect_garbage(retry_delay=60)
+            self.assertEqual(result, {"removed": 0, "failed": 0})
+            set_last_attempt(61)
+            result = storage_gc_service.collect_garbage(retry_delay=60)
+            self.assertEqual(result, {"removed": 0, "failed": 1})
+            set_last_attempt(61)
+            result = storage_gc_service.collect_garbage(retry_delay=60)
+            self.assertEqual(result, {"removed": 0, "failed": 0})
+        finally:
+            file_store.remove_keys = remove_keys
+        set_last_attempt(121)
+        result = storage_gc_service.collect_garbage(retry_delay=60)
+        self.assertEqual(result, {"removed": 1, "failed": 0})
+
+    def test_collect_storage_garbage_command(self):
+        storage_gc_service.add_tombstones(
+            [("files", "previews-%s" % self.preview_file_id)]
+        )
+        remove_keys = file_store.remove_keys
+        file_store.remove_keys = lambda bucket, keys: {
+            key: "Storage unavailable" for key in keys
+        }
+        try:
+            commands.collect_storage_garbage(batch_size=1, retry_delay=0)
+        finally:
+            file_store.remove_keys = remove_keys
+        self.assertEqual(StorageTombstone.query.first().attempts, 1)
+
+    def test_scan_orphan_files(self):
+        orphan_id = "63e453f1-9655-49ad-acba-ff7f27c49e9d"
+        for file_id in [self.preview_file_id, orphan_id]:
+            file_store.add_picture("previews", file_id, self.fixture_path)
+            file_store.add_movie("previews", file_id, self.fixture_path)
+        for file_id in [
+            self.preview_file_id,
+            str(self.asset.id),
+            str(self.person.id),
+            str(self.project.id),
+            orphan_id,
+        ]:
+            file_store.add_picture("thumbnails", file_id, self.fixture_path)
+
+        orphans = storage_gc_service.scan_orphan_files(
+            add_tombstones_for_orphans=False
+        )
+        self.assertEqual(
+            sorted(orphans["pictures"]),
+            ["previews-%s" % orphan_id, "thumbnails-%s" % orphan_id],
+        )
+        self.assertEqual(orphans["movies"], ["previews-%s" % orphan_id])
+        self.assertEqual(StorageTombstone.query.count(), 0)
+        storage_gc_service.scan_orphan_files()
+        self.assertEqual(StorageTombstone.query.count(), 3)
@@ -1,14 +1,71 @@
+import json
+import os
+import tempfile
+import threading
 import uuid
 import gazu
 
+from flask import Flask, Response, request
+from urllib.parse import unquote
+from werkzeug.serving import make_server
+
 from tests.base import ApiDBTestCase
 
+from zou.app.models.comment import Comment
 from zou.app.models.entity import Entity
 from zou.app.models.project import Project
+from zou.app.models.task import Task
+from zou.app.models.task_type import TaskType
 from zou.app.services import sync_service
+from zou.app.stores import file_store, versions_store
 from zou.app.utils import events
 
 
+class KitsuStandIn(object):
+    """
+    Local HTTP server answering the data routes of a target instance. Routes
+    map a path (query string included) to the result to send. A route
+    without query string can be a function receiving the query parameters.
+    Requested paths are stored in `fetched_paths`.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.failing_paths = ()
+        self.fetched_paths = []
+        app = Flask(__name__)
+        app.add_url_rule("/api/data/<path:path>", "data", self.get_data)
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.host = "http://127.0.0.1:%s/api" % self.server.server_port
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def get_data(self, path):
+        query_string = unquote(request.query_string.decode())
+        full_path = "%s?%s" % (path, query_string) if query_string else path
+        self.fetched_paths.append(full_path)
+        if full_path in self.failing_paths:
+            return self.get_response({"message": "Server error"}, 500)
+        elif full_path in self.routes:
+            return self.get_response(self.routes[full_path])
+        elif callable(self.routes.get(path)):
+            return self.get_response(self.routes[path](request.args.to_dict()))
+        else:
+            return self.get_response({"message": "Not found"}, 404)
+
+    def get_response(self, result, status=200):
+        return Response(
+            json.dumps(result), status=status, mimetype="application/json"
+        )
+
+
 class SyncServiceTestCase(ApiDBTestCase):
     def setUp(self):
         super(SyncServiceTestCase, self).setUp()
@@ -23,22 +80,51 @@ class SyncServiceTestCase(ApiDBTestCase):
         self.last_event_data = {}
         events.unregister_all()
         self.new_project_id = str(uuid.uuid4())
+        self.open_status_id = str(self.open_status.id)
 
-        self.real_fetch_one = gazu.client.fetch_one
+        self.api = KitsuStandIn()
+        self.host = gazu.client.get_host()
+        gazu.client.set_host(self.api.host)
+        self.set_fake_api({})
 
-        def fetch_one_mock(model_name, model_id):
-            return {
-                "id": self.new_project_id,
-                "name": "Test Sync Project",
-                "project_status_id": str(self.open_status.id),
-                "team": [],
-                "type": "Project",
-            }
+    def tearDown(self):
+        gazu.client.set_host(self.host)
+        self.api.stop()
+        super(SyncServiceTestCase, self).tearDown()
 
-        gazu.client.fetch_one = fetch_one_mock
+    def set_fake_api(self, routes, failing_paths=()):
+        """
+        Serve given routes (path -> result) from the local target instance,
+        along with the project used by event tests. Fetched paths are stored
+        in self.fetched_paths.
+        """
+        self.api.routes = dict(routes)
+        self.api.routes["projects/%s" % self.new_project_id] = {
+            "id": self.new_project_id,
+            "name": "Test Sync Project",
+            "project_status_id": self.open_status_id,
+            "team": [],
+            "type": "Project",
+        }
+        self.api.failing_paths = failing_paths
+        self.fetched_paths = self.api.fetched_paths = []
 
-    def tearDown(self):
-        gazu.client.fetch_one = self.real_fetch_one
+    def get_task_type_pages(self, nb_pages, page_size=3):
+        pages = {}
+        for page in range(1, nb_pages + 1):
+            pages["task-types?relations=true&page=%d" % page] = {
+                "nb_pages": nb_pages,
+                "data": [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "name": "Task type %d-%d" % (page, index),
+                        "for_entity": "Shot",
+                        "type": "TaskType",
+                    }
+                    for index in range(page_size)
+                ],
+            }
+        return pages
 
     def handle_event(self, data={}):
         self.last_event_data = data
@@ -97,3 +183,227 @@ class SyncServiceTestCase(ApiDBTestCase):
         events.register("task:update", "handle_event", self)
         sync_service.forward_base_event("task", "update", {"task_id": "test"})
         self.assertTrue("task_id" in self.last_event_data)
+
+    def test_sync_entries_pages(self):
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        pages = self.get_task_type_pages(4)
+        pages["task-types?relations=true&page=2"]["data"][0] = {
+            "id": str(self.task_type.id),
+            "name": "Renamed",
+            "type": "TaskType",
+        }
+        self.set_fake_api(pages)
+        nb_task_types = TaskType.query.count()
+        sync_service.sync_entries("task-types", TaskType, max_workers=2)
+        self.assertEqual(sorted(self.fetched_paths), sorted(pages.keys()))
+        self.assertEqual(TaskType.query.count(), nb_task_types + 11)
+        self.assertEqual(TaskType.get(self.task_type.id).name, "Renamed")
+        self.assertEqual(TaskType.get(self.task_type.id).for_entity, "Asset")
+
+    def test_sync_entries_resume(self):
+        pages = self.get_task_type_pages(4)
+        self.set_fake_api(
+            pages, failing_paths=["task-types?relations=true&page=3"]
+        )
+        (_, file_path) = tempfile.mkstemp()
+        os.remove(file_path)
+        checkpoint = sync_service.SyncCheckpoint(file_path)
+        with self.assertRaises(gazu.exception.ServerErrorException):
+            sync_service.sync_entries(
+                "task-types", TaskType, checkpoint=checkpoint
+            )
+        self.assertEqual(TaskType.query.count(), 6)
+
+        self.set_fake_api(pages)
+        checkpoint = sync_service.SyncCheckpoint(file_path)
+        self.assertEqual(checkpoint.get_last_page("task-types"), 2)
+        sync_service.sync_entries(
+            "task-types", TaskType, checkpoint=checkpoint
+        )
+        self.assertEqual(
+            sorted(self.fetched_paths),
+            [
+                "task-types?relations=true&page=3",
+                "task-types?relations=true&page=4",
+            ],
+        )
+        self.assertEqual(TaskType.query.count(), 12)
+
+        self.set_fake_api(pages)
+        sync_service.sync_entries(
+            "task-types", TaskType, checkpoint=checkpoint
+        )
+        self.assertEqual(self.fetched_paths, [])
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(file_path))
+
+    def test_sync_entries_renews_versions(self):
+        self.set_fake_api(self.get_task_type_pages(2))
+        version = versions_store.get("schedule-items")
+        sync_service.sync_entries("task-types", TaskType)
+        self.assertNotEqual(version, versions_store.get("schedule-items"))
+
+    def test_import_comments_refreshes_last_comment(self):
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        self.generate_fixture_task_status()
+        self.generate_fixture_person()
+        self.generate_fixture_assigner()
+        task_id = str(self.generate_fixture_shot_task().id)
+        comment = {
+            "id": str(uuid.uuid4()),
+            "object_id": task_id,
+            "object_type": "Task",
+            "task_status_id": str(self.task_status.id),
+            "person_id": str(self.person.id),
+            "text": "Imported comment",
+            "type": "Comment",
+        }
+        sync_service.import_instances(Comment, "comments", [comment])
+        self.assertEqual(str(Task.get(task_id).last_comment_id), comment["id"])
+        sync_service.delete_instances(Comment, "comments", [comment["id"]])
+        self.assertIsNone(Task.get(task_id).last_comment_id)
+
+    def test_sync_entries_with_failed_row(self):
+        pages = self.get_task_type_pages(4)
+        broken_row = pages["task-types?relations=true&page=2"]["data"][1]
+        broken_row["name"] = None
+        self.set_fake_api(pages)
+        (_, file_path) = tempfile.mkstemp()
+        os.remove(file_path)
+        checkpoint = sync_service.SyncCheckpoint(file_path)
+        sync_service.sync_entries(
+            "task-types", TaskType, checkpoint=checkpoint
+        )
+        self.assertEqual(TaskType.query.count(), 11)
+        checkpoint = sync_service.SyncCheckpoint(file_path)
+        self.assertEqual(checkpoint.get_last_page("task-types"), 1)
+        self.assertFalse(checkpoint.is_done("task-types"))
+
+        broken_row["name"] = "Fixed"
+        self.set_fake_api(pages)
+        sync_service.sync_entries(
+            "task-types", TaskType, checkpoint=checkpoint
+        )
+        self.assertEqual(
+            self.fetched_paths[0], "task-types?relations=true&page=2"
+        )
+        self.assertEqual(TaskType.query.count(), 12)
+        self.assertTrue(checkpoint.is_done("task-types"))
+        checkpoint.clear()
+
+    def test_fetch_pages_without_page_count(self):
+        routes = {
+            "news?page=%d" % page: {"data": [page] * (3 - page)}
+            for page in range(1, 4)
+        }
+        self.set_fake_api(routes)
+        self.assertEqual(
+            list(sync_service.fetch_pages("news", max_workers=1)),
+            [(1, [1, 1]), (2, [2])],
+        )
+
+    def test_download_preview_files_from_storage(self):
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        self.generate_fixture_task_status()
+        self.generate_fixture_person()
+        self.generate_fixture_assigner()
+        self.generate_fixture_task()
+        preview_file_ids = sorted(
+            str(self.generate_fixture_preview_file(revision=revision).id)
+            for revision in range(1, 4)
+        )
+        file_path_fixture = self.get_fixture_file_path("thumbnails/th01.png")
+        for preview_file_id in preview_file_ids:
+            file_store.add_picture(
+                "thumbnails", preview_file_id, file_path_fixture
+            )
+        checkpoint_file = os.path.join(tempfile.mkdtemp(), "checkpoint")
+        with open(checkpoint_file, "w") as checkpoint:
+            json.dump(
+                {
+                    "last_key": preview_file_ids[1],
+                    "failed_keys": [preview_file_ids[0]],
+                },
+                checkpoint,
+            )
+
+        # The first preview file failed in the previous run, it is retried.
+        # The local storage is the object storage here, so the thumbnails
+        # are already there with the same size.
+        progress = sync_service.download_preview_files_from_storage(
+            workers=2, checkpoint_file=checkpoint_file
+        )
+        stats = progress.get_stats()
+        self.assertEqual(stats["total"], 2)
+        self.assertEqual(stats["items"], 2)
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(stats["transferred"], 0)
+        self.assertEqual(stats["failed"], 0)
+        self.assertFalse(os.path.exists(checkpoint_file))
+        file_store.clear()
+
+    def test_run_last_events_sync(self):
+        self.generate_fixture_department()
+        self.generate_fixture_task_type()
+        deleted_task_type = self.task_type
+        remote_task_types = [
+            {
+                "id": str(uuid.uuid4()),
+                "name": name,
+                "for_entity": "Shot",
+                "type": "TaskType",
+            }
+            for name in ["Remote type 1", "Remote type 2"]
+        ]
+        events = [
+            {
+                "id": str(uuid.uuid4()),
+                "created_at": "2024-01-10T12:00:00.%06d" % index,
+                "name": name,
+                "data": {"task_type_id": task_type_id},
+            }
+            for (index, (name, task_type_id)) in enumerate(
+                [
+                    ("task-type:new", remote_task_types[0]["id"]),
+                    ("task-type:new", remote_task_types[1]["id"]),
+                    ("task-type:update", remote_task_types[0]["id"]),
+                    ("task-type:update", remote_task_types[1]["id"]),
+                    ("task-type:delete", str(deleted_task_type.id)),
+                    ("task-type:update", remote_task_types[1]["id"]),
+                ]
+            )
+        ]
+        self.fetched_ids = []
+
+        def get_task_types(params):
+            ids = json.loads(params["id"])
+            self.fetched_ids += ids
+            return [
+                task_type
+                for task_type in remote_task_types
+                if task_type["id"] in ids
+            ]
+
+        cursor_file = os.path.join(tempfile.mkdtemp(), "cursor")
+        cursor = sync_service.EventCursor(cursor_file)
+        cursor.set_position(events[0])
+        routes = {"task-types": get_task_types}
+        for index in [0, 3]:
+            routes[
+                "events/next?page_size=3&after=%s&after_id=%s"
+                % (events[index]["created_at"], events[index]["id"])
+            ] = events[index + 1 : index + 4]
+        self.set_fake_api(routes)
+
+        # Each object is fetched once per page of events.
+        sync_service.run_last_events_sync(page_size=3, cursor_file=cursor_file)
+        self.assertEqual(self.fetched_ids.count(remote_task_types[0]["id"]), 1)
+        self.assertEqual(self.fetched_ids.count(remote_task_types[1]["id"]), 2)
+        for task_type in remote_task_types:
+            self.assertIsNotNone(TaskType.get(task_type["id"]))
+        self.assertIsNone(TaskType.get(deleted_task_type.id))
+        cursor = sync_service.EventCursor(cursor_file)
+        self.assertEqual(cursor.id, events[-1]["id"])
@@ -1,12 +1,27 @@
 # -*- coding: UTF-8 -*-
 import datetime
 
+from sqlalchemy import func
+
 from tests.base import ApiDBTestCase
 
-from zou.app.models.task import Task
+from zou.app import db
+from zou.app.models.comment import (
+    Comment,
+    acknowledgements_table,
+    mentions_table,
+    preview_link_table,
+)
+from zou.app.models.entity import Entity
+from zou.app.models.news import News
+from zou.app.models.notification import Notification
+from zou.app.models.output_file import OutputFile
+from zou.app.models.subscription import Subscription
+from zou.app.models.task import Task, assignees_table
 from zou.app.models.task_type import TaskType
 from zou.app.models.time_spent import TimeSpent
 from zou.app.models.preview_file import PreviewFile
+from zou.app.models.working_file import WorkingFile
 from zou.app.services import (
     comments_service,
     deletion_service,
@@ -328,6 +343,27 @@ class TaskServiceTestCase(ApiDBTestCase):
         task = tasks_service.get_task_with_relations(task_id)
         self.assertEqual(len(task["assignees"]), 0)
 
+    def test_assign_tasks(self):
+        task_ids = [self.task_id, str(self.shot_task.id), "wrong-id"]
+        person_id = str(self.person.id)
+        assigner_id = str(self.assigner.id)
+        tasks_service.assign_task(self.task_id, person_id)
+        tasks = tasks_service.assign_tasks(task_ids, person_id, assigner_id)
+        self.assertEqual(len(tasks), 2)
+        for task in tasks:
+            self.assertEqual(task["assigner_id"], assigner_id)
+            task = tasks_service.get_task_with_relations(task["id"])
+            self.assertEqual(task["assignees"], [person_id])
+
+        tasks = tasks_service.clear_assignations(task_ids, self.user["id"])
+        self.assertEqual(len(tasks), 2)
+        task = tasks_service.get_task_with_relations(self.task_id)
+        self.assertEqual(task["assignees"], [person_id])
+        tasks_service.clear_assignations(task_ids)
+        for task_id in task_ids[:2]:
+            task = tasks_service.get_task_with_relations(task_id)
+            self.assertEqual(len(task["assignees"]), 0)
+
     def test_get_tasks_for_person(self):
         projects = [self.project.serialize()]
         tasks = tasks_service.get_person_tasks(self.user["id"], projects)
@@ -352,6 +388,149 @@ class TaskServiceTestCase(ApiDBTestCase):
             tasks[1]["last_comment"]["person_id"], str(self.person.id)
         )
 
+    def test_get_tasks_for_person_payload(self):
+        projects = [self.project.serialize()]
+        self.generate_fixture_episode()
+        self.generate_fixture_sequence(name="S02")
+        self.generate_fixture_sequence_task()
+        tasks_service.assign_task(self.task.id, self.user["id"])
+        tasks = tasks_service.get_person_tasks(self.person.id, projects)
+        self.assertEqual(len(tasks), 3)
+        for task in tasks:
+            task_with_relations = tasks_service.get_task_with_relations(
+                task["id"]
+            )
+            for key, value in task_with_relations.items():
+                if key == "assignees":
+                    self.assertEqual(sorted(task[key]), sorted(value))
+                else:
+                    self.assertEqual(task[key], value)
+        sequence_task = [
+            task for task in tasks if task["entity_name"] == "S02"
+        ][0]
+        self.assertEqual(sequence_task["episode_id"], str(self.episode.id))
+        self.assertEqual(sequence_task["episode_name"], "E01")
+        asset_task = [task for task in tasks if task["id"] == self.task_id][0]
+        self.assertEqual(
+            sorted(asset_task["assignees"]),
+            sorted([str(self.person.id), self.user["id"]]),
+        )
+
+        self.task_status_to_review.update({"is_feedback_request": True})
+        tasks_service.update_task(
+            self.task_id, {"task_status_id": self.task_status_to_review.id}
+        )
+        tasks = tasks_service.get_person_tasks_to_check(
+            [str(self.department.id)], [self.project_id]
+        )
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(
+            sorted(tasks[0]["assignees"]),
+            sorted([str(self.person.id), self.user["id"]]),
+        )
+        self.assertEqual(tasks[0]["task_status_name"], "To review")
+
+    def test_get_last_comment_map(self):
+        self.generate_fixture_user_client()
+        shot_task_id = str(self.shot_task.id)
+        comments_service.new_comment(
+            self.task_id,
+            self.task_status.id,
+            self.person.id,
+            "first comment",
+            created_at="2022-01-01 10:00:00",
+        )
+        comments_service.new_comment(
+            self.task_id,
+            self.task_status.id,
+            self.person.id,
+            "last comment",
+            created_at="2022-01-02 10:00:00",
+        )
+        comments_service.new_comment(
+            self.task_id,
+            self.task_status.id,
+            self.user_client["id"],
+            "client comment",
+            created_at="2022-01-03 10:00:00",
+        )
+        comments_service.new_comment(
+            shot_task_id,
+            self.task_status.id,
+            self.person.id,
+            "shot comment",
+        )
+        comment_map = tasks_service.get_last_comment_map(
+            [self.task_id, shot_task_id]
+        )
+        self.assertEqual(len(comment_map), 2)
+        self.assertEqual(comment_map[self.task_id]["text"], "last comment")
+        self.assertEqual(
+            comment_map[self.task_id]["date"], "2022-01-02T10:00:00"
+        )
+        self.assertEqual(
+            comment_map[self.task_id]["person_id"], str(self.person.id)
+        )
+        self.assertEqual(comment_map[shot_task_id]["text"], "shot comment")
+
+    def test_last_comment_and_preview_file(self):
+        comment = comments_service.new_comment(
+            self.task_id,
+            self.task_status.id,
+            self.person.id,
+            "first comment",
+        )
+        task = tasks_service.get_task(self.task_id)
+        self.assertEqual(task["last_comment_id"], comment["id"])
+        self.assertIsNone(task["last_preview_file_id"])
+
+        preview_file = tasks_service.add_preview_file_to_comment(
+            comment["id"], self.person.id, self.task_id
+        )
+        last_comment = comments_service.new_comment(
+            self.task_id,
+            self.task_status.id,
+            self.person.id,
+            "last comment",
+        )
+        task = tasks_service.get_task(self.task_id)
+        self.assertEqual(task["last_comment_id"], last_comment["id"])
+        self.assertEqual(task["last_preview_file_id"], preview_file["id"])
+
+        deletion_service.remove_comment(last_comment["id"])
+        task = tasks_service.get_task(self.task_id)
+        self.assertEqual(task["last_comment_id"], comment["id"])
+
+        Task.get(self.task_id).update(
+            {"last_comment_id": None, "last_preview_file_id": None}
+        )
+        tasks_service.clear_task_cache(self.task_id)
+        nb_tasks = tasks_service.refresh_last_comments_and_preview_files(
+            project_id=self.project_id
+        )
+        self.assertEqual(nb_tasks, 2)
+        task = tasks_service.get_task(self.task_id)
+        self.assertEqual(task["last_comment_id"], comment["id"])
+        self.assertEqual(task["last_preview_file_id"], preview_file["id"])
+
+    def test_get_tasks_for_person_client_last_comment(self):
+        self.generate_fixture_user_client()
+        projects = [self.project.serialize()]
+        comments_service.new_comment(
+            self.task_id, self.task_status.id, self.person.id, "comment"
+        )
+        comments_service.new_comment(
+            self.task_id,
+            self.task_status.id,
+            self.user_client["id"],
+            "client comment",
+        )
+        tasks = tasks_service.get_person_tasks(self.person.id, projects)
+        task = [task for task in tasks if task["id"] == self.task_id][0]
+        self.assertEqual(task["last_comment"]["text"], "comment")
+        shot_task = [task for task in tasks if task["id"] != self.task_id][0]
+        self.assertEqual(shot_task["last_comment"], {})
+
     def test_get_done_tasks_for_person(self):
         projects = [self.project.serialize()]
         tasks = tasks_service.get_person_done_tasks(self.user["id"], projects)
@@ -416,6 +595,68 @@ class TaskServiceTestCase(ApiDBTestCase):
             TaskNotFoundException, tasks_service.get_task, self.task_id
         )
 
+    def test_remove_tasks_and_related(self):
+        shot_task_id = str(self.shot_task.id)
+        self.output_file.update({"source_file_id": self.working_file.id})
+        self.generate_fixture_preview_file()
+        self.asset.update({"preview_file_id": self.preview_file.id})
+        comment = Comment.get(self.generate_fixture_comment()["id"])
+        comment.update(
+            {"previews": [self.preview_file], "mentions": [self.person]}
+        )
+        self.generate_fixture_notification()
+        self.generate_fixture_subscription()
+        News.create(
+            author_id=self.person.id,
+            comment_id=comment.id,
+            task_id=self.task_id,
+            preview_file_id=self.preview_file.id,
+        )
+        for task_id in [self.task_id, shot_task_id]:
+            TimeSpent.create(
+                person_id=self.person.id,
+                task_id=task_id,
+                date=datetime.date(2017, 9, 23),
+                duration=3600,
+            )
+        self.generate_fixture_comment(task_id=shot_task_id)
+
+        counts = deletion_service.remove_tasks_and_related([self.task_id])
+        self.assertEqual(
+            counts,
+            {
+                "notification": 1,
+                "news": 1,
+                "subscription": 1,
+                "time_spent": 1,
+                "comment_preview_link": 1,
+                "comment_mentions": 1,
+                "comment_acknowledgments": 0,
+                "attachment_file": 0,
+                "comment": 1,
+                "preview_file": 1,
+                "output_file": 1,
+                "working_file": 1,
+                "assignations": 1,
+                "task": 1,
+            },
+        )
+        self.assertIsNone(Task.get(self.task_id))
+        self.assertIsNone(Entity.get(self.asset.id).preview_file_id)
+        for model in [
+            News,
+            Notification,
+            OutputFile,
+            PreviewFile,
+            Subscription,
+            WorkingFile,
+        ]:
+            self.assertEqual(model.query.count(), 0)
+        self.assertEqual(Comment.query.count(), 1)
+        self.assertEqual(TimeSpent.query.count(), 1)
+        task = tasks_service.get_task_with_relations(shot_task_id)
+        self.assertEqual(len(task["assignees"]), 1)
+
     def test_delete_all_task_types(self):
         self.generate_fixture_project_standard()
         self.generate_fixture_asset_standard()
@@ -431,6 +672,174 @@ class TaskServiceTestCase(ApiDBTestCase):
         self.assertIsNotNone(Task.get(task_3_id))
         self.assertIsNotNone(Task.get(task_4_id))
 
+    def test_remove_tasks_and_related_by_batches(self):
+        task_1_id = str(self.task.id)
+        task_2_id = str(self.generate_fixture_task(name="second task").id)
+        self.generate_fixture_comment(task_id=task_1_id)
+        self.generate_fixture_comment(task_id=task_2_id)
+        batch_size = deletion_service.DELETION_BATCH_SIZE
+        deletion_service.DELETION_BATCH_SIZE = 1
+        try:
+            counts = deletion_service.remove_tasks_and_related(
+                [task_1_id, task_2_id]
+            )
+        finally:
+            deletion_service.DELETION_BATCH_SIZE = batch_size
+        self.assertEqual(counts["task"], 2)
+        self.assertEqual(counts["comment"], 2)
+        self.assertIsNone(Task.get(task_1_id))
+        self.assertIsNone(Task.get(task_2_id))
+        self.assertEqual(Comment.query.count(), 0)
+
+    def remove_task_cascade(self, task_id):
+        # Former per-task cascade of remove_task(task_id, force=True).
+        task = Task.get(task_id)
+        working_files = WorkingFile.query.filter_by(task_id=task_id)
+        for working_file in working_files:
+            output_files = OutputFile.query.filter_by(
+                source_file_id=working_file.id
+            )
+            for output_file in output_files:
+                output_file.delete()
+            working_file.delete()
+
+        comments = Comment.query.filter_by(object_id=task_id)
+        for comment in comments:
+            notifications = Notification.query.filter_by(comment_id=comment.id)
+            for notification in notifications:
+                notification.delete()
+            news_list = News.query.filter_by(comment_id=comment.id)
+            for news in news_list:
+                news.delete()
+            comment.delete()
+
+        subscriptions = Subscription.query.filter_by(task_id=task_id)
+        for subscription in subscriptions:
+            subscription.delete()
+
+        preview_files = PreviewFile.query.filter_by(task_id=task_id)
+        for preview_file in preview_files:
+            deletion_service.remove_preview_file(preview_file)
+
+        time_spents = TimeSpent.query.filter_by(task_id=task_id)
+        for time_spent in time_spents:
+            time_spent.delete()
+
+        notifications = Notification.query.filter_by(task_id=task_id)
+        for notification in notifications:
+            notification.delete()
+
+        news_list = News.query.filter_by(task_id=task.id)
+        for news in news_list:
+            news.delete()
+
+        task.delete()
+
+    def generate_tasks_to_remove(self, asset_name, nb_tasks):
+        asset = self.generate_fixture_asset(name=asset_name)
+        self.generate_fixture_task(name="Kept")
+        self.generate_fixture_comment()
+        self.generate_fixture_working_file()
+        task_ids = []
+        for index in range(nb_tasks):
+            task = self.generate_fixture_task(name="Task %s" % index)
+            task_ids.append(str(task.id))
+            working_file = self.generate_fixture_working_file()
+            self.generate_fixture_output_file(revision=index + 1).update(
+                {"source_file_id": working_file.id}
+            )
+            preview_file = self.generate_fixture_preview_file()
+            asset.update({"preview_file_id": preview_file.id})
+            comment = Comment.get(self.generate_fixture_comment()["id"])
+            comment.update(
+                {
+                    "previews": [preview_file],
+                    "mentions": [self.person],
+                    "acknowledgements": [self.person],
+                }
+            )
+            self.generate_fixture_notification()
+            if index == 0:
+                self.generate_fixture_subscription()
+            News.create(
+                author_id=self.person.id,
+                comment_id=comment.id,
+                task_id=task.id,
+                preview_file_id=preview_file.id,
+            )
+            TimeSpent.create(
+                person_id=self.person.id,
+                task_id=task.id,
+                date=datetime.date(2017, 9, 23),
+                duration=3600,
+            )
+        return task_ids
+
+    def get_row_counts(self):
+        tables = [
+            model.__table__
+            for model in [
+                Comment,
+                News,
+                Notification,
+                OutputFile,
+                PreviewFile,
+                Subscription,
+                Task,
+                TimeSpent,
+                WorkingFile,
+            ]
+        ] + [
+            acknowledgements_table,
+            assignees_table,
+            mentions_table,
+            preview_link_table,
+        ]
+        counts = {
+            table.name: db.session.query(func.count())
+            .select_from(table)
+            .scalar()
+            for table in tables
+        }
+        counts["entity_preview_file"] = Entity.query.filter(
+            Entity.preview_file_id != None
+        ).count()
+        return counts
+
+    def assert_remove_tasks_matches_task_cascade(self, nb_tasks):
+        cascade_task_ids = self.generate_tasks_to_remove("Cascade", nb_tasks)
+        batch_task_ids = self.generate_tasks_to_remove("Batch", nb_tasks)
+        initial_counts = self.get_row_counts()
+
+        for task_id in cascade_task_ids:
+            self.remove_task_cascade(task_id)
+        cascade_counts = self.get_row_counts()
+        deletion_service.remove_tasks_and_related(batch_task_ids)
+        batch_counts = self.get_row_counts()
+
+        for table_name, initial_count in initial_counts.items():
+            self.assertGreater(
+                initial_count - cascade_counts[table_name], 0, table_name
+            )
+            self.assertEqual(
+                cascade_counts[table_name] - batch_counts[table_name],
+                initial_count - cascade_counts[table_name],
+                table_name,
+            )
+        for task_id in cascade_task_ids + batch_task_ids:
+            self.assertIsNone(Task.get(task_id))
+
+    def test_remove_tasks_and_related_matches_task_cascade(self):
+        self.assert_remove_tasks_matches_task_cascade(3)
+
+    def test_remove_tasks_and_related_matches_task_cascade_by_batches(self):
+        batch_size = deletion_service.DELETION_BATCH_SIZE
+        deletion_service.DELETION_BATCH_SIZE = 2
+        try:
+            self.assert_remove_tasks_matches_task_cascade(5)
+        finally:
+            deletion_service.DELETION_BATCH_SIZE = batch_size
+
     def test_get_comment_mentions(self):
         mentions = comments_service.get_comment_mentions(
             self.task_id, "Test @Emma Doe"
@@ -461,6 +870,44 @@ class TaskServiceTestCase(ApiDBTestCase):
         self.assertEqual(len(comments), 1)
         persons_service.get_current_user = old_get_current_user
 
+    def test_get_comments_page(self):
+        for i in range(5):
+            self.generate_fixture_comment()
+        comment = Comment.get(self.comment["id"])
+        comment.update(
+            {
+                "mentions": [self.person],
+                "acknowledgements": [self.person],
+                "previews": [self.generate_fixture_preview_file()],
+            }
+        )
+        comments = tasks_service.get_comments(self.task_id, is_manager=True)
+        self.assertEqual(len(comments), 5)
+        self.assertEqual(comments[0]["id"], self.comment["id"])
+        self.assertEqual(comments[0]["mentions"], [str(self.person.id)])
+        self.assertEqual(
+            comments[0]["acknowledgements"], [str(self.person.id)]
+        )
+        self.assertEqual(
+            comments[0]["previews"][0]["id"], str(self.preview_file.id)
+        )
+        self.assertEqual(comments[0]["previews"][0]["status"], "ready")
+        self.assertEqual(comments[1]["previews"], [])
+        self.assertEqual(comments[1]["attachment_files"], [])
+        self.assertEqual(comments[1]["mentions"], [])
+        self.assertNotIn("role", comments[0]["person"])
+
+        page_1 = tasks_service.get_comments(
+            self.task_id, is_manager=True, page=1, limit=3
+        )
+        page_2 = tasks_service.get_comments(
+            self.task_id, is_manager=True, page=2, limit=3
+        )
+        self.assertEqual(
+            [comment["id"] for comment in page_1 + page_2],
+            [comment["id"] for comment in comments],
+        )
+
     def test_new_comment(self):
         comment = comments_service.new_comment(
             self.task_id, self.task_status.id, self.person.id, "Test @John Doe"
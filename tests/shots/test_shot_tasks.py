@@ -1,3 +1,5 @@
+import json
+
 from tests.base import ApiDBTestCase
 
 from zou.app.services import (
@@ -6,6 +8,7 @@ from zou.app.services import (
     tasks_service,
     shots_service,
 )
+from zou.app.stores import versions_store
 
 
 class ShotTasksTestCase(ApiDBTestCase):
@@ -29,6 +32,13 @@ class ShotTasksTestCase(ApiDBTestCase):
         self.shot_id = str(self.shot.id)
         self.meta_descriptor_id = self.meta_descriptor.id
         self.department_id = self.department.id
+        # Conditional requests are disabled without a shared store.
+        self.is_versions_store_shared = versions_store.is_shared
+        versions_store.is_shared = True
+
+    def tearDown(self):
+        versions_store.is_shared = self.is_versions_store_shared
+        super(ShotTasksTestCase, self).tearDown()
 
     def test_get_tasks_for_shot(self):
         tasks = self.get("data/shots/%s/tasks" % self.shot_id)
@@ -44,6 +54,32 @@ class ShotTasksTestCase(ApiDBTestCase):
         self.assertEqual(shots[0]["episode_name"], "E01")
         self.assertEqual(shots[0]["sequence_name"], "S01")
 
+    def test_get_shots_and_tasks_etag(self):
+        task_id = str(self.shot_task.id)
+        path = "data/shots/with-tasks?project_id=%s" % self.project.id
+        response = self.app.get(path, headers=self.base_headers)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        headers = dict(self.base_headers, **{"If-None-Match": etag})
+        response = self.app.get(path, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        response = self.app.get("data/shots/with-tasks", headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        tasks_service.update_task(task_id, {"priority": 3})
+        response = self.app.get(path, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        shots = json.loads(response.data.decode("utf-8"))
+        self.assertEqual(shots[0]["tasks"][0]["priority"], 3)
+
+    def test_get_shots_and_tasks_without_shared_versions(self):
+        versions_store.is_shared = False
+        path = "data/shots/with-tasks?project_id=%s" % self.project.id
+        response = self.app.get(path, headers=self.base_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response.headers)
+
     def test_get_shots_and_tasks_vendor(self):
         self.generate_fixture_shot_task(name="Secondary")
         self.generate_fixture_user_vendor()
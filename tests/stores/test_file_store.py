@@ -45,3 +45,33 @@ class FileStoreTestCase(unittest.TestCase):
         file_name = "thumbnails-63e453f1-9655-49ad-acba-ff7f27c49e9d"
         result_path = file_store.path(file_store.pictures, file_name)
         self.assertTrue(os.path.exists(result_path))
+
+    def test_list_and_remove_keys(self):
+        file_path_fixture = self.get_fixture_file_path("thumbnails/th01.png")
+        file_ids = [
+            "63e453f1-9655-49ad-acba-ff7f27c49e9d",
+            "7e1de7e8-6d2b-4bd5-9ba9-9e0e2f3c1f0b",
+        ]
+        for file_id in file_ids:
+            file_store.add_picture(
+                "thumbnails-square", file_id, file_path_fixture
+            )
+        keys = sorted(file_store.list_keys("pictures"))
+        self.assertEqual(
+            keys, ["thumbnails-square-%s" % file_id for file_id in file_ids]
+        )
+        errors = file_store.remove_keys("pictures", keys + ["previews-wrong"])
+        self.assertEqual(errors, {})
+        self.assertEqual(list(file_store.list_keys("pictures")), [])
+
+    def test_get_size(self):
+        file_path_fixture = self.get_fixture_file_path("thumbnails/th01.png")
+        file_id = "63e453f1-9655-49ad-acba-ff7f27c49e9d"
+        file_store.add_picture("thumbnails", file_id, file_path_fixture)
+        self.assertEqual(
+            file_store.get_size("pictures", "thumbnails-%s" % file_id),
+            os.path.getsize(file_path_fixture),
+        )
+        self.assertIsNone(
+            file_store.get_size("pictures", "previews-%s" % file_id)
+        )
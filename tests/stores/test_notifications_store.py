@@ -0,0 +1,77 @@
+from tests.base import ApiTestCase
+
+from zou.app.stores import notifications_store
+
+
+class NotificationsStoreTestCase(ApiTestCase):
+    def setUp(self):
+        super(NotificationsStoreTestCase, self).setUp()
+        self.store = notifications_store
+        self.store.clear()
+
+    def tearDown(self):
+        self.store.clear()
+
+    def test_pop_due_digests(self):
+        self.store.add_message("person-1", {"subject": "a"}, 60, now=100)
+        self.store.add_message("person-1", {"subject": "b"}, 60, now=130)
+        self.store.add_message("person-2", {"subject": "c"}, 60, now=150)
+        self.assertEqual(self.store.get_pending_digests_count(), 2)
+        self.assertEqual(self.store.pop_due_digests(now=150), {})
+
+        digests = self.store.pop_due_digests(now=160)
+        self.assertEqual(
+            digests, {"person-1": [{"subject": "a"}, {"subject": "b"}]}
+        )
+        self.assertEqual(self.store.pop_due_digests(now=160), {})
+        self.assertEqual(self.store.get_pending_digests_count(), 1)
+
+        digests = self.store.pop_due_digests(now=210)
+        self.assertEqual(digests, {"person-2": [{"subject": "c"}]})
+        self.assertEqual(self.store.get_pending_digests_count(), 0)
+
+    def test_restore_digests(self):
+        self.store.add_message("person-1", {"subject": "a"}, 60, now=100)
+        self.store.add_message("person-1", {"subject": "b"}, 60, now=130)
+        digests = self.store.pop_due_digests(now=160)
+        self.store.add_message("person-1", {"subject": "c"}, 60, now=170)
+        self.store.restore_digests(digests, now=180)
+        self.assertEqual(self.store.pop_due_digests(now=170), {})
+        digests = self.store.pop_due_digests(now=180)
+        self.assertEqual(
+            digests,
+            {
+                "person-1": [
+                    {"subject": "a"},
+                    {"subject": "b"},
+                    {"subject": "c"},
+                ]
+            },
+        )
+
+    def test_delivery_retries(self):
+        self.assertEqual(self.store.pop_delivery_retries(), [])
+        self.store.add_delivery_retries(
+            [
+                {"channel": "slack", "message": ["U1", "a"], "attempts": 1},
+                {"channel": "slack", "message": ["U2", "b"], "attempts": 2},
+            ]
+        )
+        self.assertEqual(self.store.get_metrics()["pending_retries"], 2)
+        retries = self.store.pop_delivery_retries(limit=1)
+        self.assertEqual(retries[0]["message"], ["U1", "a"])
+        retries = self.store.pop_delivery_retries()
+        self.assertEqual(len(retries), 1)
+        self.assertEqual(retries[0]["attempts"], 2)
+        self.assertEqual(self.store.pop_delivery_retries(), [])
+
+    def test_metrics(self):
+        self.store.add_metrics("email", sent=4, failed=1, duration=2.0)
+        self.store.add_metrics("email", sent=2, duration=1.0)
+        metrics = self.store.get_metrics()
+        self.assertEqual(
+            metrics["email"],
+            {"sent": 6, "failed": 1, "duration": 3.0, "throughput": 2.0},
+        )
+        self.assertEqual(metrics["slack"]["sent"], 0)
+        self.assertEqual(metrics["pending_digests"], 0)
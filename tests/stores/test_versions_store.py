@@ -0,0 +1,69 @@
+from tests.base import ApiTestCase
+
+from zou.app.stores import versions_store
+
+
+class VersionsStoreTestCase(ApiTestCase):
+    def setUp(self):
+        super(VersionsStoreTestCase, self).setUp()
+        self.store = versions_store
+        self.store.clear()
+
+    def tearDown(self):
+        self.store.clear()
+
+    def test_get_and_bump(self):
+        version = self.store.get("casting", "project-1")
+        self.assertEqual(version, self.store.get("casting", "project-1"))
+        self.assertNotEqual(version, self.store.get("casting", "project-2"))
+        self.store.bump("casting", "project-1")
+        self.assertNotEqual(version, self.store.get("casting", "project-1"))
+
+    def test_bump_for_event(self):
+        version = self.store.get("casting", "project-1")
+        self.store.bump_for_event("task:update", "project-1")
+        self.assertEqual(version, self.store.get("casting", "project-1"))
+        self.store.bump_for_event("entity-link:new", "project-1")
+        self.assertNotEqual(version, self.store.get("casting", "project-1"))
+
+    def test_bump_for_models(self):
+        casting_version = self.store.get("casting", "project-1")
+        playlists_version = self.store.get("playlists", "project-1")
+        self.store.bump_for_models(["entity"], "project-1")
+        self.assertNotEqual(
+            casting_version, self.store.get("casting", "project-1")
+        )
+        self.assertEqual(
+            playlists_version, self.store.get("playlists", "project-1")
+        )
+        shots_version = self.store.get("shots", "project-1")
+        self.store.bump_for_models(["preview_file"])
+        self.assertNotEqual(shots_version, self.store.get("shots"))
+
+    def test_get_etag(self):
+        etag = self.store.get_etag("casting", "project-1")
+        self.assertEqual(etag, self.store.get_etag("casting", "project-1"))
+        self.store.bump_for_event("asset:update", "project-2")
+        self.assertEqual(etag, self.store.get_etag("casting", "project-1"))
+        self.store.bump_for_event("entity-link:delete", None)
+        self.assertNotEqual(etag, self.store.get_etag("casting", "project-1"))
+
+    def test_get_etag_any_project(self):
+        etag = self.store.get_etag("shots")
+        self.store.bump_for_event("casting:update", "project-1")
+        self.assertEqual(etag, self.store.get_etag("shots"))
+        self.store.bump_for_event("task:update", "project-1")
+        self.assertNotEqual(etag, self.store.get_etag("shots"))
+
+    def test_get_etag_several_collections(self):
+        etag = self.store.get_etag(["shots", "playlists"], "project-1")
+        self.assertEqual(
+            etag, self.store.get_etag(["playlists", "shots"], "project-1")
+        )
+        self.assertNotEqual(
+            etag, self.store.get_etag(["shots", "playlists"], "project-1", "a")
+        )
+        self.store.bump_for_event("playlist:update", "project-1")
+        self.assertNotEqual(
+            etag, self.store.get_etag(["shots", "playlists"], "project-1")
+        )
@@ -195,6 +195,87 @@ class CreateFromImportTestCase(ApiDBTestCase):
         task = Task.get(task_dict["id"])
         self.assertEqual(task.name, task_dict["name"])
 
+    def test_task_list(self):
+        task_ids = [
+            "0a4ed4d4-3e4d-4a53-a5c6-7c3c7b0b9d11",
+            "5b0c0e4a-8c2a-4f1e-9c6b-4d2f6e1a7b22",
+        ]
+        task_dicts = [
+            {
+                "assignees": [str(self.person.id), str(self.assigner.id)],
+                "id": task_id,
+                "name": "Task %d" % index,
+                "priority": 3,
+                "project_id": str(self.project.id),
+                "task_type_id": str(self.task_type.id),
+                "task_status_id": str(self.task_status.id),
+                "entity_id": str(self.asset.id),
+                "type": "Task",
+            }
+            for (index, task_id) in enumerate(task_ids)
+        ]
+        Task.create_from_import_list(task_dicts)
+        for task_id in task_ids:
+            task = Task.get(task_id)
+            self.assertEqual(len(task.assignees), 2)
+
+        Task.create_from_import_list(
+            {
+                "data": [
+                    {
+                        "id": task_ids[0],
+                        "name": "Renamed",
+                        "assignees": [
+                            str(self.person.id),
+                            "e1a4b9c3-0d5f-4c2e-8f7a-000000000000",
+                        ],
+                        "type": "Task",
+                    }
+                ]
+            }
+        )
+        task = Task.get(task_ids[0])
+        self.assertEqual(task.name, "Renamed")
+        self.assertEqual(task.priority, 3)
+        self.assertEqual(
+            [str(person.id) for person in task.assignees],
+            [str(self.person.id)],
+        )
+        self.assertEqual(len(Task.get(task_ids[1]).assignees), 2)
+
+    def test_entity_list(self):
+        shot_dict = {
+            "id": str(self.shot.id),
+            "entities_out": [str(self.asset.id)],
+            "name": "SH02",
+            "project_id": str(self.project.id),
+            "type": "Shot",
+        }
+        Entity.create_from_import_list([shot_dict])
+        shot = Entity.get(self.shot.id)
+        self.assertEqual(shot.name, "SH02")
+        self.assertEqual(shot.entities_out[0].id, self.asset.id)
+        links = EntityLink.get_all_by(entity_in_id=self.shot.id)
+        self.assertEqual(len(links), 1)
+
+    def test_person_list(self):
+        person_dict = {
+            "departments": [str(self.department.id)],
+            "id": "b86127df-909b-4bc2-983e-a959ea5a7319",
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "jhon01@gmail.com",
+            "password": "hash",
+            "role": "user",
+            "type": "Person",
+            "full_name": "John Doe",
+        }
+        Person.create_from_import_list([person_dict])
+        person = Person.get(person_dict["id"])
+        self.assertEqual(person.password, b"hash")
+        self.assertEqual(person.departments[0].id, self.department.id)
+        self.assertEqual(person_dict["type"], "Person")
+
     """
     def test_notification(self):
         pass
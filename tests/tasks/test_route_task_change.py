@@ -170,6 +170,54 @@ class RouteTaskChangeTestCase(ApiDBTestCase):
         comments = self.get("data/tasks/%s/comments" % task2_id)
         self.assertEqual(len(comments), 0)
 
+    def test_batch_comment(self):
+        project_id = str(self.project.id)
+        task_id = str(self.task.id)
+        self.generate_fixture_task(name="second_task")
+        task2_id = str(self.task.id)
+        path = "/actions/projects/%s/tasks/batch-comment" % project_id
+        results = self.post(
+            path,
+            [
+                {
+                    "task_status_id": self.retake_status_id,
+                    "comment": "retake 1",
+                    "object_id": task_id,
+                },
+                {
+                    "task_status_id": self.wip_status_id,
+                    "comment": "wip",
+                    "object_id": task2_id,
+                },
+                {
+                    "task_status_id": self.wip_status_id,
+                    "comment": "wrong task",
+                    "object_id": "wrong-id",
+                },
+                {
+                    "task_status_id": "wrong-id",
+                    "comment": "wrong status",
+                    "object_id": task_id,
+                },
+            ],
+        )
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]["comment"]["text"], "retake 1")
+        self.assertEqual(results[1]["comment"]["object_id"], task2_id)
+        self.assertTrue("error" in results[2])
+        self.assertTrue("error" in results[3])
+        task = self.get("data/tasks/%s" % task_id)
+        self.assertEqual(task["retake_count"], 1)
+        self.assertEqual(task["task_status_id"], self.retake_status_id)
+        task = self.get("data/tasks/%s" % task2_id)
+        self.assertEqual(task["task_status_id"], self.wip_status_id)
+        comments = self.get("data/tasks/%s/comments" % task_id)
+        self.assertEqual(len(comments), 1)
+        comments = self.get("data/tasks/%s/comments" % task2_id)
+        self.assertEqual(len(comments), 1)
+        news = self.get("data/projects/%s/news" % project_id)
+        self.assertEqual(len(news["data"]), 2)
+
     def test_attachments(self):
         self.delete_test_folder()
         self.create_test_folder()
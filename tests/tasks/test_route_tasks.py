@@ -325,9 +325,50 @@ class TaskRoutesTestCase(ApiDBTestCase):
         )
         self.assertEqual(comments[0]["task_status"]["short_name"], "wip")
 
+        path = "/data/tasks/%s/comments/?page=1&limit=1" % self.task_id
+        comments = self.get(path)
+        self.assertEqual(len(comments), 1)
+        self.assertEqual(comments[0]["text"], data["comment"])
+        path = "/data/tasks/%s/comments/?page=1&limit=10000" % self.task_id
+        comments = self.get(path)
+        self.assertEqual(len(comments), 2)
+        path = "/data/tasks/%s/comments/?page=1&limit=abc" % self.task_id
+        self.get(path, 400)
+        path = "/data/tasks/%s/comments/?page=1&limit=0" % self.task_id
+        self.get(path, 400)
+
         path = "/actions/tasks/unknown/comments/"
         comments = self.get(path, 404)
 
+    def test_task_comments_for_client(self):
+        self.generate_fixture_task()
+        self.generate_fixture_user_client()
+        task_id = str(self.task.id)
+        client_id = self.user_client["id"]
+        projects_service.add_team_member(self.project_id, client_id)
+        for text in ["client comment 1", "client comment 2"]:
+            comments_service.new_comment(
+                task_id, self.wip_status_id, client_id, text
+            )
+        for text in ["staff comment 1", "staff comment 2"]:
+            comments_service.new_comment(
+                task_id, self.wip_status_id, self.user["id"], text
+            )
+
+        self.log_in_client()
+        path = "/data/tasks/%s/comments/?page=1&limit=1" % task_id
+        comments = self.get(path)
+        self.assertEqual(
+            [comment["text"] for comment in comments], ["client comment 2"]
+        )
+        path = "/data/tasks/%s/comments/?page=2&limit=1" % task_id
+        comments = self.get(path)
+        self.assertEqual(
+            [comment["text"] for comment in comments], ["client comment 1"]
+        )
+        path = "/data/tasks/%s/comments/?page=3&limit=1" % task_id
+        self.assertEqual(self.get(path), [])
+
     def test_delete_task_comment(self):
         self.generate_fixture_project_standard()
         self.generate_fixture_asset_standard()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from zou.app.utils import transfer
+
+
+class TransferTestCase(unittest.TestCase):
+    def setUp(self):
+        super(TransferTestCase, self).setUp()
+        self.messages = []
+        self.checkpoint_path = os.path.join(
+            tempfile.mkdtemp(), "checkpoint.json"
+        )
+
+    def test_call_with_retries(self):
+        self.calls = 0
+
+        def flaky():
+            self.calls += 1
+            if self.calls < 3:
+                raise Exception("failure %s" % self.calls)
+            return "done"
+
+        self.assertEqual(
+            transfer.call_with_retries(flaky, retries=2, backoff=0), "done"
+        )
+        self.assertEqual(self.calls, 3)
+        self.calls = 0
+        with self.assertRaises(Exception):
+            transfer.call_with_retries(flaky, retries=1, backoff=0)
+        self.assertEqual(self.calls, 2)
+
+    def test_checkpoint(self):
+        checkpoint = transfer.TransferCheckpoint(self.checkpoint_path)
+        self.assertIsNone(checkpoint.last_key)
+        checkpoint.set_failed("key-1", True)
+        checkpoint.save("key-2")
+        checkpoint.save("key-0")
+        checkpoint = transfer.TransferCheckpoint(self.checkpoint_path)
+        self.assertEqual(checkpoint.last_key, "key-2")
+        self.assertEqual(checkpoint.failed_keys, ["key-1"])
+        checkpoint.set_failed("key-1", False)
+        self.assertEqual(checkpoint.failed_keys, [])
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+        self.assertIsNone(checkpoint.last_key)
+
+    def test_run_transfers(self):
+        keys = ["key-%02d" % index for index in range(20)]
+        self.calls = {}
+
+        def transfer_func(key):
+            self.calls[key] = self.calls.get(key, 0) + 1
+            if key == "key-03":
+                raise Exception("broken file")
+            elif key == "key-05" and self.calls[key] == 1:
+                raise Exception("temporary failure")
+            elif key == "key-07":
+                return transfer.get_transfer_result(skipped=1)
+            return transfer.get_transfer_result(transferred=2, size=10)
+
+        checkpoint = transfer.TransferCheckpoint(self.checkpoint_path)
+        progress = transfer.TransferProgress(
+            total=len(keys), output=self.messages.append
+        )
+        transfer.run_transfers(
+            ((key, key) for key in keys),
+            transfer_func,
+            workers=3,
+            checkpoint=checkpoint,
+            progress=progress,
+            retries=1,
+            backoff=0,
+        )
+        stats = progress.get_stats()
+        self.assertEqual(stats["items"], 20)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["skipped"], 1)
+        self.assertEqual(stats["transferred"], 36)
+        self.assertEqual(stats["size"], 180)
+        self.assertEqual(self.calls["key-03"], 2)
+        self.assertEqual(self.calls["key-05"], 2)
+        self.assertIn("Transfer of key-03 failed: broken file", self.messages)
+        self.assertTrue(self.messages[-1].startswith("20/20 items processed"))
+        checkpoint = transfer.TransferCheckpoint(self.checkpoint_path)
+        self.assertEqual(checkpoint.last_key, "key-19")
+        self.assertEqual(checkpoint.failed_keys, ["key-03"])
@@ -2,6 +2,7 @@ import os
 import sys
 
 from zou.app.utils import events, api as api_utils
+from zou.app.services import index_service
 
 from flask import Blueprint
 
@@ -72,7 +73,8 @@ def configure_api_routes(app):
 def register_event_handlers(app):
     """
     Load code from event handlers folder. Then it registers in the event manager
-    each event handler listed in the __init_.py.
+    each event handler listed in the __init_.py. Handlers keeping the search
+    index current are registered too.
     """
     sys.path.insert(0, app.config["EVENT_HANDLERS_FOLDER"])
     try:
@@ -84,6 +86,7 @@ def register_event_handlers(app):
         # Handlers are optional, that's why this error is ignored.
         # app.logger.info("No event handlers folder is configured.")
         pass
+    index_service.register_event_handlers(app)
     return app
 
 
@@ -2,7 +2,7 @@ from flask import request
 from flask_restful import Resource, reqparse
 from flask_jwt_extended import jwt_required
 
-from zou.app.utils import permissions, query
+from zou.app.utils import etags, permissions, query
 from zou.app.mixin import ArgsMixin
 from zou.app.services import (
     assets_service,
@@ -135,15 +135,21 @@ class AssetsAndTasksResource(Resource):
         criterions = query.get_query_criterions_from_request(request)
         page = query.get_page_from_request(request)
         check_criterion_access(criterions)
-        if permissions.has_vendor_permissions():
-            criterions["assigned_to"] = persons_service.get_current_user()[
-                "id"
-            ]
-            criterions["vendor_departments"] = [
-                str(department.id)
-                for department in persons_service.get_current_user_raw().departments
-            ]
-        return assets_service.get_assets_and_tasks(criterions, page)
+
+        def get_assets_and_tasks():
+            if permissions.has_vendor_permissions():
+                criterions["assigned_to"] = persons_service.get_current_user()[
+                    "id"
+                ]
+                criterions["vendor_departments"] = [
+                    str(department.id)
+                    for department in persons_service.get_current_user_raw().departments
+                ]
+            return assets_service.get_assets_and_tasks(criterions, page)
+
+        return etags.conditional_response(
+            "assets", criterions.get("project_id", None), get_assets_and_tasks
+        )
 
 
 class AssetTypeResource(Resource):
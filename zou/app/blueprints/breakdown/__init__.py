@@ -10,6 +10,8 @@ from .resources import (
     SceneAssetInstancesResource,
     SceneCameraInstancesResource,
     CastingResource,
+    ProjectCastingResource,
+    ProjectCastingGraphResource,
     AssetTypeCastingResource,
     SequenceCastingResource,
     EpisodeSequenceAllCastingResource,
@@ -18,6 +20,11 @@ from .resources import (
 
 
 routes = [
+    ("/data/projects/<project_id>/casting", ProjectCastingResource),
+    (
+        "/data/projects/<project_id>/casting/graph",
+        ProjectCastingGraphResource,
+    ),
     (
         "/data/projects/<project_id>/entities/<entity_id>/casting",
         CastingResource,
@@ -12,7 +12,7 @@ from zou.app.services import (
 )
 
 from zou.app.mixin import ArgsMixin
-from zou.app.utils import permissions
+from zou.app.utils import etags, permissions
 
 
 class CastingResource(Resource):
@@ -72,6 +72,68 @@ class CastingResource(Resource):
         return breakdown_service.update_casting(entity_id, casting)
 
 
+class ProjectCastingResource(Resource):
+    @jwt_required
+    def put(self, project_id):
+        """
+        Resource to allow the modification of assets linked to several
+        entities at once.
+        ---
+        tags:
+          - Breakdown
+        description: Body is a map where keys are entity IDs and values are
+                     casting lists of the related entity.
+        parameters:
+          - in: path
+            name: project_id
+            required: True
+            type: string
+            format: UUID
+            x-example: a24a6ea4-ce75-4665-a070-57453082c25
+        responses:
+            200:
+                description: Modification of assets linked to given entities
+        """
+        castings = request.json
+        user_service.check_manager_project_access(project_id)
+        return breakdown_service.update_castings(project_id, castings)
+
+
+class ProjectCastingGraphResource(Resource):
+    @jwt_required
+    def get(self, project_id):
+        """
+        Resource to retrieve all the links between shots and assets of given
+        project in a compact format.
+        ---
+        tags:
+          - Breakdown
+        description: Shot IDs, asset IDs and labels are listed once. Links
+                     are described by arrays of shot indexes, asset indexes,
+                     occurences and label indexes. The response comes with
+                     an ETag, a request with a matching If-None-Match header
+                     returns a 304 without reading the database.
+        parameters:
+          - in: path
+            name: project_id
+            required: True
+            type: string
+            format: UUID
+            x-example: a24a6ea4-ce75-4665-a070-57453082c25
+        responses:
+            200:
+                description: Casting graph of given project
+            304:
+                description: Casting graph did not change
+        """
+        user_service.check_project_access(project_id)
+        return etags.conditional_response(
+            "casting",
+            project_id,
+            lambda: breakdown_service.get_casting_graph(project_id),
+        )
+
+
 class EpisodesCastingResource(Resource):
     @jwt_required
     def get(self, project_id):
@@ -92,7 +154,13 @@ class EpisodesCastingResource(Resource):
                 description: Casting of episodes
         """
         user_service.check_project_access(project_id)
-        return breakdown_service.get_production_episodes_casting(project_id)
+        return etags.conditional_response(
+            "casting",
+            project_id,
+            lambda: breakdown_service.get_production_episodes_casting(
+                project_id
+            ),
+        )
 
 
 class EpisodeSequenceAllCastingResource(Resource):
@@ -121,8 +189,12 @@ class EpisodeSequenceAllCastingResource(Resource):
                 description: Casting for all shots from given episode.
         """
         user_service.check_project_access(project_id)
-        return breakdown_service.get_all_sequences_casting(
-            project_id, episode_id=episode_id
+        return etags.conditional_response(
+            "casting",
+            project_id,
+            lambda: breakdown_service.get_all_sequences_casting(
+                project_id, episode_id=episode_id
+            ),
         )
 
 
@@ -147,7 +219,11 @@ class SequenceAllCastingResource(Resource):
                 description: Casting for all shots from given project.
         """
         user_service.check_project_access(project_id)
-        return breakdown_service.get_all_sequences_casting(project_id)
+        return etags.conditional_response(
+            "casting",
+            project_id,
+            lambda: breakdown_service.get_all_sequences_casting(project_id),
+        )
 
 
 class SequenceCastingResource(Resource):
@@ -176,8 +252,14 @@ class SequenceCastingResource(Resource):
                 description: Casting of shots from given sequence
         """
         user_service.check_project_access(project_id)
-        shots_service.get_sequence(sequence_id)
-        return breakdown_service.get_sequence_casting(sequence_id)
+
+        def get_sequence_casting():
+            shots_service.get_sequence(sequence_id)
+            return breakdown_service.get_sequence_casting(sequence_id)
+
+        return etags.conditional_response(
+            "casting", project_id, get_sequence_casting
+        )
 
 
 class AssetTypeCastingResource(Resource):
@@ -206,9 +288,15 @@ class AssetTypeCastingResource(Resource):
                 description: Casting of assets from given asset type
         """
         user_service.check_project_access(project_id)
-        assets_service.get_asset_type(asset_type_id)
-        return breakdown_service.get_asset_type_casting(
-            project_id, asset_type_id
+
+        def get_asset_type_casting():
+            assets_service.get_asset_type(asset_type_id)
+            return breakdown_service.get_asset_type_casting(
+                project_id, asset_type_id
+            )
+
+        return etags.conditional_response(
+            "casting", project_id, get_asset_type_casting
         )
 
 
@@ -8,6 +8,7 @@ from .resources import (
     AttachmentResource,
     CommentTaskResource,
     CommentManyTasksResource,
+    BatchCommentTasksResource,
     DownloadAttachmentResource,
     ProjectAttachmentFiles,
     TaskAttachmentFiles,
@@ -45,6 +46,10 @@ routes = [
         "/actions/projects/<project_id>/tasks/comment-many",
         CommentManyTasksResource,
     ),
+    (
+        "/actions/projects/<project_id>/tasks/batch-comment",
+        BatchCommentTasksResource,
+    ),
 ]
 
 blueprint = Blueprint("comments", "comments")
@@ -362,28 +362,38 @@ class CommentManyTasksResource(Resource):
             201:
                 description: Given files added to the comment entry as attachments
         """
-        comments = request.json
+        results = self.create_comments(project_id, request.json)
+        return [
+            result["comment"] for result in results if "comment" in result
+        ], 201
+
+    def create_comments(self, project_id, comments):
+        """
+        Create given comments in a single batch. Comments the current user
+        is not allowed to post are returned with an error.
+        """
         person = persons_service.get_current_user(relations=True)
         try:
             user_service.check_manager_project_access(project_id)
+            allowed_comments = comments
         except permissions.PermissionDenied:
-            comments = self.get_allowed_comments_only(comments, person)
-        result = []
-        for comment in comments:
-            try:
-                comment = comments_service.create_comment(
-                    person["id"],
-                    comment["object_id"],
-                    comment["task_status_id"],
-                    comment["comment"],
-                    [],
-                    {},
-                    None,
-                )
-                result.append(comment)
-            except KeyError:
-                pass
-        return result, 201
+            allowed_comments = self.get_allowed_comments_only(comments, person)
+        results = comments_service.create_comments(
+            person["id"], allowed_comments
+        )
+        task_results = {
+            task_id: iter(results_for_task)
+            for (task_id, results_for_task) in results.items()
+        }
+        return [
+            next(task_results[str(comment.get("object_id"))])
+            if str(comment.get("object_id")) in task_results
+            else {
+                "object_id": comment.get("object_id"),
+                "error": "Permission denied",
+            }
+            for comment in comments
+        ]
 
     def get_allowed_comments_only(self, comments, person):
         allowed_comments = []
@@ -410,6 +420,58 @@ class CommentManyTasksResource(Resource):
         return allowed_comments
 
 
+class BatchCommentTasksResource(CommentManyTasksResource):
+    """
+    Create several comments at once in a single batch and return a result
+    for each given comment.
+    """
+
+    @jwt_required
+    def post(self, project_id):
+        """
+        Create several comments at once and return a result for each of them.
+        ---
+        tags:
+        - Comments
+        description: Each comment requires a task id (object_id), a
+                     task_status_id and a comment text. Comments are created
+                     in a single transaction. Each result contains the
+                     object_id and either the created comment or an error.
+        parameters:
+          - in: path
+            name: project_id
+            required: True
+            type: string
+            format: UUID
+            x-example: a24a6ea4-ce75-4665-a070-57453082c25
+          - in: body
+            name: Comments
+            description: List of comments (object_id, task_status_id, comment)
+            schema:
+                type: array
+                items:
+                    type: object
+                    required:
+                        - object_id
+                        - task_status_id
+                    properties:
+                        object_id:
+                            type: string
+                            format: UUID
+                            example: a24a6ea4-ce75-4665-a070-57453082c25
+                        task_status_id:
+                            type: string
+                            format: UUID
+                            example: a24a6ea4-ce75-4665-a070-57453082c25
+                        comment:
+                            type: string
+        responses:
+            201:
+                description: Result of each comment creation
+        """
+        return self.create_comments(project_id, request.json), 201
+
+
 class ReplyCommentResource(Resource, ArgsMixin):
     """
     Reply to given comment. Add comment to its replies list.
@@ -1,10 +1,11 @@
 from flask import Blueprint
 from zou.app.utils.api import configure_api_from_blueprint
 
-from .resources import EventsResource, LoginLogsResource
+from .resources import EventsResource, LoginLogsResource, NextEventsResource
 
 routes = [
     ("/data/events/last", EventsResource),
+    ("/data/events/next", NextEventsResource),
     ("/data/events/login-logs/last", LoginLogsResource),
 ]
 
@@ -57,7 +57,7 @@ class EventsResource(Resource, ArgsMixin):
         permissions.check_manager_permissions()
         before = self.parse_date_parameter(args["before"])
         after = self.parse_date_parameter(args["after"])
-        page_size = args["page_size"]
+        page_size = int(args["page_size"])
         only_files = args["only_files"] == "true"
         project_id = args.get("project_id", None)
         if project_id is not None and not fields.is_valid_id(project_id):
@@ -74,6 +74,70 @@ class EventsResource(Resource, ArgsMixin):
             )
 
 
+class NextEventsResource(Resource, ArgsMixin):
+    @jwt_required
+    def get(self):
+        """
+        Retrieve events following given cursor, from the oldest to the most
+        recent. The cursor is the creation date and the id of the last event
+        already read.
+        ---
+        tags:
+          - Events
+        parameters:
+          - in: query
+            name: after
+            type: string
+            format: date
+            x-example: "2022-07-12T10:23:45.123456"
+          - in: query
+            name: after_id
+            type: string
+            format: UUID
+            x-example: a24a6ea4-ce75-4665-a070-57453082c25
+          - in: query
+            name: only_files
+            type: boolean
+            default: False
+          - in: query
+            name: page_size
+            type: integer
+            default: 100
+            x-example: 100
+          - in: query
+            name: project_id
+            type: string
+            format: UUID
+            x-example: a24a6ea4-ce75-4665-a070-57453082c25
+        responses:
+            200:
+                description: Events following given cursor
+        """
+        args = self.get_args(
+            [
+                ("after", None, False),
+                ("after_id", None, False),
+                ("only_files", False, False),
+                ("page_size", 100, False),
+                ("project_id", None, False),
+            ]
+        )
+        permissions.check_manager_permissions()
+        after = self.parse_date_parameter(args["after"])
+        for key in ["after_id", "project_id"]:
+            if args[key] is not None and not fields.is_valid_id(args[key]):
+                raise WrongParameterException(
+                    "The %s parameter is not a valid id" % key
+                )
+        return events_service.get_next_events(
+            after=after,
+            after_id=args["after_id"],
+            page_size=int(args["page_size"]),
+            only_files=args["only_files"] == "true",
+            project_id=args["project_id"],
+        )
+
+
 class LoginLogsResource(Resource, ArgsMixin):
     @jwt_required
     def get(self):
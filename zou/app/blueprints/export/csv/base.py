@@ -17,6 +17,12 @@ class BaseCsvExport(Resource):
     def prepare_import(self):
         pass
 
+    def prepare_rows(self, results):
+        """
+        Hook to retrieve data required by all rows before building them.
+        """
+        pass
+
     @jwt_required
     def get(self):
         """
@@ -34,6 +40,7 @@ class BaseCsvExport(Resource):
             csv_content = []
             csv_content.append(self.build_headers())
             results = self.build_query().all()
+            self.prepare_rows(results)
             for result in results:
                 csv_content.append(self.build_row(result))
         except permissions.PermissionDenied:
@@ -53,6 +53,9 @@ class PlaylistCsvExport(Resource):
             )
             task_ids.append(preview_file["task_id"])
         self.task_comment_map = tasks_service.get_last_comment_map(task_ids)
+        self.entity_names = names_service.get_full_entity_names(
+            [shot["entity_id"] for shot in playlist["shots"]]
+        )
         episode = self.get_episode(playlist)
 
         csv_content = []
@@ -103,7 +106,7 @@ class PlaylistCsvExport(Resource):
 
     def build_row(self, shot):
         entity = entities_service.get_entity(shot["entity_id"])
-        name, _ = names_service.get_full_entity_name(shot["entity_id"])
+        name, _ = self.entity_names[str(shot["entity_id"])]
         preview_file = files_service.get_preview_file(shot["preview_file_id"])
         task = tasks_service.get_task(preview_file["task_id"])
         task_type = self.task_type_map[task["task_type_id"]]
@@ -57,6 +57,13 @@ class TimeSpentsCsvExport(BaseCsvExport):
         )
         return query
 
+    def prepare_rows(self, time_spent_rows):
+        shot_ids = []
+        for (_, _, entity_type_name, entity_id, _, _, _, _) in time_spent_rows:
+            if entity_type_name == "Shot":
+                shot_ids.append(entity_id)
+        self.shot_names = names_service.get_full_entity_names(shot_ids)
+
     def build_row(self, time_spent_row):
         (
             time_spent,
@@ -69,7 +76,7 @@ class TimeSpentsCsvExport(BaseCsvExport):
             person_last_name,
         ) = time_spent_row
         if entity_type_name == "Shot":
-            entity_name, _ = names_service.get_full_entity_name(entity_id)
+            entity_name, _ = self.shot_names[str(entity_id)]
 
         date = ""
         if time_spent.date is not None:
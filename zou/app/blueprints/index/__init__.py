@@ -9,6 +9,7 @@ from .resources import (
     ConfigResource,
     IndexResource,
     InfluxStatusResource,
+    NotificationDeliveryStatsResource,
     StatusResource,
     StatusResourcesResource,
     StatsResource,
@@ -22,6 +23,7 @@ routes = [
     ("/status/resources", StatusResourcesResource),
     ("/status.txt", TxtStatusResource),
     ("/stats", StatsResource),
+    ("/stats/notifications", NotificationDeliveryStatsResource),
     ("/config", ConfigResource),
 ]
 
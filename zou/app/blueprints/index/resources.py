@@ -10,7 +10,7 @@ from zou import __version__
 
 from zou.app import app, config
 from zou.app.utils import permissions, shell
-from zou.app.services import projects_service, stats_service
+from zou.app.services import emails_service, projects_service, stats_service
 
 from flask_jwt_extended import jwt_required
 
@@ -242,6 +242,26 @@ class StatsResource(Resource):
         return stats_service.get_main_stats()
 
 
+class NotificationDeliveryStatsResource(Resource):
+    @jwt_required
+    def get(self):
+        """
+        Retrieve notification delivery metrics.
+        ---
+        tags:
+          - Index
+        description: Messages sent and failed, time spent and throughput for each channel.
+        responses:
+            403:
+                description: Permission denied
+            200:
+                description: Notification delivery metrics
+        """
+        if not permissions.has_admin_permissions():
+            abort(403)
+        return emails_service.get_delivery_metrics()
+
+
 class ConfigResource(Resource):
     def get(self):
         """
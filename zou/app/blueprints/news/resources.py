@@ -58,6 +58,19 @@ class ProjectNewsResource(Resource, ArgsMixin):
             name: only_preview
             type: boolean
             default: False
+          - in: query
+            name: cursor
+            type: string
+            format: UUID
+            description: Id of the last news of the previous page (next_cursor
+                         field of the previous result). Pages are then built
+                         from it instead of using the page number.
+            x-example: a24a6ea4-ce75-4665-a070-57453082c25
+          - in: query
+            name: with_total
+            type: boolean
+            default: True
+            description: Set it to false to skip total and stats computation.
         responses:
             200:
                 description: All news related to given project
@@ -71,6 +84,8 @@ class ProjectNewsResource(Resource, ArgsMixin):
             page_size,
             after,
             before,
+            cursor,
+            with_total,
         ) = self.get_arguments()
         projects_service.get_project(project_id)
         user_service.check_project_access(project_id)
@@ -87,16 +102,18 @@ class ProjectNewsResource(Resource, ArgsMixin):
             page_size=page_size,
             after=after,
             before=before,
+            cursor=cursor,
+            with_total=with_total,
         )
-        stats = news_service.get_news_stats_for_project(
-            project_id,
-            task_type_id=task_type_id,
-            task_status_id=task_status_id,
-            author_id=person_id,
-            after=after,
-            before=before,
-        )
-        result["stats"] = stats
+        if with_total:
+            result["stats"] = news_service.get_news_stats_for_project(
+                project_id,
+                task_type_id=task_type_id,
+                task_status_id=task_status_id,
+                author_id=person_id,
+                after=after,
+                before=before,
+            )
         return result
 
     def get_arguments(self):
@@ -109,6 +126,7 @@ class ProjectNewsResource(Resource, ArgsMixin):
         parser.add_argument("page_size", default=50, type=int)
         parser.add_argument("after", default=None)
         parser.add_argument("before", default=None)
+        parser.add_argument("cursor", default=None)
         args = parser.parse_args()
 
         return (
@@ -120,6 +138,8 @@ class ProjectNewsResource(Resource, ArgsMixin):
             args["page_size"],
             args["after"],
             args["before"],
+            args["cursor"],
+            self.get_bool_parameter("with_total", "true"),
         )
 
 
@@ -17,7 +17,7 @@ from zou.app.services import (
     user_service,
 )
 from zou.app.stores import file_store, queue_store
-from zou.app.utils import fs, permissions
+from zou.app.utils import etags, fs, permissions
 from zou.utils.movie import EncodingParameters
 
 
@@ -51,12 +51,16 @@ class ProjectPlaylistsResource(Resource, ArgsMixin):
         page = self.get_page()
         sort_by = self.get_sort_by()
         task_type_id = self.get_text_parameter("task_type_id")
-        return playlists_service.all_playlists_for_project(
+        return etags.conditional_response(
+            "playlists",
             project_id,
-            for_client=permissions.has_client_permissions(),
-            page=page,
-            sort_by=sort_by,
-            task_type_id=task_type_id,
+            lambda: playlists_service.all_playlists_for_project(
+                project_id,
+                for_client=permissions.has_client_permissions(),
+                page=page,
+                sort_by=sort_by,
+                task_type_id=task_type_id,
+            ),
         )
 
 
@@ -95,14 +99,20 @@ class EpisodePlaylistsResource(Resource, ArgsMixin):
         user_service.check_project_access(project_id)
         sort_by = self.get_sort_by()
         task_type_id = self.get_text_parameter("task_type_id")
-        if episode_id not in ["main", "all"]:
-            shots_service.get_episode(episode_id)
-        return playlists_service.all_playlists_for_episode(
-            project_id,
-            episode_id,
-            permissions.has_client_permissions(),
-            sort_by=sort_by,
-            task_type_id=task_type_id,
+
+        def get_episode_playlists():
+            if episode_id not in ["main", "all"]:
+                shots_service.get_episode(episode_id)
+            return playlists_service.all_playlists_for_episode(
+                project_id,
+                episode_id,
+                permissions.has_client_permissions(),
+                sort_by=sort_by,
+                task_type_id=task_type_id,
+            )
+
+        return etags.conditional_response(
+            "playlists", project_id, get_episode_playlists
         )
 
 
@@ -10,7 +10,7 @@ from zou.app.services import (
     tasks_service,
     user_service,
 )
-from zou.app.utils import permissions
+from zou.app.utils import etags, permissions
 from zou.app.services.exception import WrongParameterException
 
 
@@ -836,7 +836,11 @@ class ProductionScheduleItemsResource(Resource):
         """
         user_service.check_project_access(project_id)
         user_service.block_access_to_vendor()
-        return schedule_service.get_schedule_items(project_id)
+        return etags.conditional_response(
+            "schedule-items",
+            project_id,
+            lambda: schedule_service.get_schedule_items(project_id),
+        )
 
 
 class ProductionTaskTypeScheduleItemsResource(Resource):
@@ -864,7 +868,11 @@ class ProductionTaskTypeScheduleItemsResource(Resource):
         """
         user_service.check_project_access(project_id)
         user_service.block_access_to_vendor()
-        return schedule_service.get_task_types_schedule_items(project_id)
+        return etags.conditional_response(
+            "schedule-items",
+            project_id,
+            lambda: schedule_service.get_task_types_schedule_items(project_id),
+        )
 
 
 class ProductionAssetTypesScheduleItemsResource(Resource):
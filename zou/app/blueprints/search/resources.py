@@ -19,10 +19,10 @@ class SearchResource(Resource, ArgsMixin):
             name: query
             required: True
             type: string
-            x-example: Name of asset or person
+            x-example: Name of asset, person, shot, task or comment text
         responses:
             200:
-                description: List of assets and persons that contain the query (3 results max)
+                description: Lists of assets, persons, episodes, sequences, shots, tasks and comments that contain the query (3 results max per list)
         """
         args = self.get_args([("query", "", True)])
         query = args.get("query")
@@ -36,7 +36,28 @@ class SearchResource(Resource, ArgsMixin):
         persons = index_service.search_persons(query)
         open_project_ids = [project["id"] for project in projects]
 
-        return {
-            "assets": index_service.search_assets(query, open_project_ids),
-            "persons": persons,
-        }
+        result = {"assets": [], "persons": persons}
+        for entry_type in index_service.ENTRY_TYPES:
+            result["%ss" % entry_type.lower()] = []
+        # Index searches are not filtered on projects when no project is
+        # given.
+        if len(open_project_ids) == 0:
+            return result
+
+        if (
+            permissions.has_client_permissions()
+            or permissions.has_vendor_permissions()
+        ):
+            entry_types = index_service.ENTRY_ENTITY_TYPES
+        else:
+            entry_types = index_service.ENTRY_TYPES
+        entries = index_service.search_entries(
+            query, open_project_ids, types=entry_types
+        )
+
+        result["assets"] = index_service.search_assets(query, open_project_ids)
+        for entry_type in index_service.ENTRY_TYPES:
+            result["%ss" % entry_type.lower()] = [
+                entry for entry in entries if entry["type"] == entry_type
+            ]
+        return result
@@ -17,7 +17,7 @@ from zou.app.services import (
 )
 
 from zou.app.mixin import ArgsMixin
-from zou.app.utils import permissions, query
+from zou.app.utils import etags, permissions, query
 
 
 class ShotResource(Resource, ArgsMixin):
@@ -530,15 +530,21 @@ class ShotsAndTasksResource(Resource):
         """
         criterions = query.get_query_criterions_from_request(request)
         user_service.check_project_access(criterions.get("project_id", None))
-        if permissions.has_vendor_permissions():
-            criterions["assigned_to"] = persons_service.get_current_user()[
-                "id"
-            ]
-            criterions["vendor_departments"] = [
-                str(department.id)
-                for department in persons_service.get_current_user_raw().departments
-            ]
-        return shots_service.get_shots_and_tasks(criterions)
+
+        def get_shots_and_tasks():
+            if permissions.has_vendor_permissions():
+                criterions["assigned_to"] = persons_service.get_current_user()[
+                    "id"
+                ]
+                criterions["vendor_departments"] = [
+                    str(department.id)
+                    for department in persons_service.get_current_user_raw().departments
+                ]
+            return shots_service.get_shots_and_tasks(criterions)
+
+        return etags.conditional_response(
+            "shots", criterions.get("project_id", None), get_shots_and_tasks
+        )
 
 
 class SceneAndTasksResource(Resource):
@@ -5,7 +5,6 @@ from flask_restful import Resource, reqparse
 from flask_jwt_extended import jwt_required
 
 from zou.app.services.exception import (
-    TaskNotFoundException,
     PersonNotFoundException,
     MalformedFileTreeException,
     WrongDateFormatException,
@@ -29,6 +28,10 @@ from zou.app.utils import events, query, permissions
 from zou.app.mixin import ArgsMixin
 
 
+COMMENTS_PAGE_SIZE = 100
+MAX_COMMENTS_PAGE_SIZE = 1000
+
+
 class AddPreviewResource(Resource):
     """
     Add a preview to given task. Revision is automatically set: it is
@@ -194,7 +197,7 @@ class TaskPreviewsResource(Resource):
         return files_service.get_preview_files_for_task(task_id)
 
 
-class TaskCommentsResource(Resource):
+class TaskCommentsResource(Resource, ArgsMixin):
     """
     Return comments linked to given task.
     """
@@ -206,6 +209,9 @@ class TaskCommentsResource(Resource):
         ---
         tags:
         - Tasks
+        description: Comments are sorted from the most recent to the oldest.
+                     If a page is given, only the comments of this page are
+                     returned.
         parameters:
           - in: path
             name: task_id
@@ -213,6 +219,16 @@ class TaskCommentsResource(Resource):
             type: string
             format: UUID
             x-example: a24a6ea4-ce75-4665-a070-57453082c25
+          - in: query
+            name: page
+            type: integer
+            x-example: 1
+          - in: query
+            name: limit
+            type: integer
+            default: 100
+            maximum: 1000
+            x-example: 100
         responses:
             200:
                 description: Comments linked to given task
@@ -223,8 +239,18 @@ class TaskCommentsResource(Resource):
         is_client = permissions.has_client_permissions()
         is_manager = permissions.has_manager_permissions()
         is_supervisor = permissions.has_supervisor_permissions()
+        page = self.get_page()
         return tasks_service.get_comments(
-            task_id, is_client, is_manager or is_supervisor
+            task_id,
+            is_client,
+            is_manager or is_supervisor,
+            page=page if page > 0 else None,
+            limit=self.get_int_parameter(
+                "limit",
+                default=COMMENTS_PAGE_SIZE,
+                minimum=1,
+                maximum=MAX_COMMENTS_PAGE_SIZE,
+            ),
         )
 
 
@@ -773,20 +799,11 @@ class ClearAssignationResource(Resource):
         """
         (task_ids, person_id) = self.get_arguments()
 
-        tasks = []
-        for task_id in task_ids:
-            try:
-                user_service.check_task_departement_access_for_unassign(
-                    task_id, person_id
-                )
-                tasks_service.clear_assignation(task_id, person_id=person_id)
-                tasks.append(task_id)
-            except permissions.PermissionDenied:
-                pass
-            except TaskNotFoundException:
-                pass
-
-        return tasks
+        task_ids = user_service.get_tasks_with_departement_access(
+            task_ids, person_id, unassign=True
+        )
+        tasks = tasks_service.clear_assignations(task_ids, person_id=person_id)
+        return [task["id"] for task in tasks]
 
     def get_arguments(self):
         parser = reqparse.RequestParser()
@@ -840,22 +857,17 @@ class TasksAssignResource(Resource):
         """
         (task_ids) = self.get_arguments()
 
-        tasks = []
         current_user = persons_service.get_current_user()
-        for task_id in task_ids:
-            try:
-                user_service.check_task_departement_access(task_id, person_id)
-                task = self.assign_task(task_id, person_id, current_user["id"])
-                notifications_service.create_assignation_notification(
-                    task_id, person_id, current_user["id"]
-                )
-                tasks.append(task)
-            except TaskNotFoundException:
-                pass
-            except permissions.PermissionDenied:
-                pass
-            except PersonNotFoundException:
-                return {"error": "Assignee doesn't exist in database."}, 400
+        try:
+            task_ids = user_service.get_tasks_with_departement_access(
+                task_ids, person_id
+            )
+            tasks = self.assign_tasks(task_ids, person_id, current_user["id"])
+        except PersonNotFoundException:
+            return {"error": "Assignee doesn't exist in database."}, 400
+        notifications_service.create_assignation_notifications(
+            tasks, person_id, current_user["id"]
+        )
         if len(tasks) > 0:
             projects_service.add_team_member(tasks[0]["project_id"], person_id)
 
@@ -872,8 +884,8 @@ class TasksAssignResource(Resource):
         args = parser.parse_args()
         return args["task_ids"]
 
-    def assign_task(self, task_id, person_id, assigner_id):
-        return tasks_service.assign_task(task_id, person_id, assigner_id)
+    def assign_tasks(self, task_ids, person_id, assigner_id):
+        return tasks_service.assign_tasks(task_ids, person_id, assigner_id)
 
 
 class TaskAssignResource(Resource):
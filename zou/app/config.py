@@ -24,6 +24,8 @@ AUTH_TOKEN_BLACKLIST_KV_INDEX = 0
 MEMOIZE_DB_INDEX = 1
 KV_EVENTS_DB_INDEX = 2
 KV_JOB_DB_INDEX = 3
+KV_VERSIONS_DB_INDEX = 4
+KV_NOTIFICATIONS_DB_INDEX = 5
 
 JWT_BLACKLIST_ENABLED = True
 JWT_BLACKLIST_TOKEN_CHECKS = ["access", "refresh"]
@@ -60,6 +62,8 @@ TMP_DIR = os.getenv("TMP_DIR", os.path.join(tempfile.gettempdir(), "zou"))
 INDEXES_FOLDER = os.getenv(
     "INDEXES_FOLDER", os.path.join(os.getcwd(), "indexes")
 )
+INDEXES_FLUSH_INTERVAL = float(os.getenv("INDEXES_FLUSH_INTERVAL", 2))
+INDEXES_BATCH_SIZE = int(os.getenv("INDEXES_BATCH_SIZE", 1000))
 
 EVENT_STREAM_HOST = os.getenv("EVENT_STREAM_HOST", "localhost")
 EVENT_STREAM_PORT = os.getenv("EVENT_STREAM_PORT", 5001)
@@ -78,6 +82,18 @@ MAIL_USE_SSL = envtobool("MAIL_USE_SSL", False)
 MAIL_DEFAULT_SENDER = os.getenv(
     "MAIL_DEFAULT_SENDER", "no-reply@your-studio.com"
 )
+
+# Notifications sent to a person during this window (in seconds) are grouped
+# in a single digest per channel. 0 means notifications are sent right away.
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv("NOTIFICATION_DIGEST_WINDOW", 0))
+# Maximum number of messages sent per second for each channel.
+NOTIFICATION_RATE_LIMITS = {
+    "email": float(os.getenv("NOTIFICATION_EMAIL_RATE_LIMIT", 10)),
+    "slack": float(os.getenv("NOTIFICATION_SLACK_RATE_LIMIT", 1)),
+    "mattermost": float(os.getenv("NOTIFICATION_MATTERMOST_RATE_LIMIT", 10)),
+    "discord": float(os.getenv("NOTIFICATION_DISCORD_RATE_LIMIT", 5)),
+}
+
 DOMAIN_NAME = os.getenv("DOMAIN_NAME", "localhost:8080")
 DOMAIN_PROTOCOL = os.getenv("DOMAIN_PROTOCOL", "https")
 
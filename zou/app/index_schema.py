@@ -16,6 +16,23 @@ person_schema = indexing.get_schema(
     {"name": "indexed", "id": "unique_id_stored"}
 )
 
+# Shots, sequences, episodes, tasks and comments. Display fields are stored
+# so search results can be rendered without querying the database.
+entry_schema = indexing.get_schema(
+    {
+        "name": "indexed",
+        "id": "unique_id_stored",
+        "type": "id_stored",
+        "project_id": "id_stored",
+        "entity_id": "id_stored",
+        "task_id": "id_stored",
+        "project_name": "stored",
+        "title": "stored",
+        "text": "stored",
+        "person_name": "stored",
+    }
+)
+
 
 def init_indexes():
     indexes_folder = app.config["INDEXES_FOLDER"]
@@ -29,4 +46,9 @@ def init_indexes():
     if not os.path.exists(person_index_path):
         fs.mkdir_p(person_index_path)
         person_index = indexing.create_index(person_index_path, person_schema)
-    return (asset_index, person_index)
+    entry_index_path = os.path.join(indexes_folder, "entries")
+    entry_index = None
+    if not os.path.exists(entry_index_path):
+        fs.mkdir_p(entry_index_path)
+        entry_index = indexing.create_index(entry_index_path, entry_schema)
+    return (asset_index, person_index, entry_index)
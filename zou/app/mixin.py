@@ -95,6 +95,32 @@ class ArgsMixin(object):
         options = request.args
         return options.get(field_name, None)
 
+    def get_int_parameter(
+        self, field_name, default=None, minimum=None, maximum=None
+    ):
+        """
+        Returns given parameter as an integer. A value lower than minimum
+        is rejected, a value greater than maximum is capped to maximum.
+        """
+        options = request.args
+        value = options.get(field_name, None)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise WrongParameterException(
+                "%s parameter must be an integer." % field_name
+            )
+        if minimum is not None and value < minimum:
+            raise WrongParameterException(
+                "%s parameter must be greater or equal to %s."
+                % (field_name, minimum)
+            )
+        if maximum is not None:
+            value = min(value, maximum)
+        return value
+
     def get_bool_parameter(self, field_name, default="false"):
         options = request.args
         return options.get(field_name, default).lower() == "true"
@@ -103,17 +129,18 @@ class ArgsMixin(object):
         self.parse_date_parameter(self.get_text_parameter(field_name))
 
     def parse_date_parameter(self, param):
-        date = None
         if param is None:
-            return date
-        try:
-            date = fields.get_date_object(param, "%Y-%m-%dT%H:%M:%S")
-        except Exception:
+            return None
+        for date_format in [
+            "%Y-%m-%dT%H:%M:%S",
+            "%Y-%m-%dT%H:%M:%S.%f",
+            "%Y-%m-%d",
+        ]:
             try:
-                date = fields.get_date_object(param, "%Y-%m-%d")
+                return fields.get_date_object(param, date_format)
             except Exception:
-                raise WrongParameterException(
-                    "Wrong date format for before argument."
-                    "Expected format: 2020-01-05T13:23:10 or 2020-01-05"
-                )
-        return date
+                pass
+        raise WrongParameterException(
+            "Wrong date format for before argument."
+            "Expected format: 2020-01-05T13:23:10 or 2020-01-05"
+        )
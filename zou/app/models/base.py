@@ -1,5 +1,7 @@
 import datetime
 
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy_utils import UUIDType
 from zou.app import db
 from zou.app.utils import fields
@@ -125,13 +127,139 @@ class BaseMixin(object):
     @classmethod
     def create_from_import_list(cls, data_list):
         """
-        Create a list of instances of the model based on data that comes from
-        the Zou API.
+        Create or update a list of instances of the model based on data that
+        comes from the Zou API. It returns the ids of saved instances.
         """
         if "data" in data_list:
             data_list = data_list["data"]
-        for data in data_list:
-            cls.create_from_import(data)
+        return cls.upsert_many(
+            [cls.prepare_import(data) for data in data_list]
+        )
+
+    @classmethod
+    def prepare_import(cls, data):
+        """
+        Return a copy of given data coming from the Zou API, cleaned to be
+        saved with `upsert_many`.
+        """
+        data = dict(data)
+        data.pop("type", None)
+        return data
+
+    @classmethod
+    def upsert_many(cls, records, chunk_size=500):
+        """
+        Insert or update given records with chunked INSERT ... ON CONFLICT DO
+        UPDATE statements. For existing rows, only the fields given in the
+        record are updated. A list of ids given for a many-to-many relation
+        (like task assignees) replaces the links of the record, with bulk
+        writes on the link table. Other fields are ignored. It returns the
+        ids of saved records.
+        """
+        table = cls.__table__
+        columns = set(table.columns.keys())
+        relations = [
+            relation
+            for relation in inspect(cls).relationships
+            if relation.secondary is not None and not relation.viewonly
+        ]
+        ids = []
+        try:
+            for index in range(0, len(records), chunk_size):
+                chunk = records[index : index + chunk_size]
+                groups = {}
+                for record in chunk:
+                    row = {
+                        key: value
+                        for (key, value) in record.items()
+                        if key in columns
+                    }
+                    groups.setdefault(tuple(sorted(row.keys())), []).append(
+                        row
+                    )
+                for (keys, rows) in groups.items():
+                    ids += cls._upsert_rows(keys, rows)
+                for relation in relations:
+                    links = {
+                        str(record["id"]): record[relation.key]
+                        for record in chunk
+                        if record.get(relation.key) is not None
+                    }
+                    if len(links) > 0:
+                        cls._set_many_links(relation, links)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            db.session.remove()
+            raise
+        return ids
+
+    @classmethod
+    def _upsert_rows(cls, keys, rows):
+        table = cls.__table__
+        constraint = table.primary_key.name or "%s_pkey" % table.name
+        statement = insert(table).values(rows)
+        update_keys = [key for key in keys if key != "id"]
+        if len(update_keys) > 0:
+            statement = statement.on_conflict_do_update(
+                constraint=constraint,
+                set_={key: statement.excluded[key] for key in update_keys},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(constraint=constraint)
+        statement = statement.returning(table.c.id)
+        return [row_id for (row_id,) in db.session.execute(statement)]
+
+    @classmethod
+    def _set_many_links(cls, relation, links):
+        """
+        Set the links of given many-to-many relation. `links` is a dict
+        where keys are record ids and values are the lists of linked ids.
+        Ids of missing linked instances are skipped.
+        """
+        link_table = relation.secondary
+        (_, local_column) = relation.synchronize_pairs[0]
+        secondary_pairs = relation.secondary_synchronize_pairs
+        (target_column, remote_column) = secondary_pairs[0]
+        linked_ids = set(
+            str(linked_id)
+            for linked_ids in links.values()
+            for linked_id in linked_ids
+        )
+        existing_ids = set()
+        if len(linked_ids) > 0:
+            existing_ids = set(
+                str(linked_id)
+                for (linked_id,) in db.session.query(target_column).filter(
+                    target_column.in_(linked_ids)
+                )
+            )
+        pairs = set(
+            (record_id, str(linked_id))
+            for (record_id, linked_ids) in links.items()
+            for linked_id in linked_ids
+            if str(linked_id) in existing_ids
+        )
+
+        statement = link_table.delete().where(
+            local_column.in_(list(links.keys()))
+        )
+        if len(pairs) > 0:
+            statement = statement.where(
+                ~tuple_(local_column, remote_column).in_(list(pairs))
+            )
+        db.session.execute(statement)
+        if len(pairs) > 0:
+            db.session.execute(
+                insert(link_table).on_conflict_do_nothing(),
+                [
+                    {
+                        local_column.name: record_id,
+                        remote_column.name: linked_id,
+                    }
+                    for (record_id, linked_id) in pairs
+                ],
+            )
 
     @classmethod
     def delete_from_import(cls, instance_id):
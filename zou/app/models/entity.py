@@ -53,6 +53,16 @@ class EntityLink(db.Model, BaseMixin, SerializerMixin):
         ),
     )
 
+    @classmethod
+    def create_from_import_list(cls, data_list):
+        """
+        Links are matched on the entities they link instead of their id, so
+        they are imported one by one.
+        """
+        if "data" in data_list:
+            data_list = data_list["data"]
+        return [cls.create_from_import(data)[0].id for data in data_list]
+
     @classmethod
     def create_from_import(cls, data):
         del data["type"]
@@ -157,6 +167,12 @@ class Entity(db.Model, BaseMixin, SerializerMixin):
                 self.entities_out.append(entity)
         self.save()
 
+    @classmethod
+    def prepare_import(cls, data):
+        (data, entity_ids) = cls.sanitize_import_data(dict(data))
+        data["entities_out"] = entity_ids
+        return data
+
     @classmethod
     def create_from_import(cls, data):
         is_update = False
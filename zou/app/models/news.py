@@ -36,6 +36,21 @@ class News(db.Model, BaseMixin, SerializerMixin):
         index=True,
     )
 
+    __table_args__ = (db.Index("ix_news_created_at_id", "created_at", "id"),)
+
+    @classmethod
+    def prepare_import(cls, data):
+        return {
+            "id": data["id"],
+            "updated_at": data["created_at"],
+            "created_at": data["created_at"],
+            "change": data["change"],
+            "author_id": data["author_id"],
+            "comment_id": data["comment_id"],
+            "preview_file_id": data["preview_file_id"],
+            "task_id": data["task_id"],
+        }
+
     @classmethod
     def create_from_import(cls, data):
         data = {
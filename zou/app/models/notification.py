@@ -55,6 +55,7 @@ class Notification(db.Model, BaseMixin, SerializerMixin):
             "comment_id",
             "reply_id",
             "type",
+            "created_at",
             name="notification_uc",
         ),
     )
@@ -68,6 +69,12 @@ class Notification(db.Model, BaseMixin, SerializerMixin):
         obj_dict["type"] = obj_type or type(self).__name__
         return obj_dict
 
+    @classmethod
+    def prepare_import(cls, data):
+        data = dict(data)
+        data["type"] = data.pop("notification_type", "")
+        return data
+
     @classmethod
     def create_from_import(cls, data):
         notification_type = ""
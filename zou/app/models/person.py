@@ -145,6 +145,15 @@ class Person(db.Model, BaseMixin, SerializerMixin):
                 self.departments.append(department)
         self.save()
 
+    @classmethod
+    def prepare_import(cls, person):
+        person = dict(person)
+        person.pop("type", None)
+        person.pop("full_name", None)
+        if "password" in person:
+            person["password"] = person["password"].encode()
+        return person
+
     @classmethod
     def create_from_import(cls, person):
         del person["type"]
@@ -64,6 +64,15 @@ class PreviewFile(db.Model, BaseMixin, SerializerMixin):
     def __repr__(self):
         return "<PreviewFile %s>" % self.id
 
+    @classmethod
+    def prepare_import(cls, data):
+        data = dict(data)
+        data.pop("type", None)
+        data.pop("comments", None)
+        if data.get("status") is None:
+            data["status"] = "ready"
+        return data
+
     @classmethod
     def create_from_import(cls, data):
         del data["type"]
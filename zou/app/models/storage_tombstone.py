@@ -0,0 +1,25 @@
+from zou.app import db
+from zou.app.models.serializer import SerializerMixin
+from zou.app.models.base import BaseMixin
+
+
+class StorageTombstone(db.Model, BaseMixin, SerializerMixin):
+    """
+    Key of a file to remove from the storage. Tombstones are created when
+    the database entry owning the file is deleted. The storage garbage
+    collector removes the files in batches and deletes their tombstones.
+    Failed removals are retried until the maximum number of attempts is
+    reached.
+    """
+
+    bucket = db.Column(db.String(40), nullable=False)
+    key = db.Column(db.String(400), nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text())
+
+    __table_args__ = (
+        db.UniqueConstraint("bucket", "key", name="storage_tombstone_uc"),
+    )
+
+    def __repr__(self):
+        return "<StorageTombstone %s/%s>" % (self.bucket, self.key)
@@ -62,6 +62,8 @@ class Task(db.Model, BaseMixin, SerializerMixin):
     assigner_id = db.Column(
         UUIDType(binary=False), db.ForeignKey("person.id"), index=True
     )
+    last_comment_id = db.Column(UUIDType(binary=False), index=True)
+    last_preview_file_id = db.Column(UUIDType(binary=False), index=True)
     assignees = db.relationship("Person", secondary=assignees_table)
 
     __table_args__ = (
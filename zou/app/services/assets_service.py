@@ -686,12 +686,8 @@ def remove_asset(asset_id, force=False):
             project_id=str(asset.project_id),
         )
     else:
-        from zou.app.services import tasks_service
-
         tasks = Task.query.filter_by(entity_id=asset_id).all()
-        for task in tasks:
-            deletion_service.remove_task(task.id, force=True)
-            tasks_service.clear_task_cache(str(task.id))
+        deletion_service.remove_tasks_and_related([task.id for task in tasks])
         asset.delete()
         clear_asset_cache(str(asset_id))
         index_service.remove_asset_index(str(asset_id))
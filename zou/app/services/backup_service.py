@@ -1,6 +1,8 @@
 import datetime
 import gzip
 import os
+import shutil
+import subprocess
 
 from sh import pg_dump
 
@@ -9,8 +11,9 @@ from zou.app.models.person import Person
 from zou.app.models.preview_file import PreviewFile
 from zou.app.models.project import Project
 
+from zou.app.services.exception import DatabaseBackupException
 from zou.app.stores import file_store
-from zou.app.utils import date_helpers
+from zou.app.utils import date_helpers, transfer
 
 from flask_fs.backends.local import LocalBackend
 
@@ -60,18 +63,165 @@ def store_db_backup(filename):
         file_store.add_file("dbbackup", filename, filename)
 
 
-def upload_preview_files_to_storage(days=None):
+def get_compress_command(workers=None):
+    """
+    Return the command compressing its standard input: pigz, which
+    compresses with several threads, when it is installed, gzip otherwise.
+    """
+    if shutil.which("pigz") is not None:
+        command = ["pigz", "-c"]
+        if workers is not None:
+            command += ["-p", str(workers)]
+        return command
+    else:
+        return ["gzip", "-c"]
+
+
+def get_decompress_command():
+    if shutil.which("pigz") is not None:
+        return ["pigz", "-dc"]
+    else:
+        return ["gzip", "-dc"]
+
+
+def get_db_backup_key(filename):
+    return file_store.make_key("dbbackup", filename)
+
+
+def check_processes(processes):
+    for process in processes:
+        process.wait()
+    for process in processes:
+        if process.returncode != 0:
+            raise DatabaseBackupException(
+                "%s failed with exit code %s"
+                % (process.args[0], process.returncode)
+            )
+
+
+def stream_db_backup(
+    host, port, user, password, database, workers=None, output=print
+):
+    """
+    Dump the database and store it in the files bucket using the `dbbackup`
+    prefix, without writing it on the disk: pg_dump output is piped through
+    the compressor directly into a multipart upload. `workers` is the number
+    of compression threads. It returns the name of the stored file.
+    """
+    now = datetime.datetime.now().strftime("%Y-%m-%d")
+    filename = "%s-zou-db-backup.sql.gz" % now
+    dump = subprocess.Popen(
+        ["pg_dump", "-h", host, "-p", str(port), "-U", user, database],
+        stdout=subprocess.PIPE,
+        env=dict(os.environ, PGPASSWORD=password),
+    )
+    compressor = subprocess.Popen(
+        get_compress_command(workers),
+        stdin=dump.stdout,
+        stdout=subprocess.PIPE,
+    )
+    dump.stdout.close()
+    stream = transfer.ProgressStream(
+        compressor.stdout,
+        label="uploaded",
+        output=output,
+        on_end=lambda: check_processes([dump, compressor]),
+    )
+    try:
+        with app.app_context():
+            file_store.write_stream(
+                "files", get_db_backup_key(filename), stream
+            )
+    finally:
+        compressor.stdout.close()
+        for process in [dump, compressor]:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+    return filename
+
+
+def restore_db_backup(
+    filename, host, port, user, password, database, output=print
+):
+    """
+    Load given backup, stored in the files bucket with the `dbbackup` prefix,
+    into the database. The backup is downloaded, decompressed and sent to
+    psql as a stream, it is never written on the disk. The target database
+    is expected to be empty. The backup is restored in a single transaction:
+    if any statement fails, the database is left unchanged.
+    """
+    decompressor = subprocess.Popen(
+        get_decompress_command(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    restore = subprocess.Popen(
+        [
+            "psql",
+            "-h",
+            host,
+            "-p",
+            str(port),
+            "-U",
+            user,
+            "-d",
+            database,
+            "-q",
+            "--single-transaction",
+            "-v",
+            "ON_ERROR_STOP=1",
+        ],
+        stdin=decompressor.stdout,
+        stdout=subprocess.DEVNULL,
+        env=dict(os.environ, PGPASSWORD=password),
+    )
+    decompressor.stdout.close()
+    stream = transfer.ProgressStream(
+        file_store.read_stream("files", get_db_backup_key(filename)),
+        label="restored",
+        output=output,
+    )
+    try:
+        with app.app_context():
+            for chunk in stream:
+                decompressor.stdin.write(chunk)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            decompressor.stdin.close()
+        except BrokenPipeError:
+            pass
+        decompressor.wait()
+        restore.wait()
+    check_processes([decompressor, restore])
+
+
+def upload_preview_files_to_storage(
+    days=None,
+    workers=transfer.DEFAULT_TRANSFER_WORKERS,
+    checkpoint_file=None,
+):
     """
     Upload all thumbnail and original files for preview entries to object
-    storage.
+    storage. Preview files are uploaded by `workers` concurrent uploads. With
+    a checkpoint file, an interrupted upload resumes where it stopped.
     """
-    query = PreviewFile.query
+    query = PreviewFile.query.with_entities(
+        PreviewFile.id, PreviewFile.extension
+    )
     if days is not None:
         limit_date = date_helpers.get_date_from_now(int(days))
         query = query.filter(PreviewFile.updated_at >= limit_date)
 
-    for preview_file in query.all():
-        upload_preview(preview_file)
+    return transfer.run_query_transfers(
+        query,
+        PreviewFile.id,
+        upload_preview,
+        workers=workers,
+        checkpoint_file=checkpoint_file,
+    )
 
 
 def upload_entity_thumbnail(entity):
@@ -88,55 +238,58 @@ def upload_entity_thumbnail(entity):
         print("%s uploaded" % file_path)
 
 
-def upload_preview(preview_file):
+def get_preview_file_paths(preview_file):
     """
-    Upload all files link to preview file entry: orginal file and variants.
+    Return the local backend, the bucket name and the prefix of each file
+    linked to given preview file: original file and variants.
     """
-    print("upload preview %s (%s)" % (preview_file.id, preview_file.extension))
-
-    local_picture = LocalBackend(
-        "local", {"root": os.path.join(preview_folder, "pictures")}
-    )
-    local_movie = LocalBackend(
-        "local", {"root": os.path.join(preview_folder, "movies")}
-    )
-    local_file = LocalBackend(
-        "local", {"root": os.path.join(preview_folder, "files")}
-    )
-
     is_movie = preview_file.extension == "mp4"
     is_picture = preview_file.extension == "png"
-    is_file = not is_movie and not is_picture
 
-    preview_file_id = str(preview_file.id)
-    file_key = "previews-%s" % preview_file_id
+    paths = []
+    if is_movie or is_picture:
+        for prefix in ["thumbnails", "thumbnails-square", "original"]:
+            paths.append((local_picture, "pictures", prefix))
     if is_picture:
-        file_path = local_picture.path(file_key)
-        ul_func = file_store.add_picture
-        exists_func = file_store.exists_picture
+        paths.append((local_picture, "pictures", "previews"))
     elif is_movie:
-        file_path = local_movie.path(file_key)
-        ul_func = file_store.add_movie
-        exists_func = file_store.exists_movie
-    elif is_file:
-        file_path = local_file.path(file_key)
-        ul_func = file_store.add_file
-        exists_func = file_store.exists_file
+        paths.append((local_movie, "movies", "previews"))
+    else:
+        paths.append((local_file, "files", "previews"))
+    return paths
 
-    if is_movie or is_picture:
-        for prefix in ["thumbnails", "thumbnails-square", "original"]:
-            pic_file_path = local_picture.path(
-                "%s-%s" % (prefix, str(preview_file.id))
-            )
-            if os.path.exists(pic_file_path) and not file_store.exists_picture(
-                prefix, preview_file_id
-            ):
-                file_store.add_picture(prefix, preview_file_id, pic_file_path)
-
-    prefix = "previews"
-    if os.path.exists(file_path) and not exists_func(prefix, preview_file_id):
-        ul_func(prefix, preview_file_id, file_path)
-    print("%s uploaded" % file_path)
+
+def upload_preview(preview_file):
+    """
+    Upload all files link to preview file entry: orginal file and variants.
+    Files already stored with the same size are skipped. It returns the
+    result of the transfer.
+    """
+    upload_functions = {
+        "pictures": file_store.add_picture,
+        "movies": file_store.add_movie,
+        "files": file_store.add_file,
+    }
+    preview_file_id = str(preview_file.id)
+    result = transfer.get_transfer_result()
+    with app.app_context():
+        for (local, bucket_name, prefix) in get_preview_file_paths(
+            preview_file
+        ):
+            key = file_store.make_key(prefix, preview_file_id)
+            file_path = local.path(key)
+            if not os.path.exists(file_path):
+                continue
+            size = os.path.getsize(file_path)
+            if file_store.get_size(bucket_name, key) == size:
+                result["skipped"] += 1
+            else:
+                upload_functions[bucket_name](
+                    prefix, preview_file_id, file_path
+                )
+                result["transferred"] += 1
+                result["size"] += size
+    return result
 
 
 def upload_entity_thumbnails_to_storage(days=None):
@@ -1,7 +1,8 @@
 from slugify import slugify
-from sqlalchemy import desc
+from sqlalchemy import and_, bindparam, desc, func, tuple_
 from sqlalchemy.orm import aliased
 
+from zou.app import db
 from zou.app.models.asset_instance import AssetInstance
 from zou.app.models.entity import Entity, EntityLink
 from zou.app.models.entity_type import EntityType
@@ -15,7 +16,9 @@ from zou.app.services import (
     assets_service,
     entities_service,
     shots_service,
+    tasks_service,
 )
+from zou.app.services.exception import EntityNotFoundException
 
 """
 Breakdown can be represented in two ways:
@@ -191,6 +194,60 @@ def get_all_sequences_casting(project_id, episode_id=None):
     )
 
 
+def get_casting_graph(project_id):
+    """
+    Return all the links between shots and assets of given project in a
+    compact columnar format. Shot IDs, asset IDs and labels are listed once
+    in dedicated lists. Links are described by four arrays of the same
+    length: shot indexes, asset indexes, number of occurences and label
+    indexes.
+    """
+    shot_type = shots_service.get_shot_type()
+    Shot = aliased(Entity, name="shot")
+    links = (
+        EntityLink.query.join(Shot, EntityLink.entity_in_id == Shot.id)
+        .join(Entity, EntityLink.entity_out_id == Entity.id)
+        .filter(Shot.project_id == project_id)
+        .filter(Shot.entity_type_id == shot_type["id"])
+        .filter(Entity.canceled != True)
+        .with_entities(
+            EntityLink.entity_in_id,
+            EntityLink.entity_out_id,
+            EntityLink.nb_occurences,
+            EntityLink.label,
+        )
+        .order_by(EntityLink.entity_in_id, EntityLink.entity_out_id)
+    )
+
+    shot_indexes = {}
+    asset_indexes = {}
+    label_indexes = {}
+    graph = {
+        "shot_ids": [],
+        "asset_ids": [],
+        "labels": [],
+        "links": {"shots": [], "assets": [], "occurences": [], "labels": []},
+    }
+    for shot_id, asset_id, nb_occurences, label in links:
+        shot_id = str(shot_id)
+        asset_id = str(asset_id)
+        label = label or ""
+        if shot_id not in shot_indexes:
+            shot_indexes[shot_id] = len(graph["shot_ids"])
+            graph["shot_ids"].append(shot_id)
+        if asset_id not in asset_indexes:
+            asset_indexes[asset_id] = len(graph["asset_ids"])
+            graph["asset_ids"].append(asset_id)
+        if label not in label_indexes:
+            label_indexes[label] = len(graph["labels"])
+            graph["labels"].append(label)
+        graph["links"]["shots"].append(shot_indexes[shot_id])
+        graph["links"]["assets"].append(asset_indexes[asset_id])
+        graph["links"]["occurences"].append(nb_occurences)
+        graph["links"]["labels"].append(label_indexes[label])
+    return graph
+
+
 def get_asset_type_casting(project_id, asset_type_id):
     """
     Return all assets and their number of occurences listed in asset of given
@@ -319,6 +376,240 @@ def create_casting_link(entity_in_id, asset_id, nb_occurences=1, label=""):
     return link
 
 
+def update_castings(project_id, castings):
+    """
+    Update casting of several entities at once. Castings are given as a map
+    where keys are entity IDs and values are casting lists (same format as
+    for `update_casting`). New casting is compared to existing links, then
+    links are inserted, updated and deleted with one statement per
+    operation. Episode castings are propagated to their shots, so they are
+    still processed one by one through `update_casting`.
+    """
+    entity_ids = list(castings.keys())
+    entities = (
+        Entity.query.filter(Entity.id.in_(entity_ids))
+        .filter(Entity.project_id == project_id)
+        .all()
+    )
+    if len(entities) != len(set(entity_ids)):
+        raise EntityNotFoundException
+
+    shot_type = shots_service.get_shot_type()
+    episode_type = shots_service.get_episode_type()
+    episode_ids = [
+        str(entity.id)
+        for entity in entities
+        if str(entity.entity_type_id) == episode_type["id"]
+    ]
+    for episode_id in episode_ids:
+        update_casting(episode_id, castings[episode_id])
+    entities = [
+        entity for entity in entities if str(entity.id) not in episode_ids
+    ]
+    if len(entities) == 0:
+        return castings
+
+    casting_map = {
+        str(entity.id): _get_casting_map(castings[str(entity.id)])
+        for entity in entities
+    }
+    links = EntityLink.query.filter(
+        EntityLink.entity_in_id.in_(list(casting_map.keys()))
+    ).all()
+
+    new_links = []
+    updated_links = []
+    removed_links = []
+    for link in links:
+        entity_id = str(link.entity_in_id)
+        asset_id = str(link.entity_out_id)
+        cast = casting_map[entity_id].pop(asset_id, None)
+        if cast is None:
+            removed_links.append(link.id)
+        elif cast != (link.nb_occurences, link.label):
+            updated_links.append(
+                {
+                    "_id": link.id,
+                    "_nb_occurences": cast[0],
+                    "_label": cast[1],
+                }
+            )
+    for entity_id, entity_casting in casting_map.items():
+        for asset_id, (nb_occurences, label) in entity_casting.items():
+            new_links.append(
+                {
+                    "id": fields.gen_uuid(),
+                    "entity_in_id": entity_id,
+                    "entity_out_id": asset_id,
+                    "nb_occurences": nb_occurences,
+                    "label": label,
+                }
+            )
+
+    shot_ids = [
+        str(entity.id)
+        for entity in entities
+        if str(entity.entity_type_id) == shot_type["id"]
+    ]
+    new_episode_links = _get_new_episode_casting_links(shot_ids, new_links)
+
+    try:
+        _apply_casting_link_changes(
+            new_links + new_episode_links, updated_links, removed_links
+        )
+        db.session.execute(
+            Entity.__table__.update()
+            .where(Entity.id == bindparam("_id"))
+            .values(nb_entities_out=bindparam("_nb_entities_out")),
+            [
+                {
+                    "_id": entity.id,
+                    "_nb_entities_out": len(castings[str(entity.id)]),
+                }
+                for entity in entities
+            ],
+        )
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+    for link in new_links:
+        events.emit(
+            "entity-link:new",
+            {
+                "entity_link_id": link["id"],
+                "entity_in_id": link["entity_in_id"],
+                "entity_out_id": link["entity_out_id"],
+                "nb_occurences": link["nb_occurences"],
+            },
+            project_id=project_id,
+        )
+    for link in updated_links:
+        events.emit(
+            "entity-link:update",
+            {
+                "entity_link_id": link["_id"],
+                "nb_occurences": link["_nb_occurences"],
+            },
+            project_id=project_id,
+        )
+    for link_id in removed_links:
+        events.emit(
+            "entity-link:delete",
+            {"entity_link_id": link_id},
+            project_id=project_id,
+        )
+    for link in new_episode_links:
+        events.emit(
+            "asset:update",
+            {"asset_id": link["entity_out_id"]},
+            project_id=project_id,
+        )
+
+    refresh_shots_casting_stats(project_id, shot_ids)
+    for entity in entities:
+        entity_id = str(entity.id)
+        if entity_id in shot_ids:
+            events.emit(
+                "shot:casting-update",
+                {
+                    "shot_id": entity_id,
+                    "nb_entities_out": len(castings[entity_id]),
+                },
+                project_id=project_id,
+            )
+        else:
+            events.emit(
+                "asset:casting-update",
+                {"asset_id": entity_id},
+                project_id=project_id,
+            )
+    return castings
+
+
+def _get_casting_map(casting):
+    """
+    Turn a casting list into a map where keys are asset IDs and values are
+    tuples made of the number of occurences and the label.
+    """
+    return {
+        cast["asset_id"]: (cast["nb_occurences"], cast.get("label", ""))
+        for cast in casting
+        if "asset_id" in cast and "nb_occurences" in cast
+    }
+
+
+def _get_new_episode_casting_links(shot_ids, new_links):
+    """
+    When an asset is casted in a shot, the asset is automatically casted in
+    the episode. Return the episode links to create for given new shot
+    links.
+    """
+    new_shot_links = [
+        link for link in new_links if link["entity_in_id"] in shot_ids
+    ]
+    if len(new_shot_links) == 0:
+        return []
+
+    Sequence = aliased(Entity, name="sequence")
+    episode_map = {
+        str(shot_id): str(episode_id)
+        for shot_id, episode_id in Entity.query.join(
+            Sequence, Entity.parent_id == Sequence.id
+        )
+        .filter(Entity.id.in_(shot_ids))
+        .filter(Sequence.parent_id != None)
+        .with_entities(Entity.id, Sequence.parent_id)
+    }
+    episode_links = {}
+    for link in new_shot_links:
+        episode_id = episode_map.get(link["entity_in_id"], None)
+        key = (episode_id, link["entity_out_id"])
+        if episode_id is not None and key not in episode_links:
+            episode_links[key] = {
+                "id": fields.gen_uuid(),
+                "entity_in_id": episode_id,
+                "entity_out_id": link["entity_out_id"],
+                "nb_occurences": 1,
+                "label": link["label"],
+            }
+    if len(episode_links) == 0:
+        return []
+
+    existing_links = EntityLink.query.filter(
+        tuple_(EntityLink.entity_in_id, EntityLink.entity_out_id).in_(
+            list(episode_links.keys())
+        )
+    ).with_entities(EntityLink.entity_in_id, EntityLink.entity_out_id)
+    for episode_id, asset_id in existing_links:
+        del episode_links[(str(episode_id), str(asset_id))]
+    return list(episode_links.values())
+
+
+def _apply_casting_link_changes(new_links, updated_links, removed_links):
+    """
+    Write casting link changes to the database with one statement per kind
+    of change. It doesn't commit the session.
+    """
+    table = EntityLink.__table__
+    if len(removed_links) > 0:
+        db.session.execute(table.delete().where(table.c.id.in_(removed_links)))
+    if len(updated_links) > 0:
+        db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam("_id"))
+            .values(
+                nb_occurences=bindparam("_nb_occurences"),
+                label=bindparam("_label"),
+            ),
+            updated_links,
+        )
+    if len(new_links) > 0:
+        db.session.execute(table.insert(), new_links)
+
+
 def _extract_removal(entity, casting):
     assets = []
     asset_map = {}
@@ -336,15 +627,26 @@ def _remove_asset_from_episode_shots(asset_id, episode_id):
     links = EntityLink.query.filter(
         EntityLink.entity_in_id.in_(shot_ids)
     ).filter(EntityLink.entity_out_id == asset_id)
+    updated_shots = []
     for link in links:
         shot = shots_service.get_shot_raw(str(link.entity_in_id))
         shot.update({"nb_entities_out": shot.nb_entities_out - 1})
-        refresh_shot_casting_stats(shot.serialize())
         link.delete()
+        updated_shots.append(shot.serialize())
+
+    if len(updated_shots) > 0:
+        refresh_shots_casting_stats(
+            updated_shots[0]["project_id"],
+            [shot["id"] for shot in updated_shots],
+        )
+    for shot in updated_shots:
         events.emit(
             "shot:casting-update",
-            {"shot_id": str(shot.id), "nb_entities_out": shot.nb_entities_out},
-            project_id=str(shot.project_id),
+            {
+                "shot_id": shot["id"],
+                "nb_entities_out": shot["nb_entities_out"],
+            },
+            project_id=shot["project_id"],
         )
     return shots
 
@@ -717,60 +1019,132 @@ def refresh_casting_stats(asset):
     how many assets are available for this task and saves the result
     on the task level.
     """
-
-    cast_in = get_cast_in(asset["id"])
-    shots = [entity for entity in cast_in if "shot_id" in entity]
-    priority_map = _get_task_type_priority_map(asset["project_id"])
-    for shot in shots:
-        refresh_shot_casting_stats(
-            {"id": shot["shot_id"], "project_id": asset["project_id"]},
-            priority_map,
-        )
+    shot_type = shots_service.get_shot_type()
+    shot_ids = (
+        EntityLink.query.join(Entity, EntityLink.entity_in_id == Entity.id)
+        .filter(EntityLink.entity_out_id == asset["id"])
+        .filter(Entity.entity_type_id == shot_type["id"])
+        .filter(Entity.canceled != True)
+        .with_entities(EntityLink.entity_in_id)
+    )
+    _refresh_tasks_casting_stats(
+        asset["project_id"], Task.entity_id.in_(shot_ids.subquery())
+    )
     return asset
 
 
-def refresh_shot_casting_stats(shot, priority_map=None):
+def refresh_shot_casting_stats(shot):
     """
     For all tasks related to given shot, it computes how many assets are
     available for this task and saves the result on the task level.
     """
+    return refresh_shots_casting_stats(shot["project_id"], [shot["id"]])
+
 
-    if priority_map is None:
-        priority_map = _get_task_type_priority_map(shot["project_id"])
-    casting = get_entity_casting(shot["id"])
-    tasks = Task.get_all_by(entity_id=shot["id"])
-    for task in tasks:
-        nb_ready = 0
-        for asset in casting:
-            if _is_asset_ready(asset, task, priority_map):
-                nb_ready += 1
-        task.update({"nb_assets_ready": nb_ready})
+def refresh_shots_casting_stats(project_id, shot_ids):
+    """
+    For all tasks related to given shots, it computes how many assets are
+    available for this task and saves the result on the task level.
+    """
+    if len(shot_ids) == 0:
+        return []
+    return _refresh_tasks_casting_stats(
+        project_id, Task.entity_id.in_(shot_ids)
+    )
+
+
+def _refresh_tasks_casting_stats(project_id, task_criterion):
+    """
+    Compute the number of ready assets for all tasks matching given
+    criterion and save it with a single update statement. An asset is ready
+    for a task when the priority of its ready_for task type is greater or
+    equal to the priority of the task type. Only tasks for which the result
+    changed are modified. A change event is emitted for each of them, then
+    a single event gathering all the changes.
+    """
+    TaskPriority = _get_task_type_priorities_query(project_id).subquery(
+        "task_priority"
+    )
+    ReadyPriority = _get_task_type_priorities_query(project_id).subquery(
+        "ready_priority"
+    )
+    Asset = aliased(Entity, name="asset")
+    task_priority = func.coalesce(TaskPriority.c.priority, 0)
+    ready_priority = func.coalesce(
+        func.nullif(ReadyPriority.c.priority, 0), -1
+    )
+    nb_assets_ready = (
+        db.session.query(
+            Task.id.label("task_id"),
+            func.count(Asset.id)
+            .filter(task_priority <= ready_priority)
+            .label("nb_assets_ready"),
+        )
+        .select_from(Task)
+        .outerjoin(
+            TaskPriority, TaskPriority.c.task_type_id == Task.task_type_id
+        )
+        .outerjoin(EntityLink, EntityLink.entity_in_id == Task.entity_id)
+        .outerjoin(
+            Asset,
+            and_(
+                Asset.id == EntityLink.entity_out_id, Asset.ready_for != None
+            ),
+        )
+        .outerjoin(
+            ReadyPriority, ReadyPriority.c.task_type_id == Asset.ready_for
+        )
+        .filter(task_criterion)
+        .group_by(Task.id)
+        .subquery()
+    )
+    table = Task.__table__
+    try:
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == nb_assets_ready.c.task_id)
+            .where(
+                table.c.nb_assets_ready.is_distinct_from(
+                    nb_assets_ready.c.nb_assets_ready
+                )
+            )
+            .values(nb_assets_ready=nb_assets_ready.c.nb_assets_ready)
+            .returning(table.c.id, table.c.nb_assets_ready)
+        )
+        updated_tasks = result.fetchall()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+    casting_stats = {}
+    for task_id, nb_ready in updated_tasks:
+        task_id = str(task_id)
+        tasks_service.clear_task_cache(task_id)
+        casting_stats[task_id] = nb_ready
         events.emit(
             "task:update-casting-stats",
-            {"task_id": str(task.id), "nb_assets_ready": nb_ready},
+            {"task_id": task_id, "nb_assets_ready": nb_ready},
             persist=False,
-            project_id=shot["project_id"],
+            project_id=str(project_id),
+        )
+    if len(casting_stats) > 0:
+        events.emit(
+            "task:update-casting-stats-batch",
+            {"casting_stats": casting_stats},
+            persist=False,
+            project_id=str(project_id),
         )
+    return casting_stats
 
 
-def _get_task_type_priority_map(project_id):
-    task_types = (
+def _get_task_type_priorities_query(project_id):
+    return (
         ProjectTaskTypeLink.query.join(TaskType)
         .filter(ProjectTaskTypeLink.project_id == project_id)
         .filter(TaskType.for_entity == "Shot")
-        .all()
+        .with_entities(
+            ProjectTaskTypeLink.task_type_id, ProjectTaskTypeLink.priority
+        )
     )
-    priority_map = {
-        str(task_type_link.task_type_id): task_type_link.priority
-        for task_type_link in task_types
-    }
-    return priority_map
-
-
-def _is_asset_ready(asset, task, priority_map):
-    is_ready = False
-    if "ready_for" in asset and asset["ready_for"] is not None:
-        priority_ready = priority_map.get(asset["ready_for"], -1) or -1
-        priority_task = priority_map.get(str(task.task_type_id), 0) or 0
-        is_ready = priority_task <= priority_ready
-    return is_ready
@@ -7,6 +7,7 @@ import string
 from flask import current_app
 
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 from zou.app.models.attachment_file import AttachmentFile
 from zou.app.models.comment import Comment
@@ -27,13 +28,15 @@ from zou.app.services import (
 )
 from zou.app.services.exception import (
     AttachmentFileNotFoundException,
-    WrongParameterException,
     AssetNotFoundException,
+    TaskNotFoundException,
+    TaskStatusNotFoundException,
+    WrongParameterException,
 )
 
 from zou.app.utils import cache, date_helpers, events, fs, fields
 from zou.app.stores import file_store
-from zou.app import config
+from zou.app import config, db
 
 
 def get_attachment_file_raw(attachment_file_id):
@@ -99,6 +102,156 @@ def create_comment(
     return comment
 
 
+def create_comments(person_id, comments):
+    """
+    Create several comments at once. Each comment is a dict with an object_id
+    (the task id), a task_status_id, a comment text and an optional
+    checklist. The author, task statuses, project teams and status
+    automations are retrieved once for all comments. Comments and task
+    changes are written in a single transaction, news and notifications are
+    stored in bulk.
+
+    It returns the results keyed by task id. There is one result per given
+    comment, in the order of the comments: a dict with the object id and
+    either the created comment or an error message.
+    """
+    author = _get_comment_author(person_id)
+    task_status_map = tasks_service.get_task_status_map()
+    task_ids = [
+        comment.get("object_id")
+        for comment in comments
+        if fields.is_valid_id(str(comment.get("object_id")))
+    ]
+    tasks = {
+        str(task.id): task
+        for task in Task.query.options(joinedload(Task.assignees)).filter(
+            Task.id.in_(task_ids)
+        )
+    }
+    task_dicts = {}
+    teams = {}
+    results = {}
+    entries = []
+    for data in comments:
+        task_id = str(data.get("object_id"))
+        result = {"object_id": task_id}
+        results.setdefault(task_id, []).append(result)
+        try:
+            task_status = task_status_map.get(str(data.get("task_status_id")))
+            if task_id not in tasks:
+                raise TaskNotFoundException("Task not found")
+            if task_status is None:
+                raise TaskStatusNotFoundException("Task status not found")
+            if task_id not in task_dicts:
+                task_dicts[task_id] = tasks[task_id].serialize(relations=True)
+            task = task_dicts[task_id]
+            _check_retake_capping(task_status, task)
+        except (
+            TaskNotFoundException,
+            TaskStatusNotFoundException,
+            WrongParameterException,
+        ) as exception:
+            result["error"] = str(exception)
+            continue
+
+        if task["project_id"] not in teams:
+            teams[task["project_id"]] = Project.get(task["project_id"]).team
+        text = data.get("comment", "") or ""
+        comment = Comment(
+            object_id=task_id,
+            object_type="Task",
+            task_status_id=task_status["id"],
+            person_id=author["id"],
+            mentions=_get_mentions_in_team(teams[task["project_id"]], text),
+            acknowledgements=[],
+            previews=[],
+            attachment_files=[],
+            checklist=data.get("checklist", []) or [],
+            text=text,
+            created_at=datetime.datetime.utcnow(),
+        )
+        previous_status_id = task["task_status_id"]
+        (new_data, status_changed) = _get_status_change_data(task_status, task)
+        new_data["last_comment_date"] = comment.created_at
+        tasks[task_id].update_no_commit(new_data)
+        task.update(fields.serialize_dict(new_data))
+        db.session.add(comment)
+        entries.append(
+            (
+                result,
+                comment,
+                task,
+                task_status,
+                status_changed,
+                previous_status_id,
+            )
+        )
+
+    if len(entries) == 0:
+        return results
+    try:
+        db.session.flush()
+        serialized_comments = [
+            comment.serialize(relations=True) for (_, comment, *_) in entries
+        ]
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+    tasks_service.refresh_last_comments_and_preview_files(
+        list(task_dicts.keys())
+    )
+    subscriptions = []
+    for (
+        comment,
+        (result, _, task, task_status, status_changed, previous_status_id),
+    ) in zip(serialized_comments, entries):
+        events.emit(
+            "comment:new",
+            {"comment_id": comment["id"], "task_id": task["id"]},
+            project_id=task["project_id"],
+        )
+        if status_changed:
+            events.emit(
+                "task:status-changed",
+                {
+                    "task_id": task["id"],
+                    "new_task_status_id": task_status["id"],
+                    "previous_task_status_id": previous_status_id,
+                    "person_id": comment["person_id"],
+                },
+                project_id=task["project_id"],
+            )
+        subscriptions.append((task, comment, status_changed))
+        comment["task_status"] = task_status
+        comment["person"] = author
+        result["comment"] = comment
+
+    for task in task_dicts.values():
+        events.emit(
+            "task:update",
+            {"task_id": task["id"]},
+            project_id=task["project_id"],
+        )
+    notifications_service.create_notifications_for_tasks_and_comments(
+        subscriptions
+    )
+    news_service.create_news_for_tasks_and_comments(subscriptions)
+
+    automations = {}
+    for (task, comment, _) in subscriptions:
+        project_id = task["project_id"]
+        if project_id not in automations:
+            automations[
+                project_id
+            ] = projects_service.get_project_status_automations(project_id)
+        for automation in automations[project_id]:
+            _run_status_automation(automation, task, author["id"])
+    return results
+
+
 def _check_retake_capping(task_status, task):
     if task_status["is_retake"]:
         project = projects_service.get_project(task["project_id"])
@@ -125,11 +278,31 @@ def _get_comment_author(person_id):
 
 
 def _manage_status_change(task_status, task, comment):
+    (new_data, status_changed) = _get_status_change_data(task_status, task)
+    new_data["last_comment_date"] = comment["created_at"]
+    tasks_service.update_task(task["id"], new_data)
+    task.update(new_data)
+    if status_changed:
+        events.emit(
+            "task:status-changed",
+            {
+                "task_id": task["id"],
+                "new_task_status_id": new_data["task_status_id"],
+                "previous_task_status_id": task["task_status_id"],
+                "person_id": comment["person_id"],
+            },
+            project_id=task["project_id"],
+        )
+    return task, status_changed
+
+
+def _get_status_change_data(task_status, task):
+    """
+    Return the task fields to update when a comment sets given status on
+    given task and whether the status changed.
+    """
     status_changed = task_status["id"] != task["task_status_id"]
-    new_data = {
-        "task_status_id": task_status["id"],
-        "last_comment_date": comment["created_at"],
-    }
+    new_data = {"task_status_id": task_status["id"]}
     if status_changed:
         if task_status["is_retake"]:
             retake_count = task["retake_count"]
@@ -147,21 +320,7 @@ def _manage_status_change(task_status, task, comment):
             and task["real_start_date"] is None
         ):
             new_data["real_start_date"] = datetime.datetime.now()
-
-    tasks_service.update_task(task["id"], new_data)
-    task.update(new_data)
-    if status_changed:
-        events.emit(
-            "task:status-changed",
-            {
-                "task_id": task["id"],
-                "new_task_status_id": new_data["task_status_id"],
-                "previous_task_status_id": task["task_status_id"],
-                "person_id": comment["person_id"],
-            },
-            project_id=task["project_id"],
-        )
-    return task, status_changed
+    return (new_data, status_changed)
 
 
 def _manage_subscriptions(task, comment, status_changed):
@@ -269,6 +428,7 @@ def new_comment(
         text=text,
         created_at=created_at_date,
     )
+    tasks_service.refresh_last_comments_and_preview_files([task["id"]])
 
     comment = comment.serialize(relations=True)
     add_attachments_to_comment(comment, files)
@@ -304,8 +464,12 @@ def get_comment_mentions(object_id, text):
     """
     task = tasks_service.get_task_raw(object_id)
     project = Project.get(task.project_id)
+    return _get_mentions_in_team(project.team, text)
+
+
+def _get_mentions_in_team(team, text):
     mentions = []
-    for person in project.team:
+    for person in team:
         if re.search("@%s( |$)" % person.full_name(), text) is not None:
             mentions.append(person)
     return mentions
@@ -1,9 +1,16 @@
 import datetime
+from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 
+from zou.app import db
 
 from zou.app.models.attachment_file import AttachmentFile
-from zou.app.models.comment import Comment
+from zou.app.models.comment import (
+    Comment,
+    acknowledgements_table,
+    mentions_table,
+    preview_link_table,
+)
 from zou.app.models.desktop_login_log import DesktopLoginLog
 from zou.app.models.entity import Entity, EntityLink, EntityVersion
 from zou.app.models.event import ApiEvent
@@ -20,12 +27,13 @@ from zou.app.models.project import Project
 from zou.app.models.schedule_item import ScheduleItem
 from zou.app.models.search_filter import SearchFilter
 from zou.app.models.subscription import Subscription
-from zou.app.models.task import Task
+from zou.app.models.task import Task, assignees_table
 from zou.app.models.time_spent import TimeSpent
 from zou.app.models.working_file import WorkingFile
 
-from zou.app.utils import events, fields
-from zou.app.stores import file_store
+from zou.app.utils import events, fields, partitions
+from zou.app.services import storage_gc_service
+from zou.app.stores import versions_store
 
 from zou.app.services.exception import (
     AttachmentFileNotFoundException,
@@ -39,9 +47,14 @@ def remove_comment(comment_id):
     Remove a comment from database and everything related (notifs, news, and
     preview files)
     """
+    from zou.app.services import tasks_service
+
     comment = Comment.get(comment_id)
     if comment is not None:
         task = Task.get(comment.object_id)
+        is_last_comment = (
+            task is not None and task.last_comment_id == comment.id
+        )
         notifications = Notification.query.filter_by(comment_id=comment.id)
         for notification in notifications:
             notification.delete()
@@ -66,6 +79,9 @@ def remove_comment(comment_id):
         for attachment in attachments:
             remove_attachment_file(attachment)
 
+        if is_last_comment:
+            tasks_service.refresh_last_comments_and_preview_files([task.id])
+
         if task is not None:
             events.emit(
                 "comment:delete",
@@ -85,49 +101,13 @@ def remove_task(task_id, force=False):
     from zou.app.services import tasks_service
 
     task = Task.get(task_id)
+    task_serialized = task.serialize()
     if force:
-        working_files = WorkingFile.query.filter_by(task_id=task_id)
-        for working_file in working_files:
-            output_files = OutputFile.query.filter_by(
-                source_file_id=working_file.id
-            )
-            for output_file in output_files:
-                output_file.delete()
-            working_file.delete()
-
-        comments = Comment.query.filter_by(object_id=task_id)
-        for comment in comments:
-            notifications = Notification.query.filter_by(comment_id=comment.id)
-            for notification in notifications:
-                notification.delete()
-            news_list = News.query.filter_by(comment_id=comment.id)
-            for news in news_list:
-                news.delete()
-            comment.delete()
-
-        subscriptions = Subscription.query.filter_by(task_id=task_id)
-        for subscription in subscriptions:
-            subscription.delete()
-
-        preview_files = PreviewFile.query.filter_by(task_id=task_id)
-        for preview_file in preview_files:
-            remove_preview_file(preview_file)
-
-        time_spents = TimeSpent.query.filter_by(task_id=task_id)
-        for time_spent in time_spents:
-            time_spent.delete()
-
-        notifications = Notification.query.filter_by(task_id=task_id)
-        for notification in notifications:
-            notification.delete()
-
-        news_list = News.query.filter_by(task_id=task.id)
-        for news in news_list:
-            news.delete()
+        remove_tasks_and_related([task_id])
+        return task_serialized
 
     task.delete()
     tasks_service.clear_task_cache(task_id)
-    task_serialized = task.serialize()
     events.emit(
         "task:delete",
         {
@@ -140,6 +120,261 @@ def remove_task(task_id, force=False):
     return task_serialized
 
 
+DELETION_BATCH_SIZE = 1000
+
+
+def _get_ids(query):
+    return [row[0] for row in query]
+
+
+def get_tasks_deletion_plan(task_ids):
+    """
+    Compute what must be removed along with given tasks. Comments, working
+    files and preview files are selected through subqueries on the tasks,
+    so statements don't embed their ids. Only the files to remove from
+    storage (preview files and attachment files) are loaded.
+    """
+    task_ids = _get_ids(
+        db.session.query(Task.id).filter(
+            Task.id.in_(
+                [
+                    task_id
+                    for task_id in task_ids
+                    if fields.is_valid_id(str(task_id))
+                ]
+            )
+        )
+    )
+    comment_ids = (
+        db.session.query(Comment.id)
+        .filter(Comment.object_id.in_(task_ids))
+        .subquery()
+    )
+    working_file_ids = (
+        db.session.query(WorkingFile.id)
+        .filter(WorkingFile.task_id.in_(task_ids))
+        .subquery()
+    )
+    return {
+        "task": task_ids,
+        "comment": comment_ids,
+        "attachment_file": _get_ids(
+            db.session.query(AttachmentFile.id).filter(
+                AttachmentFile.comment_id.in_(comment_ids)
+            )
+        ),
+        "working_file": working_file_ids,
+        "output_file": db.session.query(OutputFile.id)
+        .filter(OutputFile.source_file_id.in_(working_file_ids))
+        .subquery(),
+        "preview_file": [
+            (preview_file_id, extension)
+            for (preview_file_id, extension) in db.session.query(
+                PreviewFile.id, PreviewFile.extension
+            ).filter(PreviewFile.task_id.in_(task_ids))
+        ],
+        "preview_file_ids": db.session.query(PreviewFile.id)
+        .filter(PreviewFile.task_id.in_(task_ids))
+        .subquery(),
+    }
+
+
+def get_tasks_deletion_statements(plan):
+    """
+    Build the statements removing everything listed in given deletion plan.
+    There is one statement per table, ordered so that rows are removed
+    before the rows they reference. References to removed preview files
+    from remaining rows are cleared first.
+    """
+    task_ids = plan["task"]
+    comment_ids = plan["comment"]
+    preview_file_ids = plan["preview_file_ids"]
+    return [
+        (
+            "notification",
+            Notification.__table__.delete().where(
+                or_(
+                    Notification.task_id.in_(task_ids),
+                    Notification.comment_id.in_(comment_ids),
+                )
+            ),
+        ),
+        (
+            "news",
+            News.__table__.delete().where(
+                or_(
+                    News.task_id.in_(task_ids),
+                    News.comment_id.in_(comment_ids),
+                )
+            ),
+        ),
+        (
+            None,
+            News.__table__.update()
+            .where(News.preview_file_id.in_(preview_file_ids))
+            .values(preview_file_id=None),
+        ),
+        (
+            None,
+            Entity.__table__.update()
+            .where(Entity.preview_file_id.in_(preview_file_ids))
+            .values(preview_file_id=None),
+        ),
+        (
+            None,
+            Comment.__table__.update()
+            .where(Comment.preview_file_id.in_(preview_file_ids))
+            .values(preview_file_id=None),
+        ),
+        (
+            "subscription",
+            Subscription.__table__.delete().where(
+                Subscription.task_id.in_(task_ids)
+            ),
+        ),
+        (
+            "time_spent",
+            TimeSpent.__table__.delete().where(
+                TimeSpent.task_id.in_(task_ids)
+            ),
+        ),
+        (
+            "comment_preview_link",
+            preview_link_table.delete().where(
+                or_(
+                    preview_link_table.c.comment.in_(comment_ids),
+                    preview_link_table.c.preview_file.in_(preview_file_ids),
+                )
+            ),
+        ),
+        (
+            "comment_mentions",
+            mentions_table.delete().where(
+                mentions_table.c.comment.in_(comment_ids)
+            ),
+        ),
+        (
+            "comment_acknowledgments",
+            acknowledgements_table.delete().where(
+                acknowledgements_table.c.comment.in_(comment_ids)
+            ),
+        ),
+        (
+            "attachment_file",
+            AttachmentFile.__table__.delete().where(
+                AttachmentFile.comment_id.in_(comment_ids)
+            ),
+        ),
+        (
+            "comment",
+            Comment.__table__.delete().where(Comment.id.in_(comment_ids)),
+        ),
+        (
+            "preview_file",
+            PreviewFile.__table__.delete().where(
+                PreviewFile.id.in_(preview_file_ids)
+            ),
+        ),
+        (
+            "output_file",
+            OutputFile.__table__.delete().where(
+                OutputFile.id.in_(plan["output_file"])
+            ),
+        ),
+        (
+            "working_file",
+            WorkingFile.__table__.delete().where(
+                WorkingFile.id.in_(plan["working_file"])
+            ),
+        ),
+        (
+            "assignations",
+            assignees_table.delete().where(
+                assignees_table.c.task.in_(task_ids)
+            ),
+        ),
+        ("task", Task.__table__.delete().where(Task.id.in_(task_ids))),
+    ]
+
+
+def remove_tasks_and_related(task_ids):
+    """
+    Remove given tasks and everything related to them: comments, news,
+    notifications, subscriptions, time spents, working, output, preview and
+    attachment files. Tasks are processed by batches of
+    DELETION_BATCH_SIZE: each table is cleared with one statement per batch
+    and all statements run in a single transaction. Files are marked for
+    removal by the storage garbage collector in the same transaction.
+
+    It returns the number of deleted rows per table.
+    """
+    from zou.app.services import tasks_service
+
+    task_ids = list(task_ids)
+    tasks = []
+    counts = {}
+    try:
+        for index in range(0, len(task_ids), DELETION_BATCH_SIZE):
+            plan = get_tasks_deletion_plan(
+                task_ids[index : index + DELETION_BATCH_SIZE]
+            )
+            tasks += (
+                db.session.query(
+                    Task.id, Task.entity_id, Task.task_type_id, Task.project_id
+                )
+                .filter(Task.id.in_(plan["task"]))
+                .all()
+            )
+            for (table_name, statement) in get_tasks_deletion_statements(plan):
+                result = db.session.execute(statement)
+                if table_name is not None:
+                    counts[table_name] = (
+                        counts.get(table_name, 0) + result.rowcount
+                    )
+            storage_gc_service.add_tombstones_no_commit(
+                get_files_keys(plan["preview_file"], plan["attachment_file"])
+            )
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+    for (task_id, entity_id, task_type_id, project_id) in tasks:
+        tasks_service.clear_task_cache(str(task_id))
+        events.emit(
+            "task:delete",
+            {
+                "task_id": str(task_id),
+                "entity_id": str(entity_id),
+                "task_type_id": str(task_type_id),
+            },
+            project_id=str(project_id),
+        )
+    # Comments, previews and entity thumbnails are removed without emitting
+    # their own events.
+    for project_id in set(project_id for (_, _, _, project_id) in tasks):
+        versions_store.bump_for_models(
+            ["comment", "preview_file", "entity"], str(project_id)
+        )
+    return counts
+
+
+def get_files_keys(preview_files, attachment_file_ids):
+    """
+    Return the storage keys of given preview files and attachment files.
+    Preview files are given as (id, extension) tuples.
+    """
+    keys = []
+    for (preview_file_id, extension) in preview_files:
+        keys += storage_gc_service.get_preview_file_keys(
+            preview_file_id, extension
+        )
+    for attachment_file_id in attachment_file_ids:
+        keys += storage_gc_service.get_attachment_file_keys(attachment_file_id)
+    return keys
+
+
 def remove_preview_file_by_id(preview_file_id):
     preview_file = PreviewFile.get(preview_file_id)
     return remove_preview_file(preview_file)
@@ -147,12 +382,15 @@ def remove_preview_file_by_id(preview_file_id):
 
 def remove_preview_file(preview_file):
     """
-    Remove all files related to given preview file, then remove the preview file
-    entry from the database.
+    Remove the preview file entry from the database. Its files are marked for
+    removal by the storage garbage collector.
     """
+    from zou.app.services import tasks_service
+
     task = Task.get(preview_file.task_id)
     entity = Entity.get(task.entity_id)
     news = News.get_by(preview_file_id=preview_file.id)
+    is_last_preview_file = task.last_preview_file_id == preview_file.id
 
     if entity.preview_file_id == preview_file.id:
         entity.update({"preview_file_id": None})
@@ -160,16 +398,16 @@ def remove_preview_file(preview_file):
     if news is not None:
         news.update({"preview_file_id": None})
 
-    if preview_file.extension == "png":
-        clear_picture_files(preview_file.id)
-    elif preview_file.extension == "mp4":
-        clear_movie_files(preview_file.id)
-    else:
-        clear_generic_files(preview_file.id)
-
     preview_file.comments = []
     preview_file.save()
+    storage_gc_service.add_tombstones_no_commit(
+        storage_gc_service.get_preview_file_keys(
+            preview_file.id, preview_file.extension
+        )
+    )
     preview_file.delete()
+    if is_last_preview_file:
+        tasks_service.refresh_last_comments_and_preview_files([task.id])
     return preview_file.serialize()
 
 
@@ -186,70 +424,27 @@ def remove_attachment_file_by_id(attachment_file_id):
 
 def remove_attachment_file(attachment_file):
     """
-    Remove all files related to given attachment file, then remove the
-    attachment file entry from the database.
+    Remove the attachment file entry from the database. Its file is marked
+    for removal by the storage garbage collector.
     """
-    file_store.remove_file("attachments", str(attachment_file.id))
     attachment_dict = attachment_file.serialize()
+    storage_gc_service.add_tombstones_no_commit(
+        storage_gc_service.get_attachment_file_keys(attachment_file.id)
+    )
     attachment_file.delete()
     return attachment_dict
 
 
-def clear_picture_files(preview_file_id):
-    """
-    Remove all files related to given preview file, supposing the original file
-    was a picture.
-    """
-    for image_type in [
-        "original",
-        "thumbnails",
-        "thumbnails-square",
-        "previews",
-    ]:
-        try:
-            file_store.remove_picture(image_type, preview_file_id)
-        except:
-            pass
-
-
-def clear_movie_files(preview_file_id):
-    """
-    Remove all files related to given preview file, supposing the original file
-    was a movie.
-    """
-    try:
-        file_store.remove_movie("previews", preview_file_id)
-    except:
-        pass
-    for image_type in ["thumbnails", "thumbnails-square", "previews"]:
-        try:
-            file_store.remove_picture(image_type, preview_file_id)
-        except:
-            pass
-
-
-def clear_generic_files(preview_file_id):
-    """
-    Remove all files related to given preview file, supposing the original file
-    was a generic file.
-    """
-    try:
-        file_store.remove_file("previews", preview_file_id)
-    except:
-        pass
-
-
 def remove_tasks(project_id, task_ids):
     """
     Remove fully given tasks and related for given project. The project id
     filter is there to facilitate right management.
     """
     task_ids = [task_id for task_id in task_ids if fields.is_valid_id(task_id)]
-    tasks = Task.query.filter(Project.id == project_id).filter(
+    tasks = Task.query.filter(Task.project_id == project_id).filter(
         Task.id.in_(task_ids)
     )
-    for task in tasks:
-        remove_task(task.id, force=True)
+    remove_tasks_and_related([task.id for task in tasks])
     return task_ids
 
 
@@ -260,10 +455,8 @@ def remove_tasks_for_project_and_task_type(project_id, task_type_id):
     tasks = Task.query.filter_by(
         project_id=project_id, task_type_id=task_type_id
     )
-    task_ids = []
-    for task in tasks:
-        remove_task(task.id, force=True)
-        task_ids.append(str(task.id))
+    task_ids = [str(task.id) for task in tasks]
+    remove_tasks_and_related(task_ids)
     return task_ids
 
 
@@ -271,21 +464,17 @@ def remove_project(project_id):
     from zou.app.services import playlists_service
 
     tasks = Task.query.filter_by(project_id=project_id)
-    for task in tasks:
-        remove_task(task.id, force=True)
-
-    query = EntityLink.query.join(
-        Entity, EntityLink.entity_in_id == Entity.id
-    ).filter(Entity.project_id == project_id)
-    for link in query:
-        link.delete_no_commit()
-    EntityLink.commit()
+    remove_tasks_and_related([task.id for task in tasks])
 
-    query = EntityVersion.query.join(
-        Entity, EntityVersion.entity_id == Entity.id
-    ).filter(Entity.project_id == project_id)
-    for version in query:
-        version.delete_no_commit()
+    entity_ids = db.session.query(Entity.id).filter(
+        Entity.project_id == project_id
+    )
+    EntityLink.query.filter(EntityLink.entity_in_id.in_(entity_ids)).delete(
+        synchronize_session=False
+    )
+    EntityVersion.query.filter(EntityVersion.entity_id.in_(entity_ids)).delete(
+        synchronize_session=False
+    )
     EntityLink.commit()
 
     playlists = Playlist.query.filter_by(project_id=project_id)
@@ -304,6 +493,9 @@ def remove_project(project_id):
     News.commit()
     project = Project.get(project_id)
     project.delete()
+    versions_store.bump_for_models(
+        ["entity", "entity_link", "playlist"], project_id
+    )
     events.emit("project:delete", {"project_id": project.id})
     return project_id
 
@@ -365,38 +557,73 @@ def remove_person(person_id, force=True):
     return person.serialize_safe()
 
 
+def _remove_old_rows(model, days_old):
+    """
+    Remove rows of given model older than *days_old*. When its table is
+    partitioned by month, partitions older than the limit are dropped and
+    only the rows of the partition overlapping the limit are deleted.
+    """
+    limit_date = datetime.datetime.utcnow() - datetime.timedelta(days=days_old)
+    try:
+        partitions.drop_partitions_before(
+            db.session.connection(), model.__tablename__, limit_date
+        )
+        model.query.filter(model.created_at < limit_date).delete(
+            synchronize_session=False
+        )
+        model.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+
+def create_next_partitions(months_ahead=3):
+    """
+    Create the monthly partitions of partitioned tables (events, login logs
+    and notifications) up to *months_ahead* months from now. It returns the
+    names of created partitions.
+    """
+    created = []
+    try:
+        for table_name in partitions.PARTITIONED_TABLES:
+            created += partitions.ensure_partitions(
+                db.session.connection(), table_name, months_ahead
+            )
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+    return created
+
+
 def remove_old_events(days_old=90):
     """
     Remove events older than *days_old*.
     """
-    limit_date = datetime.datetime.now() - datetime.timedelta(days=90)
-    ApiEvent.query.filter(ApiEvent.created_at < limit_date).delete()
-    ApiEvent.commit()
+    _remove_old_rows(ApiEvent, days_old)
 
 
 def remove_old_login_logs(days_old=90):
     """
     Remove login logs older than *days_old*.
     """
-    limit_date = datetime.datetime.now() - datetime.timedelta(days=90)
-    LoginLog.query.filter(LoginLog.created_at < limit_date).delete()
-    LoginLog.commit()
+    _remove_old_rows(LoginLog, days_old)
 
 
 def remove_old_notifications(days_old=90):
     """
     Remove notifications older than *days_old*.
     """
-    limit_date = datetime.datetime.now() - datetime.timedelta(days=90)
-    Notification.query.filter(Notification.created_at < limit_date).delete()
-    Notification.commit()
+    _remove_old_rows(Notification, days_old)
 
 
 def remove_episode(episode_id, force=False):
     """
     Remove an episode and all related sequences and shots.
     """
-    from zou.app.services import shots_service, assets_service, tasks_service
+    from zou.app.services import shots_service, assets_service
 
     episode = shots_service.get_episode_raw(episode_id)
     if force:
@@ -405,9 +632,7 @@ def remove_episode(episode_id, force=False):
         for asset in Entity.get_all_by(source_id=episode_id):
             assets_service.remove_asset(asset.id, force=True)
         tasks = Task.query.filter_by(entity_id=episode_id).all()
-        for task in tasks:
-            remove_task(task.id, force=True)
-            tasks_service.clear_task_cache(str(task.id))
+        remove_tasks_and_related([task.id for task in tasks])
         Playlist.delete_all_by(episode_id=episode_id)
         ScheduleItem.delete_all_by(object_id=episode_id)
     try:
@@ -310,12 +310,8 @@ def remove_edit(edit_id, force=False):
             project_id=str(edit.project_id),
         )
     else:
-        from zou.app.services import tasks_service
-
         tasks = Task.query.filter_by(entity_id=edit_id).all()
-        for task in tasks:
-            deletion_service.remove_task(task.id, force=True)
-            tasks_service.clear_task_cache(str(task.id))
+        deletion_service.remove_tasks_and_related([task.id for task in tasks])
 
         EntityVersion.delete_all_by(entity_id=edit_id)
         Subscription.delete_all_by(entity_id=edit_id)
@@ -1,5 +1,9 @@
-from zou.app import config
+import json
+import time
+
+from zou.app import app, config
 from zou.app.utils import emails, chats
+from zou.app.utils.rate_limit import RateLimiter
 
 from zou.app.services import (
     entities_service,
@@ -8,7 +12,10 @@ from zou.app.services import (
     projects_service,
     tasks_service,
 )
-from zou.app.stores import queue_store
+from zou.app.stores import notifications_store, queue_store
+
+
+DELIVERY_MAX_ATTEMPTS = 3
 
 
 def send_notification(person_id, subject, messages):
@@ -17,216 +24,537 @@ def send_notification(person_id, subject, messages):
     activated.
     """
     person = persons_service.get_person(person_id)
+    return send_person_notification(
+        person,
+        subject,
+        messages,
+        use_job_queue=config.ENABLE_JOB_QUEUE,
+    )
+
+
+def send_person_notification(
+    person, subject, messages, organisation=None, use_job_queue=False
+):
+    """
+    Send notification to given person through every channel the person
+    enabled. Each message is sent in its own job if the job queue is used.
+    If a digest window is configured and the notifications store is shared
+    with the delivery worker, the notification is added to the digest of the
+    person instead. Digests are sent by the delivery worker.
+    """
+    if config.NOTIFICATION_DIGEST_WINDOW > 0 and notifications_store.is_shared:
+        notifications_store.add_message(
+            person["id"],
+            {"subject": subject, "messages": messages},
+            window=config.NOTIFICATION_DIGEST_WINDOW,
+        )
+        return True
+
     email_message = messages["email_message"]
     slack_message = messages["slack_message"]
     mattermost_message = messages["mattermost_message"]
     discord_message = messages["discord_message"]
     if person["notifications_enabled"]:
-        if config.ENABLE_JOB_QUEUE:
-            queue_store.job_queue.enqueue(
-                emails.send_email,
-                args=(
-                    subject,
-                    email_message + get_signature(),
-                    person["email"],
-                ),
-            )
-        else:
-            emails.send_email(
-                subject, email_message + get_signature(), person["email"]
-            )
+        if organisation is None:
+            organisation = persons_service.get_organisation()
+        args = (
+            subject,
+            email_message + get_signature(organisation),
+            person["email"],
+        )
+        _run(emails.send_email, args, use_job_queue)
 
     if person["notifications_slack_enabled"]:
-        organisation = persons_service.get_organisation()
+        if organisation is None:
+            organisation = persons_service.get_organisation()
         userid = person["notifications_slack_userid"]
         token = organisation.get("chat_token_slack", "")
-        if config.ENABLE_JOB_QUEUE:
-            queue_store.job_queue.enqueue(
-                chats.send_to_slack,
-                args=(token, userid, slack_message),
-            )
-        else:
-            chats.send_to_slack(token, userid, slack_message)
+        args = (token, userid, slack_message)
+        _run(chats.send_to_slack, args, use_job_queue)
 
     if person["notifications_mattermost_enabled"]:
-        organisation = persons_service.get_organisation()
+        if organisation is None:
+            organisation = persons_service.get_organisation()
         userid = person["notifications_mattermost_userid"]
         webhook = organisation.get("chat_webhook_mattermost", "")
-        if config.ENABLE_JOB_QUEUE:
-            queue_store.job_queue.enqueue(
-                chats.send_to_mattermost,
-                args=(webhook, userid, mattermost_message),
-            )
-        else:
-            chats.send_to_mattermost(webhook, userid, mattermost_message)
+        args = (webhook, userid, mattermost_message)
+        _run(chats.send_to_mattermost, args, use_job_queue)
 
     if person["notifications_discord_enabled"]:
-        organisation = persons_service.get_organisation()
+        if organisation is None:
+            organisation = persons_service.get_organisation()
         userid = person["notifications_discord_userid"]
         token = organisation.get("chat_token_discord", "")
-        if config.ENABLE_JOB_QUEUE:
-            queue_store.job_queue.enqueue(
-                chats.send_to_discord,
-                args=(token, userid, discord_message),
-            )
-        else:
-            chats.send_to_discord(token, userid, discord_message)
+        args = (token, userid, discord_message)
+        _run(chats.send_to_discord, args, use_job_queue)
 
     return True
 
 
-def send_comment_notification(person_id, author_id, comment, task):
+def deliver_digests(now=None):
     """
-    Send a notification emali telling that a new comment was posted to person
-    matching given person id.
+    Send the digests that are due and the deliveries that failed during
+    previous runs. Persons are loaded with a single query and messages are
+    sent channel by channel: one SMTP connection and one chat client are
+    used for all the messages of a channel. Digests are put back in the
+    store if they cannot be built and failed deliveries are retried up to
+    DELIVERY_MAX_ATTEMPTS times. It returns the number of messages sent and
+    failed per channel.
     """
-    person = persons_service.get_person(person_id)
-    project = projects_service.get_project(task["project_id"])
-    if (
-        person["notifications_enabled"]
-        or person["notifications_slack_enabled"]
-        or person["notifications_mattermost_enabled"]
-        or person["notifications_discord_enabled"]
-    ):
-        task_status = tasks_service.get_task_status(task["task_status_id"])
-        task_status_name = task_status["short_name"].upper()
-        (author, task_name, task_url) = get_task_descriptors(author_id, task)
-        subject = "[Kitsu] %s - %s commented on %s" % (
-            task_status_name,
-            author["first_name"],
-            task_name,
-        )
-        if len(comment["text"]) > 0:
-            email_message = """<p><strong>%s</strong> wrote a comment on <a href="%s">%s</a> and set the status to <strong>%s</strong>.</p>
+    digests = notifications_store.pop_due_digests(now)
+    retries = notifications_store.pop_delivery_retries()
+    if len(digests) == 0 and len(retries) == 0:
+        return {}
 
-<p><em>%s</em></p>
-""" % (
-                author["full_name"],
-                task_url,
-                task_name,
-                task_status_name,
-                comment["text"],
+    try:
+        organisation = persons_service.get_organisation()
+        deliveries = get_digest_deliveries(digests, organisation)
+    except:
+        notifications_store.restore_digests(digests)
+        notifications_store.add_delivery_retries(retries)
+        raise
+
+    attempts = {}
+    for retry in retries:
+        message = tuple(retry["message"])
+        deliveries[retry["channel"]].append(message)
+        attempts[get_delivery_key(retry["channel"], message)] = retry[
+            "attempts"
+        ]
+    failed_deliveries = {channel: [] for channel in deliveries.keys()}
+    results = deliver_messages(deliveries, organisation, failed_deliveries)
+    retry_failed_deliveries(failed_deliveries, attempts)
+    return results
+
+
+def get_digest_deliveries(digests, organisation):
+    """
+    Build the messages to send per channel for given digests.
+    """
+    deliveries = {channel: [] for channel in notifications_store.CHANNELS}
+    for person in persons_service.get_persons_by_ids(list(digests.keys())):
+        (subject, messages) = build_digest(digests[person["id"]])
+        if person["notifications_enabled"]:
+            deliveries["email"].append(
+                (
+                    subject,
+                    messages["email_message"] + get_signature(organisation),
+                    person["email"],
+                )
             )
-            slack_message = """*%s* wrote a comment on <%s|%s> and set the status to *%s*.
-
-_%s_
-""" % (
-                author["full_name"],
-                task_url,
-                task_name,
-                task_status_name,
-                comment["text"],
+        if person["notifications_slack_enabled"]:
+            deliveries["slack"].append(
+                (
+                    person["notifications_slack_userid"],
+                    messages["slack_message"],
+                )
+            )
+        if person["notifications_mattermost_enabled"]:
+            deliveries["mattermost"].append(
+                (
+                    person["notifications_mattermost_userid"],
+                    messages["mattermost_message"],
+                )
             )
+        if person["notifications_discord_enabled"]:
+            deliveries["discord"].append(
+                (
+                    person["notifications_discord_userid"],
+                    messages["discord_message"],
+                )
+            )
+    return deliveries
 
-            discord_message = """*%s* wrote a comment on [%s](%s)> and set the status to *%s*.
 
-_%s_
-""" % (
-                author["full_name"],
-                task_name,
-                task_url,
-                task_status_name,
-                comment["text"],
-            )
+def get_delivery_key(channel, message):
+    return (channel, json.dumps(message, sort_keys=True))
 
-        else:
-            email_message = """<p><strong>%s</strong> changed status of <a href="%s">%s</a> to <strong>%s</strong>.</p>
-""" % (
-                author["full_name"],
-                task_url,
-                task_name,
-                task_status_name,
-            )
-            slack_message = """*%s* changed status of <%s|%s> to *%s*.
-""" % (
-                author["full_name"],
-                task_url,
-                task_name,
-                task_status_name,
-            )
 
-            discord_message = """*%s* changed status of [%s](%s) to *%s*.
-""" % (
-                author["full_name"],
-                task_name,
-                task_url,
-                task_status_name,
-            )
-        messages = {
-            "email_message": email_message,
+def retry_failed_deliveries(failed_deliveries, attempts=None):
+    """
+    Store given failed deliveries so they are sent again by the next run.
+    Deliveries that already failed DELIVERY_MAX_ATTEMPTS times are dropped.
+    """
+    if attempts is None:
+        attempts = {}
+    retries = []
+    for channel, messages in failed_deliveries.items():
+        for message in messages:
+            count = attempts.get(get_delivery_key(channel, message), 0) + 1
+            if count < DELIVERY_MAX_ATTEMPTS:
+                retries.append(
+                    {"channel": channel, "message": message, "attempts": count}
+                )
+            else:
+                app.logger.error(
+                    "Notification dropped after %s failed %s deliveries."
+                    % (count, channel)
+                )
+    notifications_store.add_delivery_retries(retries)
+    return retries
+
+
+def build_digest(notifications):
+    """
+    Merge given notifications (dicts with a subject and messages) into a
+    single subject and a single message per channel.
+    """
+    if len(notifications) == 1:
+        return (notifications[0]["subject"], notifications[0]["messages"])
+
+    subject = "[Kitsu] You have %s new notifications" % len(notifications)
+    messages = [notification["messages"] for notification in notifications]
+    project_names = []
+    for message in messages:
+        project_name = message["mattermost_message"]["project_name"]
+        if project_name not in project_names:
+            project_names.append(project_name)
+    slack_message = "\n".join(message["slack_message"] for message in messages)
+    return (
+        subject,
+        {
+            "email_message": "<hr />\n".join(
+                message["email_message"] for message in messages
+            ),
             "slack_message": slack_message,
             "mattermost_message": {
-                "message": slack_message,
-                "project_name": project["name"],
+                "message": "\n".join(
+                    message["mattermost_message"]["message"]
+                    for message in messages
+                ),
+                "project_name": ", ".join(project_names),
             },
-            "discord_message": discord_message,
-        }
-        send_notification(person_id, subject, messages)
+            "discord_message": "\n".join(
+                message["discord_message"] for message in messages
+            ),
+        },
+    )
 
-    return True
 
+def deliver_messages(deliveries, organisation, failed_deliveries=None):
+    """
+    Send given messages grouped by channel. Each channel is rate limited
+    according to the NOTIFICATION_RATE_LIMITS setting. Delivery results are
+    added to the delivery metrics. Messages that could not be sent are
+    added to `failed_deliveries` (lists per channel) when it is given.
+    """
+    senders = {
+        "email": lambda messages, rate_limiter, failed: emails.send_emails(
+            messages, rate_limiter, failed
+        ),
+        "slack": lambda messages, rate_limiter, failed: (
+            chats.send_many_to_slack(
+                organisation.get("chat_token_slack", ""),
+                messages,
+                rate_limiter,
+                failed,
+            )
+        ),
+        "mattermost": lambda messages, rate_limiter, failed: (
+            chats.send_many_to_mattermost(
+                organisation.get("chat_webhook_mattermost", ""),
+                messages,
+                rate_limiter,
+                failed,
+            )
+        ),
+        "discord": lambda messages, rate_limiter, failed: (
+            chats.send_many_to_discord(
+                organisation.get("chat_token_discord", ""),
+                messages,
+                rate_limiter,
+                failed,
+            )
+        ),
+    }
+    results = {}
+    for channel, messages in deliveries.items():
+        if len(messages) == 0:
+            continue
+        rate_limiter = RateLimiter(config.NOTIFICATION_RATE_LIMITS[channel])
+        start = time.monotonic()
+        failed_messages = None
+        if failed_deliveries is not None:
+            failed_messages = failed_deliveries.setdefault(channel, [])
+        (sent, failed) = senders[channel](
+            messages, rate_limiter, failed_messages
+        )
+        duration = time.monotonic() - start
+        notifications_store.add_metrics(channel, sent, failed, duration)
+        results[channel] = {"sent": sent, "failed": failed}
+    return results
 
-def send_mention_notification(person_id, author_id, comment, task):
+
+def get_delivery_metrics():
     """
-    Send a notification email telling that somenone mentioned the
-    person matching given person id.
+    Return notification delivery metrics per channel and the number of
+    digests waiting to be sent.
     """
-    person = persons_service.get_person(person_id)
-    project = projects_service.get_project(task["project_id"])
-    if (
+    return notifications_store.get_metrics()
+
+
+def _run(func, args, use_job_queue):
+    if use_job_queue:
+        queue_store.job_queue.enqueue(func, args=args)
+    else:
+        func(*args)
+
+
+def is_notification_enabled(person):
+    """
+    Return True if given person enabled at least one notification channel.
+    """
+    return (
         person["notifications_enabled"]
         or person["notifications_slack_enabled"]
         or person["notifications_mattermost_enabled"]
         or person["notifications_discord_enabled"]
-    ):
+    )
+
+
+def send_comment_notification(person_id, author_id, comment, task):
+    """
+    Send a notification emali telling that a new comment was posted to person
+    matching given person id.
+    """
+    person = persons_service.get_person(person_id)
+    project = projects_service.get_project(task["project_id"])
+    if is_notification_enabled(person):
+        task_status = tasks_service.get_task_status(task["task_status_id"])
         (author, task_name, task_url) = get_task_descriptors(author_id, task)
-        subject = "[Kitsu] %s mentioned you on %s" % (
-            author["first_name"],
-            task_name,
+        (subject, messages) = get_comment_messages(
+            author, comment, task_status, task_name, task_url, project
         )
-        email_message = """<p><strong>%s</strong> mentioned you in a comment on <a href="%s">%s</a>:</p>
+        send_notification(person_id, subject, messages)
+
+    return True
+
+
+def get_comment_messages(
+    author, comment, task_status, task_name, task_url, project
+):
+    """
+    Build subject and messages (one per channel) of comment notifications.
+    """
+    task_status_name = task_status["short_name"].upper()
+    subject = "[Kitsu] %s - %s commented on %s" % (
+        task_status_name,
+        author["first_name"],
+        task_name,
+    )
+    if len(comment["text"]) > 0:
+        email_message = """<p><strong>%s</strong> wrote a comment on <a href="%s">%s</a> and set the status to <strong>%s</strong>.</p>
 
 <p><em>%s</em></p>
 """ % (
             author["full_name"],
             task_url,
             task_name,
+            task_status_name,
             comment["text"],
         )
-        slack_message = """*%s* mentioned you in a comment on <%s|%s>.
+        slack_message = """*%s* wrote a comment on <%s|%s> and set the status to *%s*.
 
 _%s_
 """ % (
             author["full_name"],
             task_url,
             task_name,
+            task_status_name,
             comment["text"],
         )
 
-        discord_message = """*%s* mentioned you in a comment on [%s](%s).
+        discord_message = """*%s* wrote a comment on [%s](%s)> and set the status to *%s*.
 
 _%s_
 """ % (
             author["full_name"],
             task_name,
             task_url,
+            task_status_name,
             comment["text"],
         )
 
-        messages = {
-            "email_message": email_message,
-            "slack_message": slack_message,
-            "mattermost_message": {
-                "message": slack_message,
-                "project_name": project["name"],
-            },
-            "discord_message": discord_message,
-        }
+    else:
+        email_message = """<p><strong>%s</strong> changed status of <a href="%s">%s</a> to <strong>%s</strong>.</p>
+""" % (
+            author["full_name"],
+            task_url,
+            task_name,
+            task_status_name,
+        )
+        slack_message = """*%s* changed status of <%s|%s> to *%s*.
+""" % (
+            author["full_name"],
+            task_url,
+            task_name,
+            task_status_name,
+        )
+
+        discord_message = """*%s* changed status of [%s](%s) to *%s*.
+""" % (
+            author["full_name"],
+            task_name,
+            task_url,
+            task_status_name,
+        )
+    messages = {
+        "email_message": email_message,
+        "slack_message": slack_message,
+        "mattermost_message": {
+            "message": slack_message,
+            "project_name": project["name"],
+        },
+        "discord_message": discord_message,
+    }
+    return (subject, messages)
+
+
+def send_mention_notification(person_id, author_id, comment, task):
+    """
+    Send a notification email telling that somenone mentioned the
+    person matching given person id.
+    """
+    person = persons_service.get_person(person_id)
+    project = projects_service.get_project(task["project_id"])
+    if is_notification_enabled(person):
+        (author, task_name, task_url) = get_task_descriptors(author_id, task)
+        (subject, messages) = get_mention_messages(
+            author, comment, task_name, task_url, project
+        )
         return send_notification(person_id, subject, messages)
     else:
         return True
 
 
+def get_mention_messages(author, comment, task_name, task_url, project):
+    """
+    Build subject and messages (one per channel) of mention notifications.
+    """
+    subject = "[Kitsu] %s mentioned you on %s" % (
+        author["first_name"],
+        task_name,
+    )
+    email_message = """<p><strong>%s</strong> mentioned you in a comment on <a href="%s">%s</a>:</p>
+
+<p><em>%s</em></p>
+""" % (
+        author["full_name"],
+        task_url,
+        task_name,
+        comment["text"],
+    )
+    slack_message = """*%s* mentioned you in a comment on <%s|%s>.
+
+_%s_
+""" % (
+        author["full_name"],
+        task_url,
+        task_name,
+        comment["text"],
+    )
+
+    discord_message = """*%s* mentioned you in a comment on [%s](%s).
+
+_%s_
+""" % (
+        author["full_name"],
+        task_name,
+        task_url,
+        comment["text"],
+    )
+
+    messages = {
+        "email_message": email_message,
+        "slack_message": slack_message,
+        "mattermost_message": {
+            "message": slack_message,
+            "project_name": project["name"],
+        },
+        "discord_message": discord_message,
+    }
+    return (subject, messages)
+
+
+def send_comment_notifications(
+    author_id, comment, task, recipient_ids, mention_ids=[]
+):
+    """
+    Send comment notifications to given recipients and mention notifications
+    to given mentioned persons. If the job queue is activated, everything is
+    sent from a single job.
+    """
+    args = (
+        author_id,
+        comment,
+        task,
+        [str(person_id) for person_id in recipient_ids],
+        [str(person_id) for person_id in mention_ids],
+    )
+    if config.ENABLE_JOB_QUEUE:
+        queue_store.job_queue.enqueue(
+            _send_comment_notifications_job, args=args
+        )
+    else:
+        _send_comment_notifications(*args)
+    return True
+
+
+def _send_comment_notifications_job(*args):
+    with app.app_context():
+        return _send_comment_notifications(*args)
+
+
+def _send_comment_notifications(
+    author_id, comment, task, recipient_ids, mention_ids
+):
+    """
+    Recipients are retrieved with a single query. Author, task and project
+    information are retrieved once for all recipients.
+    """
+    persons = persons_service.get_persons_by_ids(
+        list(set(recipient_ids) | set(mention_ids))
+    )
+    persons = {
+        person["id"]: person
+        for person in persons
+        if is_notification_enabled(person)
+    }
+    recipients = [
+        persons[person_id]
+        for person_id in recipient_ids
+        if person_id in persons
+    ]
+    mentioned_persons = [
+        persons[person_id] for person_id in mention_ids if person_id in persons
+    ]
+    if len(recipients) == 0 and len(mentioned_persons) == 0:
+        return True
+
+    organisation = persons_service.get_organisation()
+    project = projects_service.get_project(task["project_id"])
+    (author, task_name, task_url) = get_task_descriptors(author_id, task)
+    if len(recipients) > 0:
+        task_status = tasks_service.get_task_status(task["task_status_id"])
+        (subject, messages) = get_comment_messages(
+            author, comment, task_status, task_name, task_url, project
+        )
+        for person in recipients:
+            send_person_notification(
+                person, subject, messages, organisation=organisation
+            )
+
+    if len(mentioned_persons) > 0:
+        (subject, messages) = get_mention_messages(
+            author, comment, task_name, task_url, project
+        )
+        for person in mentioned_persons:
+            send_person_notification(
+                person, subject, messages, organisation=organisation
+            )
+    return True
+
+
 def send_assignation_notification(person_id, author_id, task):
     """
     Send a notification email telling that somenone assigned to a task the
@@ -234,12 +562,7 @@ def send_assignation_notification(person_id, author_id, task):
     """
     person = persons_service.get_person(person_id)
     project = projects_service.get_project(task["project_id"])
-    if (
-        person["notifications_enabled"]
-        or person["notifications_slack_enabled"]
-        or person["notifications_mattermost_enabled"]
-        or person["notifications_discord_enabled"]
-    ):
+    if is_notification_enabled(person):
         (author, task_name, task_url) = get_task_descriptors(author_id, task)
         subject = "[Kitsu] You were assigned to %s" % task_name
         email_message = """<p><strong>%s</strong> assigned you to <a href="%s">%s</a>.</p>
@@ -273,11 +596,12 @@ def send_assignation_notification(person_id, author_id, task):
     return True
 
 
-def get_signature():
+def get_signature(organisation=None):
     """
     Build signature for Zou emails.
     """
-    organisation = persons_service.get_organisation()
+    if organisation is None:
+        organisation = persons_service.get_organisation()
     return (
         """
 <p>Best,</p>
@@ -283,10 +283,17 @@ def get_entities_and_tasks(criterions={}):
 def remove_entity_link(link_id):
     try:
         link = EntityLink.get_by(id=link_id)
+        link_dict = link.serialize()
         link.delete()
-        return link.serialize()
     except:
         raise EntityLinkNotFoundException
+    entity = get_entity(link_dict["entity_in_id"])
+    events.emit(
+        "entity-link:delete",
+        {"entity_link_id": link_dict["id"]},
+        project_id=entity["project_id"],
+    )
+    return link_dict
 
 
 def get_not_allowed_descriptors_fields_for_vendor(
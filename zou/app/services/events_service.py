@@ -1,6 +1,44 @@
+import datetime
+
+from sqlalchemy import and_, or_
+
+from zou.app import db
 from zou.app.models.event import ApiEvent
 from zou.app.models.login_log import LoginLog
-from zou.app.utils import fields
+from zou.app.utils import fields, partitions
+
+
+def get_event_windows(before=None):
+    """
+    Return the date ranges to scan, from the most recent to the oldest one,
+    to list events created before given date. When the event table is
+    partitioned, there is one range per monthly partition, so each query
+    reads a single partition. The last range is open to cover the oldest
+    partition. Otherwise a single open range is returned.
+    """
+    connection = db.session.connection()
+    if not partitions.is_partitioned(connection, ApiEvent.__tablename__):
+        return [(None, before)]
+
+    starts = sorted(
+        set(
+            partition["start"]
+            for partition in partitions.get_partitions(
+                connection, ApiEvent.__tablename__
+            )
+            if partition["start"] is not None
+            and partition["start"] > datetime.datetime.min
+            and (before is None or partition["start"] < before)
+        ),
+        reverse=True,
+    )
+    windows = []
+    end = before
+    for start in starts:
+        windows.append((start, end))
+        end = start
+    windows.append((None, end))
+    return windows
 
 
 def get_last_events(
@@ -9,14 +47,85 @@ def get_last_events(
     """
     Return last 100 events published. If before parameter is set, it returns
     last 100 events before this date.
+
+    Without after parameter, events are read month by month from the most
+    recent one, until the page is full.
     """
-    query = ApiEvent.query.order_by(ApiEvent.created_at.desc())
+    if after is not None:
+        windows = [(None, before)]
+    else:
+        windows = get_event_windows(before)
+
+    events = []
+    for (start, end) in windows:
+        query = _get_events_query(only_files, project_id)
+        if after is not None:
+            query = query.filter(ApiEvent.created_at > after)
+        if start is not None:
+            query = query.filter(ApiEvent.created_at >= start)
+        if end is not None:
+            query = query.filter(ApiEvent.created_at < end)
+        events += query.limit(page_size - len(events)).all()
+        if len(events) >= page_size:
+            break
+
+    return [
+        fields.serialize_dict(
+            {
+                "id": event.id,
+                "created_at": event.created_at,
+                "name": event.name,
+                "user_id": event.user_id,
+                "data": event.data,
+            }
+        )
+        for event in events
+    ]
+
 
+def get_next_events(
+    after=None, after_id=None, page_size=100, only_files=False, project_id=None
+):
+    """
+    Return the events following given cursor, from the oldest to the most
+    recent. The cursor is the creation date and the id of the last event
+    already read. Events created at the same date are sorted on their id, so
+    reading pages from cursor to cursor never skips nor repeats an event.
+    Dates are returned with their microseconds to be used as cursors.
+    """
+    query = (
+        _get_events_query(only_files, project_id)
+        .order_by(None)
+        .order_by(ApiEvent.created_at, ApiEvent.id)
+    )
     if after is not None:
-        query = query.filter(ApiEvent.created_at > after)
+        query = query.filter(ApiEvent.created_at >= after)
+        if after_id is None:
+            query = query.filter(ApiEvent.created_at > after)
+        else:
+            query = query.filter(
+                or_(
+                    ApiEvent.created_at > after,
+                    and_(ApiEvent.created_at == after, ApiEvent.id > after_id),
+                )
+            )
+
+    return [
+        fields.serialize_dict(
+            {
+                "id": event.id,
+                "created_at": event.created_at.isoformat(),
+                "name": event.name,
+                "user_id": event.user_id,
+                "data": event.data,
+            }
+        )
+        for event in query.limit(page_size).all()
+    ]
 
-    if before is not None:
-        query = query.filter(ApiEvent.created_at < before)
+
+def _get_events_query(only_files, project_id):
+    query = ApiEvent.query.order_by(ApiEvent.created_at.desc())
 
     if only_files:
         query = query.filter(
@@ -33,19 +142,7 @@ def get_last_events(
     if project_id is not None:
         query = query.filter(ApiEvent.project_id == project_id)
 
-    events = query.limit(page_size).all()
-    return [
-        fields.serialize_dict(
-            {
-                "id": event.id,
-                "created_at": event.created_at,
-                "name": event.name,
-                "user_id": event.user_id,
-                "data": event.data,
-            }
-        )
-        for event in events
-    ]
+    return query
 
 
 def create_login_log(person_id, ip_address, origin):
@@ -253,3 +253,7 @@ class WrongTaskTypeForEntityException(Exception):
 
 class IsUserLimitReachedException(Exception):
     pass
+
+
+class DatabaseBackupException(Exception):
+    pass
@@ -1,6 +1,3 @@
-import itertools
-from operator import itemgetter
-
 from zou.app.models.file_status import FileStatus
 from zou.app import app
 
@@ -132,38 +129,15 @@ def get_last_working_files_for_task(task_id):
     """
     Get last revisions for given task grouped by file name.
     """
-    query = WorkingFile.query.with_entities(
-        WorkingFile.name,
-        WorkingFile.task_id,
-        func.max(WorkingFile.revision).label("MAX"),
-    ).group_by(
-        WorkingFile.name,
-        WorkingFile.task_id,
-    )
-
-    query = query.filter(WorkingFile.task_id == task_id)
-    statement = query.subquery()
-
-    query = WorkingFile.query.join(
-        statement,
-        and_(
-            WorkingFile.task_id == statement.c.task_id,
-            WorkingFile.name == statement.c.name,
-            WorkingFile.revision == statement.c.MAX,
-        ),
+    query = WorkingFile.query.filter(WorkingFile.task_id == task_id)
+    query = query_utils.get_first_per_group(
+        query, [WorkingFile.name], WorkingFile.revision.desc()
     )
-
-    # query
-    working_files = fields.serialize_models(query.all())
-
-    # group by name
-    working_files_by_name = {
-        k: list(v)[0]
-        for k, v in itertools.groupby(working_files, key=itemgetter("name"))
+    return {
+        working_file.name: working_file.serialize()
+        for working_file in query.all()
     }
 
-    return working_files_by_name
-
 
 def get_next_working_revision(task_id, name):
     """
@@ -820,9 +794,14 @@ def get_output_files_for_output_type_and_asset_instance(
 
 
 def remove_preview_file(preview_file_id):
+    from zou.app.services import tasks_service
+
     preview_file = get_preview_file_raw(preview_file_id)
-    preview_file.delete()
     task = Task.get(preview_file.task_id)
+    is_last_preview_file = task.last_preview_file_id == preview_file.id
+    preview_file.delete()
+    if is_last_preview_file:
+        tasks_service.refresh_last_comments_and_preview_files([task.id])
     events.emit(
         "preview-file:delete",
         {"preview_file_id": preview_file_id},
@@ -1,13 +1,53 @@
+import atexit
+import collections
+import threading
+
 from pathlib import Path
 
-from zou.app.utils import indexing
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+
+from zou.app.utils import events, indexing
+from zou.app.utils import query as query_utils
+
+from zou.app import app, config
+from zou.app.index_schema import (
+    asset_schema,
+    entry_schema,
+    init_indexes,
+    person_schema,
+)
+from zou.app.models.comment import Comment
+from zou.app.models.entity import Entity
+from zou.app.models.entity_type import EntityType
+from zou.app.models.person import Person
+from zou.app.models.project import Project
+from zou.app.models.task import Task
+from zou.app.models.task_type import TaskType
+
+from zou.app.services import assets_service, persons_service
+
+from whoosh.index import EmptyIndexError
 
-from zou.app import app
-from zou.app.index_schema import asset_schema, person_schema, init_indexes
+ENTRY_ENTITY_TYPES = ["Episode", "Sequence", "Shot"]
+ENTRY_TYPES = ENTRY_ENTITY_TYPES + ["Task", "Comment"]
+ENTRY_EVENTS = [
+    "%s:%s" % (model_name, action)
+    for model_name in ["episode", "sequence", "shot", "task", "comment"]
+    for action in ["new", "update", "delete"]
+]
+COMMENT_EXCERPT_SIZE = 200
 
-from zou.app.services import assets_service, persons_service, projects_service
+# Changes waiting to be written, per index name: entry id -> document (None
+# for a removal). They are applied in batches by flush_index_queues.
+index_queues = {}
+index_queues_lock = threading.Lock()
+index_flush_lock = threading.Lock()
+index_flush_timer = None
 
-from whoosh.index import EmptyIndexError
+# Fields of the documents removed along with the entry they refer to (tasks
+# and comments of a deleted entity, comments of a deleted task).
+index_cascade_fields = {"entries": ["entity_id", "task_id"]}
 
 
 def get_index(index_name):
@@ -33,30 +73,141 @@ def get_person_index():
     return get_index("persons")
 
 
-def reset_index():
+def get_entry_index():
+    return get_index("entries")
+
+
+def reset_index(procs=1, multisegment=False):
     """
     Delete index and rebuild it by looping on all the assets listed in the
     database.
     """
-    reset_asset_index()
-    reset_person_index()
-
-
-def reset_entry_index(index_name, schema, get_entries, index_entry):
+    reset_asset_index(procs=procs, multisegment=multisegment)
+    reset_person_index(procs=procs, multisegment=multisegment)
+    reset_entry_search_index(procs=procs, multisegment=multisegment)
+
+
+def reset_entry_index(
+    index_name,
+    schema,
+    get_entries,
+    get_document,
+    procs=1,
+    multisegment=False,
+):
     """
     Clear and rebuild index for given parameters: folder name of the index,
-    schema, func to get entries to index, func to index a given entry.
+    schema, func to get entries to index, func to build the document of a
+    given entry. Documents are written by batches, with `procs` processes.
+    Queued changes for this index are dropped: the rebuild includes them.
     """
     index_path = Path(app.config["INDEXES_FOLDER"]) / index_name
-    try:
-        index = indexing.create_index(index_path, schema)
-    except FileNotFoundError:
-        init_indexes()
-        index = indexing.create_index(index_path, schema)
-    entries = get_entries()
-    for entry in entries:
-        index_entry(entry, index=index)
-    print(len(entries), "%s indexed" % index_name)
+    with index_flush_lock:
+        with index_queues_lock:
+            index_queues.pop(index_name, None)
+        try:
+            index = indexing.create_index(index_path, schema)
+        except FileNotFoundError:
+            init_indexes()
+            index = indexing.create_index(index_path, schema)
+        nb_entries = indexing.index_documents(
+            index,
+            (get_document(entry) for entry in get_entries()),
+            batch_size=app.config["INDEXES_BATCH_SIZE"],
+            procs=procs,
+            multisegment=multisegment,
+        )
+    print(nb_entries, "%s indexed" % index_name)
+
+
+def queue_index_change(index_name, entry_id, document):
+    """
+    Queue a change for given index: the document of given entry is replaced
+    by given document, or removed if the document is None. Queued changes
+    are applied in a batch after INDEXES_FLUSH_INTERVAL seconds, or as soon
+    as INDEXES_BATCH_SIZE changes are queued. Without interval, changes are
+    applied right away.
+    """
+    with index_queues_lock:
+        queue = index_queues.setdefault(index_name, collections.OrderedDict())
+        queue.pop(entry_id, None)
+        queue[entry_id] = document
+        nb_changes = sum(len(queue) for queue in index_queues.values())
+        interval = app.config["INDEXES_FLUSH_INTERVAL"]
+        is_flush_needed = (
+            interval <= 0 or nb_changes >= app.config["INDEXES_BATCH_SIZE"]
+        )
+        if not is_flush_needed:
+            start_index_flush_timer(interval)
+    if is_flush_needed:
+        flush_index_queues()
+    return entry_id
+
+
+def start_index_flush_timer(interval):
+    """
+    Schedule a flush of all queues in given number of seconds, unless one is
+    already scheduled. It must be called with the queues lock held.
+    """
+    global index_flush_timer
+    if index_flush_timer is None:
+        index_flush_timer = threading.Timer(interval, flush_index_queues)
+        index_flush_timer.daemon = True
+        index_flush_timer.start()
+
+
+def requeue_index_changes(index_name, changes):
+    """
+    Put back changes that could not be applied, unless a newer change for
+    the same entry was queued meanwhile. A flush is scheduled to retry them.
+    """
+    with index_queues_lock:
+        queue = index_queues.setdefault(index_name, collections.OrderedDict())
+        for (entry_id, document) in reversed(changes):
+            if entry_id not in queue:
+                queue[entry_id] = document
+                queue.move_to_end(entry_id, last=False)
+        start_index_flush_timer(max(app.config["INDEXES_FLUSH_INTERVAL"], 1.0))
+
+
+def flush_index_queues(index_names=None):
+    """
+    Apply queued changes of given indexes (all indexes by default), with one
+    writer per index. If changes of an index can't be applied (index locked
+    by another writer, writing error), they are logged and queued again. It
+    returns the applied changes per index.
+    """
+    global index_flush_timer
+    applied_changes = {}
+    with index_flush_lock:
+        with index_queues_lock:
+            if index_names is None:
+                index_names = list(index_queues.keys())
+                index_flush_timer = None
+            changes = {
+                index_name: list(index_queues.pop(index_name).items())
+                for index_name in index_names
+                if index_name in index_queues
+            }
+        for (index_name, index_changes) in changes.items():
+            try:
+                indexing.apply_changes(
+                    get_index(index_name),
+                    index_changes,
+                    cascade_fields=index_cascade_fields.get(index_name, []),
+                )
+                applied_changes[index_name] = index_changes
+            except Exception:
+                app.logger.error(
+                    "Changes of index %s can't be applied, they are queued "
+                    "again." % index_name,
+                    exc_info=1,
+                )
+                requeue_index_changes(index_name, index_changes)
+    return applied_changes
+
+
+atexit.register(flush_index_queues)
 
 
 def remove_entry_index(index, entry_id):
@@ -69,18 +220,38 @@ def remove_entry_index(index, entry_id):
     return entry_id
 
 
-def reset_asset_index():
+def reset_asset_index(procs=1, multisegment=False):
     reset_entry_index(
-        "assets", asset_schema, assets_service.get_all_raw_assets, index_asset
+        "assets",
+        asset_schema,
+        assets_service.get_all_raw_assets,
+        get_asset_document,
+        procs=procs,
+        multisegment=multisegment,
     )
 
 
-def reset_person_index():
+def reset_person_index(procs=1, multisegment=False):
     reset_entry_index(
         "persons",
         person_schema,
         persons_service.get_all_raw_active_persons,
-        index_person,
+        get_person_document,
+        procs=procs,
+        multisegment=multisegment,
+    )
+
+
+def reset_entry_search_index(procs=1, multisegment=False):
+    reset_entry_index(
+        "entries",
+        entry_schema,
+        lambda: get_entry_documents(
+            batch_size=app.config["INDEXES_BATCH_SIZE"]
+        ),
+        lambda document: document,
+        procs=procs,
+        multisegment=multisegment,
     )
 
 
@@ -90,19 +261,27 @@ def search_assets(query, project_ids=[], limit=3):
     a list of assets with extra data like the project name and the asset type
     name (3 results maximum by default).
     """
+    flush_index_queues(["assets"])
     index = get_asset_index()
-    assets = []
-
     ids = indexing.search(index, query, project_ids, limit=limit)
-
-    for asset_id in ids:
-        asset = assets_service.get_asset(asset_id)
-        asset_type = assets_service.get_asset_type(asset["entity_type_id"])
-        project = projects_service.get_project(asset["project_id"])
-        asset["project_name"] = project["name"]
-        asset["asset_type_name"] = asset_type["name"]
-        assets.append(asset)
-    return assets
+    if len(ids) == 0:
+        return []
+
+    rows = (
+        Entity.query.filter(Entity.id.in_(ids))
+        .join(Project, EntityType)
+        .add_columns(Project.name, EntityType.name)
+        .all()
+    )
+    assets_by_id = {}
+    for (asset_model, project_name, asset_type_name) in rows:
+        asset = asset_model.serialize(obj_type="Asset")
+        asset["project_name"] = project_name
+        asset["asset_type_name"] = asset_type_name
+        assets_by_id[asset["id"]] = asset
+    return [
+        assets_by_id[asset_id] for asset_id in ids if asset_id in assets_by_id
+    ]
 
 
 def search_persons(query, limit=3):
@@ -110,6 +289,7 @@ def search_persons(query, limit=3):
     Perform a search on the index. The query is a simple string. The result is
     a list of persons (3 results maximum by default).
     """
+    flush_index_queues(["persons"])
     index = get_person_index()
     persons = []
     ids = indexing.search(index, query, limit=limit)
@@ -119,43 +299,377 @@ def search_persons(query, limit=3):
     return persons
 
 
+def get_asset_document(asset):
+    return {
+        "name": asset.name,
+        "project_id": str(asset.project_id),
+        "episode_id": str(asset.source_id),
+        "id": str(asset.id),
+    }
+
+
+def get_person_document(person):
+    return {"name": person.full_name(), "id": str(person.id)}
+
+
 def index_asset(asset, index=None):
     """
-    Register asset into the index.
+    Register asset into the index. Without index given, the change is
+    queued and applied with the next batch.
     """
     if index is None:
-        index = get_asset_index()
-    return indexing.index_data(
-        index,
-        {
-            "name": asset.name,
-            "project_id": str(asset.project_id),
-            "episode_id": str(asset.source_id),
-            "id": str(asset.id),
-        },
-    )
+        return queue_index_change(
+            "assets", str(asset.id), get_asset_document(asset)
+        )
+    return indexing.index_data(index, get_asset_document(asset))
 
 
 def index_person(person, index=None):
     """
-    Register person into the index.
+    Register person into the index. Without index given, the change is
+    queued and applied with the next batch.
     """
     if index is None:
-        index = get_person_index()
-    return indexing.index_data(
-        index, {"name": person.full_name(), "id": str(person.id)}
-    )
+        return queue_index_change(
+            "persons", str(person.id), get_person_document(person)
+        )
+    return indexing.index_data(index, get_person_document(person))
 
 
 def remove_asset_index(asset_id):
     """
-    Remove document matching given asset id from asset index.
+    Remove document matching given asset id from asset index. The change is
+    queued and applied with the next batch.
     """
-    return remove_entry_index(get_asset_index(), str(asset_id))
+    return queue_index_change("assets", str(asset_id), None)
 
 
 def remove_person_index(person_id):
     """
-    Remove document matching given person id from person index.
+    Remove document matching given person id from person index. The change
+    is queued and applied with the next batch.
+    """
+    return queue_index_change("persons", str(person_id), None)
+
+
+def get_entry_title(*names):
+    return " / ".join(name for name in names if name)
+
+
+def filter_on_entity(query, entity_id, sequence, episode):
+    """
+    Keep rows related to given entity: the entity itself or the entities of
+    which it is the sequence or the episode.
+    """
+    if entity_id is None:
+        return query
+    return query.filter(
+        or_(
+            Entity.id == entity_id,
+            sequence.id == entity_id,
+            episode.id == entity_id,
+        )
+    )
+
+
+def get_entity_entries_query(entity_id=None):
+    sequence = aliased(Entity)
+    episode = aliased(Entity)
+    query = (
+        Entity.query.join(EntityType, Entity.entity_type_id == EntityType.id)
+        .join(Project, Entity.project_id == Project.id)
+        .outerjoin(sequence, Entity.parent_id == sequence.id)
+        .outerjoin(episode, sequence.parent_id == episode.id)
+        .filter(EntityType.name.in_(ENTRY_ENTITY_TYPES))
+        .filter(Entity.canceled.isnot(True))
+        .with_entities(
+            Entity.id,
+            Entity.name,
+            Entity.project_id,
+            EntityType.name.label("type"),
+            Project.name.label("project_name"),
+            sequence.name.label("parent_name"),
+            episode.name.label("grand_parent_name"),
+        )
+    )
+    return filter_on_entity(query, entity_id, sequence, episode)
+
+
+def get_task_entries_query(entity_id=None, task_id=None):
+    sequence = aliased(Entity)
+    episode = aliased(Entity)
+    query = (
+        Task.query.join(Entity, Task.entity_id == Entity.id)
+        .join(TaskType, Task.task_type_id == TaskType.id)
+        .join(Project, Task.project_id == Project.id)
+        .outerjoin(sequence, Entity.parent_id == sequence.id)
+        .outerjoin(episode, sequence.parent_id == episode.id)
+        .with_entities(
+            Task.id,
+            Task.project_id,
+            Task.entity_id,
+            Entity.name.label("entity_name"),
+            TaskType.name.label("task_type_name"),
+            Project.name.label("project_name"),
+            sequence.name.label("parent_name"),
+            episode.name.label("grand_parent_name"),
+        )
+    )
+    if task_id is not None:
+        query = query.filter(Task.id == task_id)
+    return filter_on_entity(query, entity_id, sequence, episode)
+
+
+def get_comment_entries_query(entity_id=None, comment_id=None):
+    sequence = aliased(Entity)
+    episode = aliased(Entity)
+    query = (
+        Comment.query.join(Task, Comment.object_id == Task.id)
+        .join(Entity, Task.entity_id == Entity.id)
+        .join(TaskType, Task.task_type_id == TaskType.id)
+        .join(Project, Task.project_id == Project.id)
+        .outerjoin(Person, Comment.person_id == Person.id)
+        .outerjoin(sequence, Entity.parent_id == sequence.id)
+        .outerjoin(episode, sequence.parent_id == episode.id)
+        .filter(Comment.text != None)
+        .filter(Comment.text != "")
+        .with_entities(
+            Comment.id,
+            Comment.text,
+            Task.id.label("task_id"),
+            Task.project_id,
+            Task.entity_id,
+            Entity.name.label("entity_name"),
+            TaskType.name.label("task_type_name"),
+            Project.name.label("project_name"),
+            Person.first_name,
+            Person.last_name,
+            sequence.name.label("parent_name"),
+            episode.name.label("grand_parent_name"),
+        )
+    )
+    if comment_id is not None:
+        query = query.filter(Comment.id == comment_id)
+    return filter_on_entity(query, entity_id, sequence, episode)
+
+
+def get_entity_entry_document(row):
+    title = get_entry_title(row.grand_parent_name, row.parent_name, row.name)
+    return {
+        "id": str(row.id),
+        "type": row.type,
+        "name": title,
+        "project_id": str(row.project_id),
+        "entity_id": str(row.id),
+        "project_name": row.project_name,
+        "title": title,
+    }
+
+
+def get_task_entry_document(row):
+    title = get_entry_title(
+        row.grand_parent_name,
+        row.parent_name,
+        row.entity_name,
+        row.task_type_name,
+    )
+    return {
+        "id": str(row.id),
+        "type": "Task",
+        "name": title,
+        "project_id": str(row.project_id),
+        "entity_id": str(row.entity_id),
+        "task_id": str(row.id),
+        "project_name": row.project_name,
+        "title": title,
+    }
+
+
+def get_comment_entry_document(row):
+    document = {
+        "id": str(row.id),
+        "type": "Comment",
+        "name": row.text,
+        "project_id": str(row.project_id),
+        "entity_id": str(row.entity_id),
+        "task_id": str(row.task_id),
+        "project_name": row.project_name,
+        "title": get_entry_title(
+            row.grand_parent_name,
+            row.parent_name,
+            row.entity_name,
+            row.task_type_name,
+        ),
+        "text": row.text[:COMMENT_EXCERPT_SIZE],
+    }
+    if row.first_name is not None:
+        document["person_name"] = "%s %s" % (row.first_name, row.last_name)
+    return document
+
+
+def get_entry_documents(
+    entity_id=None, task_id=None, comment_id=None, batch_size=None
+):
+    """
+    Yield the documents of the entry index: shots, sequences, episodes,
+    tasks and comments with text. Given an entity, only the documents of
+    this entity, of the entities below it and of their tasks and comments
+    are yielded. Given a task or a comment, only its document is yielded.
+    With a batch size, rows are streamed from the database by batches.
+    """
+    sources = []
+    if task_id is None and comment_id is None:
+        sources.append(
+            (
+                get_entity_entries_query(entity_id),
+                Entity.id,
+                get_entity_entry_document,
+            )
+        )
+    if comment_id is None:
+        sources.append(
+            (
+                get_task_entries_query(entity_id, task_id),
+                Task.id,
+                get_task_entry_document,
+            )
+        )
+    if task_id is None:
+        sources.append(
+            (
+                get_comment_entries_query(entity_id, comment_id),
+                Comment.id,
+                get_comment_entry_document,
+            )
+        )
+    for (query, id_column, get_document) in sources:
+        if batch_size is None:
+            rows = query.all()
+        else:
+            rows = query_utils.get_rows_by_batches(
+                query, id_column, batch_size=batch_size
+            )
+        for row in rows:
+            yield get_document(row)
+
+
+def index_search_entries(entity_id=None, task_id=None, comment_id=None):
+    """
+    Queue the documents of given entity (with the entries below it, their
+    titles include its name), task or comment. The entry is removed from
+    the index if it's no longer searchable (canceled entity, comment without
+    text).
+    """
+    entry_id = str(entity_id or task_id or comment_id)
+    documents = get_entry_documents(
+        entity_id=entity_id, task_id=task_id, comment_id=comment_id
+    )
+    is_indexed = False
+    for document in documents:
+        is_indexed = is_indexed or document["id"] == entry_id
+        queue_index_change("entries", document["id"], document)
+    if not is_indexed:
+        remove_search_entry(entry_id)
+    return entry_id
+
+
+def index_search_entity(entity_id):
+    """
+    Queue the document of given entity. The entries below it (shots, tasks
+    and comments) are re-indexed only when its title changed, as their
+    titles include it: other updates cost a single query.
     """
-    return remove_entry_index(get_person_index(), str(person_id))
+    entity_id = str(entity_id)
+    rows = get_entity_entries_query().filter(Entity.id == entity_id).all()
+    if len(rows) == 0:
+        return remove_search_entry(entity_id)
+    document = get_entity_entry_document(rows[0])
+    previous_document = get_indexed_document("entries", entity_id)
+    queue_index_change("entries", entity_id, document)
+    if (
+        previous_document is not None
+        and previous_document.get("title") != document["title"]
+    ):
+        index_search_entries(entity_id=entity_id)
+    return entity_id
+
+
+def get_indexed_document(index_name, entry_id):
+    """
+    Return the document of given entry: the queued one if a change is
+    pending, the stored fields of the index otherwise (None if the entry is
+    not indexed).
+    """
+    with index_queues_lock:
+        queue = index_queues.get(index_name, {})
+        if entry_id in queue:
+            return queue[entry_id]
+    return indexing.get_document(get_index(index_name), entry_id)
+
+
+def remove_search_entry(entry_id):
+    """
+    Remove given entry from the entry index, with the tasks and comments
+    related to it. The change is queued and applied with the next batch.
+    """
+    return queue_index_change("entries", str(entry_id), None)
+
+
+def handle_entry_event(event_name, data):
+    """
+    Update the entry index for given event about an episode, a sequence, a
+    shot, a task or a comment.
+    """
+    (model_name, action) = event_name.split(":")
+    entry_id = data.get("%s_id" % model_name)
+    if entry_id is None:
+        return None
+    elif action == "delete":
+        return remove_search_entry(entry_id)
+    elif model_name == "task":
+        return index_search_entries(task_id=entry_id)
+    elif model_name == "comment":
+        return index_search_entries(comment_id=entry_id)
+    else:
+        return index_search_entity(entry_id)
+
+
+class EntryEventHandler(object):
+    """
+    Event handler keeping the entry index current. Handlers only receive the
+    event data, so one handler is registered for each event name.
+    """
+
+    def __init__(self, event_name):
+        self.event_name = event_name
+
+    def handle_event(self, data):
+        result = handle_entry_event(self.event_name, data)
+        if config.ENABLE_JOB_QUEUE:
+            # Queued handlers run in a work-horse process that exits without
+            # running the flush timer or the exit handlers.
+            flush_index_queues(["entries"])
+        return result
+
+
+def register_event_handlers(app=None):
+    """
+    Register the handlers updating the entry index in the event manager.
+    """
+    for event_name in ENTRY_EVENTS:
+        events.register(
+            event_name, "entry_index", EntryEventHandler(event_name), app
+        )
+
+
+def search_entries(query, project_ids=[], types=ENTRY_TYPES, limit=3):
+    """
+    Perform a search on the entry index. The query is a simple string. The
+    result is a list of the stored fields of matching shots, sequences,
+    episodes, tasks and comments (3 results maximum per type by default):
+    they are enough to render the results without querying the database.
+    """
+    flush_index_queues(["entries"])
+    return indexing.search_documents(
+        get_entry_index(), query, project_ids, types=types, limit=limit
+    )
@@ -1,6 +1,14 @@
 import slugify
 
+from sqlalchemy.orm import aliased
+
+from zou.app.models.entity import Entity
+from zou.app.models.entity_type import EntityType
 from zou.app.models.organisation import Organisation
+from zou.app.models.preview_file import PreviewFile
+from zou.app.models.project import Project
+from zou.app.models.task import Task
+from zou.app.models.task_type import TaskType
 from zou.app.services import (
     entities_service,
     files_service,
@@ -50,6 +58,80 @@ def get_full_entity_name(entity_id):
     return (name, episode_id)
 
 
+def get_full_entity_names(entity_ids):
+    """
+    Bulk version of get_full_entity_name. Entities, their parent, their
+    grand parent and their entity type are retrieved with a single query.
+    It returns a dict where keys are entity ids and values are tuples made
+    of the full entity name and the episode id.
+    """
+    entity_ids = list(set(str(entity_id) for entity_id in entity_ids))
+    if len(entity_ids) == 0:
+        return {}
+
+    Parent = aliased(Entity, name="parent")
+    GrandParent = aliased(Entity, name="grand_parent")
+    query = (
+        Entity.query.join(EntityType, Entity.entity_type_id == EntityType.id)
+        .outerjoin(Parent, Parent.id == Entity.parent_id)
+        .outerjoin(GrandParent, GrandParent.id == Parent.parent_id)
+        .filter(Entity.id.in_(entity_ids))
+        .with_entities(
+            Entity.id,
+            Entity.name,
+            Entity.entity_type_id,
+            Entity.source_id,
+            EntityType.name,
+            Parent.id,
+            Parent.name,
+            GrandParent.id,
+            GrandParent.name,
+        )
+    )
+
+    shot_type_id = shots_service.get_shot_type()["id"]
+    sequence_type_id = shots_service.get_sequence_type()["id"]
+    episode_type_id = shots_service.get_episode_type()["id"]
+    names = {}
+    for (
+        entity_id,
+        name,
+        entity_type_id,
+        source_id,
+        entity_type_name,
+        parent_id,
+        parent_name,
+        grand_parent_id,
+        grand_parent_name,
+    ) in query.all():
+        entity_type_id = str(entity_type_id)
+        episode_id = None
+        if entity_type_id == shot_type_id:
+            if grand_parent_id is None:
+                full_name = "%s / %s" % (parent_name, name)
+            else:
+                episode_id = str(grand_parent_id)
+                full_name = "%s / %s / %s" % (
+                    grand_parent_name,
+                    parent_name,
+                    name,
+                )
+        elif entity_type_id == episode_type_id:
+            full_name = name
+        elif entity_type_id == sequence_type_id:
+            if parent_id is None:
+                full_name = name
+            else:
+                episode_id = str(parent_id)
+                full_name = "%s / %s" % (parent_name, name)
+        else:
+            if source_id is not None:
+                episode_id = str(source_id)
+            full_name = "%s / %s" % (entity_type_name, name)
+        names[str(entity_id)] = (full_name, episode_id)
+    return names
+
+
 def get_preview_file_name(preview_file_id):
     """
     Build unique and human readable file name for preview downloads. The
@@ -62,7 +144,76 @@ def get_preview_file_name(preview_file_id):
     task_type = tasks_service.get_task_type(task["task_type_id"])
     project = projects_service.get_project(task["project_id"])
     (entity_name, _) = get_full_entity_name(task["entity_id"])
+    return _build_preview_file_name(
+        organisation,
+        preview_file,
+        project["name"],
+        entity_name,
+        task_type["name"],
+    )
+
+
+def get_preview_file_names(preview_file_ids):
+    """
+    Bulk version of get_preview_file_name. Preview files, tasks, task types
+    and projects are retrieved with a single query and entity names with
+    another one. It returns a dict where keys are preview file ids and
+    values are file names.
+    """
+    preview_file_ids = list(set(str(pf_id) for pf_id in preview_file_ids))
+    if len(preview_file_ids) == 0:
+        return {}
+
+    organisation = Organisation.query.first()
+    rows = (
+        PreviewFile.query.join(Task, PreviewFile.task_id == Task.id)
+        .join(TaskType, Task.task_type_id == TaskType.id)
+        .join(Project, Task.project_id == Project.id)
+        .filter(PreviewFile.id.in_(preview_file_ids))
+        .with_entities(
+            PreviewFile.id,
+            PreviewFile.revision,
+            PreviewFile.position,
+            PreviewFile.extension,
+            PreviewFile.original_name,
+            Project.name,
+            TaskType.name,
+            Task.entity_id,
+        )
+        .all()
+    )
+    entity_names = get_full_entity_names([row[-1] for row in rows])
+
+    names = {}
+    for (
+        preview_file_id,
+        revision,
+        position,
+        extension,
+        original_name,
+        project_name,
+        task_type_name,
+        entity_id,
+    ) in rows:
+        preview_file = {
+            "revision": revision,
+            "position": position,
+            "extension": extension,
+            "original_name": original_name,
+        }
+        names[str(preview_file_id)] = _build_preview_file_name(
+            organisation,
+            preview_file,
+            project_name,
+            entity_names[str(entity_id)][0],
+            task_type_name,
+        )
+    return names
+
 
+def _build_preview_file_name(
+    organisation, preview_file, project_name, entity_name, task_type_name
+):
     if (
         organisation.use_original_file_name
         and preview_file.get("original_name", None) is not None
@@ -70,9 +221,9 @@ def get_preview_file_name(preview_file_id):
         name = preview_file["original_name"]
     else:
         name = "%s_%s_%s_v%s" % (
-            project["name"],
+            project_name,
             entity_name,
-            task_type["name"],
+            task_type_name,
             preview_file["revision"],
         )
         name = slugify.slugify(name, separator="_")
@@ -1,7 +1,9 @@
+import datetime
 import math
 
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
 
+from zou.app import db
 from zou.app.models.comment import Comment
 from zou.app.models.entity import Entity
 from zou.app.models.news import News
@@ -11,6 +13,7 @@ from zou.app.models.task import Task
 
 from zou.app.utils import cache, events, fields
 from zou.app.services import names_service, tasks_service
+from zou.app.services.exception import WrongParameterException
 
 
 def create_news(
@@ -63,6 +66,48 @@ def create_news_for_task_and_comment(
     return news
 
 
+def create_news_for_tasks_and_comments(entries):
+    """
+    Bulk version of create_news_for_task_and_comment. Entries are
+    (task, comment, change) tuples. All news are stored with a single insert
+    statement.
+    """
+    now = datetime.datetime.utcnow()
+    news_list = [
+        {
+            "id": fields.gen_uuid(),
+            "change": change,
+            "author_id": comment["person_id"],
+            "comment_id": comment["id"],
+            "preview_file_id": comment["preview_file_id"],
+            "task_id": comment["object_id"],
+            "created_at": comment["created_at"] or now,
+            "updated_at": now,
+        }
+        for (_, comment, change) in entries
+    ]
+    if len(news_list) > 0:
+        try:
+            db.session.execute(News.__table__.insert(), news_list)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            db.session.remove()
+            raise
+
+    for (news, (task, comment, _)) in zip(news_list, entries):
+        events.emit(
+            "news:new",
+            {
+                "news_id": str(news["id"]),
+                "task_status_id": comment["task_status_id"],
+                "task_type_id": task["task_type_id"],
+            },
+            project_id=task["project_id"],
+        )
+    return fields.serialize_list(news_list)
+
+
 def delete_news_for_comment(comment_id):
     """
     Delete all news related to comment. It's mandatory to be able to delete the
@@ -93,15 +138,22 @@ def get_last_news_for_project(
     page_size=50,
     before=None,
     after=None,
+    cursor=None,
+    with_total=True,
 ):
     """
     Return last 50 news for given project. Add related information to make it
     displayable.
+
+    If a cursor is given (the id of the last news of the previous page), the
+    news are paginated on creation date and id instead of using an offset.
+    Computing the total can be skipped with the with_total flag, the total
+    and the number of pages are then set to None.
     """
     offset = (page - 1) * page_size
 
     query = (
-        News.query.order_by(News.created_at.desc())
+        News.query.order_by(News.created_at.desc(), News.id.desc())
         .join(Task, News.task_id == Task.id)
         .join(Project)
         .join(Entity, Task.entity_id == Entity.id)
@@ -137,7 +189,14 @@ def get_last_news_for_project(
     if before is not None:
         query = query.filter(News.created_at < before)
 
-    (total, nb_pages) = _get_news_total(query, page_size)
+    total = None
+    nb_pages = None
+    if with_total:
+        (total, nb_pages) = _get_news_total(query, page_size)
+
+    if cursor is not None:
+        query = _filter_news_before_cursor(query, cursor)
+        offset = 0
 
     query = query.add_columns(
         Project.id,
@@ -153,6 +212,12 @@ def get_last_news_for_project(
     query = query.limit(page_size)
     query = query.offset(offset)
     news_list = query.all()
+    entity_names = names_service.get_full_entity_names(
+        [
+            task_entity_id
+            for (_, _, _, _, _, _, task_entity_id, _, _) in news_list
+        ]
+    )
     result = []
 
     for (
@@ -166,9 +231,7 @@ def get_last_news_for_project(
         preview_file_extension,
         entity_preview_file_id,
     ) in news_list:
-        (full_entity_name, episode_id) = names_service.get_full_entity_name(
-            task_entity_id
-        )
+        (full_entity_name, episode_id) = entity_names[str(task_entity_id)]
 
         result.append(
             fields.serialize_dict(
@@ -193,6 +256,10 @@ def get_last_news_for_project(
                 }
             )
         )
+
+    next_cursor = None
+    if len(result) == page_size:
+        next_cursor = result[-1]["id"]
     return {
         "data": result,
         "total": total,
@@ -200,9 +267,33 @@ def get_last_news_for_project(
         "limit": page_size,
         "offset": offset,
         "page": page,
+        "next_cursor": next_cursor,
     }
 
 
+def _filter_news_before_cursor(query, cursor):
+    """
+    Keep only news that come after the cursor news in the feed order
+    (creation date then id, descending). Raise a WrongParameterException if
+    the cursor is not the id of an existing news.
+    """
+    cursor_news = None
+    if fields.is_valid_id(str(cursor)):
+        cursor_news = (
+            News.query.filter(News.id == cursor)
+            .with_entities(News.id, News.created_at)
+            .first()
+        )
+    if cursor_news is None:
+        raise WrongParameterException(
+            "Cursor %s is not a valid news id." % cursor
+        )
+    return query.filter(
+        tuple_(News.created_at, News.id)
+        < tuple_(cursor_news.created_at, cursor_news.id)
+    )
+
+
 def _get_news_total(query, page_size):
     total = query.count()
     nb_pages = int(math.ceil(total / float(page_size)))
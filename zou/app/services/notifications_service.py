@@ -1,6 +1,10 @@
+import datetime
+
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import StatementError
 
-from zou.app.models.comment import Comment
+from zou.app import db
+
 from zou.app.models.project import Project
 from zou.app.models.entity import Entity
 from zou.app.models.notification import Notification
@@ -41,8 +45,19 @@ def create_notification(
     created_at=None,
 ):
     """
-    Create a new notification for given person and comment.
+    Create a new notification for given person and comment. If the same
+    notification already exists for this comment, it is returned instead.
     """
+    if comment_id is not None:
+        notification = Notification.get_by(
+            person_id=person_id,
+            author_id=author_id,
+            comment_id=comment_id,
+            reply_id=reply_id,
+            type=type,
+        )
+        if notification is not None:
+            return notification.serialize()
     creation_date = fields.get_default_date_object(created_at)
     notification = Notification.create(
         read=read,
@@ -60,22 +75,31 @@ def create_notification(
 
 def get_notification_recipients(task, replies=[]):
     """
-    Get the list of notification recipients for given task: assignees and
-    every people who commented the task.
+    Get the list of notification recipients for given task: assignees,
+    people who subscribed to the task or to its sequence and people who
+    replied. Subscriptions are retrieved with a single query.
     """
-    recipients = set()
-    comments = Comment.get_all_by(object_id=task["id"])
-    task_subscriptions = get_task_subscriptions(task)
-    sequence_subscriptions = get_sequence_subscriptions(task)
-
-    for assignee_id in task["assignees"]:
-        recipients.add(assignee_id)
-
-    for subscription in task_subscriptions:
-        recipients.add(str(subscription.person_id))
-
-    for subscription in sequence_subscriptions:
-        recipients.add(str(subscription.person_id))
+    recipients = set(task["assignees"])
+    parent_id = (
+        Entity.query.filter(Entity.id == task["entity_id"])
+        .with_entities(Entity.parent_id)
+        .as_scalar()
+    )
+    subscriptions = (
+        Subscription.query.filter(
+            or_(
+                Subscription.task_id == task["id"],
+                and_(
+                    Subscription.task_type_id == task["task_type_id"],
+                    Subscription.entity_id == parent_id,
+                ),
+            )
+        )
+        .with_entities(Subscription.person_id)
+        .distinct()
+    )
+    for (person_id,) in subscriptions:
+        recipients.add(str(person_id))
 
     for reply in replies:
         recipients.add(reply["person_id"])
@@ -104,66 +128,161 @@ def get_sequence_subscriptions(task):
     return sequence_subscriptions
 
 
+def get_notification_key(notification):
+    return tuple(
+        str(notification[key]) if notification.get(key) is not None else None
+        for key in ["person_id", "author_id", "comment_id", "reply_id", "type"]
+    )
+
+
+def remove_existing_notifications(notifications):
+    """
+    Return given notifications without those already stored or given twice,
+    based on person, author, comment, reply and type. The unique constraint
+    of the notification table includes the creation date, because the table
+    is partitioned on it, so duplicates are filtered here. Notifications
+    that are not linked to a comment (like assignations) are all kept.
+    """
+    comment_ids = {
+        notification["comment_id"]
+        for notification in notifications
+        if notification.get("comment_id") is not None
+    }
+    keys = set()
+    if len(comment_ids) > 0:
+        existing_notifications = Notification.query.filter(
+            Notification.comment_id.in_(comment_ids)
+        ).with_entities(
+            Notification.person_id,
+            Notification.author_id,
+            Notification.comment_id,
+            Notification.reply_id,
+            Notification.type,
+        )
+        keys = {
+            get_notification_key(
+                {
+                    "person_id": person_id,
+                    "author_id": author_id,
+                    "comment_id": comment_id,
+                    "reply_id": reply_id,
+                    "type": notification_type.code,
+                }
+            )
+            for (
+                person_id,
+                author_id,
+                comment_id,
+                reply_id,
+                notification_type,
+            ) in existing_notifications
+        }
+    new_notifications = []
+    for notification in notifications:
+        if notification.get("comment_id") is not None:
+            key = get_notification_key(notification)
+            if key in keys:
+                continue
+            keys.add(key)
+        new_notifications.append(notification)
+    return new_notifications
+
+
+def create_notifications(notifications):
+    """
+    Store given notifications with a single insert statement. Ids and
+    creation dates are set here so they can be returned to the caller.
+    Notifications that already exist are skipped: only the stored ones are
+    returned.
+    """
+    now = datetime.datetime.utcnow()
+    if len(notifications) > 0:
+        notifications = remove_existing_notifications(notifications)
+    for notification in notifications:
+        notification["id"] = fields.gen_uuid()
+        notification.setdefault("read", False)
+        notification.setdefault("change", False)
+        notification.setdefault("created_at", now)
+        notification["updated_at"] = notification["created_at"]
+    if len(notifications) > 0:
+        try:
+            db.session.execute(Notification.__table__.insert(), notifications)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            db.session.remove()
+            raise
+    return notifications
+
+
 def create_notifications_for_task_and_comment(task, comment, change=False):
     """
     For given task and comment, create a notification for every assignee
-    to the task and to every person participating to this task.
+    to the task and to every person participating to this task. A mention
+    notification is created for every person mentioned in the comment.
+
+    Notifications are stored with a single insert and emails are sent through
+    a single job for all recipients.
     """
-    recipient_ids = get_notification_recipients(task)
-    if comment["person_id"] in recipient_ids:
-        recipient_ids.remove(comment["person_id"])
-    author_id = comment["person_id"]
-    task = tasks_service.get_task(comment["object_id"])
+    return create_notifications_for_tasks_and_comments(
+        [(task, comment, change)]
+    )[0]
 
-    for recipient_id in recipient_ids:
-        try:
-            notification = create_notification(
-                recipient_id,
-                comment_id=comment["id"],
-                author_id=author_id,
-                task_id=task["id"],
-                read=False,
-                change=change,
-                type="comment",
-            )
-            emails_service.send_comment_notification(
-                recipient_id, author_id, comment, task
-            )
-            events.emit(
-                "notification:new",
-                {
-                    "notification_id": notification["id"],
-                    "person_id": recipient_id,
-                },
-                project_id=task["project_id"],
-                persist=False,
-            )
-        except PersonNotFoundException:
-            pass
 
-    for recipient_id in comment["mentions"]:
-        if recipient_id != comment["person_id"]:
-            notification = create_notification(
-                recipient_id,
-                comment_id=comment["id"],
-                author_id=comment["person_id"],
-                task_id=comment["object_id"],
-                type="mention",
-            )
-            emails_service.send_mention_notification(
-                recipient_id, author_id, comment, task
-            )
-            events.emit(
-                "notification:new",
-                {
-                    "notification_id": notification["id"],
-                    "person_id": recipient_id,
-                },
-                project_id=task["project_id"],
-                persist=False,
-            )
+def create_notifications_for_tasks_and_comments(entries):
+    """
+    Bulk version of create_notifications_for_task_and_comment. Entries are
+    (task, comment, change) tuples. Notifications of all entries are stored
+    with a single insert. It returns the recipient ids of each entry.
+    """
+    notifications = []
+    project_ids = {}
+    deliveries = []
+    for (task, comment, change) in entries:
+        author_id = comment["person_id"]
+        recipient_ids = get_notification_recipients(task)
+        recipient_ids.discard(author_id)
+        mention_ids = [
+            person_id
+            for person_id in dict.fromkeys(comment["mentions"])
+            if person_id != author_id
+        ]
+        for (notification_type, person_ids) in [
+            ("comment", recipient_ids),
+            ("mention", mention_ids),
+        ]:
+            for recipient_id in person_ids:
+                notifications.append(
+                    {
+                        "person_id": recipient_id,
+                        "author_id": author_id,
+                        "comment_id": comment["id"],
+                        "task_id": task["id"],
+                        "change": (
+                            change if notification_type == "comment" else False
+                        ),
+                        "type": notification_type,
+                    }
+                )
+                project_ids[task["id"]] = task["project_id"]
+        deliveries.append((task, comment, recipient_ids, mention_ids))
+
+    for notification in create_notifications(notifications):
+        events.emit(
+            "notification:new",
+            {
+                "notification_id": str(notification["id"]),
+                "person_id": notification["person_id"],
+            },
+            project_id=project_ids[notification["task_id"]],
+            persist=False,
+        )
 
-    return recipient_ids
+    for (task, comment, recipient_ids, mention_ids) in deliveries:
+        emails_service.send_comment_notifications(
+            comment["person_id"], comment, task, recipient_ids, mention_ids
+        )
+    return [recipient_ids for (_, _, recipient_ids, _) in deliveries]
 
 
 def create_notifications_for_task_and_reply(task, comment, reply):
@@ -265,6 +384,43 @@ def create_assignation_notification(task_id, person_id, author_id=None):
         return None
 
 
+def create_assignation_notifications(tasks, person_id, author_id=None):
+    """
+    Bulk version of create_assignation_notification for given task dicts.
+    Notifications are stored with a single insert.
+    """
+    notifications = []
+    assigned_tasks = []
+    for task in tasks:
+        task_author_id = author_id or task["assigner_id"]
+        if str(task_author_id) != person_id:
+            notifications.append(
+                {
+                    "person_id": person_id,
+                    "author_id": task_author_id,
+                    "task_id": task["id"],
+                    "type": "assignation",
+                }
+            )
+            assigned_tasks.append(task)
+
+    create_notifications(notifications)
+    for (notification, task) in zip(notifications, assigned_tasks):
+        emails_service.send_assignation_notification(
+            person_id, notification["author_id"], task
+        )
+        events.emit(
+            "notification:new",
+            {
+                "notification_id": str(notification["id"]),
+                "person_id": person_id,
+            },
+            project_id=task["project_id"],
+            persist=False,
+        )
+    return notifications
+
+
 def get_task_subscription_raw(person_id, task_id):
     """
     Return subscription matching given person and task.
@@ -166,6 +166,16 @@ def get_current_user_raw():
     return get_person_by_email_raw(get_jwt_identity())
 
 
+def get_persons_by_ids(person_ids):
+    """
+    Return persons matching given ids as dictionaries, with a single query.
+    """
+    if len(person_ids) == 0:
+        return []
+    persons = Person.query.filter(Person.id.in_(person_ids)).all()
+    return [person.serialize_safe() for person in persons]
+
+
 def get_persons_map():
     """
     Return a dict of which keys are person_id and values are person.
@@ -430,6 +440,7 @@ def add_to_department(department_id, person_id):
     department = Department.get(department_id)
     person.departments = person.departments + [department]
     person.save()
+    events.emit("person:update", {"person_id": str(person.id)})
     return person.serialize(relations=True)
 
 
@@ -444,6 +455,7 @@ def remove_from_department(department_id, person_id):
         if str(department.id) != department_id
     ]
     person.save()
+    events.emit("person:update", {"person_id": str(person.id)})
     return person.serialize(relations=True)
 
 
@@ -412,27 +412,30 @@ def retrieve_playlist_tmp_files(preview_files, full=False):
     """
     Retrieve all files for a given playlist into the temporary folder.
     """
-    file_paths = []
-    for preview_file in preview_files:
-        if full:
+    if full:
+        all_preview_files = []
+        for preview_file in preview_files:
             preview_file = files_service.get_preview_file(preview_file["id"])
-            sub_preview_files = (
+            all_preview_files += (
                 preview_files_service.get_preview_files_for_revision(
                     preview_file["task_id"], preview_file["revision"]
                 )
             )
-            for preview_file in sub_preview_files:
-                tmp_file_path, file_name = retrieve_playlist_tmp_file(
-                    preview_file
-                )
-                file_paths.append((tmp_file_path, file_name))
-        else:
-            tmp_file_path, file_name = retrieve_playlist_tmp_file(preview_file)
-            file_paths.append((tmp_file_path, file_name))
+        preview_files = all_preview_files
+
+    file_names = names_service.get_preview_file_names(
+        [preview_file["id"] for preview_file in preview_files]
+    )
+    file_paths = []
+    for preview_file in preview_files:
+        tmp_file_path, file_name = retrieve_playlist_tmp_file(
+            preview_file, file_names.get(preview_file["id"])
+        )
+        file_paths.append((tmp_file_path, file_name))
     return file_paths
 
 
-def retrieve_playlist_tmp_file(preview_file):
+def retrieve_playlist_tmp_file(preview_file, file_name=None):
     if preview_file["extension"] == "mp4":
         get_path_func = file_store.get_local_movie_path
         open_func = file_store.open_movie
@@ -465,7 +468,8 @@ def retrieve_playlist_tmp_file(preview_file):
                             tmp_file.write(chunk)
                     except FileNotFound:
                         pass
-    file_name = names_service.get_preview_file_name(preview_file["id"])
+    if file_name is None:
+        file_name = names_service.get_preview_file_name(preview_file["id"])
     tmp_file_path = os.path.join(config.TMP_DIR, file_name)
     copyfile(file_path, tmp_file_path)
     return tmp_file_path, file_name
@@ -840,10 +844,11 @@ def generate_playlisted_entity_from_task(task_id):
     else:
         playlisted_entity = get_base_asset_for_playlist(entity, task_id)
 
-    task_type_id = task["task_type_id"]
     preview_files = get_preview_files_for_entity(entity["id"])
-    if task_type_id in preview_files and len(preview_files[task_type_id]) > 0:
-        preview_file = preview_files[task_type_id][0]
+    preview_file = get_task_preview_file(
+        task, preview_files.get(task["task_type_id"], [])
+    )
+    if preview_file is not None:
         playlisted_entity.update(
             {
                 "preview_file_id": preview_file["id"],
@@ -857,6 +862,29 @@ def generate_playlisted_entity_from_task(task_id):
     return playlisted_entity
 
 
+def get_task_preview_file(task, preview_files):
+    """
+    Return the last preview file of given task. Given preview files (the
+    ones of the entity for the task type, sorted from the last revision) can
+    belong to another task of the same type: the preview files of the task
+    are loaded in that case. The first given preview file is returned if the
+    task has no last preview file set yet.
+    """
+    last_preview_file_id = task["last_preview_file_id"]
+    if last_preview_file_id is None:
+        return preview_files[0] if len(preview_files) > 0 else None
+
+    for preview_file in preview_files:
+        if preview_file["id"] == last_preview_file_id:
+            return preview_file
+    for preview_file in mix_preview_file_revisions(
+        get_preview_files_for_task(task["id"])
+    ):
+        if preview_file["id"] == last_preview_file_id:
+            return preview_file
+    return None
+
+
 def get_base_episode_for_playlist(entity, task_id):
     episode = shots_service.get_episode(entity["id"])
     playlisted_entity = {
@@ -928,7 +956,7 @@ def get_preview_files_for_task(task_id):
     """
     preview_files = (
         PreviewFile.query.filter_by(task_id=task_id)
-        .order_by(PreviewFile.revision.desc())
+        .order_by(PreviewFile.revision.desc(), PreviewFile.created_at)
         .all()
     )
     return _get_playlist_preview_file_list(preview_files)
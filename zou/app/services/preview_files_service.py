@@ -500,14 +500,16 @@ def get_running_preview_files():
         .order_by(PreviewFile.created_at.desc())
     )
 
+    entries = entries.all()
+    entity_names = names_service.get_full_entity_names(
+        [entity_id for (_, _, _, entity_id) in entries]
+    )
     results = []
     for (preview_file, project_id, task_type_id, entity_id) in entries:
         result = preview_file.serialize()
         result["project_id"] = fields.serialize_value(project_id)
         result["task_type_id"] = fields.serialize_value(task_type_id)
-        (result["full_entity_name"], _) = names_service.get_full_entity_name(
-            entity_id
-        )
+        (result["full_entity_name"], _) = entity_names[str(entity_id)]
         results.append(result)
     return results
 
@@ -1,8 +1,11 @@
 from datetime import timedelta
 from operator import itemgetter
+from sqlalchemy import DateTime, Float, Integer, and_, cast, extract, func
 from sqlalchemy.orm import aliased
 from sqlalchemy.exc import IntegrityError, StatementError
 
+from zou.app import db
+
 from zou.app.utils import (
     cache,
     date_helpers,
@@ -12,7 +15,6 @@ from zou.app.utils import (
 )
 
 from zou.app.models.entity import Entity, EntityLink, EntityVersion
-from zou.app.models.person import Person
 from zou.app.models.project import Project
 from zou.app.models.schedule_item import ScheduleItem
 from zou.app.models.subscription import Subscription
@@ -842,12 +844,8 @@ def remove_shot(shot_id, force=False):
             project_id=str(shot.project_id),
         )
     else:
-        from zou.app.services import tasks_service
-
         tasks = Task.query.filter_by(entity_id=shot_id).all()
-        for task in tasks:
-            deletion_service.remove_task(task.id, force=True)
-            tasks_service.clear_task_cache(str(task.id))
+        deletion_service.remove_tasks_and_related([task.id for task in tasks])
 
         EntityVersion.delete_all_by(entity_id=shot_id)
         Subscription.delete_all_by(entity_id=shot_id)
@@ -889,17 +887,13 @@ def remove_sequence(sequence_id, force=False):
     """
     sequence = get_sequence_raw(sequence_id)
     if force:
-        from zou.app.services import tasks_service
-
         for shot in Entity.get_all_by(parent_id=sequence_id):
             remove_shot(shot.id, force=True)
         Subscription.delete_all_by(entity_id=sequence_id)
         ScheduleItem.delete_all_by(object_id=sequence_id)
 
         tasks = Task.query.filter_by(entity_id=sequence_id).all()
-        for task in tasks:
-            deletion_service.remove_task(task.id, force=True)
-            tasks_service.clear_task_cache(str(task.id))
+        deletion_service.remove_tasks_and_related([task.id for task in tasks])
         Subscription.delete_all_by(entity_id=sequence_id)
     try:
         sequence.delete()
@@ -1088,34 +1082,40 @@ def get_weighted_quotas(project_id, task_type_id, detail_level):
     spents. If there is no time spent, it considers that the work was done
     from the wip date to the feedback date.
     It computes the shot count and the number of seconds too.
+
+    Frames are aggregated per person and per day directly in the database,
+    so only one row per person and day is sent back to Python.
     """
     fps = projects_service.get_project_fps(project_id)
     timezone = user_service.get_timezone()
     shot_type = get_shot_type()
     quotas = {}
+
+    date = cast(TimeSpent.date, DateTime)
+    nb_frames = func.round(
+        Entity.nb_frames * (cast(TimeSpent.duration, Float) / Task.duration)
+    )
     query = (
         Task.query.filter(Task.project_id == project_id)
         .filter(Entity.entity_type_id == shot_type["id"])
         .filter(Task.task_type_id == task_type_id)
         .filter(Task.end_date != None)
+        .filter(Task.duration > 0)
+        .filter(Entity.nb_frames != None)
         .join(Entity, Entity.id == Task.entity_id)
         .join(Project, Project.id == Task.project_id)
         .join(TimeSpent, Task.id == TimeSpent.task_id)
-        .add_columns(
-            Entity.nb_frames,
-            TimeSpent.date,
-            TimeSpent.duration,
-            TimeSpent.person_id,
+        .with_entities(
+            TimeSpent.person_id.label("person_id"),
+            date.label("date"),
+            nb_frames.label("nb_frames"),
         )
     )
-    result = query.all()
-
-    for task, nb_frames, date, duration, person_id in result:
-        person_id = str(person_id)
-        if task.duration > 0 and nb_frames is not None:
-            nb_frames = round(nb_frames * (duration / task.duration))
-            _add_quota_entry(quotas, person_id, date, timezone, nb_frames, fps)
+    _add_quota_entries(quotas, query.subquery(), timezone, fps)
 
+    day = func.generate_series(
+        Task.real_start_date, Task.end_date, timedelta(days=1)
+    )
     query = (
         Task.query.filter(Task.project_id == project_id)
         .filter(Entity.entity_type_id == shot_type["id"])
@@ -1126,27 +1126,44 @@ def get_weighted_quotas(project_id, task_type_id, detail_level):
         .join(Entity, Entity.id == Task.entity_id)
         .join(Project, Project.id == Task.project_id)
         .outerjoin(TimeSpent, Task.id == TimeSpent.task_id)
-        .join(Task.assignees)
-        .add_columns(Entity.nb_frames, Person.id)
+        .join(assignees_table, assignees_table.c.task == Task.id)
+        .with_entities(
+            Task.id.label("task_id"),
+            assignees_table.c.person.label("person_id"),
+            Task.real_start_date.label("real_start_date"),
+            Entity.nb_frames.label("nb_frames"),
+            day.label("date"),
+        )
     )
-    result = query.all()
-
-    for task, nb_frames, person_id in result:
-        business_days = (
-            date_helpers.get_business_days(task.real_start_date, task.end_date)
-            + 1
+    task_days = query.subquery()
+    is_business_day = extract("isodow", task_days.c.date) < 6
+    business_days = (
+        func.count(task_days.c.date)
+        .filter(
+            and_(
+                is_business_day, task_days.c.date > task_days.c.real_start_date
+            )
         )
-        if nb_frames is not None:
-            nb_frames = round(nb_frames / business_days) or 0
-        else:
-            nb_frames = 0
-        date = task.real_start_date
-        for x in range((task.end_date - task.real_start_date).days + 1):
-            if date.weekday() < 5:
-                _add_quota_entry(
-                    quotas, str(person_id), date, timezone, nb_frames, fps
-                )
-            date = date + timedelta(1)
+        .over(partition_by=[task_days.c.task_id, task_days.c.person_id])
+        + 1
+    )
+    nb_frames = func.coalesce(
+        func.round(cast(task_days.c.nb_frames, Float) / business_days), 0
+    )
+    query = db.session.query(
+        task_days.c.person_id.label("person_id"),
+        task_days.c.date.label("date"),
+        nb_frames.label("nb_frames"),
+        is_business_day.label("is_business_day"),
+    )
+    business_task_days = query.subquery()
+    _add_quota_entries(
+        quotas,
+        business_task_days,
+        timezone,
+        fps,
+        business_task_days.c.is_business_day,
+    )
     return quotas
 
 
@@ -1168,44 +1185,66 @@ def get_raw_quotas(project_id, task_type_id, detail_level):
         .filter(Task.end_date != None)
         .join(Entity, Entity.id == Task.entity_id)
         .join(Project, Project.id == Task.project_id)
-        .join(Task.assignees)
-        .add_columns(Entity.nb_frames, Person.id)
+        .join(assignees_table, assignees_table.c.task == Task.id)
+        .with_entities(
+            assignees_table.c.person.label("person_id"),
+            Task.end_date.label("date"),
+            func.coalesce(Entity.nb_frames, 0).label("nb_frames"),
+        )
     )
-    result = query.all()
+    _add_quota_entries(quotas, query.subquery(), timezone, fps)
+    return quotas
+
 
-    for task, nb_frames, person_id in result:
-        date = task.end_date
-        if nb_frames is None:
-            nb_frames = 0
+def _add_quota_entries(quotas, entries, timezone, fps, *criterions):
+    """
+    Sum frames of given entries (a subquery with person_id, date and
+    nb_frames columns) per person and per day, then add the result to the
+    quotas. Days are computed in the given timezone, while week numbers are
+    based on the raw date, like it was done historically.
+    """
+    local_date = func.timezone(timezone, func.timezone("UTC", entries.c.date))
+    day = func.to_char(local_date, "YYYY-MM-DD")
+    week = cast(extract("week", entries.c.date), Integer)
+    query = (
+        db.session.query(
+            entries.c.person_id,
+            day,
+            week,
+            cast(func.sum(entries.c.nb_frames), Integer),
+            func.count(),
+        )
+        .filter(*criterions)
+        .group_by(entries.c.person_id, day, week)
+    )
+    for person_id, date_str, week, nb_frames, count in query.all():
         _add_quota_entry(
-            quotas, str(person_id), date, timezone, nb_frames, fps
+            quotas, str(person_id), date_str, week, nb_frames, fps, count
         )
-    return quotas
 
 
-def _add_quota_entry(quotas, person_id, date, timezone, nb_frames, fps):
+def _add_quota_entry(
+    quotas, person_id, date_str, week_number, nb_frames, fps, count=1
+):
     nb_seconds = nb_frames / fps
-    date_str = date_helpers.get_simple_string_with_timezone_from_date(
-        date, timezone
-    )
     year = date_str[:4]
-    week = year + "-" + str(date.isocalendar()[1])
+    week = year + "-" + str(week_number)
     month = date_str[:7]
     if person_id not in quotas:
         _init_quota_person(quotas, person_id)
     _init_quota_date(quotas, person_id, date_str, week, month)
     quotas[person_id]["day"]["frames"][date_str] += nb_frames
     quotas[person_id]["day"]["seconds"][date_str] += nb_seconds
-    quotas[person_id]["day"]["count"][date_str] += 1
+    quotas[person_id]["day"]["count"][date_str] += count
     quotas[person_id]["week"]["frames"][week] += nb_frames
     quotas[person_id]["week"]["seconds"][week] += nb_seconds
-    quotas[person_id]["week"]["count"][week] += 1
+    quotas[person_id]["week"]["count"][week] += count
     quotas[person_id]["month"]["frames"][month] += nb_frames
     quotas[person_id]["month"]["seconds"][month] += nb_seconds
-    quotas[person_id]["month"]["count"][month] += 1
+    quotas[person_id]["month"]["count"][month] += count
     quotas[person_id]["year"]["frames"][year] += nb_frames
     quotas[person_id]["year"]["seconds"][year] += nb_seconds
-    quotas[person_id]["year"]["count"][year] += 1
+    quotas[person_id]["year"]["count"][year] += count
 
 
 def _init_quota_date(quotas, person_id, date_str, week, month):
@@ -1368,8 +1407,6 @@ def get_weighted_quota_shots_between(
     for entity, task_duration, duration in query_shots:
         shot = entity.serialize()
         if shot["id"] not in already_listed:
-            full_name, _ = names_service.get_full_entity_name(shot["id"])
-            shot["full_name"] = full_name
             shot["weight"] = round(duration / task_duration, 2) or 0
             shots.append(shot)
             already_listed[shot["id"]] = shot
@@ -1401,8 +1438,6 @@ def get_weighted_quota_shots_between(
             business_days = (
                 date_helpers.get_business_days(task_start, task_end) + 1
             )
-            full_name, _ = names_service.get_full_entity_name(shot["id"])
-            shot["full_name"] = full_name
             multiplicator = 1
             if task_start >= start and task_end <= end:
                 multiplicator = business_days
@@ -1418,6 +1453,7 @@ def get_weighted_quota_shots_between(
             already_listed[shot["id"]] = True
             shots.append(shot)
 
+    _set_shot_full_names(shots)
     return sorted(shots, key=itemgetter("full_name"))
 
 
@@ -1444,14 +1480,25 @@ def get_raw_quota_shots_between(
 
     for entity in query_shots:
         shot = entity.serialize()
-        full_name, _ = names_service.get_full_entity_name(shot["id"])
-        shot["full_name"] = full_name
         shot["weight"] = 1
         shots.append(shot)
 
+    _set_shot_full_names(shots)
     return sorted(shots, key=itemgetter("full_name"))
 
 
+def _set_shot_full_names(shots):
+    """
+    Set the full name of given shots with a single query.
+    """
+    full_names = names_service.get_full_entity_names(
+        [shot["id"] for shot in shots]
+    )
+    for shot in shots:
+        shot["full_name"] = full_names[shot["id"]][0]
+    return shots
+
+
 def _get_timezoned_interval(start, end):
     """
     Get time intervals adapted to the user timezone.
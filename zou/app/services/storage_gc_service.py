@@ -0,0 +1,266 @@
+"""
+Files are not removed from the storage when their database entry is deleted.
+Instead, a tombstone is stored with their key and a garbage collector removes
+them in batches later.
+"""
+import datetime
+
+from collections import defaultdict
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from zou.app import db
+from zou.app.models.attachment_file import AttachmentFile
+from zou.app.models.entity import Entity
+from zou.app.models.organisation import Organisation
+from zou.app.models.person import Person
+from zou.app.models.preview_file import PreviewFile
+from zou.app.models.project import Project
+from zou.app.models.storage_tombstone import StorageTombstone
+from zou.app.stores import file_store
+from zou.app.utils import fields
+
+# Prefixes of the keys owned by preview files and attachment files, per
+# bucket, with the models that can own them. Thumbnails are shared with
+# entities, persons, organisations and projects. Other prefixes are never
+# considered as orphans.
+OWNED_PREFIXES = {
+    "pictures": {
+        "original": ["preview_file"],
+        "thumbnails": [
+            "preview_file",
+            "entity",
+            "person",
+            "organisation",
+            "project",
+        ],
+        "thumbnails-square": ["preview_file"],
+        "previews": ["preview_file"],
+    },
+    "movies": {"previews": ["preview_file"], "lowdef": ["preview_file"]},
+    "files": {
+        "previews": ["preview_file"],
+        "attachments": ["attachment_file"],
+    },
+}
+
+OWNER_MODELS = {
+    "attachment_file": AttachmentFile,
+    "entity": Entity,
+    "organisation": Organisation,
+    "person": Person,
+    "preview_file": PreviewFile,
+    "project": Project,
+}
+
+
+def get_preview_file_keys(preview_file_id, extension):
+    """
+    Return (bucket, key) tuples of all the files stored for given preview
+    file.
+    """
+    preview_file_id = str(preview_file_id)
+    if extension == "png":
+        keys = [
+            ("pictures", prefix)
+            for prefix in [
+                "original",
+                "thumbnails",
+                "thumbnails-square",
+                "previews",
+            ]
+        ]
+    elif extension == "mp4":
+        keys = [("movies", "previews"), ("movies", "lowdef")] + [
+            ("pictures", prefix)
+            for prefix in ["thumbnails", "thumbnails-square", "previews"]
+        ]
+    else:
+        keys = [("files", "previews")]
+    return [
+        (bucket, file_store.make_key(prefix, preview_file_id))
+        for (bucket, prefix) in keys
+    ]
+
+
+def get_attachment_file_keys(attachment_file_id):
+    """
+    Return (bucket, key) tuples of the file stored for given attachment file.
+    """
+    return [("files", file_store.make_key("attachments", attachment_file_id))]
+
+
+def add_tombstones_no_commit(keys):
+    """
+    Store tombstones for given (bucket, key) tuples with a single insert.
+    Keys that already have a tombstone are ignored. The change is not
+    commited, so tombstones can be added in the transaction that deletes the
+    file owners.
+    """
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "id": fields.gen_uuid(),
+            "bucket": bucket,
+            "key": key,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for (bucket, key) in set(keys)
+    ]
+    if len(rows) > 0:
+        db.session.execute(
+            insert(StorageTombstone.__table__)
+            .values(rows)
+            .on_conflict_do_nothing()
+        )
+    return len(rows)
+
+
+def add_tombstones(keys):
+    """
+    Store tombstones for given (bucket, key) tuples and commit them.
+    """
+    try:
+        nb_tombstones = add_tombstones_no_commit(keys)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+    return nb_tombstones
+
+
+def collect_garbage(batch_size=1000, max_attempts=5, retry_delay=60):
+    """
+    Remove from the storage the files of a batch of tombstones, then delete
+    the tombstones of removed files. Failed removals are kept with their
+    error and retried on the next batches, until `max_attempts` is reached.
+    A failed removal is retried only once `retry_delay` seconds have passed
+    since its last attempt, a delay that doubles with each failure.
+    Tombstones are locked while they are processed, so several collectors
+    can run at the same time.
+
+    It returns the number of removed and failed files.
+    """
+    now = datetime.datetime.utcnow()
+    retry_after = datetime.timedelta(seconds=retry_delay) * func.power(
+        2, StorageTombstone.attempts - 1
+    )
+    tombstones = (
+        db.session.query(
+            StorageTombstone.id, StorageTombstone.bucket, StorageTombstone.key
+        )
+        .filter(StorageTombstone.attempts < max_attempts)
+        .filter(
+            or_(
+                StorageTombstone.attempts == 0,
+                StorageTombstone.updated_at <= now - retry_after,
+            )
+        )
+        .order_by(StorageTombstone.updated_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    keys_by_bucket = defaultdict(list)
+    for (_, bucket, key) in tombstones:
+        keys_by_bucket[bucket].append(key)
+
+    errors = {}
+    try:
+        for bucket, keys in keys_by_bucket.items():
+            for key, error in file_store.remove_keys(bucket, keys).items():
+                errors[(bucket, key)] = error
+
+        removed_ids = [
+            tombstone_id
+            for (tombstone_id, bucket, key) in tombstones
+            if (bucket, key) not in errors
+        ]
+        if len(removed_ids) > 0:
+            StorageTombstone.query.filter(
+                StorageTombstone.id.in_(removed_ids)
+            ).delete(synchronize_session=False)
+        for (tombstone_id, bucket, key) in tombstones:
+            if (bucket, key) in errors:
+                StorageTombstone.query.filter(
+                    StorageTombstone.id == tombstone_id
+                ).update(
+                    {
+                        StorageTombstone.attempts: StorageTombstone.attempts
+                        + 1,
+                        StorageTombstone.last_error: errors[(bucket, key)],
+                        StorageTombstone.updated_at: now,
+                    },
+                    synchronize_session=False,
+                )
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+    return {"removed": len(tombstones) - len(errors), "failed": len(errors)}
+
+
+def get_tombstones_stats(max_attempts=5):
+    """
+    Return the number of files waiting for removal and the number of files
+    for which every removal attempt failed.
+    """
+    return {
+        "pending": StorageTombstone.query.filter(
+            StorageTombstone.attempts < max_attempts
+        ).count(),
+        "failed": StorageTombstone.query.filter(
+            StorageTombstone.attempts >= max_attempts
+        ).count(),
+    }
+
+
+def _get_owner_ids(owner):
+    model = OWNER_MODELS[owner]
+    return set(str(row[0]) for row in db.session.query(model.id))
+
+
+def scan_orphan_files(add_tombstones_for_orphans=True):
+    """
+    List the keys stored in the buckets and look for files owned by preview
+    files or attachment files whose database entry does not exist anymore.
+    A thumbnail is an orphan only if no preview file, entity, person,
+    organisation or project has its id.
+    The database is read after the bucket listing, so files of entries
+    created during the scan are not seen as orphans.
+
+    Tombstones are added for the orphan files unless it is disabled. It
+    returns the orphan keys per bucket.
+    """
+    candidates = defaultdict(list)
+    for bucket, prefixes in OWNED_PREFIXES.items():
+        for key in file_store.list_keys(bucket):
+            (prefix, file_id) = (key[:-37], key[-36:])
+            if prefix in prefixes and fields.is_valid_id(file_id):
+                candidates[bucket].append((prefixes[prefix], key, file_id))
+
+    owners = set(
+        owner
+        for bucket_candidates in candidates.values()
+        for (candidate_owners, _, _) in bucket_candidates
+        for owner in candidate_owners
+    )
+    owner_ids = {owner: _get_owner_ids(owner) for owner in owners}
+    orphans = {
+        bucket: [
+            key
+            for (owners, key, file_id) in candidates[bucket]
+            if not any(file_id in owner_ids[owner] for owner in owners)
+        ]
+        for bucket in OWNED_PREFIXES
+    }
+    if add_tombstones_for_orphans:
+        add_tombstones(
+            [(bucket, key) for bucket, keys in orphans.items() for key in keys]
+        )
+    return orphans
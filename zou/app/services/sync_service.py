@@ -1,4 +1,6 @@
+import collections
 import datetime
+import json
 import logging
 import os
 import sys
@@ -6,6 +8,8 @@ import sys
 import gazu
 import sqlalchemy
 
+from concurrent.futures import ThreadPoolExecutor
+
 from zou.app.models.attachment_file import AttachmentFile
 from zou.app.models.build_job import BuildJob
 from zou.app.models.custom_action import CustomAction
@@ -34,9 +38,9 @@ from zou.app.models.task_type import TaskType
 from zou.app.models.time_spent import TimeSpent
 
 from zou.app.services import deletion_service, tasks_service
-from zou.app.stores import file_store
+from zou.app.stores import file_store, versions_store
 from flask_fs.backends.local import LocalBackend
-from zou.app.utils import events
+from zou.app.utils import events, transfer
 from zou.app import app
 
 logger = logging.getLogger()
@@ -94,6 +98,10 @@ event_name_model_map = {
     "time-spent": TimeSpent,
 }
 
+# Fields linking imported rows to the tasks whose last comment and last
+# preview file must be refreshed when these rows change.
+task_id_fields = {Comment: "object_id", PreviewFile: "task_id"}
+
 event_name_model_path_map = {
     "attachment-file": "attachment-files",
     "asset": "assets",
@@ -182,6 +190,91 @@ special_events = [
     "task:assign",
 ]
 
+DEFAULT_SYNC_WORKERS = 4
+
+
+class SyncCheckpoint(object):
+    """
+    Progress of a sync: for each synced collection, it keeps the last page
+    imported and whether the collection is complete. When a file path is
+    given, progress is saved in this file after each page, so an
+    interrupted sync can resume where it stopped.
+    """
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.progress = {}
+        if file_path is not None and os.path.exists(file_path):
+            with open(file_path) as checkpoint_file:
+                self.progress = json.load(checkpoint_file)
+
+    def get_last_page(self, key):
+        return self.progress.get(key, {}).get("page", 0)
+
+    def is_done(self, key):
+        return self.progress.get(key, {}).get("done", False)
+
+    def set_last_page(self, key, page):
+        self.progress.setdefault(key, {})["page"] = page
+        self.save()
+
+    def set_done(self, key):
+        self.progress.setdefault(key, {})["done"] = True
+        self.save()
+
+    def save(self):
+        if self.file_path is not None:
+            tmp_path = "%s.tmp" % self.file_path
+            with open(tmp_path, "w") as checkpoint_file:
+                json.dump(self.progress, checkpoint_file)
+            os.replace(tmp_path, self.file_path)
+
+    def clear(self):
+        self.progress = {}
+        if self.file_path is not None and os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class EventCursor(object):
+    """
+    Position of an event sync: creation date and id of the last event
+    applied. When a file path is given, the position is saved in this file,
+    so the next sync starts where the previous one stopped.
+    """
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.created_at = None
+        self.id = None
+        if file_path is not None and os.path.exists(file_path):
+            with open(file_path) as cursor_file:
+                position = json.load(cursor_file)
+            self.created_at = position.get("created_at")
+            self.id = position.get("id")
+
+    def set_position(self, event):
+        self.created_at = event["created_at"]
+        self.id = event["id"]
+        self.save()
+
+    def get_path(self, page_size):
+        path = "events/next?page_size=%s" % page_size
+        if self.created_at is not None:
+            path += "&after=%s" % self.created_at
+        if self.id is not None:
+            path += "&after_id=%s" % self.id
+        return path
+
+    def save(self):
+        if self.file_path is not None:
+            tmp_path = "%s.tmp" % self.file_path
+            with open(tmp_path, "w") as cursor_file:
+                json.dump(
+                    {"created_at": self.created_at, "id": self.id},
+                    cursor_file,
+                )
+            os.replace(tmp_path, self.file_path)
+
 
 def init(target, login, password):
     """
@@ -230,17 +323,27 @@ def run_listeners(event_client):
         run_listeners(event_client)
 
 
-def run_main_data_sync(project=None):
+def run_main_data_sync(
+    project=None, checkpoint=None, max_workers=DEFAULT_SYNC_WORKERS
+):
     """
     Retrieve and import all cross-projects data from target instance.
     """
     for event in main_events:
         path = event_name_model_path_map[event]
         model = event_name_model_map[event]
-        sync_entries(path, model, project=project)
+        sync_entries(
+            path,
+            model,
+            project=project,
+            checkpoint=checkpoint,
+            max_workers=max_workers,
+        )
 
 
-def run_project_data_sync(project=None):
+def run_project_data_sync(
+    project=None, checkpoint=None, max_workers=DEFAULT_SYNC_WORKERS
+):
     """
     Retrieve and import all data related to projects from target instance.
     """
@@ -254,43 +357,67 @@ def run_project_data_sync(project=None):
             print("Syncing %ss..." % event)
             path = event_name_model_path_map[event]
             model = event_name_model_map[event]
-            sync_project_entries(project, path, model)
+            sync_project_entries(
+                project,
+                path,
+                model,
+                checkpoint=checkpoint,
+                max_workers=max_workers,
+            )
         sync_entity_thumbnails(project, "assets")
         sync_entity_thumbnails(project, "shots")
         logger.info("Sync of %s complete." % project["name"])
 
 
-def run_other_sync(project=None, with_events=False):
+def run_other_sync(
+    project=None,
+    with_events=False,
+    checkpoint=None,
+    max_workers=DEFAULT_SYNC_WORKERS,
+):
     """
     Retrieve and import all search filters and events from target instance.
     """
-    sync_entries("search-filters", SearchFilter, project=project)
-    sync_entries("day-offs", SearchFilter, project=project)
+    options = {
+        "project": project,
+        "checkpoint": checkpoint,
+        "max_workers": max_workers,
+    }
+    sync_entries("search-filters", SearchFilter, **options)
+    sync_entries("day-offs", SearchFilter, **options)
     if with_events:
-        sync_entries("events", ApiEvent, project=project)
+        sync_entries("events", ApiEvent, **options)
 
 
-def run_last_events_sync(minutes=0, page_size=300):
+def run_last_events_sync(minutes=0, page_size=300, cursor_file=None):
     """
-    Retrieve last events from target instance and import related data and
-    action.
+    Retrieve events from target instance and import related data and
+    action. Events are read page by page from the position stored in the
+    cursor file, until the most recent one. Without position, it starts
+    `minutes` minutes ago, or from the last page of events if no minutes are
+    given.
     """
-    path = "events/last?page_size=%s" % page_size
-    if minutes > 0:
-        now = datetime.datetime.now()
-        min_before = now - datetime.timedelta(minutes=minutes)
-        after = min_before.strftime("%Y-%m-%dT%H:%M:%S")
-        path += "&before=%s" % now.strftime("%Y-%m-%dT%H:%M:%S")
-        path += "&after=%s" % after
-    events = gazu.client.fetch_all(path)
-    events.reverse()
-    for event in events:
-        event_name = event["name"].split(":")[0]
-        if event_name in event_name_model_map:
-            try:
-                sync_event(event)
-            except Exception:
-                pass
+    cursor = EventCursor(cursor_file)
+    if cursor.created_at is None and minutes > 0:
+        start = datetime.datetime.utcnow() - datetime.timedelta(
+            minutes=minutes
+        )
+        cursor.created_at = start.isoformat()
+    elif cursor.created_at is None:
+        events = gazu.client.fetch_all("events/last?page_size=%s" % page_size)
+        events.reverse()
+        sync_events(events)
+        if len(events) == 0:
+            return
+        cursor.set_position(events[-1])
+
+    while True:
+        events = gazu.client.fetch_all(cursor.get_path(page_size))
+        sync_events(events)
+        if len(events) > 0:
+            cursor.set_position(events[-1])
+        if len(events) < page_size:
+            break
 
 
 def run_last_events_files(minutes=0, page_size=50):
@@ -319,6 +446,13 @@ def run_last_events_files(minutes=0, page_size=50):
             )
 
 
+def get_event_instance_id(event_name, data):
+    if event_name == "metadata-descriptor":  # Backward compatibility
+        if "metadata_descriptor_id" not in data:
+            event_name = "descriptor"
+    return data["%s_id" % event_name.replace("-", "_")]
+
+
 def sync_event(event):
     """
     From information given by an event, retrieve related data and apply it.
@@ -328,31 +462,308 @@ def sync_event(event):
 
     model = event_name_model_map[event_name]
     path = event_name_model_path_map[event_name]
-
-    if event_name == "metadata-descriptor":  # Backward compatibility
-        if "metadata_descriptor_id" not in event["data"]:
-            event_name = "descriptor"
-    instance_id = event["data"]["%s_id" % event_name.replace("-", "_")]
+    instance_id = get_event_instance_id(event_name, event["data"])
 
     if action in ["update", "new"]:
         instance = gazu.client.fetch_one(path, instance_id)
         model.create_from_import(instance)
+        refresh_tasks(get_instances_task_ids(model, [instance]))
     elif action in ["delete"]:
+        task_ids = get_stored_task_ids(model, [instance_id])
         model.delete_from_import(instance_id)
+        refresh_tasks(task_ids)
+    bump_versions(model)
 
 
-def sync_entries(model_name, model, project=None):
+def get_event_changes(events):
     """
-    Retrieve cross-projects data from target instance.
+    Return the changes described by given events as a list of (model, path,
+    action, ids) tuples. When several events relate to the same object, only
+    the last action is kept, at the place of the first event, so objects are
+    imported after the ones they were created after. Consecutive changes of
+    the same kind are grouped.
+    """
+    changes = collections.OrderedDict()
+    for event in events:
+        [event_name, action] = event["name"].split(":")
+        if event_name not in event_name_model_map or action not in [
+            "new",
+            "update",
+            "delete",
+        ]:
+            continue
+        model = event_name_model_map[event_name]
+        if model is Entity:
+            path = "entities"
+        else:
+            path = event_name_model_path_map[event_name]
+        instance_id = get_event_instance_id(event_name, event["data"])
+        if action == "new":
+            action = "update"
+        changes[(path, instance_id)] = (model, action)
+
+    groups = []
+    for ((path, instance_id), (model, action)) in changes.items():
+        if len(groups) > 0 and groups[-1][1:3] == (path, action):
+            groups[-1][3].append(instance_id)
+        else:
+            groups.append((model, path, action, [instance_id]))
+    return groups
+
+
+def fetch_instances(path, instance_ids, batch_size=50):
+    """
+    Retrieve the instances matching given ids from target instance, by
+    batches of ids. Instances that don't exist anymore are not returned.
     """
     instances = []
+    for index in range(0, len(instance_ids), batch_size):
+        instances += gazu.client.fetch_all(
+            path,
+            params={
+                "id": json.dumps(instance_ids[index : index + batch_size]),
+                "relations": "true",
+            },
+        )
+    return instances
+
+
+def sync_events(events):
+    """
+    Apply given events, sorted from the oldest to the most recent. Each
+    changed object is retrieved once, with the other objects of the same
+    kind, and imported in bulk.
+    """
+    for (model, path, action, instance_ids) in get_event_changes(events):
+        try:
+            if action == "delete":
+                delete_instances(model, path, instance_ids)
+            else:
+                import_instances(
+                    model, path, fetch_instances(path, instance_ids)
+                )
+        except gazu.exception.RouteNotFoundException as e:
+            logger.error("Route not found: %s" % e)
+
+
+def import_instances(model, path, instances):
+    """
+    Import given instances in bulk. If the bulk import fails, they are
+    imported one by one and failures are logged. It returns the ids of the
+    instances that could not be imported.
+    """
+    failed_ids = []
+    try:
+        model.create_from_import_list(instances)
+    except Exception:
+        for instance in instances:
+            try:
+                model.create_from_import_list([instance])
+            except Exception as e:
+                logger.error(
+                    "Import of %s %s failed: %s" % (path, instance["id"], e)
+                )
+                failed_ids.append(instance["id"])
+    if len(failed_ids) < len(instances):
+        refresh_tasks(
+            get_instances_task_ids(
+                model,
+                [
+                    instance
+                    for instance in instances
+                    if instance["id"] not in failed_ids
+                ],
+            )
+        )
+        bump_versions(model)
+    return failed_ids
+
+
+def delete_instances(model, path, instance_ids):
+    task_ids = get_stored_task_ids(model, instance_ids)
+    for instance_id in instance_ids:
+        try:
+            model.delete_from_import(instance_id)
+        except Exception as e:
+            logger.error(
+                "Deletion of %s %s failed: %s" % (path, instance_id, e)
+            )
+    refresh_tasks(task_ids)
+    bump_versions(model)
+
+
+def get_instances_task_ids(model, instances):
+    """
+    Return the ids of the tasks related to given imported instances when
+    they are comments or preview files.
+    """
+    if model not in task_id_fields:
+        return []
+    field = task_id_fields[model]
+    return list(
+        set(
+            instance[field]
+            for instance in instances
+            if instance.get(field) is not None
+        )
+    )
+
+
+def get_stored_task_ids(model, instance_ids):
+    """
+    Return the ids of the tasks related to given stored instances when they
+    are comments or preview files.
+    """
+    if model not in task_id_fields or len(instance_ids) == 0:
+        return []
+    column = getattr(model, task_id_fields[model])
+    return [
+        str(task_id)
+        for (task_id,) in model.query.filter(model.id.in_(instance_ids))
+        .with_entities(column)
+        .distinct()
+        if task_id is not None
+    ]
+
+
+def refresh_tasks(task_ids):
+    """
+    Imports bypass the comment and preview services. Recompute the last
+    comment and the last preview file of given tasks.
+    """
+    if len(task_ids) > 0:
+        tasks_service.refresh_last_comments_and_preview_files(task_ids)
+
+
+def bump_versions(model):
+    """
+    Imports don't emit events. Renew the versions of the collections built
+    from given model, so conditional requests don't get stale data.
+    """
+    versions_store.bump_for_models([model.__tablename__])
+
+
+def get_page_path(path, page):
+    """
+    Add page parameter to given API path.
+    """
+    separator = "&" if "?" in path else "?"
+    return "%s%spage=%d" % (path, separator, page)
+
+
+def fetch_pages(path, first_page=1, max_workers=DEFAULT_SYNC_WORKERS):
+    """
+    Generator that yields pages of given API path as (page, instances)
+    tuples, in page order. The first page is fetched alone to know the
+    number of pages, the next ones are fetched concurrently by a bounded
+    pool of threads. When the API doesn't give the number of pages, pages
+    are fetched until an empty one is met.
+    """
+
+    def fetch_page(page):
+        return gazu.client.fetch_all(get_page_path(path, page))
+
+    def get_instances(results):
+        if isinstance(results, dict):
+            return (results.get("nb_pages"), results["data"])
+        else:
+            return (None, results)
+
+    (nb_pages, instances) = get_instances(fetch_page(first_page))
+    if (nb_pages is not None and first_page > nb_pages) or (
+        nb_pages is None and len(instances) == 0
+    ):
+        return
+    yield (first_page, instances)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        next_page = first_page + 1
+        page = first_page + 1
+        while nb_pages is None or page <= nb_pages:
+            while len(futures) < max_workers * 2 and (
+                nb_pages is None or next_page <= nb_pages
+            ):
+                futures[next_page] = executor.submit(fetch_page, next_page)
+                next_page += 1
+            (_, instances) = get_instances(futures.pop(page).result())
+            if nb_pages is None and len(instances) == 0:
+                break
+            yield (page, instances)
+            page += 1
+        for future in futures.values():
+            future.cancel()
+
+
+def sync_pages(
+    model,
+    path,
+    key,
+    checkpoint=None,
+    max_workers=DEFAULT_SYNC_WORKERS,
+):
+    """
+    Retrieve all pages of given API path and import them. Progress is stored
+    in given checkpoint under given key: pages already imported are skipped
+    and nothing is done if the collection was fully synced.
+
+    When a page can't be imported in bulk, its instances are imported one by
+    one. If some of them fail, the checkpoint stays before this page and the
+    collection is not marked as synced, so the next sync retries it. It
+    returns the number of imported instances.
+    """
+    if checkpoint is None:
+        checkpoint = SyncCheckpoint()
+    if checkpoint.is_done(key):
+        logger.info("    %s already synced." % key)
+        return 0
+
+    total = 0
+    failed_page = None
+    first_page = checkpoint.get_last_page(key) + 1
+    for (page, instances) in fetch_pages(path, first_page, max_workers):
+        failed_ids = import_instances(model, path, instances)
+        if len(failed_ids) > 0 and failed_page is None:
+            failed_page = page
+        if failed_page is None:
+            checkpoint.set_last_page(key, page)
+        total += len(instances) - len(failed_ids)
+    if failed_page is None:
+        checkpoint.set_done(key)
+    else:
+        logger.error(
+            "    Some %s could not be imported, the next sync resumes from "
+            "page %s." % (key, failed_page)
+        )
+    return total
+
+
+def sync_entries(
+    model_name,
+    model,
+    project=None,
+    checkpoint=None,
+    max_workers=DEFAULT_SYNC_WORKERS,
+):
+    """
+    Retrieve cross-projects data from target instance.
+    """
+    if checkpoint is None:
+        checkpoint = SyncCheckpoint()
+    if checkpoint.is_done(model_name):
+        logger.info("%s already synced." % model_name)
+        return
 
+    instances = []
     if model_name in ["organisations", "persons"]:
         path = model_name + "?relations=true"
         if model_name == "persons":
             path += "&with_pass_hash=true"
         instances = gazu.client.fetch_all(path)
         model.create_from_import_list(instances)
+        bump_versions(model)
+        nb_instances = len(instances)
+        checkpoint.set_done(model_name)
     elif project:
         project = gazu.project.get_project_by_name(project)
         if model_name == "projects":
@@ -364,31 +775,37 @@ def sync_entries(model_name, model, project=None):
         else:
             instances = gazu.client.fetch_all(model_name)
         model.create_from_import_list(instances)
+        bump_versions(model)
+        nb_instances = len(instances)
+        checkpoint.set_done(model_name)
     else:
-        page = 1
-        init = True
-        results = {"nb_pages": 2}
-        while init or results["nb_pages"] >= page:
-            results = gazu.client.fetch_all(
-                "%s?relations=true&page=%d" % (model_name, page)
-            )
-            instances += results["data"]
-            page += 1
-            init = False
-            model.create_from_import_list(results["data"])
-
-    logger.info("%s %s synced." % (len(instances), model_name))
+        nb_instances = sync_pages(
+            model,
+            "%s?relations=true" % model_name,
+            model_name,
+            checkpoint=checkpoint,
+            max_workers=max_workers,
+        )
+    logger.info("%s %s synced." % (nb_instances, model_name))
 
 
-def sync_project_entries(project, model_name, model):
+def sync_project_entries(
+    project,
+    model_name,
+    model,
+    checkpoint=None,
+    max_workers=DEFAULT_SYNC_WORKERS,
+):
     """
     Retrieve all project data from target instance.
     """
-    instances = []
-    page = 1
-    init = True
-    results = {"nb_pages": 2}
-    result_length = 1
+    if checkpoint is None:
+        checkpoint = SyncCheckpoint()
+    key = "%s:%s" % (project["id"], model_name)
+    if checkpoint.is_done(key):
+        logger.info("    %s already synced." % model_name)
+        return
+
     if model_name not in [
         "tasks",
         "comments",
@@ -398,43 +815,20 @@ def sync_project_entries(project, model_name, model):
         "preview-files",
     ]:  # not much data we retrieve all in a single request.
         path = "projects/%s/%s" % (project["id"], model_name)
-        results = gazu.client.fetch_all(path)
-        instances += results
-        try:
-            model.create_from_import_list(instances)
-        except sqlalchemy.exc.IntegrityError:
-            logger.error("An error occured", exc_info=1)
-
-    elif model_name == "news":
-        while init or result_length > 0:
-            path = "projects/%s/%s?page=%d" % (project["id"], model_name, page)
-            results = gazu.client.fetch_all(path)["data"]
-            instances += results
-            try:
-                model.create_from_import_list(results)
-            except sqlalchemy.exc.IntegrityError:
-                logger.error("An error occured", exc_info=1)
-            result_length = len(results)
-            page += 1
-            init = False
+        instances = gazu.client.fetch_all(path)
+        failed_ids = import_instances(model, path, instances)
+        nb_instances = len(instances) - len(failed_ids)
+        if len(failed_ids) == 0:
+            checkpoint.set_done(key)
 
     else:  # Lot of data, we retrieve all through paginated requests.
-        while init or results["nb_pages"] >= page:
-            path = "projects/%s/%s?page=%d" % (project["id"], model_name, page)
-            if model_name == "playlists":
-                path = "projects/%s/playlists/all?page=%d" % (
-                    project["id"],
-                    page,
-                )
-            results = gazu.client.fetch_all(path)
-            instances += results["data"]
-            try:
-                model.create_from_import_list(results["data"])
-            except sqlalchemy.exc.IntegrityError:
-                logger.error("An error occured", exc_info=1)
-            page += 1
-            init = False
-    logger.info("    %s %s synced." % (len(instances), model_name))
+        path = "projects/%s/%s" % (project["id"], model_name)
+        if model_name == "playlists":
+            path = "projects/%s/playlists/all" % project["id"]
+        nb_instances = sync_pages(
+            model, path, key, checkpoint=checkpoint, max_workers=max_workers
+        )
+    logger.info("    %s %s synced." % (nb_instances, model_name))
 
 
 def sync_entity_thumbnails(project, model_name):
@@ -529,6 +923,7 @@ def create_entry(model_name, event_name, model, event_type):
         try:
             instance = gazu.client.fetch_one(model_name, model_id)
             model.create_from_import(instance)
+            refresh_tasks(get_instances_task_ids(model, [instance]))
             forward_base_event(event_name, event_type, data)
             if event_type == "new":
                 logger.info("Creation: %s %s" % (event_name, model_id))
@@ -556,7 +951,9 @@ def delete_entry(model_name, event_name, model):
             comment = deletion_service.remove_comment(model_id)
             tasks_service.reset_task_data(comment["object_id"])
         else:
+            task_ids = get_stored_task_ids(model, [model_id])
             model.delete_all_by(id=model_id)
+            refresh_tasks(task_ids)
         forward_base_event(event_name, "delete", data)
         logger.info("Deletion: %s %s" % (model_name, model_id))
 
@@ -658,13 +1055,25 @@ def download_entity_thumbnails_from_storage():
         download_entity_thumbnail(person)
 
 
-def download_preview_files_from_storage():
+def download_preview_files_from_storage(
+    workers=transfer.DEFAULT_TRANSFER_WORKERS, checkpoint_file=None
+):
     """
     Download all thumbnail and original files for preview entries from object
-    storage and store them locally.
+    storage and store them locally. Preview files are downloaded by `workers`
+    concurrent downloads. With a checkpoint file, an interrupted download
+    resumes where it stopped.
     """
-    for preview_file in PreviewFile.query.all():
-        download_preview(preview_file)
+    query = PreviewFile.query.with_entities(
+        PreviewFile.id, PreviewFile.extension
+    )
+    return transfer.run_query_transfers(
+        query,
+        PreviewFile.id,
+        download_preview,
+        workers=workers,
+        checkpoint_file=checkpoint_file,
+    )
 
 
 def download_entity_thumbnail(entity):
@@ -689,62 +1098,86 @@ def download_entity_thumbnail(entity):
 def download_file(file_path, prefix, dl_func, preview_file_id):
     """
     Download preview file for given preview from object storage and store it
-    locally.
+    locally. It returns the size of the downloaded file.
     """
     dirname = os.path.dirname(file_path)
     if not os.path.exists(dirname):
         os.makedirs(dirname)
+    tmp_file_path = "%s.tmp" % file_path
+    size = 0
     try:
-        with open(file_path, "wb") as tmp_file:
+        with open(tmp_file_path, "wb") as tmp_file:
             for chunk in dl_func(prefix, preview_file_id):
                 tmp_file.write(chunk)
-        print("%s downloaded" % file_path)
-    except:
-        pass
+                size += len(chunk)
+        os.replace(tmp_file_path, file_path)
+    finally:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+    return size
 
 
 def download_preview(preview_file):
     """
     Download all files link to preview file entry: orginal file and variants.
+    Files missing from the object storage and local files with the same size
+    are skipped. It returns the result of the transfer.
     """
-    print(
-        "download preview %s (%s)" % (preview_file.id, preview_file.extension)
-    )
     is_movie = preview_file.extension == "mp4"
     is_picture = preview_file.extension == "png"
-    is_file = not is_movie and not is_picture
-
-    preview_file_id = str(preview_file.id)
-    file_key = "previews-%s" % preview_file_id
-    if is_file:
-        file_path = local_file.path(file_key)
-        dl_func = file_store.open_picture
-    elif is_movie:
-        file_path = local_movie.path(file_key)
-        dl_func = file_store.open_movie
-    else:
-        file_path = local_picture.path(file_key)
-        dl_func = file_store.open_file
 
+    files = []
     if is_movie or is_picture:
         for prefix in ["thumbnails", "thumbnails-square", "original"]:
-            pic_dl_func = file_store.open_picture
-            pic_file_path = local_picture.path(
-                "%s-%s" % (prefix, str(preview_file.id))
+            files.append(
+                (local_picture, "pictures", file_store.open_picture, prefix)
             )
-            download_file(pic_file_path, prefix, pic_dl_func, preview_file_id)
+    if is_picture:
+        files.append(
+            (local_picture, "pictures", file_store.open_picture, "previews")
+        )
+    elif is_movie:
+        files.append(
+            (local_movie, "movies", file_store.open_movie, "previews")
+        )
+    else:
+        files.append((local_file, "files", file_store.open_file, "previews"))
 
-    download_file(file_path, "previews", dl_func, preview_file_id)
+    preview_file_id = str(preview_file.id)
+    result = transfer.get_transfer_result()
+    with app.app_context():
+        for (local, bucket_name, dl_func, prefix) in files:
+            key = file_store.make_key(prefix, preview_file_id)
+            file_path = local.path(key)
+            size = file_store.get_size(bucket_name, key)
+            if size is None:
+                continue
+            elif os.path.exists(file_path) and (
+                os.path.getsize(file_path) == size
+            ):
+                result["skipped"] += 1
+            else:
+                result["size"] += download_file(
+                    file_path, prefix, dl_func, preview_file_id
+                )
+                result["transferred"] += 1
+    return result
 
 
-def download_files_from_another_instance(project=None):
+def download_files_from_another_instance(
+    project=None,
+    workers=transfer.DEFAULT_TRANSFER_WORKERS,
+    checkpoint_file=None,
+):
     """
     Download all files from target instance.
     """
     download_thumbnails_from_another_instance("person")
     download_thumbnails_from_another_instance("organisation")
     download_thumbnails_from_another_instance("project", project=project)
-    download_preview_files_from_another_instance(project=project)
+    download_preview_files_from_another_instance(
+        project=project, workers=workers, checkpoint_file=checkpoint_file
+    )
     download_attachment_files_from_another_instance(project=project)
 
 
@@ -785,81 +1218,99 @@ def download_thumbnail_from_another_instance(model_name, model_id):
         return path
 
 
-def download_preview_files_from_another_instance(project=None):
+def download_preview_files_from_another_instance(
+    project=None,
+    workers=transfer.DEFAULT_TRANSFER_WORKERS,
+    checkpoint_file=None,
+):
     """
     Download all preview files and related (thumbnails and low def included).
+    Preview files are downloaded by `workers` concurrent downloads. With a
+    checkpoint file, an interrupted download resumes where it stopped.
     """
+    query = PreviewFile.query.with_entities(
+        PreviewFile.id, PreviewFile.extension
+    )
     if project:
         project_dict = gazu.project.get_project_by_name(project)
-        preview_files = (
-            PreviewFile.query.join(Task)
-            .filter(Task.project_id == project_dict["id"])
-            .all()
-        )
-    else:
-        preview_files = PreviewFile.query.all()
-
-    for preview_file in preview_files:
-        download_preview_from_another_instance(preview_file)
+        query = query.join(Task).filter(Task.project_id == project_dict["id"])
+
+    return transfer.run_query_transfers(
+        query,
+        PreviewFile.id,
+        transfer_preview_from_another_instance,
+        workers=workers,
+        checkpoint_file=checkpoint_file,
+    )
 
 
 def download_preview_from_another_instance(preview_file):
     """
     Download all files link to preview file entry: orginal file and variants.
+    Errors are printed, not raised.
     """
+    try:
+        return transfer_preview_from_another_instance(preview_file)
+    except Exception as e:
+        print(e)
+        print("download of preview %s failed" % preview_file.id)
+        return transfer.get_transfer_result()
 
-    from zou.app import app
 
-    print(
-        "download preview %s (%s)" % (preview_file.id, preview_file.extension)
-    )
+def transfer_preview_from_another_instance(preview_file):
+    """
+    Download all files link to preview file entry: orginal file and variants.
+    Files already in the storage are skipped. It returns the result of the
+    transfer.
+    """
     is_movie = preview_file.extension == "mp4"
     is_picture = preview_file.extension == "png"
     is_file = not is_movie and not is_picture
 
+    files = []
+    if is_movie or is_picture:
+        for prefix in ["thumbnails", "thumbnails-square", "original"]:
+            files.append(("pictures", file_store.add_picture, prefix, "png"))
+        files.append(("pictures", file_store.add_picture, "previews", "png"))
+    if is_movie:
+        for prefix in ["low", "previews"]:
+            files.append(
+                (
+                    "movies",
+                    file_store.add_movie,
+                    prefix,
+                    preview_file.extension,
+                )
+            )
+    elif is_file:
+        files.append(
+            ("files", file_store.add_file, "previews", preview_file.extension)
+        )
+
     preview_file_id = str(preview_file.id)
+    result = transfer.get_transfer_result()
     with app.app_context():
-        if is_movie or is_picture:
-            for prefix in [
-                "thumbnails",
-                "thumbnails-square",
-                "original",
-                "previews",
-            ]:
-                if not file_store.exists_picture(prefix, preview_file_id):
-                    download_file_from_another_instance(
-                        file_store.add_picture,
-                        prefix,
-                        preview_file_id,
-                        "png",
-                    )
-
-        if is_movie:
-            for prefix in ["low", "previews"]:
-                if not file_store.exists_movie(prefix, preview_file_id):
-                    download_file_from_another_instance(
-                        file_store.add_movie,
-                        prefix,
-                        preview_file_id,
-                        preview_file.extension,
-                    )
-
-        elif is_file:
-            if not file_store.exists_file("previews", preview_file_id):
-                download_file_from_another_instance(
-                    file_store.add_file,
-                    "previews",
-                    preview_file_id,
-                    preview_file.extension,
+        for (bucket_name, save_func, prefix, extension) in files:
+            key = file_store.make_key(prefix, preview_file_id)
+            if file_store.get_size(bucket_name, key) is not None:
+                result["skipped"] += 1
+            else:
+                size = download_file_from_another_instance(
+                    save_func, prefix, preview_file_id, extension
                 )
+                if size > 0:
+                    result["transferred"] += 1
+                    result["size"] += size
+    return result
 
 
 def download_file_from_another_instance(
     save_func, prefix, preview_file_id, extension
 ):
     """
-    Download preview file for given preview from object storage and store it
-    locally.
+    Download preview file for given preview from target instance and store it
+    in the storage. It returns the size of the downloaded file, 0 if the file
+    doesn't exist on the target instance.
     """
     if prefix == "previews" and extension == "mp4":
         path = "/movies/originals/preview-files/%s.mp4" % preview_file_id
@@ -874,20 +1325,21 @@ def download_file_from_another_instance(
             preview_file_id,
             extension,
         )
+    file_path = "/tmp/%s-%s.%s" % (prefix, preview_file_id, extension)
     try:
-        file_path = "/tmp/%s.%s" % (preview_file_id, extension)
         response = gazu.client.download(path, file_path)
         if response.status_code == 404:
-            print("not found", preview_file_id)
-        if response.status_code == 500:
-            print("error while downloading", preview_file_id)
-        else:
-            save_func(prefix, preview_file_id, file_path)
-        os.remove(file_path)
-        print("%s (%s) downloaded" % (file_path, prefix))
-    except Exception as e:
-        print(e)
-        print("%s download failed" % file_path)
+            print("not found", path)
+            return 0
+        elif response.status_code != 200:
+            raise gazu.exception.ServerErrorException(
+                "%s: %s" % (path, response.status_code)
+            )
+        save_func(prefix, preview_file_id, file_path)
+        return os.path.getsize(file_path)
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
 
 def download_attachment_files_from_another_instance(project=None):
@@ -2,6 +2,8 @@ import collections
 import datetime
 import uuid
 
+from sqlalchemy import and_, func, literal, or_
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
 from sqlalchemy.exc import StatementError, IntegrityError, DataError
 from sqlalchemy.orm import aliased
 
@@ -22,7 +24,7 @@ from zou.app.models.news import News
 from zou.app.models.person import Person
 from zou.app.models.preview_file import PreviewFile
 from zou.app.models.project import Project
-from zou.app.models.task import Task
+from zou.app.models.task import Task, assignees_table
 from zou.app.models.task_type import TaskType
 from zou.app.models.task_status import TaskStatus
 from zou.app.models.time_spent import TimeSpent
@@ -481,50 +483,63 @@ def get_time_spents(task_id, date=None):
     return result
 
 
-def get_comments(task_id, is_client=False, is_manager=False):
+def get_comments(
+    task_id, is_client=False, is_manager=False, page=None, limit=None
+):
     """
-    Return all comments related to given task.
+    Return all comments related to given task. Comments come with their
+    author, task status, acknowledgements, mentions, previews and attachment
+    files retrieved in a single query. If a page is given, only `limit`
+    comments of this page are returned (most recent first). Comments hidden
+    from clients are filtered out by the query, before pagination.
     """
-    comments = []
     query = _prepare_query(task_id, is_client, is_manager)
-    (comments, comment_ids) = _run_task_comments_query(query)
-    if len(comments) > 0:
-        ack_map = _build_ack_map_for_comments(comment_ids)
-        mention_map = _build_mention_map_for_comments(comment_ids)
-        preview_map = _build_preview_map_for_comments(comment_ids, is_client)
-        attachment_file_map = _build_attachment_map_for_comments(comment_ids)
-        for comment in comments:
-            comment["acknowledgements"] = ack_map.get(comment["id"], [])
-            comment["previews"] = preview_map.get(comment["id"], [])
-            comment["mentions"] = mention_map.get(comment["id"], [])
-            comment["attachment_files"] = attachment_file_map.get(
-                comment["id"], []
-            )
-
     if is_client:
-        tmp_comments = []
-        task = get_task(task_id)
-        project = projects_service.get_project(task["project_id"])
-        for comment in comments:
-            person = persons_service.get_person(comment["person_id"])
-            current_user = persons_service.get_current_user()
-            is_author = comment["person_id"] == current_user["id"]
-            is_author_client = person["role"] == "client"
-            is_clients_isolated = project.get("is_clients_isolated", False)
-            is_allowed = (is_clients_isolated and is_author) or (
-                not is_clients_isolated and is_author_client
-            )
-            if len(comment["previews"]) > 0 and not is_author_client:
-                comment["text"] = ""
-                comment["attachment_files"] = []
-                comment["checklist"] = []
-                tmp_comments.append(comment)
-            elif is_allowed:
-                tmp_comments.append(comment)
-        comments = tmp_comments
+        query = query.filter(_get_client_comments_filter(task_id))
+    if page is not None:
+        limit = limit or 100
+        query = query.limit(limit).offset((max(page, 1) - 1) * limit)
+    comments = _run_task_comments_query(query)
+
+    for comment in comments:
+        is_author_client = comment["person"].pop("role") == "client"
+        if is_client and not is_author_client:
+            comment["text"] = ""
+            comment["attachment_files"] = []
+            comment["checklist"] = []
     return comments
 
 
+def _get_client_comments_filter(task_id):
+    """
+    Comments a client can see: comments with previews (their content is
+    hidden later) and comments written by clients. If clients are isolated
+    in the project, only comments with previews and their own comments are
+    visible.
+    """
+    task = get_task(task_id)
+    project = projects_service.get_project(task["project_id"])
+    current_user = persons_service.get_current_user()
+    if project.get("is_clients_isolated", False):
+        is_allowed = Comment.person_id == current_user["id"]
+    else:
+        is_allowed = Person.role == "client"
+    has_previews = (
+        db.session.query(preview_link_table.c.comment)
+        .join(PreviewFile, preview_link_table.c.preview_file == PreviewFile.id)
+        .filter(preview_link_table.c.comment == Comment.id)
+        .filter(
+            or_(
+                PreviewFile.validation_status == None,
+                PreviewFile.validation_status != "rejected",
+            )
+        )
+        .correlate(Comment)
+        .exists()
+    )
+    return or_(and_(has_previews, Person.role != "client"), is_allowed)
+
+
 def _prepare_query(task_id, is_client, is_manager):
     query = (
         Comment.query.order_by(Comment.created_at.desc())
@@ -537,6 +552,11 @@ def _prepare_query(task_id, is_client, is_manager):
             Person.first_name,
             Person.last_name,
             Person.has_avatar,
+            Person.role,
+            _get_comment_persons_subquery(acknowledgements_table),
+            _get_comment_persons_subquery(mentions_table),
+            _get_comment_previews_subquery(is_client),
+            _get_comment_attachment_files_subquery(),
         )
     )
     if not is_manager and not is_client:
@@ -544,8 +564,103 @@ def _prepare_query(task_id, is_client, is_manager):
     return query
 
 
+def _get_comment_persons_subquery(link_table):
+    """
+    Ids of persons linked to the comment through given table.
+    """
+    return (
+        db.session.query(
+            func.coalesce(
+                func.array_agg(link_table.c.person), literal([], ARRAY(UUID))
+            )
+        )
+        .filter(link_table.c.comment == Comment.id)
+        .correlate(Comment)
+        .as_scalar()
+    )
+
+
+def _get_comment_previews_subquery(is_client=False):
+    """
+    Previews of the comment as a JSON list. Rejected previews are not listed
+    for clients.
+    """
+    query = (
+        db.session.query(
+            func.coalesce(
+                func.json_agg(
+                    func.json_build_object(
+                        "id",
+                        PreviewFile.id,
+                        "task_id",
+                        PreviewFile.task_id,
+                        "revision",
+                        PreviewFile.revision,
+                        "extension",
+                        PreviewFile.extension,
+                        "status",
+                        func.coalesce(PreviewFile.status, "ready"),
+                        "validation_status",
+                        func.coalesce(
+                            PreviewFile.validation_status, "neutral"
+                        ),
+                        "original_name",
+                        PreviewFile.original_name,
+                        "position",
+                        PreviewFile.position,
+                        "annotations",
+                        PreviewFile.annotations,
+                    )
+                ),
+                func.json_build_array(),
+            )
+        )
+        .join(
+            preview_link_table,
+            preview_link_table.c.preview_file == PreviewFile.id,
+        )
+        .filter(preview_link_table.c.comment == Comment.id)
+        .correlate(Comment)
+    )
+    if is_client:
+        query = query.filter(
+            or_(
+                PreviewFile.validation_status == None,
+                PreviewFile.validation_status != "rejected",
+            )
+        )
+    return query.as_scalar()
+
+
+def _get_comment_attachment_files_subquery():
+    """
+    Attachment files of the comment as a JSON list.
+    """
+    return (
+        db.session.query(
+            func.coalesce(
+                func.json_agg(
+                    func.json_build_object(
+                        "id",
+                        AttachmentFile.id,
+                        "name",
+                        AttachmentFile.name,
+                        "extension",
+                        AttachmentFile.extension,
+                        "size",
+                        AttachmentFile.size,
+                    )
+                ),
+                func.json_build_array(),
+            )
+        )
+        .filter(AttachmentFile.comment_id == Comment.id)
+        .correlate(Comment)
+        .as_scalar()
+    )
+
+
 def _run_task_comments_query(query):
-    comment_ids = []
     comments = []
     for result in query.all():
         (
@@ -556,6 +671,11 @@ def _run_task_comments_query(query):
             person_first_name,
             person_last_name,
             person_has_avatar,
+            person_role,
+            acknowledgements,
+            mentions,
+            previews,
+            attachment_files,
         ) = result
 
         comment_dict = comment.serialize()
@@ -564,6 +684,7 @@ def _run_task_comments_query(query):
             "last_name": person_last_name,
             "has_avatar": person_has_avatar,
             "id": str(comment.person_id),
+            "role": person_role,
         }
         comment_dict["task_status"] = {
             "name": task_status_name,
@@ -571,95 +692,14 @@ def _run_task_comments_query(query):
             "color": task_status_color,
             "id": str(comment.task_status_id),
         }
+        comment_dict["acknowledgements"] = [
+            str(person_id) for person_id in acknowledgements
+        ]
+        comment_dict["mentions"] = [str(person_id) for person_id in mentions]
+        comment_dict["previews"] = previews
+        comment_dict["attachment_files"] = attachment_files
         comments.append(comment_dict)
-        comment_ids.append(comment_dict["id"])
-    return (comments, comment_ids)
-
-
-def _build_ack_map_for_comments(comment_ids):
-    ack_map = {}
-    for link in (
-        db.session.query(acknowledgements_table)
-        .filter(acknowledgements_table.c.comment.in_(comment_ids))
-        .all()
-    ):
-        comment_id = str(link.comment)
-        person_id = str(link.person)
-        if comment_id not in ack_map:
-            ack_map[comment_id] = []
-        ack_map[comment_id].append(person_id)
-    return ack_map
-
-
-def _build_mention_map_for_comments(comment_ids):
-    mention_map = {}
-    for link in (
-        db.session.query(mentions_table)
-        .filter(mentions_table.c.comment.in_(comment_ids))
-        .all()
-    ):
-        comment_id = str(link.comment)
-        person_id = str(link.person)
-        if comment_id not in mention_map:
-            mention_map[comment_id] = []
-        mention_map[comment_id].append(person_id)
-    return mention_map
-
-
-def _build_preview_map_for_comments(comment_ids, is_client=False):
-    preview_map = {}
-    query = (
-        PreviewFile.query.join(preview_link_table)
-        .filter(preview_link_table.c.comment.in_(comment_ids))
-        .add_columns(preview_link_table.c.comment)
-    )
-    for (preview, comment_id) in query.all():
-        comment_id = str(comment_id)
-        if comment_id not in preview_map:
-            preview_map[comment_id] = []
-        status = "ready"
-        if preview.status is not None:
-            status = preview.status.code
-        validation_status = "neutral"
-        if preview.validation_status is not None:
-            validation_status = preview.validation_status.code
-
-        if validation_status != "rejected" or not is_client:
-            preview_map[comment_id].append(
-                {
-                    "id": str(preview.id),
-                    "task_id": str(preview.task_id),
-                    "revision": preview.revision,
-                    "extension": preview.extension,
-                    "status": status,
-                    "validation_status": validation_status,
-                    "original_name": preview.original_name,
-                    "position": preview.position,
-                    "annotations": preview.annotations,
-                }
-            )
-    return preview_map
-
-
-def _build_attachment_map_for_comments(comment_ids):
-    attachment_file_map = {}
-    attachment_files = AttachmentFile.query.filter(
-        AttachmentFile.comment_id.in_(comment_ids)
-    ).all()
-    for attachment_file in attachment_files:
-        comment_id = str(attachment_file.comment_id)
-        attachment_file_id = str(attachment_file.id)
-        if comment_id not in attachment_file_map:
-            attachment_file_map[str(comment_id)] = []
-        attachment_file_map[str(comment_id)].append(
-            {
-                "id": attachment_file_id,
-                "name": attachment_file.name,
-                "extension": attachment_file.extension,
-                "size": attachment_file.size,
-            }
-        )
-    return attachment_file_map
+    return comments
 
 
 def get_comment_raw(comment_id):
@@ -778,41 +818,17 @@ def get_person_tasks(person_id, projects, is_done=None):
     """
     Retrieve all tasks for given person and projects.
     """
-    person = Person.get(person_id)
     project_ids = [project["id"] for project in projects]
-
-    Sequence = aliased(Entity, name="sequence")
-    Episode = aliased(Entity, name="episode")
     query = (
-        Task.query.join(Project, TaskType, TaskStatus)
-        .join(Entity, Entity.id == Task.entity_id)
-        .join(EntityType, EntityType.id == Entity.entity_type_id)
-        .outerjoin(Sequence, Sequence.id == Entity.parent_id)
-        .outerjoin(Episode, Episode.id == Sequence.parent_id)
-        .filter(Task.assignees.contains(person))
-        .filter(Project.id.in_(project_ids))
-        .add_columns(
-            Project.name,
-            Project.has_avatar,
-            Entity.id,
-            Entity.name,
-            Entity.description,
-            Entity.data,
-            Entity.preview_file_id,
-            Entity.source_id,
-            EntityType.name,
-            Entity.canceled,
-            Entity.parent_id,
-            Sequence.name,
-            Episode.id,
-            Episode.name,
-            TaskType.name,
-            TaskType.for_entity,
-            TaskStatus.name,
-            TaskType.color,
-            TaskStatus.color,
-            TaskStatus.short_name,
+        _build_person_tasks_query()
+        .filter(
+            Task.id.in_(
+                db.session.query(assignees_table.c.task).filter(
+                    assignees_table.c.person == person_id
+                )
+            )
         )
+        .filter(Project.id.in_(project_ids))
     )
 
     if is_done:
@@ -821,102 +837,49 @@ def get_person_tasks(person_id, projects, is_done=None):
         )
     else:
         query = query.filter(TaskStatus.is_done == False)
-
-    tasks = []
-    for (
-        task,
-        project_name,
-        project_has_avatar,
-        entity_id,
-        entity_name,
-        entity_description,
-        entity_data,
-        entity_preview_file_id,
-        entity_source_id,
-        entity_type_name,
-        entity_canceled,
-        entity_parent_id,
-        sequence_name,
-        episode_id,
-        episode_name,
-        task_type_name,
-        task_type_for_entity,
-        task_status_name,
-        task_type_color,
-        task_status_color,
-        task_status_short_name,
-    ) in query.all():
-        if entity_preview_file_id is None:
-            entity_preview_file_id = ""
-
-        if entity_source_id is None:
-            entity_source_id = ""
-
-        if episode_id is None:
-            episode_id = entity_source_id
-
-        task_dict = get_task_with_relations(str(task.id))
-        if entity_type_name == "Sequence" and entity_parent_id is not None:
-            episode_id = entity_parent_id
-            episode = shots_service.get_episode(episode_id)
-            episode_name = episode["name"]
-
-        task_dict.update(
-            {
-                "project_name": project_name,
-                "project_id": str(task.project_id),
-                "project_has_avatar": project_has_avatar,
-                "entity_id": str(entity_id),
-                "entity_name": entity_name,
-                "entity_description": entity_description,
-                "entity_data": entity_data,
-                "entity_preview_file_id": str(entity_preview_file_id),
-                "entity_source_id": str(entity_source_id),
-                "entity_type_name": entity_type_name,
-                "entity_canceled": entity_canceled,
-                "sequence_name": sequence_name,
-                "episode_id": str(episode_id),
-                "episode_name": episode_name,
-                "task_estimation": task.estimation,
-                "task_duration": task.duration,
-                "task_start_date": fields.serialize_value(task.start_date),
-                "task_due_date": fields.serialize_value(task.due_date),
-                "task_type_name": task_type_name,
-                "task_type_for_entity": task_type_for_entity,
-                "task_status_name": task_status_name,
-                "task_type_color": task_type_color,
-                "task_status_color": task_status_color,
-                "task_status_short_name": task_status_short_name,
-            }
-        )
-        tasks.append(task_dict)
-
-    task_ids = [task["id"] for task in tasks]
-    task_comment_map = get_last_comment_map(task_ids)
-    for task in tasks:
-        if task["id"] in task_comment_map:
-            task["last_comment"] = task_comment_map[task["id"]]
-        else:
-            task["last_comment"] = {}
-    return tasks
+    return _get_person_task_dicts(query)
 
 
 def get_person_tasks_to_check(department_ids, project_ids):
     """
     Retrieve all tasks requiring a feedback for given departments and projects.
     """
+    query = (
+        _build_person_tasks_query()
+        .filter(Project.id.in_(project_ids))
+        .filter(TaskStatus.is_feedback_request)
+        .filter(TaskType.department_id.in_(department_ids))
+    )
+    return _get_person_task_dicts(query)
+
+
+def _build_person_tasks_query():
+    """
+    Build the query used to list tasks of a person. Tasks come with the
+    information about their project, entity, task type and task status. The
+    assignees of each task are aggregated in an array.
+    """
     Sequence = aliased(Entity, name="sequence")
     Episode = aliased(Entity, name="episode")
-    query = (
+    LastComment = aliased(Comment, name="last_comment")
+    LastCommentAuthor = aliased(Person, name="last_comment_author")
+    assignees = (
+        db.session.query(func.array_agg(assignees_table.c.person))
+        .filter(assignees_table.c.task == Task.id)
+        .label("assignees")
+    )
+    return (
         Task.query.join(Project, TaskType, TaskStatus)
         .join(Entity, Entity.id == Task.entity_id)
         .join(EntityType, EntityType.id == Entity.entity_type_id)
         .outerjoin(Sequence, Sequence.id == Entity.parent_id)
         .outerjoin(Episode, Episode.id == Sequence.parent_id)
-        .filter(Project.id.in_(project_ids))
-        .filter(TaskStatus.is_feedback_request)
-        .filter(TaskType.department_id.in_(department_ids))
+        .outerjoin(LastComment, LastComment.id == Task.last_comment_id)
+        .outerjoin(
+            LastCommentAuthor, LastCommentAuthor.id == LastComment.person_id
+        )
         .add_columns(
+            assignees,
             Project.name,
             Project.has_avatar,
             Entity.id,
@@ -937,11 +900,27 @@ def get_person_tasks_to_check(department_ids, project_ids):
             TaskType.color,
             TaskStatus.color,
             TaskStatus.short_name,
+            LastComment.text,
+            LastComment.created_at,
+            LastComment.person_id,
+            LastCommentAuthor.role,
         )
     )
+
+
+def _get_person_task_dicts(query):
+    """
+    Build task dicts from the result of a query built with
+    `_build_person_tasks_query`. The last comment comes from the join on the
+    task last comment, except when it was posted by a client. In that case,
+    the last comment not posted by a client is retrieved with one extra
+    query.
+    """
     tasks = []
+    client_commented_tasks = []
     for (
         task,
+        assignees,
         project_name,
         project_has_avatar,
         entity_id,
@@ -962,6 +941,10 @@ def get_person_tasks_to_check(department_ids, project_ids):
         task_type_color,
         task_status_color,
         task_status_short_name,
+        last_comment_text,
+        last_comment_date,
+        last_comment_person_id,
+        last_comment_author_role,
     ) in query.all():
         if entity_preview_file_id is None:
             entity_preview_file_id = ""
@@ -972,14 +955,17 @@ def get_person_tasks_to_check(department_ids, project_ids):
         if episode_id is None:
             episode_id = entity_source_id
 
-        task_dict = get_task_with_relations(str(task.id))
+        # For sequences, the parent joined as sequence is the episode.
         if entity_type_name == "Sequence" and entity_parent_id is not None:
             episode_id = entity_parent_id
-            episode = shots_service.get_episode(episode_id)
-            episode_name = episode["name"]
+            episode_name = sequence_name
 
+        task_dict = task.serialize()
         task_dict.update(
             {
+                "assignees": [
+                    str(assignee_id) for assignee_id in assignees or []
+                ],
                 "project_name": project_name,
                 "project_id": str(task.project_id),
                 "project_has_avatar": project_has_avatar,
@@ -1004,39 +990,56 @@ def get_person_tasks_to_check(department_ids, project_ids):
                 "task_type_color": task_type_color,
                 "task_status_color": task_status_color,
                 "task_status_short_name": task_status_short_name,
+                "last_comment": {},
             }
         )
+        if last_comment_author_role == "client":
+            client_commented_tasks.append(task_dict)
+        elif last_comment_date is not None:
+            task_dict["last_comment"] = {
+                "text": last_comment_text,
+                "date": fields.serialize_value(last_comment_date),
+                "person_id": fields.serialize_value(last_comment_person_id),
+            }
         tasks.append(task_dict)
 
-    task_ids = [task["id"] for task in tasks]
-    task_comment_map = get_last_comment_map(task_ids)
-    for task in tasks:
-        if task["id"] in task_comment_map:
-            task["last_comment"] = task_comment_map[task["id"]]
-        else:
-            task["last_comment"] = {}
+    if len(client_commented_tasks) > 0:
+        task_comment_map = get_last_comment_map(
+            [task["id"] for task in client_commented_tasks]
+        )
+        for task in client_commented_tasks:
+            task["last_comment"] = task_comment_map.get(task["id"], {})
     return tasks
 
 
 def get_last_comment_map(task_ids):
-    task_comment_map = {}
-    comments = (
-        Comment.query.filter(Comment.object_id.in_(task_ids))
+    """
+    Return a map where keys are task IDs and values are the last comment
+    (posted by a non-client user) of each task. Only one row is fetched per
+    task.
+    """
+    query = (
+        db.session.query(
+            Comment.object_id,
+            Comment.text,
+            Comment.created_at,
+            Comment.person_id,
+        )
         .join(Person)
+        .filter(Comment.object_id.in_(task_ids))
         .filter(Person.role != "client")
-        .order_by(Comment.object_id, Comment.created_at)
-        .all()
     )
-    task_id = None
-    for comment in comments:
-        if comment.object_id != task_id:
-            task_id = fields.serialize_value(comment.object_id)
-            task_comment_map[task_id] = {
-                "text": comment.text,
-                "date": fields.serialize_value(comment.created_at),
-                "person_id": fields.serialize_value(comment.person_id),
-            }
-    return task_comment_map
+    query = query_utils.get_first_per_group(
+        query, [Comment.object_id], Comment.created_at.desc()
+    )
+    return {
+        fields.serialize_value(task_id): {
+            "text": text,
+            "date": fields.serialize_value(created_at),
+            "person_id": fields.serialize_value(person_id),
+        }
+        for (task_id, text, created_at, person_id) in query.all()
+    }
 
 
 def create_tasks(task_type, entities):
@@ -1359,6 +1362,119 @@ def assign_task(task_id, person_id, assigner_id=None):
     return task_dict
 
 
+def _get_valid_task_ids(task_ids):
+    return list(
+        set(
+            str(task_id)
+            for task_id in task_ids
+            if fields.is_valid_id(str(task_id))
+        )
+    )
+
+
+def assign_tasks(task_ids, person_id, assigner_id=None):
+    """
+    Assign given person to given tasks. Assignations are stored with a single
+    insert that ignores existing ones. Unknown task ids are ignored. Emit a
+    *task:assign* and a *task:update* event for each task.
+    """
+    person = persons_service.get_person(person_id)
+    task_ids = _get_valid_task_ids(task_ids)
+    tasks = Task.query.filter(Task.id.in_(task_ids)).all()
+    if len(tasks) == 0:
+        return []
+
+    task_ids = [task.id for task in tasks]
+    try:
+        db.session.execute(
+            insert(assignees_table)
+            .values(
+                [
+                    {"task": task_id, "person": person["id"]}
+                    for task_id in task_ids
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+        if assigner_id is not None:
+            Task.query.filter(Task.id.in_(task_ids)).update(
+                {
+                    Task.assigner_id: assigner_id,
+                    Task.updated_at: datetime.datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+    tasks = Task.query.filter(Task.id.in_(task_ids)).all()
+    task_dicts = []
+    for task in tasks:
+        task_id = str(task.id)
+        project_id = str(task.project_id)
+        clear_task_cache(task_id)
+        events.emit(
+            "task:assign",
+            {"task_id": task_id, "person_id": person["id"]},
+            project_id=project_id,
+        )
+        events.emit("task:update", {"task_id": task_id}, project_id=project_id)
+        task_dicts.append(task.serialize())
+    return task_dicts
+
+
+def clear_assignations(task_ids, person_id=None):
+    """
+    Remove assignations of given tasks with a single delete. If a person is
+    given, only the assignations of this person are removed. Emit a
+    *task:unassign* event for each removed assignation and a *task:update*
+    event for each task.
+    """
+    task_ids = _get_valid_task_ids(task_ids)
+    tasks = Task.query.filter(Task.id.in_(task_ids)).all()
+    if len(tasks) == 0:
+        return []
+
+    task_ids = [task.id for task in tasks]
+    query = assignees_table.delete().where(
+        assignees_table.c.task.in_(task_ids)
+    )
+    if person_id is not None:
+        query = query.where(assignees_table.c.person == person_id)
+    try:
+        removed_assignations = db.session.execute(
+            query.returning(assignees_table.c.task, assignees_table.c.person)
+        ).fetchall()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+    tasks = Task.query.filter(Task.id.in_(task_ids)).all()
+    project_ids = {str(task.id): str(task.project_id) for task in tasks}
+    for (task_id, assignee_id) in removed_assignations:
+        events.emit(
+            "task:unassign",
+            {"person_id": str(assignee_id), "task_id": str(task_id)},
+            project_id=project_ids[str(task_id)],
+        )
+    task_dicts = []
+    for task in tasks:
+        task_id = str(task.id)
+        clear_task_cache(task_id)
+        events.emit(
+            "task:update",
+            {"task_id": task_id},
+            project_id=project_ids[task_id],
+        )
+        task_dicts.append(task.serialize())
+    return task_dicts
+
+
 def task_to_review(
     task_id, person, comment, preview_path={}, change_status=True
 ):
@@ -1439,6 +1555,7 @@ def add_preview_file_to_comment(comment_id, person_id, task_id, revision=0):
     comment.save()
     if news is not None:
         news.update({"preview_file_id": preview_file.id})
+    refresh_last_comments_and_preview_files([task_id])
     events.emit(
         "comment:update", {"comment_id": comment.id}, project_id=project_id
     )
@@ -1536,6 +1653,7 @@ def reset_task_data(task_id):
     retake_count = 0
     real_start_date = None
     last_comment_date = None
+    last_comment_id = None
     end_date = None
     task_status_id = get_default_status()["id"]
     comments = (
@@ -1571,6 +1689,7 @@ def reset_task_data(task_id):
 
         task_status_id = comment.task_status_id
         last_comment_date = comment.created_at
+        last_comment_id = comment.id
 
     duration = 0
     time_spents = TimeSpent.get_all_by(task_id=task.id)
@@ -1583,6 +1702,7 @@ def reset_task_data(task_id):
             "retake_count": retake_count,
             "real_start_date": real_start_date,
             "last_comment_date": last_comment_date,
+            "last_comment_id": last_comment_id,
             "end_date": end_date,
             "task_status_id": task_status_id,
         }
@@ -1590,3 +1710,46 @@ def reset_task_data(task_id):
     project_id = str(task.project_id)
     events.emit("task:update", {"task_id": task.id}, project_id)
     return task.serialize()
+
+
+def refresh_last_comments_and_preview_files(task_ids=None, project_id=None):
+    """
+    Set the last comment and the last preview file of given tasks (or of all
+    tasks of given project, or of all tasks) with a single update statement.
+    The last preview file is the first one of the highest revision.
+    """
+    table = Task.__table__
+    last_comment = (
+        db.session.query(Comment.id)
+        .filter(Comment.object_id == table.c.id)
+        .order_by(Comment.created_at.desc())
+        .limit(1)
+        .as_scalar()
+    )
+    last_preview_file = (
+        db.session.query(PreviewFile.id)
+        .filter(PreviewFile.task_id == table.c.id)
+        .order_by(PreviewFile.revision.desc(), PreviewFile.created_at)
+        .limit(1)
+        .as_scalar()
+    )
+    statement = table.update().values(
+        last_comment_id=last_comment,
+        last_preview_file_id=last_preview_file,
+    )
+    if task_ids is not None:
+        statement = statement.where(table.c.id.in_(task_ids))
+    if project_id is not None:
+        statement = statement.where(table.c.project_id == project_id)
+
+    try:
+        result = db.session.execute(statement)
+        db.session.commit()
+    except:
+        db.session.rollback()
+        db.session.remove()
+        raise
+
+    for task_id in task_ids or []:
+        clear_task_cache(str(task_id))
+    return result.rowcount
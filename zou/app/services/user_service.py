@@ -28,6 +28,7 @@ from zou.app.services import (
 from zou.app.services.exception import (
     SearchFilterNotFoundException,
     NotificationNotFoundException,
+    TaskNotFoundException,
 )
 from zou.app.utils import cache, fields, permissions
 
@@ -693,6 +694,29 @@ def check_task_departement_access_for_unassign(task_id, person_id=None):
     return is_allowed
 
 
+def get_tasks_with_departement_access(task_ids, person_id, unassign=False):
+    """
+    Return ids of given tasks for which current user is allowed to
+    (un)assign given person. Admins are allowed on every task, so no task is
+    loaded for them. Unknown tasks are left out for other users.
+    """
+    if permissions.has_admin_permissions():
+        return list(task_ids)
+    allowed_task_ids = []
+    for task_id in task_ids:
+        try:
+            if unassign:
+                check_task_departement_access_for_unassign(task_id, person_id)
+            else:
+                check_task_departement_access(task_id, person_id)
+            allowed_task_ids.append(task_id)
+        except permissions.PermissionDenied:
+            pass
+        except TaskNotFoundException:
+            pass
+    return allowed_task_ids
+
+
 def check_all_departments_access(project_id, departments=[]):
     """
     Return true if current user is admin or is manager and is in team or is
@@ -898,7 +922,7 @@ def get_last_notifications(
             Comment.task_status_id,
             Comment.text,
             Comment.replies,
-            Task.entity_id,
+            Task.entity_id.label("task_entity_id"),
             Author.role,
         )
     )
@@ -922,6 +946,9 @@ def get_last_notifications(
         query = query.filter(Notification.type == notification_type)
 
     notifications = query.limit(100).all()
+    entity_names = names_service.get_full_entity_names(
+        [row.task_entity_id for row in notifications]
+    )
 
     for (
         notification,
@@ -935,9 +962,7 @@ def get_last_notifications(
         task_entity_id,
         role,
     ) in notifications:
-        (full_entity_name, episode_id) = names_service.get_full_entity_name(
-            task_entity_id
-        )
+        (full_entity_name, episode_id) = entity_names[str(task_entity_id)]
         preview_file_id = None
         mentions = []
         if comment_id is not None:
@@ -1,6 +1,10 @@
 import os
+import shutil
+import threading
 import flask_fs as fs
 
+from concurrent.futures import ThreadPoolExecutor
+
 from flask_fs.backends.local import LocalBackend
 from flask_fs.backends.swift import SwiftBackend
 from flask_fs.backends.s3 import S3Backend
@@ -34,17 +38,13 @@ def path(self, filename):
     return path
 
 
-def init_swift(self, name, config):
-    """
-    Hack needed because Flask FS backend supports only swift 1.0 authentication.
-    """
+def make_swift_connection(config):
     import swiftclient
 
-    super(SwiftBackend, self).__init__(name, config)
     version = "3"
     if "2.0" in config.authurl:
         version = "2.0"
-    self.conn = swiftclient.Connection(
+    return swiftclient.Connection(
         user=config.user,
         key=config.key,
         authurl=config.authurl,
@@ -54,26 +54,46 @@ def init_swift(self, name, config):
             "region_name": config.region_name,
         },
     )
+
+
+def init_swift(self, name, config):
+    """
+    Hack needed because Flask FS backend supports only swift 1.0 authentication.
+    """
+    super(SwiftBackend, self).__init__(name, config)
+    self.connections = threading.local()
     self.conn.put_container(self.name)
 
 
-def init_s3(self, name, config):
-    import boto3
-    import botocore.exceptions
+def get_swift_connection(self):
+    """
+    Swift connections can't be shared between threads, so each thread gets
+    its own connection.
+    """
+    if not hasattr(self.connections, "conn"):
+        self.connections.conn = make_swift_connection(self.config)
+    return self.connections.conn
 
-    super(S3Backend, self).__init__(name, config)
-    self.session = boto3.session.Session()
-    self.s3config = boto3.session.Config(signature_version="s3v4")
 
-    self.s3 = self.session.resource(
+def make_s3_resource(config):
+    import boto3
+
+    session = boto3.session.Session()
+    return session.resource(
         "s3",
-        config=self.s3config,
+        config=boto3.session.Config(signature_version="s3v4"),
         endpoint_url=config.endpoint,
         region_name=config.region,
         aws_access_key_id=config.access_key,
         aws_secret_access_key=config.secret_key,
     )
-    self.bucket = self.s3.Bucket(name)
+
+
+def init_s3(self, name, config):
+    import botocore.exceptions
+
+    super(S3Backend, self).__init__(name, config)
+    self.resources = threading.local()
 
     bucket_exists = True
 
@@ -121,13 +141,30 @@ def read_s3(self, filename):
     return obj["Body"].iter_chunks(1024 * 1024)
 
 
+def get_s3_resource(self):
+    """
+    Boto3 resources can't be shared between threads, so each thread gets
+    its own resource.
+    """
+    if not hasattr(self.resources, "s3"):
+        self.resources.s3 = make_s3_resource(self.config)
+    return self.resources.s3
+
+
+def get_s3_bucket(self):
+    return self.s3.Bucket(self.name)
+
+
 LocalBackend.default_root = default_root
 LocalBackend.read = read
 LocalBackend.path = path
 LocalBackend.delete = local_delete
 SwiftBackend.__init__ = init_swift
+SwiftBackend.conn = property(get_swift_connection)
 SwiftBackend.read = read_swift
 S3Backend.__init__ = init_s3
+S3Backend.s3 = property(get_s3_resource)
+S3Backend.bucket = property(get_s3_bucket)
 S3Backend.read = read_s3
 
 
@@ -155,6 +192,7 @@ def make_storage(bucket):
 pictures = make_storage("pictures")
 movies = make_storage("movies")
 files = make_storage("files")
+storages = {"pictures": pictures, "movies": movies, "files": files}
 
 pictures.configure(app)
 movies.configure(app)
@@ -270,3 +308,189 @@ def remove_file(prefix, id):
 
 def get_local_file_path(prefix, id):
     return path(files, make_key(prefix, id))
+
+
+def list_keys(bucket_name):
+    """
+    Return a generator of all the keys stored in given bucket. Local files
+    are stored in subfolders, so their key is rebuilt from their path.
+    """
+    storage = storages[bucket_name]
+    if isinstance(storage.backend, LocalBackend):
+        for filename in storage.list_files():
+            parts = filename.split(os.sep)
+            if len(parts) > 1:
+                yield "%s-%s" % (parts[0], parts[-1])
+    else:
+        for key in storage.list_files():
+            yield key
+
+
+def remove_keys(bucket_name, keys, max_workers=8):
+    """
+    Remove given keys from given bucket. S3 objects are removed with
+    multi-object delete requests, Swift objects with parallel requests and
+    local files one by one. Missing files are considered as removed.
+
+    It returns a dict of the keys that could not be removed with their error.
+    """
+    storage = storages[bucket_name]
+    backend = storage.backend
+    if isinstance(backend, S3Backend):
+        return _remove_s3_keys(backend, keys)
+    elif isinstance(backend, SwiftBackend):
+        return _remove_swift_keys(backend, keys, max_workers)
+    else:
+        return _remove_local_keys(backend, keys)
+
+
+def _remove_local_keys(backend, keys):
+    errors = {}
+    for key in keys:
+        try:
+            os.remove(backend.path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            errors[key] = str(e)
+    return errors
+
+
+def _remove_s3_keys(backend, keys):
+    errors = {}
+    for index in range(0, len(keys), 1000):
+        chunk = keys[index : index + 1000]
+        try:
+            result = backend.s3.meta.client.delete_objects(
+                Bucket=backend.bucket.name,
+                Delete={
+                    "Objects": [{"Key": key} for key in chunk],
+                    "Quiet": True,
+                },
+            )
+            for error in result.get("Errors", []):
+                if error.get("Code") != "NoSuchKey":
+                    errors[error["Key"]] = error.get("Message", "")
+        except Exception as e:
+            for key in chunk:
+                errors[key] = str(e)
+    return errors
+
+
+def _remove_swift_keys(backend, keys, max_workers=8):
+    from swiftclient.exceptions import ClientException
+
+    def remove_key(key):
+        try:
+            backend.conn.delete_object(backend.name, key)
+        except ClientException as e:
+            if e.http_status != 404:
+                return (key, str(e))
+        except Exception as e:
+            return (key, str(e))
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(remove_key, keys)
+    return dict(result for result in results if result is not None)
+
+
+def get_size(bucket_name, key):
+    """
+    Return the size in bytes of the file stored under given key in given
+    bucket, or None if there is no such file.
+    """
+    backend = storages[bucket_name].backend
+    if isinstance(backend, S3Backend):
+        import botocore.exceptions
+
+        try:
+            return backend.s3.meta.client.head_object(
+                Bucket=backend.name, Key=key
+            )["ContentLength"]
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ["404", "NoSuchKey"]:
+                return None
+            raise
+    elif isinstance(backend, SwiftBackend):
+        from swiftclient.exceptions import ClientException
+
+        try:
+            headers = backend.conn.head_object(backend.name, key)
+            return int(headers["content-length"])
+        except ClientException as e:
+            if e.http_status == 404:
+                return None
+            raise
+    else:
+        file_path = backend.path(key)
+        if os.path.exists(file_path):
+            return os.path.getsize(file_path)
+        else:
+            return None
+
+
+def write_stream(bucket_name, key, stream, part_size=64 * 1024 * 1024):
+    """
+    Store the content read from given file-like object under given key in
+    given bucket, without loading it fully in memory or on disk. S3 objects
+    are sent with a multipart upload, Swift objects as segments listed by a
+    manifest object. If reading the stream fails, nothing is stored.
+    """
+    backend = storages[bucket_name].backend
+    if isinstance(backend, S3Backend):
+        from boto3.s3.transfer import TransferConfig
+
+        backend.s3.meta.client.upload_fileobj(
+            stream,
+            backend.name,
+            key,
+            Config=TransferConfig(multipart_chunksize=part_size),
+        )
+    elif isinstance(backend, SwiftBackend):
+        _write_swift_segments(backend, key, stream, part_size)
+    else:
+        file_path = backend.path(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        try:
+            with open(file_path, "wb") as target_file:
+                shutil.copyfileobj(stream, target_file)
+        except:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+
+
+def _write_swift_segments(backend, key, stream, part_size):
+    segment_names = []
+    try:
+        while True:
+            chunk = stream.read(part_size)
+            if len(chunk) == 0:
+                break
+            segment_names.append("%s/%08d" % (key, len(segment_names)))
+            backend.conn.put_object(backend.name, segment_names[-1], chunk)
+        backend.conn.put_object(
+            backend.name,
+            key,
+            b"",
+            headers={"X-Object-Manifest": "%s/%s/" % (backend.name, key)},
+        )
+    except:
+        _remove_swift_keys(backend, segment_names)
+        raise
+
+
+def read_stream(bucket_name, key, chunk_size=1024 * 1024):
+    """
+    Generator that yields the content of the file stored under given key in
+    given bucket, chunk by chunk.
+    """
+    backend = storages[bucket_name].backend
+    if isinstance(backend, LocalBackend):
+        with open(backend.path(key), "rb") as source_file:
+            for chunk in iter(lambda: source_file.read(chunk_size), b""):
+                yield chunk
+    else:
+        for chunk in backend.read(key):
+            yield chunk
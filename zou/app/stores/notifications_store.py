@@ -0,0 +1,169 @@
+"""
+Pending notification messages are stored per person until their digest is
+due. Delivery metrics (messages sent and failed, time spent per channel) are
+stored here too, so they are shared by all delivery workers.
+
+When Redis cannot be reached, a process local store is used and `is_shared`
+is False: no worker would ever deliver the digests stored there, so messages
+must be sent directly in that case.
+"""
+import json
+import sys
+import time
+import redis
+
+from zou.app import config
+
+
+try:
+    notifications_store = redis.StrictRedis(
+        host=config.KEY_VALUE_STORE["host"],
+        port=config.KEY_VALUE_STORE["port"],
+        db=config.KV_NOTIFICATIONS_DB_INDEX,
+        decode_responses=True,
+    )
+    notifications_store.get("test")
+    is_shared = True
+except redis.ConnectionError:
+    try:
+        import fakeredis
+
+        notifications_store = fakeredis.FakeStrictRedis(decode_responses=True)
+        is_shared = False
+    except:
+        print("Cannot access to the required Redis instance")
+        sys.exit(1)
+
+DUE_KEY = "digests:due"
+RETRY_KEY = "digests:retries"
+METRICS_KEY = "delivery:metrics"
+CHANNELS = ["email", "slack", "mattermost", "discord"]
+
+
+def get_digest_key(person_id):
+    return "digests:%s" % person_id
+
+
+def add_message(person_id, message, window=0, now=None):
+    """
+    Store given message in the digest of given person. The digest is due
+    `window` seconds after the first message was added to it.
+    """
+    if now is None:
+        now = time.time()
+    pipeline = notifications_store.pipeline()
+    pipeline.rpush(get_digest_key(person_id), json.dumps(message))
+    pipeline.zadd(DUE_KEY, {person_id: now + window}, nx=True)
+    return pipeline.execute()
+
+
+def pop_due_digests(now=None, limit=500):
+    """
+    Remove digests that are due from the store and return them as a dict
+    where keys are person ids and values are the list of pending messages.
+    """
+    if now is None:
+        now = time.time()
+    person_ids = notifications_store.zrangebyscore(
+        DUE_KEY, "-inf", now, start=0, num=limit
+    )
+    digests = {}
+    for person_id in person_ids:
+        key = get_digest_key(person_id)
+        pipeline = notifications_store.pipeline(transaction=True)
+        pipeline.lrange(key, 0, -1)
+        pipeline.delete(key)
+        pipeline.zrem(DUE_KEY, person_id)
+        (messages, _, removed) = pipeline.execute()
+        if removed and len(messages) > 0:
+            digests[person_id] = [json.loads(message) for message in messages]
+    return digests
+
+
+def restore_digests(digests, now=None):
+    """
+    Put given digests (as returned by `pop_due_digests`) back in the store,
+    before any message added since then. They are due immediately.
+    """
+    if now is None:
+        now = time.time()
+    pipeline = notifications_store.pipeline(transaction=True)
+    for person_id, messages in digests.items():
+        pipeline.lpush(
+            get_digest_key(person_id),
+            *[json.dumps(message) for message in reversed(messages)]
+        )
+        pipeline.zadd(DUE_KEY, {person_id: now})
+    return pipeline.execute()
+
+
+def add_delivery_retries(deliveries):
+    """
+    Store given deliveries that failed so they are sent again by the next
+    delivery run. Deliveries are dicts made of a channel, a message and
+    a number of attempts.
+    """
+    if len(deliveries) == 0:
+        return []
+    return notifications_store.rpush(
+        RETRY_KEY, *[json.dumps(delivery) for delivery in deliveries]
+    )
+
+
+def pop_delivery_retries(limit=500):
+    """
+    Remove deliveries to retry from the store and return them.
+    """
+    pipeline = notifications_store.pipeline(transaction=True)
+    pipeline.lrange(RETRY_KEY, 0, limit - 1)
+    pipeline.ltrim(RETRY_KEY, limit, -1)
+    (deliveries, _) = pipeline.execute()
+    return [json.loads(delivery) for delivery in deliveries]
+
+
+def get_pending_digests_count():
+    """
+    Return the number of persons waiting for a digest.
+    """
+    return notifications_store.zcard(DUE_KEY)
+
+
+def add_metrics(channel, sent=0, failed=0, duration=0.0):
+    """
+    Add given delivery results to the metrics of given channel.
+    """
+    pipeline = notifications_store.pipeline()
+    pipeline.hincrby(METRICS_KEY, "%s:sent" % channel, sent)
+    pipeline.hincrby(METRICS_KEY, "%s:failed" % channel, failed)
+    pipeline.hincrbyfloat(METRICS_KEY, "%s:duration" % channel, duration)
+    return pipeline.execute()
+
+
+def get_metrics():
+    """
+    Return delivery metrics for each channel: messages sent, messages that
+    failed, time spent delivering them and resulting throughput (messages
+    per second).
+    """
+    values = notifications_store.hgetall(METRICS_KEY)
+    metrics = {}
+    for channel in CHANNELS:
+        sent = int(values.get("%s:sent" % channel, 0))
+        failed = int(values.get("%s:failed" % channel, 0))
+        duration = float(values.get("%s:duration" % channel, 0))
+        metrics[channel] = {
+            "sent": sent,
+            "failed": failed,
+            "duration": round(duration, 3),
+            "throughput": round(sent / duration, 3) if duration > 0 else 0,
+        }
+    metrics["pending_digests"] = get_pending_digests_count()
+    metrics["pending_retries"] = notifications_store.llen(RETRY_KEY)
+    return metrics
+
+
+def clear():
+    """
+    Remove all pending messages and metrics from the store.
+    """
+    return notifications_store.flushdb()
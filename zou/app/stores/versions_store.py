@@ -0,0 +1,197 @@
+"""
+Versions are random tokens stored for each collection of data, per project.
+Each time an event related to a collection is emitted, the version of the
+collection is renewed. It allows to build ETags for heavy read endpoints
+without querying the database.
+
+Versions must be shared by all the API instances. When Redis cannot be
+reached, a process local store is used and `is_shared` is False: conditional
+requests must not be honoured in that case.
+"""
+import hashlib
+import sys
+import redis
+
+from zou.app import config
+from zou.app.utils import fields
+
+
+try:
+    versions_store = redis.StrictRedis(
+        host=config.KEY_VALUE_STORE["host"],
+        port=config.KEY_VALUE_STORE["port"],
+        db=config.KV_VERSIONS_DB_INDEX,
+        decode_responses=True,
+    )
+    versions_store.get("test")
+    is_shared = True
+except redis.ConnectionError:
+    try:
+        import fakeredis
+
+        versions_store = fakeredis.FakeStrictRedis(decode_responses=True)
+        is_shared = False
+    except:
+        print("Cannot access to the required Redis instance")
+        sys.exit(1)
+
+# Keys are collection names. Values are the events that modify the
+# collection. An event is described by its full name (`asset:update`) or by
+# its model name only (`entity-link`) to match all actions on this model.
+collection_events = {
+    "assets": [
+        "asset",
+        "asset-type",
+        "episode",
+        "task",
+        "comment",
+        "preview-file",
+        "entity-link",
+        "metadata-descriptor",
+        "project",
+        "person",
+    ],
+    "casting": [
+        "entity-link",
+        "asset:update",
+        "asset:delete",
+        "asset-type",
+        "shot:delete",
+        "preview-file:set-main",
+    ],
+    "playlists": [
+        "playlist",
+        "build-job",
+    ],
+    "schedule-items": [
+        "schedule-item",
+        "task-type",
+        "project",
+    ],
+    "shots": [
+        "shot",
+        "sequence",
+        "episode",
+        "task",
+        "comment",
+        "preview-file",
+        "metadata-descriptor",
+        "project",
+        "person",
+    ],
+}
+
+# Events matching the rows of a model, for models whose table name doesn't
+# match the name used by their events. They are used for write operations
+# that don't emit events (sync imports, set-based deletions).
+model_events = {
+    "entity": [
+        "asset:update",
+        "shot:update",
+        "shot:delete",
+        "sequence:update",
+        "episode:update",
+    ],
+    "entity_type": ["asset-type:update"],
+}
+
+# Version renewed each time a collection is modified, whatever the project is.
+# It is used for requests that span several projects.
+ANY_PROJECT = "any"
+
+
+def get_key(collection, project_id=None):
+    """
+    Build the store key of given collection for given project.
+    """
+    return "%s:%s" % (collection, project_id or "all")
+
+
+def get(collection, project_id=None):
+    """
+    Return current version of given collection for given project. If there is
+    no version stored yet, a new one is generated.
+    """
+    key = get_key(collection, project_id)
+    version = versions_store.get(key)
+    if version is None:
+        versions_store.set(key, fields.gen_uuid().hex, nx=True)
+        version = versions_store.get(key)
+    return version
+
+
+def bump(collection, project_id=None):
+    """
+    Renew the version of given collection for given project and the version
+    of the collection for any project.
+    """
+    pipeline = versions_store.pipeline()
+    pipeline.set(get_key(collection, project_id), fields.gen_uuid().hex)
+    pipeline.set(get_key(collection, ANY_PROJECT), fields.gen_uuid().hex)
+    return pipeline.execute()
+
+
+def bump_for_event(event, project_id=None):
+    """
+    Renew the version of every collection modified by given event. When no
+    project is given, the version shared by all projects is renewed.
+    """
+    if project_id == "None":
+        project_id = None
+    for collection in get_event_collections(event):
+        bump(collection, project_id)
+
+
+def bump_for_models(model_names, project_id=None):
+    """
+    Renew the version of every collection built from given models (table
+    names). It is used by write operations that don't emit events.
+    """
+    collections = set()
+    for model_name in model_names:
+        events = model_events.get(
+            model_name, ["%s:update" % model_name.replace("_", "-")]
+        )
+        for event in events:
+            collections.update(get_event_collections(event))
+    for collection in sorted(collections):
+        bump(collection, project_id)
+
+
+def get_event_collections(event):
+    """
+    Return the names of the collections modified by given event.
+    """
+    model_name = event.split(":")[0]
+    return [
+        collection
+        for collection, events in collection_events.items()
+        if event in events or model_name in events
+    ]
+
+
+def get_etag(collections, project_id=None, variant=""):
+    """
+    Build an ETag for given collections and project from the versions of the
+    collections (the project one and the one shared by all projects). When
+    no project is given, the version for any project is used. Variant allows
+    to build different ETags for the same versions (user, query parameters,
+    ...).
+    """
+    if isinstance(collections, str):
+        collections = [collections]
+    versions = [variant]
+    for collection in sorted(collections):
+        if project_id is None:
+            versions.append(get(collection, ANY_PROJECT))
+        else:
+            versions.append(get(collection))
+            versions.append(get(collection, project_id))
+    return hashlib.md5(":".join(versions).encode("utf-8")).hexdigest()
+
+
+def clear():
+    """
+    Remove all versions stored in the store.
+    """
+    return versions_store.flushdb()
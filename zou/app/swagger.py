@@ -1268,6 +1268,16 @@ swagger_template = {
                     "format": "UUID",
                     "description": "Person ID",
                 },
+                "last_comment_id": {
+                    "type": "string",
+                    "format": "UUID",
+                    "description": "Last comment ID",
+                },
+                "last_preview_file_id": {
+                    "type": "string",
+                    "format": "UUID",
+                    "description": "Last preview file ID",
+                },
             },
         },
         "TaskStatus": {
@@ -127,3 +127,177 @@ def send_to_discord(token, userid, message):
         logger.info(
             "The token of the Discord bot for sending notifications is not defined."
         )
+
+
+def send_many_to_slack(
+    token, messages, rate_limiter=None, failed_messages=None
+):
+    """
+    Send given messages with a single Slack client. Messages are tuples made
+    of a user id and a message. It returns the number of messages sent and
+    the number of messages that failed. Messages rejected or raising an
+    error are appended to `failed_messages` when it is given.
+    """
+    if not token:
+        logger.info(
+            "The token of Slack for sending notifications is not defined."
+        )
+        return (0, len(messages))
+
+    sent = 0
+    client = SlackClient(token=token)
+    for (userid, message) in messages:
+        is_sent = False
+        if not userid:
+            logger.info("The userid of Slack user is not defined.")
+            continue
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        try:
+            response = client.api_call(
+                "chat.postMessage",
+                channel="@%s" % userid,
+                blocks=[
+                    {
+                        "type": "section",
+                        "text": {"type": "mrkdwn", "text": message},
+                    }
+                ],
+                as_user=True,
+            )
+            if response.get("ok", True):
+                sent += 1
+                is_sent = True
+            else:
+                logger.info(
+                    "Slack notification rejected: %s" % response.get("error")
+                )
+        except Exception:
+            logger.info("Exception when sending a Slack notification:")
+            logger.info(traceback.format_exc())
+        if not is_sent and failed_messages is not None:
+            failed_messages.append((userid, message))
+    return (sent, len(messages) - sent)
+
+
+def send_many_to_mattermost(
+    webhook, messages, rate_limiter=None, failed_messages=None
+):
+    """
+    Send given messages through a single Mattermost webhook. Messages are
+    tuples made of a user id and a message. It returns the number of messages
+    sent and the number of messages that failed. Messages raising an error
+    are appended to `failed_messages` when it is given.
+    """
+    if not webhook:
+        logger.info(
+            "The webhook of Mattermost for sending notifications is not defined."
+        )
+        return (0, len(messages))
+
+    sent = 0
+    try:
+        arg = webhook.split("/")
+        server = "%s%s//%s" % (arg[0], arg[1], arg[2])
+        mwh = Webhook(server, arg[4])
+        mwh.icon_url = "%s://%s/img/kitsu.b07d6464.png" % (
+            config.DOMAIN_PROTOCOL,
+            config.DOMAIN_NAME,
+        )
+    except Exception:
+        logger.info("Exception when configuring the Mattermost webhook:")
+        logger.info(traceback.format_exc())
+        return (0, len(messages))
+
+    for (userid, message) in messages:
+        if not userid:
+            logger.info("The userid of Mattermost user is not defined.")
+            continue
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        try:
+            mwh.username = "Kitsu - %s" % (message["project_name"])
+            mwh.send(message["message"], channel="@%s" % userid)
+            sent += 1
+        except Exception:
+            logger.info("Exception when sending a Mattermost notification:")
+            logger.info(traceback.format_exc())
+            if failed_messages is not None:
+                failed_messages.append((userid, message))
+    return (sent, len(messages) - sent)
+
+
+def send_many_to_discord(
+    token, messages, rate_limiter=None, failed_messages=None
+):
+    """
+    Send given messages with a single Discord client session. Messages are
+    tuples made of a user id and a message. It returns the number of messages
+    sent and the number of messages that failed. Messages that could not be
+    delivered to a known user are appended to `failed_messages` when it is
+    given.
+    """
+    if not token:
+        logger.info(
+            "The token of the Discord bot for sending notifications is not defined."
+        )
+        return (0, len(messages))
+
+    results = {"sent": 0, "sent_messages": [], "unknown": []}
+
+    async def send_many_to_discord_async(token, messages):
+        intents = DiscordIntents.default()
+        intents.members = True
+        client = DiscordClient(intents=intents)
+
+        @client.event
+        async def on_ready():
+            try:
+                users = {
+                    "%s#%s" % (user.name, user.discriminator): user
+                    for user in client.get_all_members()
+                    if not user.bot
+                }
+                for (userid, message) in messages:
+                    user = users.get(userid)
+                    if user is None:
+                        logger.info(
+                            "User %s not found by Discord bot" % userid
+                        )
+                        results["unknown"].append(userid)
+                        continue
+                    if rate_limiter is not None:
+                        await asyncio.sleep(rate_limiter.get_delay())
+                    try:
+                        embed = DiscordEmbed()
+                        embed.description = message
+                        await user.send(embed=embed)
+                        results["sent"] += 1
+                        results["sent_messages"].append((userid, message))
+                    except Exception:
+                        logger.info(
+                            "Exception when sending a Discord notification:"
+                        )
+                        logger.info(traceback.format_exc())
+            finally:
+                await client.close()
+
+        await client.start(token)
+
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(send_many_to_discord_async(token, messages))
+    except Exception:
+        logger.info("Exception when sending Discord notifications:")
+        logger.info(traceback.format_exc())
+    finally:
+        loop.close()
+    if failed_messages is not None:
+        failed_messages.extend(
+            (userid, message)
+            for (userid, message) in messages
+            if (userid, message) not in results["sent_messages"]
+            and userid not in results["unknown"]
+        )
+    return (results["sent"], len(messages) - results["sent"])
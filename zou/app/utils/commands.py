@@ -2,24 +2,30 @@
 
 import os
 import json
+import time
 import datetime
 
 
 from ldap3 import Server, Connection, ALL, NTLM, SIMPLE
 from zou.app.utils import thumbnail as thumbnail_utils
+from zou.app.utils import transfer
 from zou.app.stores import auth_tokens_store, file_store
 from zou.app.services import (
     assets_service,
     backup_service,
     deletion_service,
     edits_service,
+    emails_service,
     index_service,
     persons_service,
     projects_service,
     shots_service,
+    storage_gc_service,
     sync_service,
     tasks_service,
 )
+from zou.app.models.comment import Comment
+from zou.app.models.entity import Entity
 from zou.app.models.person import Person
 from sqlalchemy.sql.expression import not_
 from zou.app.index_schema import init_indexes
@@ -362,17 +368,26 @@ def import_data_from_another_instance(
     with_events=False,
     no_projects=False,
     only_projects=False,
+    workers=sync_service.DEFAULT_SYNC_WORKERS,
+    checkpoint_file=None,
 ):
     """
     Retrieve and save all the data from another API instance. It doesn't
-    change the IDs.
+    change the IDs. When a checkpoint file is given, progress is stored in
+    it so an interrupted sync resumes where it stopped. The file is removed
+    once the sync is complete.
     """
     sync_service.init(target, login, password)
+    checkpoint = sync_service.SyncCheckpoint(checkpoint_file)
+    options = {"checkpoint": checkpoint, "max_workers": workers}
     if not only_projects:
-        sync_service.run_main_data_sync(project=project)
+        sync_service.run_main_data_sync(project=project, **options)
     if not no_projects:
-        sync_service.run_project_data_sync(project=project)
-        sync_service.run_other_sync(project=project)
+        sync_service.run_project_data_sync(project=project, **options)
+        sync_service.run_other_sync(
+            project=project, with_events=with_events, **options
+        )
+    checkpoint.clear()
 
 
 def run_sync_change_daemon(event_target, target, login, password, logs_dir):
@@ -406,15 +421,18 @@ def run_sync_file_change_daemon(
 
 
 def import_last_changes_from_another_instance(
-    target, login, password, minutes=0, page_size=300
+    target, login, password, minutes=0, page_size=300, cursor_file=None
 ):
     """
     Retrieve and save all the data related to most recent events from another
-    API instance. It doesn't change the IDs.
+    API instance. It doesn't change the IDs. With a cursor file, events are
+    read from the last event applied by the previous run.
     """
     sync_service.init(target, login, password)
     print("Last events syncing started.")
-    sync_service.run_last_events_sync(minutes=minutes, page_size=300)
+    sync_service.run_last_events_sync(
+        minutes=minutes, page_size=page_size, cursor_file=cursor_file
+    )
     print("Last events syncing ended.")
 
 
@@ -432,42 +450,158 @@ def import_last_file_changes_from_another_instance(
     print("Last files syncing ended.")
 
 
-def import_files_from_another_instance(target, login, password, project=None):
+def import_files_from_another_instance(
+    target,
+    login,
+    password,
+    project=None,
+    workers=transfer.DEFAULT_TRANSFER_WORKERS,
+    checkpoint_file=None,
+):
     """
     Retrieve and save all the data related most recent events from another API
-    instance. It doesn't change the IDs.
+    instance. It doesn't change the IDs. Preview files are downloaded by
+    `workers` concurrent downloads. With a checkpoint file, an interrupted
+    download of preview files resumes where it stopped.
     """
     sync_service.init(target, login, password)
-    sync_service.download_files_from_another_instance(project=project)
+    sync_service.download_files_from_another_instance(
+        project=project, workers=workers, checkpoint_file=checkpoint_file
+    )
 
 
-def download_file_from_storage():
+def download_file_from_storage(
+    workers=transfer.DEFAULT_TRANSFER_WORKERS, checkpoint_file=None
+):
     sync_service.download_entity_thumbnails_from_storage()
-    sync_service.download_preview_files_from_storage()
+    sync_service.download_preview_files_from_storage(
+        workers=workers, checkpoint_file=checkpoint_file
+    )
+
+
+def dump_database(workers=None):
+    print("Database backup started.")
+    filename = backup_service.stream_db_backup(
+        app.config["DATABASE"]["host"],
+        app.config["DATABASE"]["port"],
+        app.config["DATABASE"]["username"],
+        app.config["DATABASE"]["password"],
+        app.config["DATABASE"]["database"],
+        workers=workers,
+    )
+    print("Database backup stored: %s" % filename)
 
 
-def dump_database():
-    filename = backup_service.generate_db_backup(
+def restore_database(filename):
+    print("Database restoration started.")
+    backup_service.restore_db_backup(
+        filename,
         app.config["DATABASE"]["host"],
         app.config["DATABASE"]["port"],
         app.config["DATABASE"]["username"],
         app.config["DATABASE"]["password"],
         app.config["DATABASE"]["database"],
     )
-    backup_service.store_db_backup(filename)
+    print("Database restoration ended.")
 
 
-def upload_files_to_cloud_storage(days):
+def upload_files_to_cloud_storage(
+    days, workers=transfer.DEFAULT_TRANSFER_WORKERS, checkpoint_file=None
+):
     backup_service.upload_entity_thumbnails_to_storage(days)
-    backup_service.upload_preview_files_to_storage(days)
+    backup_service.upload_preview_files_to_storage(
+        days, workers=workers, checkpoint_file=checkpoint_file
+    )
 
 
 def reset_tasks_data(project_id):
     deletion_service.reset_tasks_data(project_id)
 
 
+def refresh_tasks_last_comment_and_preview(project_id=None):
+    print("Start setting last comment and last preview file of tasks.")
+    nb_tasks = tasks_service.refresh_last_comments_and_preview_files(
+        project_id=project_id
+    )
+    print("%s tasks updated." % nb_tasks)
+
+
+def deliver_notifications(interval=None):
+    """
+    Send notification digests that are due. If an interval is given, it
+    runs as a worker that checks for due digests every `interval` seconds.
+    """
+    with app.app_context():
+        while True:
+            try:
+                results = emails_service.deliver_digests()
+            except Exception:
+                if not interval:
+                    raise
+                app.logger.error(
+                    "Notification digests could not be delivered.",
+                    exc_info=1,
+                )
+                results = {}
+            for channel, result in results.items():
+                print(
+                    "%s: %s sent, %s failed"
+                    % (channel, result["sent"], result["failed"])
+                )
+            if not interval:
+                break
+            time.sleep(interval)
+
+
+def collect_storage_garbage(
+    batch_size=1000, max_attempts=5, interval=None, retry_delay=60
+):
+    """
+    Remove files marked for removal from the storage, batch by batch. If an
+    interval is given, it runs as a worker that checks for new tombstones
+    every `interval` seconds once there is nothing left to remove or when a
+    batch could not remove any file.
+    """
+    with app.app_context():
+        while True:
+            result = storage_gc_service.collect_garbage(
+                batch_size=batch_size,
+                max_attempts=max_attempts,
+                retry_delay=retry_delay,
+            )
+            if result["removed"] > 0 or result["failed"] > 0:
+                print(
+                    "%s files removed, %s failed"
+                    % (result["removed"], result["failed"])
+                )
+            if (
+                result["removed"] == 0
+                or result["removed"] + result["failed"] < batch_size
+            ):
+                if not interval:
+                    break
+                time.sleep(interval)
+
+
+def scan_orphan_files(dry_run=False):
+    """
+    Look for preview and attachment files that have no database entry
+    anymore. Unless it is a dry run, they are marked for removal.
+    """
+    with app.app_context():
+        orphans = storage_gc_service.scan_orphan_files(
+            add_tombstones_for_orphans=not dry_run
+        )
+        for bucket, keys in orphans.items():
+            for key in keys:
+                print("%s/%s" % (bucket, key))
+            print("%s: %s orphan files found" % (bucket, len(keys)))
+
+
 def remove_old_data(days_old=90):
     print("Start removing non critical data older than %s." % days_old)
+    print("Creating next partitions...")
+    deletion_service.create_next_partitions()
     print("Removing old events...")
     deletion_service.remove_old_events(days_old)
     print("Removing old login logs...")
@@ -477,9 +611,9 @@ def remove_old_data(days_old=90):
     print("Old data removed.")
 
 
-def reset_search_index():
+def reset_search_index(procs=1, multisegment=False):
     print("Resetting search index.")
-    index_service.reset_index()
+    index_service.reset_index(procs=procs, multisegment=multisegment)
     print("Search index resetted.")
 
 
@@ -489,6 +623,65 @@ def init_search_index():
     print("Search index initialised.")
 
 
+def get_latency_stats(durations):
+    durations = sorted(durations)
+    p95_index = min(int(len(durations) * 0.95), len(durations) - 1)
+    return {
+        "min": durations[0] * 1000,
+        "median": durations[len(durations) // 2] * 1000,
+        "p95": durations[p95_index] * 1000,
+    }
+
+
+def search_database(query, limit=3):
+    """
+    Search shots and comment text with `ilike` filters, like a search
+    without index does. It is the baseline of the search benchmark.
+    """
+    pattern = "%%%s%%" % query
+    entities = Entity.query.filter(Entity.name.ilike(pattern)).limit(limit)
+    comments = Comment.query.filter(Comment.text.ilike(pattern)).limit(limit)
+    return entities.all() + comments.all()
+
+
+def benchmark_search(queries, iterations=20):
+    """
+    Run each query `iterations` times on the search indexes and on the
+    database and print the latency of each kind of search.
+    """
+    searches = [
+        ("assets", index_service.search_assets),
+        ("persons", index_service.search_persons),
+        ("entries", index_service.search_entries),
+        ("database (ilike)", search_database),
+    ]
+    report = []
+    for query in queries:
+        for (name, search) in searches:
+            durations = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                results = search(query)
+                durations.append(time.perf_counter() - start)
+            stats = get_latency_stats(durations)
+            stats.update({"query": query, "search": name})
+            stats["results"] = len(results)
+            report.append(stats)
+            print(
+                "%s on %s: %s results, min %.2f ms, median %.2f ms, "
+                "p95 %.2f ms"
+                % (
+                    query,
+                    name,
+                    stats["results"],
+                    stats["min"],
+                    stats["median"],
+                    stats["p95"],
+                )
+            )
+    return report
+
+
 def search_asset(query):
     assets = index_service.search_assets(query)
     if len(assets) == 0:
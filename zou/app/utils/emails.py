@@ -31,6 +31,60 @@ def send_email(subject, html, recipient_email, body=None):
                 app.logger.info(traceback.format_exc())
 
 
+def send_emails(emails, rate_limiter=None, failed_messages=None):
+    """
+    Send given emails through a single SMTP connection. Emails are tuples
+    made of a subject, an HTML body and a recipient email. It returns the
+    number of emails sent and the number of emails that failed. Emails that
+    could not be sent are appended to `failed_messages` when it is given.
+    """
+    sent = 0
+    failed = 0
+    if app.config["MAIL_DEBUG"]:
+        for (_, html, _) in emails:
+            print(strip_html_tags(html))
+        return (len(emails), 0)
+    elif not app.config["MAIL_ENABLED"] or len(emails) == 0:
+        return (0, 0)
+
+    with app.app_context():
+        mail_default_sender = app.config["MAIL_DEFAULT_SENDER"]
+        remaining_emails = list(emails)
+        try:
+            with mail.connect() as connection:
+                while len(remaining_emails) > 0:
+                    email = remaining_emails.pop(0)
+                    (subject, html, recipient_email) = email
+                    if rate_limiter is not None:
+                        rate_limiter.wait()
+                    try:
+                        connection.send(
+                            Message(
+                                sender="Kitsu Bot <%s>" % mail_default_sender,
+                                body=strip_html_tags(html),
+                                html=html,
+                                subject=subject,
+                                recipients=[recipient_email],
+                            )
+                        )
+                        sent += 1
+                    except Exception:
+                        failed += 1
+                        if failed_messages is not None:
+                            failed_messages.append(email)
+                        app.logger.info(
+                            "Exception when sending a mail notification:"
+                        )
+                        app.logger.info(traceback.format_exc())
+        except Exception:
+            failed += len(remaining_emails)
+            if failed_messages is not None:
+                failed_messages.extend(remaining_emails)
+            app.logger.info("Exception when connecting to the mail server:")
+            app.logger.info(traceback.format_exc())
+    return (sent, failed)
+
+
 class HTMLStripper(HTMLParser):
     def __init__(self):
         super().__init__()
@@ -0,0 +1,33 @@
+from flask import Response, request
+from flask_jwt_extended import get_jwt_identity
+
+from zou.app.stores import versions_store
+
+
+def get_etag(collections, project_id=None):
+    """
+    Build the ETag of current request from the versions of given collections.
+    The ETag depends on the user and on the query parameters because they
+    change the result of the request.
+    """
+    variant = "%s:%s" % (get_jwt_identity(), request.full_path)
+    return versions_store.get_etag(collections, project_id, variant)
+
+
+def conditional_response(collections, project_id, get_result):
+    """
+    Return a 304 response if the ETag sent in the If-None-Match header
+    matches the current versions of given collections. Else it returns the
+    result of the get_result function with the ETag in the headers.
+
+    The ETag is computed before getting the result, so a change that occurs
+    meanwhile renews the ETag. Without a shared versions store, other API
+    instances can't renew the ETag, so the result is always returned.
+    """
+    if not versions_store.is_shared:
+        return get_result()
+    etag = get_etag(collections, project_id)
+    headers = {"ETag": '"%s"' % etag}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    return get_result(), 200, headers
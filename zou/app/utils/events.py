@@ -2,7 +2,7 @@ from collections import OrderedDict
 
 from flask import current_app
 
-from zou.app.stores import publisher_store
+from zou.app.stores import publisher_store, versions_store
 from zou.app.models.event import ApiEvent
 from zou.app.utils import fields
 
@@ -68,6 +68,7 @@ def emit(event, data={}, persist=True, project_id=None):
     if project_id is not None:
         data["project_id"] = project_id
     data = fields.serialize_dict(data)
+    versions_store.bump_for_event(event, project_id)
     publisher_store.publish(event, data)
     if persist:
         save_event(event, data, project_id=project_id)
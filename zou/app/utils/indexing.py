@@ -1,7 +1,7 @@
 from whoosh import index
-from whoosh.query import Or, Term
+from whoosh.query import And, Or, Term
 from whoosh.qparser import QueryParser
-from whoosh.fields import Schema, BOOLEAN, NGRAMWORDS, ID
+from whoosh.fields import Schema, BOOLEAN, NGRAMWORDS, ID, STORED
 
 
 def get_schema(schema):
@@ -15,6 +15,8 @@ def get_schema(schema):
             kwargs[key] = ID(unique=True, stored=True)
         elif value == "boolean":
             kwargs[key] = BOOLEAN(stored=True)
+        elif value == "stored":
+            kwargs[key] = STORED()
     return Schema(**kwargs)
 
 
@@ -26,6 +28,25 @@ def get_index(path):
     return index.open_dir(path)
 
 
+def get_writer(ix, procs=1, multisegment=False, limitmb=256, timeout=0.0):
+    """
+    Return a writer for given index. With several processes, documents are
+    indexed in parallel by sub-writers. With multisegment, each sub-writer
+    commits its own segment instead of merging them, which is faster but
+    leaves more segments to merge later. The writer waits up to `timeout`
+    seconds for the index lock.
+    """
+    if procs > 1:
+        return ix.writer(
+            procs=procs,
+            multisegment=multisegment,
+            limitmb=limitmb,
+            timeout=timeout,
+        )
+    else:
+        return ix.writer(limitmb=limitmb, timeout=timeout)
+
+
 def index_data(ix, data):
     writer = ix.writer(limitmb=1024)
     writer.add_document(**data)
@@ -33,21 +54,109 @@ def index_data(ix, data):
     return writer
 
 
+def index_documents(
+    ix, documents, batch_size=10000, procs=1, multisegment=False
+):
+    """
+    Add given documents to given index. A single writer is used for each
+    batch of documents, so there is one commit per batch instead of one per
+    document. It returns the number of indexed documents.
+    """
+    count = 0
+    writer = None
+    for document in documents:
+        if writer is None:
+            writer = get_writer(ix, procs=procs, multisegment=multisegment)
+        writer.add_document(**document)
+        count += 1
+        if count % batch_size == 0:
+            writer.commit()
+            writer = None
+    if writer is not None:
+        writer.commit()
+    return count
+
+
+def apply_changes(ix, changes, cascade_fields=[], timeout=10.0):
+    """
+    Apply given changes to given index with a single writer. Changes are
+    (id, document) pairs: the document replaces the one with the same id,
+    or it is removed if the document is None. On removal, documents whose
+    cascade fields match the removed id are removed too.
+    """
+    writer = get_writer(ix, timeout=timeout)
+    try:
+        for (entry_id, document) in changes:
+            if document is None:
+                writer.delete_by_term("id", entry_id)
+                for field in cascade_fields:
+                    writer.delete_by_term(field, entry_id)
+            else:
+                writer.update_document(**document)
+    except:
+        writer.cancel()
+        raise
+    writer.commit()
+    return len(changes)
+
+
+def get_document(ix, entry_id):
+    """
+    Return stored fields of the document matching given id, None if there is
+    no such document.
+    """
+    with ix.searcher() as searcher:
+        return searcher.document(id=entry_id)
+
+
+def get_filter(project_ids=[], type_name=None):
+    """
+    Build a filter on given project ids and document type. It returns None
+    when there is nothing to filter.
+    """
+    terms = []
+    if len(project_ids) > 0:
+        terms.append(
+            Or([Term("project_id", project_id) for project_id in project_ids])
+        )
+    if type_name is not None:
+        terms.append(Term("type", type_name))
+    if len(terms) == 0:
+        return None
+    elif len(terms) == 1:
+        return terms[0]
+    else:
+        return And(terms)
+
+
 def search(ix, query, project_ids=[], limit=10):
     query_parser = QueryParser("name", schema=ix.schema)
     whoosh_query = query_parser.parse(query)
-    is_project_filter = len(project_ids) > 0
     ids = []
     with ix.searcher() as searcher:
-        if is_project_filter:
-            project_id_terms = Or(
-                [Term("project_id", project_id) for project_id in project_ids]
-            )
-            results = searcher.search(
-                whoosh_query, filter=project_id_terms, limit=limit
-            )
-        else:
-            results = searcher.search(whoosh_query, limit=limit)
+        results = searcher.search(
+            whoosh_query, filter=get_filter(project_ids), limit=limit
+        )
         for result in results:
             ids.append(result["id"])
     return ids
+
+
+def search_documents(ix, query, project_ids=[], types=[], limit=10):
+    """
+    Return stored fields of the documents matching given query. With types
+    given, up to `limit` documents are returned for each type, in the order
+    of the types. The query is parsed once and a single searcher is used.
+    """
+    query_parser = QueryParser("name", schema=ix.schema)
+    whoosh_query = query_parser.parse(query)
+    documents = []
+    with ix.searcher() as searcher:
+        for type_name in types or [None]:
+            results = searcher.search(
+                whoosh_query,
+                filter=get_filter(project_ids, type_name),
+                limit=limit,
+            )
+            documents += [result.fields() for result in results]
+    return documents
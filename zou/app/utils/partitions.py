@@ -0,0 +1,312 @@
+"""
+Helpers to manage tables partitioned by month on their creation date. They
+work on a SQLAlchemy connection so they can be used from migrations as well
+as from services. Tables that are not partitioned are left untouched.
+"""
+import datetime
+import re
+
+from sqlalchemy import text
+
+PARTITIONED_TABLES = ["api_event", "login_log", "notification"]
+
+BOUND_RE = re.compile(r"FROM \((.+)\) TO \((.+)\)")
+
+
+def get_month_start(date):
+    return datetime.datetime(date.year, date.month, 1)
+
+
+def add_months(date, months):
+    month_index = date.year * 12 + date.month - 1 + months
+    return datetime.datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_partition_name(table_name, month_start):
+    return "%s_%s" % (table_name, month_start.strftime("%Y_%m"))
+
+
+def is_partitioned(connection, table_name):
+    """
+    Return True if given table is a partitioned table.
+    """
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name"),
+        name=table_name,
+    ).scalar()
+    return relkind == "p"
+
+
+def _parse_bound(value):
+    if value == "MINVALUE":
+        return datetime.datetime.min
+    elif value == "MAXVALUE":
+        return datetime.datetime.max
+    return datetime.datetime.fromisoformat(value.strip("'"))
+
+
+def get_partitions(connection, table_name):
+    """
+    Return partitions of given table as dicts with their name and their
+    bounds (start included, end excluded). The default partition has no
+    bounds.
+    """
+    rows = connection.execute(
+        text(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = :name
+            """
+        ),
+        name=table_name,
+    ).fetchall()
+    partitions = []
+    for (name, bound) in rows:
+        match = BOUND_RE.search(bound)
+        if match is None:
+            partitions.append({"name": name, "start": None, "end": None})
+        else:
+            partitions.append(
+                {
+                    "name": name,
+                    "start": _parse_bound(match.group(1)),
+                    "end": _parse_bound(match.group(2)),
+                }
+            )
+    return sorted(
+        partitions, key=lambda p: p["start"] or datetime.datetime.max
+    )
+
+
+def create_month_partition(connection, table_name, month_start):
+    """
+    Create the partition of given table for the month starting at given
+    date. Rows of this month already stored in the default partition are
+    moved to the new partition.
+    """
+    name = get_partition_name(table_name, month_start)
+    default_name = "%s_default" % table_name
+    start = month_start.isoformat(" ")
+    end = add_months(month_start, 1).isoformat(" ")
+    connection.execute(
+        'CREATE TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS)' % (name, table_name)
+    )
+    if default_name in [
+        p["name"] for p in get_partitions(connection, table_name)
+    ]:
+        connection.execute(
+            text(
+                'WITH moved AS (DELETE FROM "%s" '
+                "WHERE created_at >= :start AND created_at < :end "
+                'RETURNING *) INSERT INTO "%s" SELECT * FROM moved'
+                % (default_name, name)
+            ),
+            start=start,
+            end=end,
+        )
+    connection.execute(
+        'ALTER TABLE "%s" ATTACH PARTITION "%s" '
+        "FOR VALUES FROM ('%s') TO ('%s')" % (table_name, name, start, end)
+    )
+    return name
+
+
+def ensure_partitions(connection, table_name, months_ahead=3, now=None):
+    """
+    Create the missing partitions of given table, from the current month to
+    `months_ahead` months later. It returns the names of created partitions.
+    """
+    if not is_partitioned(connection, table_name):
+        return []
+    if now is None:
+        now = datetime.datetime.utcnow()
+    partitions = get_partitions(connection, table_name)
+    created = []
+    for months in range(months_ahead + 1):
+        month_start = add_months(get_month_start(now), months)
+        month_end = add_months(month_start, 1)
+        is_covered = any(
+            p["start"] is not None
+            and p["start"] < month_end
+            and p["end"] > month_start
+            for p in partitions
+        )
+        if not is_covered:
+            created.append(
+                create_month_partition(connection, table_name, month_start)
+            )
+    return created
+
+
+def drop_partitions_before(connection, table_name, limit_date):
+    """
+    Drop partitions of given table that only contain rows created before
+    given date. It returns the names of dropped partitions.
+    """
+    if not is_partitioned(connection, table_name):
+        return []
+    dropped = []
+    for partition in get_partitions(connection, table_name):
+        if partition["end"] is not None and partition["end"] <= limit_date:
+            connection.execute('DROP TABLE "%s"' % partition["name"])
+            dropped.append(partition["name"])
+    return dropped
+
+
+def _get_table_definitions(connection, table_name):
+    indexes = connection.execute(
+        text(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE tablename = :name AND indexname NOT IN (
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = CAST(:name AS regclass)
+            )
+            """
+        ),
+        name=table_name,
+    ).fetchall()
+    constraints = connection.execute(
+        text(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = CAST(:name AS regclass)
+            AND contype IN ('p', 'u', 'f')
+            """
+        ),
+        name=table_name,
+    ).fetchall()
+    return indexes, constraints
+
+
+def _add_created_at(definition):
+    return re.sub(r"\)$", ", created_at)", definition, count=1)
+
+
+def partition_table(connection, table_name, months_ahead=3, now=None):
+    """
+    Turn given table into a table partitioned by month on its creation date.
+    The existing table is not copied: it becomes the partition holding all
+    rows created before the month following its most recent row (at least
+    the current month). New monthly partitions are created after it, plus a
+    default partition.
+
+    Primary key and unique constraints of partitioned tables must include
+    the partition key, so `created_at` is added to them.
+    """
+    if now is None:
+        now = datetime.datetime.utcnow()
+    legacy_name = "%s_legacy" % table_name
+    (indexes, constraints) = _get_table_definitions(connection, table_name)
+
+    connection.execute(
+        'UPDATE "%s" SET created_at = COALESCE(updated_at, NOW()) '
+        "WHERE created_at IS NULL" % table_name
+    )
+    last_date = connection.execute(
+        'SELECT MAX(created_at) FROM "%s"' % table_name
+    ).scalar()
+    boundary = get_month_start(now)
+    if last_date is not None:
+        boundary = max(boundary, add_months(get_month_start(last_date), 1))
+    boundary = boundary.isoformat(" ")
+    connection.execute(
+        'ALTER TABLE "%s" RENAME TO "%s"' % (table_name, legacy_name)
+    )
+    for (index_name, _) in indexes:
+        connection.execute(
+            'ALTER INDEX "%s" RENAME TO "%s_legacy"'
+            % (index_name, index_name[:56])
+        )
+    for (constraint_name, constraint_type, definition) in constraints:
+        if constraint_type in ("p", "u"):
+            # Replaced by a unique index matching the constraint of the
+            # partitioned table, so it is reused when attaching the table.
+            connection.execute(
+                'ALTER TABLE "%s" DROP CONSTRAINT "%s"'
+                % (legacy_name, constraint_name)
+            )
+            connection.execute(
+                'CREATE UNIQUE INDEX "%s_legacy" ON "%s" %s'
+                % (
+                    constraint_name[:56],
+                    legacy_name,
+                    _add_created_at(definition[definition.index("(") :]),
+                )
+            )
+
+    connection.execute(
+        'CREATE TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS) '
+        "PARTITION BY RANGE (created_at)" % (table_name, legacy_name)
+    )
+    connection.execute(
+        'ALTER TABLE "%s" ALTER COLUMN created_at SET NOT NULL' % table_name
+    )
+    for (constraint_name, constraint_type, definition) in constraints:
+        if constraint_type in ("p", "u"):
+            definition = _add_created_at(definition)
+        connection.execute(
+            'ALTER TABLE "%s" ADD CONSTRAINT "%s" %s'
+            % (table_name, constraint_name, definition)
+        )
+    for (_, definition) in indexes:
+        connection.execute(definition)
+
+    connection.execute(
+        'ALTER TABLE "%s" ADD CONSTRAINT "%s_range" '
+        "CHECK (created_at IS NOT NULL AND created_at < '%s')"
+        % (legacy_name, legacy_name, boundary)
+    )
+    connection.execute(
+        'ALTER TABLE "%s" ALTER COLUMN created_at SET NOT NULL' % legacy_name
+    )
+    connection.execute(
+        'ALTER TABLE "%s" ATTACH PARTITION "%s" '
+        "FOR VALUES FROM (MINVALUE) TO ('%s')"
+        % (table_name, legacy_name, boundary)
+    )
+    connection.execute(
+        'ALTER TABLE "%s" DROP CONSTRAINT "%s_range"'
+        % (legacy_name, legacy_name)
+    )
+    connection.execute(
+        'CREATE TABLE "%s_default" PARTITION OF "%s" DEFAULT'
+        % (table_name, table_name)
+    )
+    ensure_partitions(connection, table_name, months_ahead, now)
+
+
+def unpartition_table(connection, table_name):
+    """
+    Turn given partitioned table back into a regular table. All rows are
+    copied into the new table.
+    """
+    (indexes, constraints) = _get_table_definitions(connection, table_name)
+    plain_name = "%s_plain" % table_name
+    connection.execute(
+        'CREATE TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS)'
+        % (plain_name, table_name)
+    )
+    connection.execute(
+        'INSERT INTO "%s" SELECT * FROM "%s"' % (plain_name, table_name)
+    )
+    connection.execute('DROP TABLE "%s"' % table_name)
+    connection.execute(
+        'ALTER TABLE "%s" RENAME TO "%s"' % (plain_name, table_name)
+    )
+    connection.execute(
+        'ALTER TABLE "%s" ALTER COLUMN created_at DROP NOT NULL' % table_name
+    )
+    for (constraint_name, constraint_type, definition) in constraints:
+        if constraint_type in ("p", "u"):
+            definition = definition.replace(", created_at)", ")")
+        connection.execute(
+            'ALTER TABLE "%s" ADD CONSTRAINT "%s" %s'
+            % (table_name, constraint_name, definition)
+        )
+    for (_, definition) in indexes:
+        connection.execute(definition.replace(" ONLY ", " "))
@@ -74,6 +74,16 @@ def get_paginated_results(query, page, relations=False):
         return result
 
 
+def get_first_per_group(query, group_columns, *order_by):
+    """
+    Restrict given query to the first row of each group. Groups are defined
+    by given columns and rows are sorted inside each group with given order
+    by clauses. It relies on the DISTINCT ON clause of Postgres, which avoids
+    to load all the rows of each group.
+    """
+    return query.distinct(*group_columns).order_by(*group_columns, *order_by)
+
+
 def apply_sort_by(model, query, sort_by):
     """
     Apply an order by clause to a sqlalchemy query from a string parameter.
@@ -85,3 +95,24 @@ def apply_sort_by(model, query, sort_by):
     else:
         sort_field = model.updated_at.desc()
     return query.order_by(sort_field)
+
+
+def get_rows_by_batches(query, id_column, after_id=None, batch_size=1000):
+    """
+    Generator that yields rows of given query sorted by given id column.
+    Rows are fetched by batches, each batch starting after the last id of
+    the previous one. It avoids loading all rows in memory and the read
+    transaction is ended after each batch, so rows can be processed for a
+    long time without keeping a cursor open. Rows must have an `id` field.
+    """
+    while True:
+        batch_query = query.order_by(id_column)
+        if after_id is not None:
+            batch_query = batch_query.filter(id_column > after_id)
+        rows = batch_query.limit(batch_size).all()
+        query.session.commit()
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            break
+        after_id = rows[-1].id
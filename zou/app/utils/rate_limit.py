@@ -0,0 +1,28 @@
+import time
+
+
+class RateLimiter(object):
+    """
+    Space calls to `wait` so that no more than `rate` calls are made per
+    second. A rate of 0 or less means no limit.
+    """
+
+    def __init__(self, rate=0):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self.next_call = 0
+
+    def get_delay(self):
+        """
+        Return the time to wait before the next call is allowed and reserve
+        the slot of this call.
+        """
+        now = time.monotonic()
+        delay = max(self.next_call - now, 0)
+        self.next_call = max(self.next_call, now) + self.interval
+        return delay
+
+    def wait(self):
+        delay = self.get_delay()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
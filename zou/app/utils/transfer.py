@@ -0,0 +1,353 @@
+"""
+Engine to transfer a large number of files (from or to an object storage or
+another instance) with a pool of workers. Items to transfer are streamed:
+only a bounded number of them are pending at the same time. Failed
+transfers are retried with an exponential backoff, progress is reported
+regularly and a checkpoint allows to resume an interrupted transfer.
+"""
+import collections
+import json
+import os
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from sqlalchemy import or_
+
+from zou.app.utils.query import get_rows_by_batches
+
+DEFAULT_TRANSFER_WORKERS = 8
+
+
+def call_with_retries(func, retries=3, backoff=1.0):
+    """
+    Call given function. If it raises an exception, it is called again up
+    to `retries` times, waiting `backoff` seconds before the first retry
+    and doubling this delay for the next ones.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff * 2**attempt)
+            attempt += 1
+
+
+def get_transfer_result(transferred=0, skipped=0, size=0):
+    """
+    Build the result expected from a transfer function: number of files
+    transferred, number of files skipped (already there with the same size)
+    and number of bytes transferred.
+    """
+    return {"transferred": transferred, "skipped": skipped, "size": size}
+
+
+class TransferCheckpoint(object):
+    """
+    Position of a transfer stored in a JSON file: all items up to the saved
+    key were processed. Items are transferred in key order, so a transfer
+    restarted after this key doesn't process them again. Keys of the items
+    whose transfer failed are stored too, so they can be retried. Without
+    file path, the position is only kept in memory.
+    """
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.last_key = None
+        self.failed_keys = []
+        if file_path is not None and os.path.exists(file_path):
+            with open(file_path) as checkpoint_file:
+                data = json.load(checkpoint_file)
+            self.last_key = data.get("last_key")
+            self.failed_keys = data.get("failed_keys", [])
+
+    def set_failed(self, key, is_failed):
+        if is_failed and key not in self.failed_keys:
+            self.failed_keys.append(key)
+        elif not is_failed and key in self.failed_keys:
+            self.failed_keys.remove(key)
+
+    def save(self, last_key=None):
+        """
+        Save the position and the failed keys. The position never moves
+        back: retried items are located before it.
+        """
+        if last_key is not None and (
+            self.last_key is None or last_key > self.last_key
+        ):
+            self.last_key = last_key
+        if self.file_path is not None:
+            tmp_path = "%s.tmp" % self.file_path
+            with open(tmp_path, "w") as checkpoint_file:
+                json.dump(
+                    {
+                        "last_key": self.last_key,
+                        "failed_keys": self.failed_keys,
+                    },
+                    checkpoint_file,
+                )
+            os.replace(tmp_path, self.file_path)
+
+    def clear(self):
+        self.last_key = None
+        self.failed_keys = []
+        if self.file_path is not None and os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class TransferProgress(object):
+    """
+    Count processed items, transferred files and bytes, and report the
+    throughput and the estimated remaining time of a transfer.
+    """
+
+    def __init__(self, total=None, report_interval=10, output=print):
+        self.total = total
+        self.report_interval = report_interval
+        self.output = output
+        self.lock = threading.Lock()
+        self.items = 0
+        self.transferred = 0
+        self.skipped = 0
+        self.failed = 0
+        self.size = 0
+        self.start = time.monotonic()
+        self.last_report = self.start
+
+    def add_result(self, result):
+        with self.lock:
+            self.items += 1
+            self.transferred += result.get("transferred", 0)
+            self.skipped += result.get("skipped", 0)
+            self.size += result.get("size", 0)
+
+    def add_failure(self):
+        with self.lock:
+            self.items += 1
+            self.failed += 1
+
+    def get_stats(self):
+        elapsed = max(time.monotonic() - self.start, 0.001)
+        items_per_second = self.items / elapsed
+        eta = None
+        if self.total is not None and items_per_second > 0:
+            eta = max(self.total - self.items, 0) / items_per_second
+        return {
+            "items": self.items,
+            "total": self.total,
+            "transferred": self.transferred,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "size": self.size,
+            "elapsed": elapsed,
+            "throughput": self.size / elapsed,
+            "eta": eta,
+        }
+
+    def format(self):
+        stats = self.get_stats()
+        message = "%s%s items processed (%s files transferred, %s skipped, "
+        message += "%s failed), %.1f MB at %.2f MB/s"
+        message = message % (
+            stats["items"],
+            "/%s" % stats["total"] if stats["total"] is not None else "",
+            stats["transferred"],
+            stats["skipped"],
+            stats["failed"],
+            stats["size"] / 1000000.0,
+            stats["throughput"] / 1000000.0,
+        )
+        if stats["eta"] is not None:
+            message += ", ETA %s" % time.strftime(
+                "%H:%M:%S", time.gmtime(stats["eta"])
+            )
+        return message
+
+    def report(self, force=False):
+        now = time.monotonic()
+        if force or now - self.last_report >= self.report_interval:
+            self.last_report = now
+            self.output(self.format())
+
+
+class ProgressStream(object):
+    """
+    Wrap a file-like object or an iterable of chunks to count the bytes read
+    through it and report the throughput regularly. `on_end` is called when
+    the end of the stream is reached, before it is reported to the reader:
+    it can raise an exception to make the reader fail.
+    """
+
+    def __init__(
+        self,
+        stream,
+        label="transferred",
+        report_interval=10,
+        output=print,
+        on_end=None,
+    ):
+        self.stream = stream
+        self.label = label
+        self.report_interval = report_interval
+        self.output = output
+        self.on_end = on_end
+        self.size = 0
+        self.ended = False
+        self.start = time.monotonic()
+        self.last_report = self.start
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.add_chunk(chunk)
+        return chunk
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.add_chunk(chunk)
+            yield chunk
+        self.add_chunk(b"")
+
+    def add_chunk(self, chunk):
+        self.size += len(chunk)
+        if len(chunk) == 0 and not self.ended:
+            self.ended = True
+            self.report(force=True)
+            if self.on_end is not None:
+                self.on_end()
+        elif len(chunk) > 0:
+            self.report()
+
+    def format(self):
+        elapsed = max(time.monotonic() - self.start, 0.001)
+        return "%.1f MB %s at %.2f MB/s" % (
+            self.size / 1000000.0,
+            self.label,
+            self.size / elapsed / 1000000.0,
+        )
+
+    def report(self, force=False):
+        now = time.monotonic()
+        if force or now - self.last_report >= self.report_interval:
+            self.last_report = now
+            self.output(self.format())
+
+
+def run_transfers(
+    items,
+    transfer_func,
+    workers=DEFAULT_TRANSFER_WORKERS,
+    checkpoint=None,
+    progress=None,
+    retries=3,
+    backoff=1.0,
+):
+    """
+    Call `transfer_func` on each item of the (key, item) pairs yielded by
+    `items`, with a pool of `workers` threads. The transfer function returns
+    a result built with `get_transfer_result`. At most twice as many items
+    as workers are pending at the same time, so items can be streamed from
+    the database.
+
+    Items must be yielded in key order. Each time all the items up to a key
+    are processed (failed ones included), this key is saved in the
+    checkpoint, along with the keys of failed items. It returns the
+    progress of the transfer.
+    """
+    if progress is None:
+        progress = TransferProgress()
+    pending_keys = collections.OrderedDict()
+    futures = {}
+
+    def collect(done_futures):
+        for future in done_futures:
+            key = futures.pop(future)
+            try:
+                progress.add_result(future.result())
+                is_failed = False
+            except Exception as e:
+                progress.add_failure()
+                progress.output("Transfer of %s failed: %s" % (key, e))
+                is_failed = True
+            if checkpoint is not None:
+                checkpoint.set_failed(key, is_failed)
+            pending_keys[key] = True
+        last_key = None
+        while len(pending_keys) > 0 and next(iter(pending_keys.values())):
+            (last_key, _) = pending_keys.popitem(last=False)
+        if checkpoint is not None:
+            checkpoint.save(last_key)
+        progress.report()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (key, item) in items:
+            while len(futures) >= workers * 2:
+                (done, _) = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = executor.submit(
+                call_with_retries,
+                lambda item=item: transfer_func(item),
+                retries,
+                backoff,
+            )
+            futures[future] = key
+            pending_keys[key] = False
+        while len(futures) > 0:
+            (done, _) = wait(futures, return_when=FIRST_COMPLETED)
+            collect(done)
+    progress.report(force=True)
+    return progress
+
+
+def run_query_transfers(
+    query,
+    id_column,
+    transfer_func,
+    workers=DEFAULT_TRANSFER_WORKERS,
+    checkpoint_file=None,
+    retries=3,
+    backoff=1.0,
+    output=print,
+):
+    """
+    Call `transfer_func` on each row of given query with a pool of workers.
+    Rows are streamed from the database by batches sorted on given id
+    column. With a checkpoint file, an interrupted transfer resumes after
+    the last row processed, and rows whose transfer failed are retried. The
+    checkpoint is removed once all rows are transferred. If some transfers
+    failed, it is kept with their ids so the next run retries them. It
+    returns the progress of the transfer.
+    """
+    checkpoint = TransferCheckpoint(checkpoint_file)
+    if checkpoint.last_key is not None:
+        output(
+            "Resume transfer after %s, retry %s failed rows."
+            % (checkpoint.last_key, len(checkpoint.failed_keys))
+        )
+        condition = id_column > checkpoint.last_key
+        if len(checkpoint.failed_keys) > 0:
+            condition = or_(condition, id_column.in_(checkpoint.failed_keys))
+        query = query.filter(condition)
+    progress = TransferProgress(total=query.count(), output=output)
+    rows = (
+        (str(row.id), row) for row in get_rows_by_batches(query, id_column)
+    )
+    run_transfers(
+        rows,
+        transfer_func,
+        workers=workers,
+        checkpoint=checkpoint,
+        progress=progress,
+        retries=retries,
+        backoff=backoff,
+    )
+    if checkpoint_file is not None and len(checkpoint.failed_keys) > 0:
+        output(
+            "%s rows failed, run the transfer again with the same "
+            "checkpoint file to retry them." % len(checkpoint.failed_keys)
+        )
+    else:
+        checkpoint.clear()
+    return progress
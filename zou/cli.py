@@ -261,17 +261,23 @@ def sync_with_ldap_server():
 @click.option("--no-projects", is_flag=True)
 @click.option("--with-events", is_flag=True)
 @click.option("--only-projects", is_flag=True)
+@click.option("--workers", default=4)
+@click.option("--checkpoint-file")
 def sync_full(
     target,
     project=None,
     with_events=False,
     no_projects=False,
     only_projects=False,
+    workers=4,
+    checkpoint_file=None,
 ):
     """
     Retrieve all data from target instance. It expects that credentials to
     connect to target instance are given through SYNC_LOGIN and SYNC_PASSWORD
-    environment variables.
+    environment variables. Pages are fetched by `workers` concurrent
+    requests. With a checkpoint file, an interrupted sync resumes where it
+    stopped when it is run again with the same file.
     """
     print("Start syncing.")
     login = os.getenv("SYNC_LOGIN")
@@ -284,6 +290,8 @@ def sync_full(
         with_events=with_events,
         no_projects=no_projects,
         only_projects=only_projects,
+        workers=workers,
+        checkpoint_file=checkpoint_file,
     )
     print("Syncing ended.")
 
@@ -291,17 +299,26 @@ def sync_full(
 @cli.command()
 @click.option("--target", default="http://localhost:5000")
 @click.option("--project")
-def sync_full_files(target, project=None):
+@click.option("--workers", default=8)
+@click.option("--checkpoint-file", default=None)
+def sync_full_files(target, project=None, workers=8, checkpoint_file=None):
     """
     Retrieve all files from target instance. It expects that credentials to
     connect to target instance are given through SYNC_LOGIN and SYNC_PASSWORD
-    environment variables.
+    environment variables. Preview files are downloaded by `workers`
+    concurrent downloads. With a checkpoint file, an interrupted sync resumes
+    where it stopped when it is run again with the same file.
     """
     print("Start syncing.")
     login = os.getenv("SYNC_LOGIN")
     password = os.getenv("SYNC_PASSWORD")
     commands.import_files_from_another_instance(
-        target, login, password, project=project
+        target,
+        login,
+        password,
+        project=project,
+        workers=workers,
+        checkpoint_file=checkpoint_file,
     )
     print("Syncing ended.")
 
@@ -344,16 +361,24 @@ def sync_file_changes(event_target, target, logs_directory):
 @click.option("--target", default="http://localhost:8080/api")
 @click.option("--minutes", default=0)
 @click.option("--page-size", default=300)
-def sync_last_events(target, minutes, page_size):
+@click.option("--cursor-file", default=None)
+def sync_last_events(target, minutes, page_size, cursor_file):
     """
     Retrieve last events that occured on target instance and import data related
     to them. It expects that credentials to connect to target instance are
-    given through SYNC_LOGIN and SYNC_PASSWORD environment variables.
+    given through SYNC_LOGIN and SYNC_PASSWORD environment variables. With a
+    cursor file, each run starts after the last event applied by the
+    previous one.
     """
     login = os.getenv("SYNC_LOGIN")
     password = os.getenv("SYNC_PASSWORD")
     commands.import_last_changes_from_another_instance(
-        target, login, password, minutes=minutes, page_size=page_size
+        target,
+        login,
+        password,
+        minutes=minutes,
+        page_size=page_size,
+        cursor_file=cursor_file,
     )
 
 
@@ -375,30 +400,54 @@ def sync_last_files(target, minutes, page_size):
 
 
 @cli.command()
-def download_storage_files():
+@click.option("--workers", default=8)
+@click.option("--checkpoint-file", default=None)
+def download_storage_files(workers, checkpoint_file):
     """
     Download all files from a Swift object storage and store them in a local
-    storage.
+    storage. Preview files are downloaded by `workers` concurrent downloads.
+    With a checkpoint file, an interrupted download resumes where it stopped.
     """
-    commands.download_file_from_storage()
+    commands.download_file_from_storage(
+        workers=workers, checkpoint_file=checkpoint_file
+    )
 
 
 @cli.command()
-def dump_database():
+@click.option("--workers", default=None, type=int)
+def dump_database(workers):
     """
     Dump database described in Zou environment variables and save it to
-    configured object storage.
+    configured object storage. The dump is compressed and uploaded while it
+    is generated, with `workers` compression threads when pigz is installed.
     """
-    commands.dump_database()
+    commands.dump_database(workers)
+
+
+@cli.command()
+@click.option("--filename", required=True)
+def restore_database(filename):
+    """
+    Load given database backup, stored in the configured object storage by
+    the dump-database command, into the database described in Zou
+    environment variables. This database is expected to be empty.
+    """
+    commands.restore_database(filename)
 
 
 @cli.command()
 @click.option("--days", default=None)
-def upload_files_to_cloud_storage(days):
+@click.option("--workers", default=8)
+@click.option("--checkpoint-file", default=None)
+def upload_files_to_cloud_storage(days, workers, checkpoint_file):
     """
     Upload all files related to previews to configured object storage.
+    Preview files are uploaded by `workers` concurrent uploads. With a
+    checkpoint file, an interrupted upload resumes where it stopped.
     """
-    commands.upload_files_to_cloud_storage(days)
+    commands.upload_files_to_cloud_storage(
+        days, workers=workers, checkpoint_file=checkpoint_file
+    )
 
 
 @cli.command()
@@ -411,6 +460,54 @@ def clean_tasks_data(projectid):
         commands.reset_tasks_data(projectid)
 
 
+@cli.command()
+@click.option("--projectid", default=None)
+def refresh_tasks_last_comment_and_preview(projectid):
+    """
+    Set the last comment and the last preview file of every task (or of the
+    tasks of given project). It's required after the upgrade that adds
+    these fields.
+    """
+    commands.refresh_tasks_last_comment_and_preview(projectid)
+
+
+@cli.command()
+@click.option("--interval", default=0)
+def deliver_notifications(interval):
+    """
+    Send notification digests that are due. With an interval (in seconds),
+    it runs as a delivery worker that checks for due digests periodically.
+    """
+    commands.deliver_notifications(interval)
+
+
+@cli.command()
+@click.option("--batch-size", default=1000)
+@click.option("--max-attempts", default=5)
+@click.option("--interval", default=0)
+@click.option("--retry-delay", default=60)
+def collect_storage_garbage(batch_size, max_attempts, interval, retry_delay):
+    """
+    Remove from the storage the files of deleted previews and attachments.
+    With an interval (in seconds), it runs as a worker that checks for files
+    to remove periodically. Failed removals are retried after a delay (in
+    seconds) that doubles with each attempt.
+    """
+    commands.collect_storage_garbage(
+        batch_size, max_attempts, interval, retry_delay
+    )
+
+
+@cli.command()
+@click.option("--dry-run", is_flag=True, default=False)
+def scan_orphan_files(dry_run):
+    """
+    Look for stored preview and attachment files without database entry and
+    mark them for removal (unless --dry-run is set).
+    """
+    commands.scan_orphan_files(dry_run)
+
+
 @cli.command()
 @click.option("--days", default=90)
 def remove_old_data(days):
@@ -422,11 +519,15 @@ def remove_old_data(days):
 
 
 @cli.command()
-def reset_search_index():
+@click.option("--procs", default=1)
+@click.option("--multisegment", is_flag=True, default=False)
+def reset_search_index(procs, multisegment):
     """
-    Reset search index.
+    Reset search index. Documents are indexed by `procs` processes. With
+    multisegment, each process writes its own segment instead of merging
+    them, which is faster.
     """
-    commands.reset_search_index()
+    commands.reset_search_index(procs=procs, multisegment=multisegment)
 
 
 @cli.command()
@@ -444,5 +545,16 @@ def search_asset(query):
     commands.search_asset(query)
 
 
+@cli.command()
+@click.option("--query", multiple=True, required=True)
+@click.option("--iterations", default=20)
+def benchmark_search(query, iterations):
+    """
+    Print the latency of searches on the indexes and on the database for
+    given queries.
+    """
+    commands.benchmark_search(query, iterations=iterations)
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,28 @@
+"""add news created at index
+
+Revision ID: 4aa6b2d1e8f3
+Revises: 9d3bb33a6fc6
+Create Date: 2026-10-19 12:20:14.518203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "4aa6b2d1e8f3"
+down_revision = "9d3bb33a6fc6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_news_created_at_id",
+        "news",
+        ["created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_news_created_at_id", table_name="news")
@@ -0,0 +1,55 @@
+"""add last comment and last preview file to task
+
+Revision ID: 9d3bb33a6fc6
+Revises: 2baede80b111
+Create Date: 2026-10-19 11:02:41.293846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = "9d3bb33a6fc6"
+down_revision = "2baede80b111"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "task",
+        sa.Column(
+            "last_comment_id",
+            sqlalchemy_utils.types.uuid.UUIDType(binary=False),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "task",
+        sa.Column(
+            "last_preview_file_id",
+            sqlalchemy_utils.types.uuid.UUIDType(binary=False),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        op.f("ix_task_last_comment_id"),
+        "task",
+        ["last_comment_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_task_last_preview_file_id"),
+        "task",
+        ["last_preview_file_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_task_last_preview_file_id"), table_name="task")
+    op.drop_index(op.f("ix_task_last_comment_id"), table_name="task")
+    op.drop_column("task", "last_preview_file_id")
+    op.drop_column("task", "last_comment_id")
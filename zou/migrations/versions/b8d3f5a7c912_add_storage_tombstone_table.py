@@ -0,0 +1,41 @@
+"""add storage tombstone table
+
+Revision ID: b8d3f5a7c912
+Revises: 4aa6b2d1e8f3
+Create Date: 2026-10-19 13:10:42.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+import uuid
+
+# revision identifiers, used by Alembic.
+revision = "b8d3f5a7c912"
+down_revision = "4aa6b2d1e8f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "storage_tombstone",
+        sa.Column(
+            "id",
+            sqlalchemy_utils.types.uuid.UUIDType(binary=False),
+            default=uuid.uuid4,
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("bucket", sa.String(length=40), nullable=False),
+        sa.Column("key", sa.String(length=400), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("bucket", "key", name="storage_tombstone_uc"),
+    )
+
+
+def downgrade():
+    op.drop_table("storage_tombstone")
@@ -0,0 +1,30 @@
+"""partition event, login log and notification tables by month
+
+Revision ID: c3e9a1f4d2b6
+Revises: b8d3f5a7c912
+Create Date: 2026-10-19 15:02:17.431806
+
+"""
+from alembic import op
+
+from zou.app.utils import partitions
+
+# revision identifiers, used by Alembic.
+revision = "c3e9a1f4d2b6"
+down_revision = "b8d3f5a7c912"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    for table_name in partitions.PARTITIONED_TABLES:
+        if not partitions.is_partitioned(connection, table_name):
+            partitions.partition_table(connection, table_name)
+
+
+def downgrade():
+    connection = op.get_bind()
+    for table_name in partitions.PARTITIONED_TABLES:
+        if partitions.is_partitioned(connection, table_name):
+            partitions.unpartition_table(connection, table_name)